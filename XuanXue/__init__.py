@@ -27,9 +27,64 @@ from .xuanxue import (
     get_stock_kbar_path,
     set_stock_kbar_path,
     check_stock_kbar_path,
+    clear_path_overrides,
     KbarSeriesGanZhi,
+    KbarSeriesGanZhiMany,
+    XuanXueSession,
+    get_default_session,
+    KbarShardRouter,
+    set_kbar_shards,
+    get_kbar_shard_router,
+    clear_kbar_shards,
+    KbarSeriesGanZhiAsync,
+    OnBoardDateGanZhiAsync,
+    DateTimeGanZhiAsync,
+    set_async_max_workers,
+    shutdown_async_executor,
+    set_read_only,
+    is_read_only,
+    enable_write_behind,
+    disable_write_behind,
+    flush_write_behind,
+    write_behind_queue_depth,
+    enable_result_cache,
+    disable_result_cache,
+    clear_result_cache,
+    result_cache_stats,
+    enable_metrics,
+    disable_metrics,
+    stats,
+    stats_prometheus,
+    reset_stats,
+    profile,
+    is_profiling,
+    backfill_pillars,
+    resample_kbar_series,
+    resample_kbar_database,
+    aggregate_by_pillar,
+    PillarReturnStats,
+    pillar_return_stats,
+    forward_returns,
+    load_pillar_arrays,
+    kbar_series_pillar_arrays,
+    ingest_kbar_file,
+    ingest_kbar_csv,
+    ingest_kbar_parquet,
+    export_pillars,
+    export_pillars_parquet,
+    export_pillars_arrow,
+    export_pillars_npz,
+    load_pillars_npz,
+    export_kbar_files,
+    KbarFile,
+    open_kbar_file,
+    write_kbar_file,
+    encode_ganzhi,
+    decode_ganzhi,
     KbarSeriesKey,
     KbarSeries,
+    ColumnarKbarSeries,
+    intern_kbar_series_key,
     Kbar
 
 )
@@ -40,7 +95,88 @@ __all__ = [
     "OnBoardDateGanZhi",
     "DateTimeGanZhi", 
     "KbarSeriesGanZhi",
+    "KbarSeriesGanZhiMany",
 
+    # 会话
+    "XuanXueSession",
+    "get_default_session",
+
+    # 分片存储
+    "KbarShardRouter",
+    "set_kbar_shards",
+    "get_kbar_shard_router",
+    "clear_kbar_shards",
+
+    # asyncio接口
+    "KbarSeriesGanZhiAsync",
+    "OnBoardDateGanZhiAsync",
+    "DateTimeGanZhiAsync",
+    "set_async_max_workers",
+    "shutdown_async_executor",
+
+    # 只读模式
+    "set_read_only",
+    "is_read_only",
+
+    # 后台写入
+    "enable_write_behind",
+    "disable_write_behind",
+    "flush_write_behind",
+    "write_behind_queue_depth",
+
+    # 结果缓存
+    "enable_result_cache",
+    "disable_result_cache",
+    "clear_result_cache",
+    "result_cache_stats",
+
+    # 运行指标
+    "enable_metrics",
+    "disable_metrics",
+    "stats",
+    "stats_prometheus",
+    "reset_stats",
+
+    # 性能分析
+    "profile",
+    "is_profiling",
+
+    # 干支回填
+    "backfill_pillars",
+
+    # 周期重采样
+    "resample_kbar_series",
+    "resample_kbar_database",
+
+    # 按干支聚合
+    "aggregate_by_pillar",
+
+    # 干支收益率统计
+    "PillarReturnStats",
+    "pillar_return_stats",
+    "forward_returns",
+    "load_pillar_arrays",
+    "kbar_series_pillar_arrays",
+
+    # K线批量导入
+    "ingest_kbar_file",
+    "ingest_kbar_csv",
+    "ingest_kbar_parquet",
+
+    # 列式导出
+    "export_pillars",
+    "export_pillars_parquet",
+    "export_pillars_arrow",
+    "export_pillars_npz",
+    "load_pillars_npz",
+    "encode_ganzhi",
+    "decode_ganzhi",
+
+    # K线二进制文件
+    "export_kbar_files",
+    "KbarFile",
+    "open_kbar_file",
+    "write_kbar_file",
     
     # 配置管理
     "get_stock_meta_path",
@@ -49,10 +185,13 @@ __all__ = [
     "get_stock_kbar_path",
     "set_stock_kbar_path",
     "check_stock_kbar_path",
+    "clear_path_overrides",
 
     #类别
     "KbarSeriesKey",
     "KbarSeries",
+    "ColumnarKbarSeries",
+    "intern_kbar_series_key",
     "Kbar",
 
 
@@ -0,0 +1,8 @@
+"""
+python -m XuanXue 命令行入口
+"""
+import sys
+
+from .xuanxue.cli import main
+
+sys.exit(main())
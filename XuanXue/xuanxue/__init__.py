@@ -11,13 +11,75 @@ KbarSeriesGanZhi( start-datetime, end-datetime, NULL, useDB=true)
 这样是在 K线数据库里面查询 Start-DateTime - End-DateTime的K线序列 ,然后计算干支,如果已经计算过了, 就返回DB的干支结果
 """
 
+import logging
+
+# 库默认不输出日志，由调用方配置 logging 后按级别输出
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
 __version__ = "0.1.0"
 __author__ = "XuWu"
 
 from .core.ganzhi_calculator import DateTimeGanZhi
 from .core.stock_ganzhi import OnBoardDateGanZhi
-from .core.kbarseriesganzhi import KbarSeriesGanZhi
+from .core.kbarseriesganzhi import KbarSeriesGanZhi, KbarSeriesGanZhiMany
+from .core.session import XuanXueSession, get_default_session
+from .core.kbar_shard import (
+    KbarShardRouter,
+    set_kbar_shards,
+    get_kbar_shard_router,
+    clear_kbar_shards,
+)
+from .core.async_api import (
+    KbarSeriesGanZhiAsync,
+    OnBoardDateGanZhiAsync,
+    DateTimeGanZhiAsync,
+    set_async_max_workers,
+    shutdown_async_executor,
+)
+from .core.database import set_read_only, is_read_only
+from .core.write_behind import (
+    enable_write_behind,
+    disable_write_behind,
+    flush_write_behind,
+    write_behind_queue_depth,
+)
+from .core.result_cache import (
+    enable_result_cache,
+    disable_result_cache,
+    clear_result_cache,
+    result_cache_stats,
+)
+from .core.metrics import (
+    enable_metrics,
+    disable_metrics,
+    stats,
+    stats_prometheus,
+    reset_stats,
+)
+from .core.profiling import profile, is_profiling
+from .core.backfill import backfill_pillars
+from .core.resample import resample_kbar_series, resample_kbar_database
+from .core.aggregate import aggregate_by_pillar
+from .core.analytics import (
+    PillarReturnStats,
+    pillar_return_stats,
+    forward_returns,
+    load_pillar_arrays,
+    kbar_series_pillar_arrays,
+)
+from .core.ingest import ingest_kbar_file, ingest_kbar_csv, ingest_kbar_parquet
+from .core.export import (
+    export_pillars,
+    export_pillars_parquet,
+    export_pillars_arrow,
+    export_pillars_npz,
+    load_pillars_npz,
+    export_kbar_files,
+)
 from .utils import KbarSeriesKey,KbarSeries,Kbar
+from .utils import ColumnarKbarSeries, intern_kbar_series_key
+from .utils import KbarFile, open_kbar_file, write_kbar_file
+from .utils import encode_ganzhi, decode_ganzhi
 
 from XuanXue.xuanxue.config import (
     get_stock_meta_path,
@@ -26,6 +88,7 @@ from XuanXue.xuanxue.config import (
     get_stock_kbar_path,
     set_stock_kbar_path,
     check_stock_kbar_path,
+    clear_path_overrides,
 )
 
 __all__ = [
@@ -37,8 +100,63 @@ __all__ = [
     "get_stock_kbar_path",
     "set_stock_kbar_path",
     "check_stock_kbar_path",
+    "clear_path_overrides",
     "KbarSeriesGanZhi",
+    "KbarSeriesGanZhiMany",
+    "XuanXueSession",
+    "get_default_session",
+    "KbarShardRouter",
+    "set_kbar_shards",
+    "get_kbar_shard_router",
+    "clear_kbar_shards",
+    "KbarSeriesGanZhiAsync",
+    "OnBoardDateGanZhiAsync",
+    "DateTimeGanZhiAsync",
+    "set_async_max_workers",
+    "shutdown_async_executor",
+    "set_read_only",
+    "is_read_only",
+    "enable_write_behind",
+    "disable_write_behind",
+    "flush_write_behind",
+    "write_behind_queue_depth",
+    "enable_result_cache",
+    "disable_result_cache",
+    "clear_result_cache",
+    "result_cache_stats",
+    "enable_metrics",
+    "disable_metrics",
+    "stats",
+    "stats_prometheus",
+    "reset_stats",
+    "profile",
+    "is_profiling",
+    "backfill_pillars",
+    "resample_kbar_series",
+    "resample_kbar_database",
+    "aggregate_by_pillar",
+    "PillarReturnStats",
+    "pillar_return_stats",
+    "forward_returns",
+    "load_pillar_arrays",
+    "kbar_series_pillar_arrays",
+    "ingest_kbar_file",
+    "ingest_kbar_csv",
+    "ingest_kbar_parquet",
+    "export_pillars",
+    "export_pillars_parquet",
+    "export_pillars_arrow",
+    "export_pillars_npz",
+    "load_pillars_npz",
+    "export_kbar_files",
+    "KbarFile",
+    "open_kbar_file",
+    "write_kbar_file",
+    "encode_ganzhi",
+    "decode_ganzhi",
     "KbarSeriesKey",
     "KbarSeries",
+    "ColumnarKbarSeries",
+    "intern_kbar_series_key",
     "Kbar"
 ]
@@ -0,0 +1,153 @@
+"""
+XuanXue 命令行
+
+python -m XuanXue backfill [--db PATH] [--chunk-size N] [--restart]
+    回填K线数据库中所有缺失的干支，可中断，再次运行时从检查点继续
+
+python -m XuanXue ingest FILE [FILE ...] [--db PATH] [--symbol S] [--exchange E] [--period P]
+    把CSV/Parquet格式的K线文件批量导入K线数据库，同时计算干支
+
+python -m XuanXue export OUT [--db PATH] [--start S] [--end E] [--key SYMBOL EXCHANGE PERIOD]
+    把干支序列导出为列式文件（.parquet / .arrow / .npz），四柱编码为int8
+    加 --kbar-files 时OUT为目录，每个K线序列导出一个可内存映射的 .xkb 二进制文件
+
+python -m XuanXue resample PERIOD [PERIOD ...] [--db PATH] [--source-period 1min] [--key SYMBOL EXCHANGE PERIOD]
+    由细粒度K线（默认1分钟）聚合生成目标周期的K线并计算干支，再次运行时只处理新的K线
+"""
+import argparse
+import sys
+
+from .core.backfill import backfill_pillars, format_eta
+from .core.export import export_kbar_files, export_pillars
+from .core.ingest import ingest_kbar_file
+from .core.resample import resample_kbar_database, resample_kbar_series
+
+
+def _print_backfill_progress(stats):
+    print(f"  已处理 {stats['processed']}/{stats['total']} 条 "
+          f"(更新 {stats['updated']}, 失败 {stats['failed']}), "
+          f"{stats['rows_per_sec']:.0f} 条/秒, 预计剩余 {format_eta(stats)}, "
+          f"检查点 id={stats['last_id']}")
+
+
+def _cmd_backfill(args):
+    db_paths = args.db or [None]
+    for db_path in db_paths:
+        print(f"开始回填干支: {db_path or '配置的stock_kbar_path'}")
+        try:
+            stats = backfill_pillars(db_path, chunk_size=args.chunk_size, restart=args.restart,
+                                     progress=_print_backfill_progress)
+        except KeyboardInterrupt:
+            print("已中断，再次运行将从检查点继续")
+            return 130
+        print(f"完成: {stats['db_path']} 共处理 {stats['processed']} 条, 更新 {stats['updated']} 条, "
+              f"失败 {stats['failed']} 条, 用时 {stats['elapsed']:.1f} 秒")
+    return 0
+
+
+def _print_ingest_progress(stats):
+    print(f"  已导入 {stats['rows']} 条, {stats['rows_per_sec']:.0f} 条/秒")
+
+
+def _cmd_ingest(args):
+    for path in args.files:
+        print(f"开始导入: {path}")
+        stats = ingest_kbar_file(path, args.db, chunk_size=args.chunk_size, symbol=args.symbol,
+                                 exchange=args.exchange, period=args.period, on_conflict=args.on_conflict,
+                                 progress=_print_ingest_progress)
+        print(f"完成: {path} -> {stats['db_path']} 共导入 {stats['rows']} 条, "
+              f"用时 {stats['elapsed']:.1f} 秒")
+    return 0
+
+
+def _cmd_export(args):
+    if args.kbar_files:
+        stats = export_kbar_files(args.output, args.db, args.start, args.end, args.key, chunk_size=args.chunk_size)
+        print(f"完成: 导出 {stats['files']} 个文件共 {stats['rows']} 条到 {stats['directory']}, "
+              f"用时 {stats['elapsed']:.1f} 秒")
+        return 0
+    kwargs = {}
+    if args.pillar_encoding and not args.output.lower().endswith(".npz"):
+        kwargs["pillar_encoding"] = args.pillar_encoding
+    stats = export_pillars(args.output, args.db, args.start, args.end, args.key,
+                           chunk_size=args.chunk_size, **kwargs)
+    print(f"完成: 导出 {stats['rows']} 条到 {stats['path']}, 用时 {stats['elapsed']:.1f} 秒")
+    return 0
+
+
+def _cmd_resample(args):
+    if args.key:
+        for key in args.key:
+            for period in args.periods:
+                stats = resample_kbar_series(key, period, args.db, offset_minutes=args.offset_minutes,
+                                             full=args.full)
+                print(f"完成: {'-'.join(key)} -> {period} 聚合 {stats['source_rows']} 条源K线, "
+                      f"写入 {stats['bars']} 根, 用时 {stats['elapsed']:.1f} 秒")
+        return 0
+    stats = resample_kbar_database(args.periods, args.source_period, args.db, offset_minutes=args.offset_minutes,
+                                   full=args.full)
+    print(f"完成: {stats['series']} 个 {args.source_period} 序列聚合 {stats['source_rows']} 条源K线, "
+          f"写入 {stats['bars']} 根, 用时 {stats['elapsed']:.1f} 秒")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m XuanXue", description="XuanXue 玄学数据分析包命令行")
+    subparsers = parser.add_subparsers(dest="command")
+
+    backfill = subparsers.add_parser("backfill", help="回填K线数据库中缺失的干支")
+    backfill.add_argument("--db", action="append", help="K线数据库路径，可重复指定；默认使用配置的stock_kbar_path")
+    backfill.add_argument("--chunk-size", type=int, default=10000, help="每块处理并提交的记录数（默认10000）")
+    backfill.add_argument("--restart", action="store_true", help="忽略检查点，从头开始回填")
+    backfill.set_defaults(func=_cmd_backfill)
+
+    ingest = subparsers.add_parser("ingest", help="批量导入CSV/Parquet格式的K线文件")
+    ingest.add_argument("files", nargs="+", help="K线文件路径（.csv 或 .parquet）")
+    ingest.add_argument("--db", help="K线数据库路径，默认使用配置的stock_kbar_path")
+    ingest.add_argument("--chunk-size", type=int, default=100000, help="每个事务写入的记录数（默认100000）")
+    ingest.add_argument("--symbol", help="文件中没有symbol列时使用的证券代码")
+    ingest.add_argument("--exchange", help="文件中没有exchange列时使用的交易所")
+    ingest.add_argument("--period", help="文件中没有period列时使用的周期")
+    ingest.add_argument("--on-conflict", choices=("update", "ignore", "none"), default="update",
+                        help="遇到重复K线时覆盖(update)、跳过(ignore)或不处理(none)")
+    ingest.set_defaults(func=_cmd_ingest)
+
+    export = subparsers.add_parser("export", help="把干支序列导出为Parquet/Arrow/NPZ列式文件")
+    export.add_argument("output", help="输出文件路径，按扩展名选择格式（.parquet / .arrow / .npz）")
+    export.add_argument("--db", action="append", help="K线数据库路径，可重复指定；默认使用分片配置或stock_kbar_path")
+    export.add_argument("--start", help="开始时间，默认不限制")
+    export.add_argument("--end", help="结束时间，默认不限制")
+    export.add_argument("--key", nargs=3, action="append", metavar=("SYMBOL", "EXCHANGE", "PERIOD"),
+                        help="只导出指定的K线序列，可重复指定")
+    export.add_argument("--chunk-size", type=int, default=100000, help="每块从数据库读取的记录数（默认100000）")
+    export.add_argument("--pillar-encoding", choices=("int8", "dictionary"),
+                        help="Parquet/Arrow中四柱的编码方式（默认int8）")
+    export.add_argument("--kbar-files", action="store_true",
+                        help="把每个K线序列（含OHLCV）导出为OUT目录下的 .xkb 二进制文件")
+    export.set_defaults(func=_cmd_export)
+
+    resample = subparsers.add_parser("resample", help="由细粒度K线聚合生成其他周期的K线并计算干支")
+    resample.add_argument("periods", nargs="+", help="目标周期，如 5min 15min 1h 1day")
+    resample.add_argument("--db", help="K线数据库路径，默认使用配置的stock_kbar_path")
+    resample.add_argument("--source-period", default="1min", help="源K线周期（默认1min）")
+    resample.add_argument("--key", nargs=3, action="append", metavar=("SYMBOL", "EXCHANGE", "PERIOD"),
+                          help="只聚合指定的源K线序列，可重复指定；默认聚合全部源周期的序列")
+    resample.add_argument("--offset-minutes", type=int, default=0,
+                          help="分桶对齐点平移的分钟数，如A股1小时K线从9:30开始时为30")
+    resample.add_argument("--full", action="store_true", help="忽略检查点，全部重新聚合")
+    resample.set_defaults(func=_cmd_resample)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, "func", None):
+        parser.print_help()
+        return 1
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,7 +13,8 @@ from .config_manager import (
     StockPathManager,
     get_stock_kbar_path,
     set_stock_kbar_path,
-    check_stock_kbar_path
+    check_stock_kbar_path,
+    clear_path_overrides,
 )
 
 __all__ = [
@@ -26,6 +27,7 @@ __all__ = [
     'StockPathManager',
     'get_stock_kbar_path',
     'set_stock_kbar_path',
-    'check_stock_kbar_path'
+    'check_stock_kbar_path',
+    'clear_path_overrides',
 
 ]
\ No newline at end of file
@@ -1,11 +1,40 @@
 """
 股票数据库路径配置管理器
 管理 stock_meta_path 和 stock_kbar_path 配置
+
+路径的优先级（从高到低）:
+    1. 进程内覆盖：set_stock_kbar_path(path, persist=False)，不写配置文件，只对当前进程有效
+    2. 环境变量：XUANXUE_STOCK_META_PATH / XUANXUE_STOCK_KBAR_PATH
+    3. 配置文件 config.txt：解析结果缓存在内存中，文件被修改（修改时间/大小/inode变化）后才重新读取
+写配置文件时先写临时文件再替换，并用锁文件串行化不同进程的读-改-写
 """
+import contextlib
+import logging
 import os
 import sqlite3
+import threading
 from typing import Optional, Tuple, Dict
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATHS = {
+    "stock_meta_path": "stock_meta.db",
+    "stock_kbar_path": "kbar_db/stock_kbar.db",
+}
+
+# 覆盖配置文件的环境变量
+PATH_ENV_VARS = {
+    "stock_meta_path": "XUANXUE_STOCK_META_PATH",
+    "stock_kbar_path": "XUANXUE_STOCK_KBAR_PATH",
+}
+
+
 class StockPathManager:
     """股票数据库路径管理器"""
     
@@ -16,19 +45,27 @@ class StockPathManager:
         else:
             self.config_file = config_file
         
+        self._lock = threading.Lock()
+        self._cached_paths = None   # 配置文件的解析结果
+        self._cached_stamp = None   # 解析时配置文件的 (inode, 修改时间, 大小)
+        self._overrides = {}        # 进程内覆盖的路径
         self._ensure_config_exists()
     
     def _ensure_config_exists(self):
         """确保配置文件存在"""
         if not os.path.exists(self.config_file):
             # 创建默认配置
-            self._save_paths({
-                "stock_meta_path": "stock_meta.db",
-                "stock_kbar_path": "kbar_db/stock_kbar.db"
-            })
+            self._save_paths(dict(DEFAULT_PATHS))
     
-    def _load_paths(self) -> Dict[str, str]:
-        """从配置文件加载所有路径"""
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
+    def _read_paths(self) -> Dict[str, str]:
+        """读取并解析配置文件"""
         paths = {}
         try:
             with open(self.config_file, 'r', encoding='utf-8') as f:
@@ -42,40 +79,85 @@ class StockPathManager:
             pass
         
         # 设置默认值
-        if 'stock_meta_path' not in paths:
-            paths['stock_meta_path'] = "stock_meta.db"
-        if 'stock_kbar_path' not in paths:
-            paths['stock_kbar_path'] = "kbar_db/stock_kbar.db"
-        
+        for path_key, default in DEFAULT_PATHS.items():
+            paths.setdefault(path_key, default)
         return paths
     
+    def _load_paths(self) -> Dict[str, str]:
+        """从配置文件加载所有路径，文件未修改时直接返回缓存的解析结果"""
+        stamp = self._file_stamp()
+        with self._lock:
+            if self._cached_paths is None or stamp is None or stamp != self._cached_stamp:
+                self._cached_paths = self._read_paths()
+                self._cached_stamp = stamp
+            return dict(self._cached_paths)
+    
     def _load_path(self, path_key: str) -> str:
-        """从配置文件加载指定路径"""
+        """加载指定路径：进程内覆盖 > 环境变量 > 配置文件"""
+        override = self._overrides.get(path_key)
+        if override:
+            return override
+        env_var = PATH_ENV_VARS.get(path_key)
+        if env_var and os.environ.get(env_var):
+            return os.environ[env_var]
         paths = self._load_paths()
         return paths.get(path_key, "")
     
+    @contextlib.contextmanager
+    def _file_lock(self):
+        """配置文件的进程间锁（锁文件为 config.txt.lock）"""
+        with open(self.config_file + ".lock", "a+b") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+    
+    def _write_paths(self, paths: Dict[str, str]):
+        # 先写临时文件再替换，其他进程不会读到写了一半的配置
+        temp_file = f"{self.config_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write("# XuanXue 股票数据库路径配置\n")
+            f.write("# 请确保路径指向有效的SQLite数据库文件\n\n")
+            f.write(f"stock_meta_path={paths.get('stock_meta_path', DEFAULT_PATHS['stock_meta_path'])}\n")
+            f.write(f"stock_kbar_path={paths.get('stock_kbar_path', DEFAULT_PATHS['stock_kbar_path'])}\n")
+        os.replace(temp_file, self.config_file)
+        with self._lock:
+            self._cached_paths = dict(paths)
+            self._cached_stamp = self._file_stamp()
+    
     def _save_paths(self, paths: Dict[str, str]):
         """保存所有路径到配置文件"""
         try:
             # 确保目录存在
             os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-            
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                f.write("# XuanXue 股票数据库路径配置\n")
-                f.write("# 请确保路径指向有效的SQLite数据库文件\n\n")
-                f.write(f"stock_meta_path={paths.get('stock_meta_path', 'stock_meta.db')}\n")
-                f.write(f"stock_kbar_path={paths.get('stock_kbar_path', 'kbar_db/stock_kbar.db')}\n")
-            
+            with self._file_lock():
+                self._write_paths(paths)
             return True
         except Exception as e:
-            print(f"保存配置失败: {e}")
+            logger.warning("保存配置失败: %s", e)
             return False
     
     def _save_path(self, path_key: str, path: str):
-        """保存单个路径到配置文件"""
-        current_paths = self._load_paths()
-        current_paths[path_key] = path
-        return self._save_paths(current_paths)
+        """保存单个路径到配置文件（加锁后重新读取文件，不会覆盖其他进程刚写入的另一项）"""
+        try:
+            os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
+            with self._file_lock():
+                current_paths = self._read_paths()
+                current_paths[path_key] = path
+                self._write_paths(current_paths)
+            return True
+        except Exception as e:
+            logger.warning("保存配置失败: %s", e)
+            return False
     
     def get_path(self, path_key: str = "stock_meta_path") -> str:
         """获取当前配置的数据库路径（绝对路径）"""
@@ -90,14 +172,35 @@ class StockPathManager:
         absolute_path = os.path.abspath(os.path.join(config_dir, relative_path))
         return absolute_path
     
-    def set_path(self, path_key: str, path: str) -> bool:
-        """设置数据库路径"""
+    def set_path(self, path_key: str, path: str, persist: bool = True) -> bool:
+        """
+        设置数据库路径
+        :param persist: True表示写入配置文件；False表示只在当前进程内覆盖，不写文件
+        persist=True 写入的配置文件优先级低于环境变量 XUANXUE_STOCK_*_PATH，
+        环境变量已设置时写入的路径在当前进程中不生效（会记录警告）
+        """
         # 转换为绝对路径
         if not os.path.isabs(path):
             path = os.path.abspath(path)
         
+        if not persist:
+            self._overrides[path_key] = path
+            return True
+        # 写入配置文件的路径应当生效，清除之前的进程内覆盖
+        self._overrides.pop(path_key, None)
+        env_var = PATH_ENV_VARS.get(path_key)
+        if env_var and os.environ.get(env_var):
+            logger.warning("%s 已写入配置文件，但环境变量 %s=%s 优先，当前进程仍使用环境变量的路径",
+                           path_key, env_var, os.environ[env_var])
         return self._save_path(path_key, path)
     
+    def clear_overrides(self, path_key: Optional[str] = None):
+        """清除进程内覆盖的路径，path_key为None时清除全部"""
+        if path_key is None:
+            self._overrides.clear()
+        else:
+            self._overrides.pop(path_key, None)
+    
     def check_path(self, path_key: str = "stock_meta_path") -> Tuple[bool, str]:
         """
         检查当前路径是否能正常工作
@@ -108,8 +211,20 @@ class StockPathManager:
         Returns:
             Tuple[bool, str]: (是否可用, 提示信息)
         """
-        path = self.get_path(path_key)
+        return self.check_file(self.get_path(path_key), path_key)
+    
+    @staticmethod
+    def check_file(path: str, path_key: str = "stock_meta_path") -> Tuple[bool, str]:
+        """
+        检查指定的数据库文件是否能正常工作（不读取配置）
         
+        Args:
+            path: 数据库文件路径
+            path_key: 按哪种数据库检查，"stock_meta_path" 或 "stock_kbar_path"
+            
+        Returns:
+            Tuple[bool, str]: (是否可用, 提示信息)
+        """
         # 检查文件是否存在
         if not os.path.exists(path):
             return False, f"数据库文件不存在: {path}"
@@ -180,9 +295,12 @@ def get_stock_meta_path() -> str:
     """获取股票元数据数据库路径（绝对路径）"""
     return get_path_manager().get_path("stock_meta_path")
 
-def set_stock_meta_path(path: str) -> bool:
-    """设置股票元数据数据库路径"""
-    return get_path_manager().set_path("stock_meta_path", path)
+def set_stock_meta_path(path: str, persist: bool = True) -> bool:
+    """
+    设置股票元数据数据库路径
+    :param persist: False表示只在当前进程内生效，不写配置文件
+    """
+    return get_path_manager().set_path("stock_meta_path", path, persist)
 
 def check_stock_meta_path() -> Tuple[bool, str]:
     """
@@ -198,9 +316,12 @@ def get_stock_kbar_path() -> str:
     """获取股票K线数据库路径（绝对路径）"""
     return get_path_manager().get_path("stock_kbar_path")
 
-def set_stock_kbar_path(path: str) -> bool:
-    """设置股票K线数据库路径"""
-    return get_path_manager().set_path("stock_kbar_path", path)
+def set_stock_kbar_path(path: str, persist: bool = True) -> bool:
+    """
+    设置股票K线数据库路径
+    :param persist: False表示只在当前进程内生效，不写配置文件
+    """
+    return get_path_manager().set_path("stock_kbar_path", path, persist)
 
 def check_stock_kbar_path() -> Tuple[bool, str]:
     """
@@ -212,6 +333,10 @@ def check_stock_kbar_path() -> Tuple[bool, str]:
     return get_path_manager().check_path("stock_kbar_path")
 
 # === 通用函数 ===
+def clear_path_overrides():
+    """清除 persist=False 设置的进程内路径，恢复使用环境变量或配置文件"""
+    get_path_manager().clear_overrides()
+
 def get_all_paths() -> Dict[str, str]:
     """获取所有配置的数据库路径"""
     manager = get_path_manager()
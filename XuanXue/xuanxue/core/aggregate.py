@@ -0,0 +1,177 @@
+"""
+按干支分组的聚合统计
+
+aggregate_by_pillar(group_by="day", ...)   在SQLite中按干支 GROUP BY，返回每组的K线数以及各指标的个数、总和、均值
+
+指标（由OHLCV计算，均在SQL中完成）:
+    return            收盘到收盘收益率 close / 前一根close - 1（按 symbol, exchange, period 分区、按 ts 排序取前一根，
+                      时间范围内每个序列的第一根没有前一根，不计入）
+    intrabar_return   K线内收益率 close / open - 1
+    range             振幅 (high - low) / open
+    volume            成交量
+    amount            成交额
+
+group_by 可以是一柱（"year" / "month" / "day" / "hour"，按干支如 "甲子" 分组）、
+单独的天干或地支列（如 "day_gan"、"hour_zhi"），或它们的列表（多维分组）；结果总是同时按周期分组，
+不同周期的收益率不混在一起。
+
+只有聚合后的小表（按一柱分组时每个周期最多60组）从SQLite返回Python，不再把每根K线的干支字符串读入内存后按位置与价格对齐。
+干支为空（未回填）的K线归入值为 None 的组，需要时先运行 backfill_pillars；
+只有日期的K线（如日K线）没有时柱，按时柱分组时同样归入 None 组。
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+from ..config import gan, zhi
+from ..utils.ganzhi_codes import GANZHI_CYCLE
+from ..utils.kbar_type import PILLAR_NAMES
+from .database import open_connection, close_connection
+from .ganzhi_calculator import parse_time_range
+from .kbar_query import source_paths
+from .kbarseriesganzhi import _normalize_kbar_series_key
+from .metrics import start_call
+from .profiling import profiled
+
+MEASURES = ("return", "intrabar_return", "range", "volume", "amount")
+
+# 可用于分组的列: 一柱取 天干||地支，单独的天干/地支列直接使用；
+# 只有日期的K线时柱为空字符串，与未回填的NULL一样归入 None 组
+GROUP_COLUMNS = {name: f"NULLIF({name}_gan || {name}_zhi, '')" for name in PILLAR_NAMES}
+GROUP_COLUMNS.update({f"{name}_{part}": f"NULLIF({name}_{part}, '')" for name in PILLAR_NAMES for part in ("gan", "zhi")})
+
+_MEASURE_SQL = {
+    "return": "CASE WHEN prev_close > 0 THEN close / prev_close - 1 END",
+    "intrabar_return": "CASE WHEN open > 0 THEN close / open - 1 END",
+    "range": "CASE WHEN open > 0 THEN (high - low) / open END",
+    "volume": "volume",
+    "amount": "amount",
+}
+
+AGGREGATE_SQL = """
+SELECT period, {groups}, COUNT(*), {aggregates}
+FROM (
+    SELECT period, {group_exprs}, open, high, low, close, volume, amount,
+           LAG(close) OVER (PARTITION BY symbol, exchange, period ORDER BY ts) AS prev_close
+    FROM kbar_data
+    {where}
+)
+GROUP BY period, {groups}
+"""
+
+_SORT_ORDER = {
+    "pillar": {name: i for i, name in enumerate(GANZHI_CYCLE)},
+    "gan": {name: i for i, name in enumerate(gan)},
+    "zhi": {name: i for i, name in enumerate(zhi)},
+}
+
+
+def _normalize_group_by(group_by: Union[str, Sequence[str]]) -> List[str]:
+    names = [group_by] if isinstance(group_by, str) else list(group_by)
+    if not names:
+        raise ValueError("group_by 不能为空")
+    for name in names:
+        if name not in GROUP_COLUMNS:
+            raise ValueError(f"不支持的分组列: {name}，可选: {', '.join(GROUP_COLUMNS)}")
+    if len(set(names)) != len(names):
+        raise ValueError(f"分组列重复: {names}")
+    return names
+
+
+def _build_where(start_datetime, end_datetime, kbar_series_keys, periods):
+    """
+    构建过滤条件
+    ts在库中可能是 "YYYY-MM-DDTHH:MM:SS" 或 "YYYY-MM-DD HH:MM:SS"：先按日期范围比较（可使用ts索引），
+    再把 "T" 替换为空格后精确比较
+    """
+    conditions = []
+    params = []
+    start_dt, end_dt = parse_time_range(start_datetime, end_datetime)
+    if start_dt is not None:
+        conditions.append("ts >= ? AND replace(ts, 'T', ' ') >= ?")
+        params += [start_dt.strftime("%Y-%m-%d"), start_dt.strftime("%Y-%m-%d %H:%M:%S")]
+    if end_dt is not None:
+        conditions.append("ts < date(?, '+1 day') AND replace(ts, 'T', ' ') <= ?")
+        params += [end_dt.strftime("%Y-%m-%d"), end_dt.strftime("%Y-%m-%d %H:%M:%S")]
+    if periods is not None:
+        periods = [periods] if isinstance(periods, str) else list(periods)
+        conditions.append(f"period IN ({', '.join('?' * len(periods))})")
+        params += periods
+    if kbar_series_keys is not None:
+        keys = [_normalize_kbar_series_key(key) for key in kbar_series_keys]
+        conditions.append("(" + " OR ".join(["(symbol = ? AND exchange = ? AND period = ?)"] * len(keys)) + ")")
+        for key in keys:
+            params += [key.symbol, key.exchange, key.period]
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where, params
+
+
+def _sort_key(names: List[str], row: Dict):
+    key = [row["period"]]
+    for name in names:
+        order = _SORT_ORDER["pillar" if name in PILLAR_NAMES else name.rsplit("_", 1)[1]]
+        value = row[name]
+        key.append((value is None, order.get(value, len(order)) if value is not None else 0))
+    return key
+
+
+@profiled("aggregate_by_pillar")
+def aggregate_by_pillar(group_by: Union[str, Sequence[str]] = "day", db_path=None,
+                        start_datetime=None, end_datetime=None,
+                        kbar_series_keys: Optional[Iterable] = None,
+                        periods: Optional[Union[str, Iterable[str]]] = None) -> List[Dict]:
+    """
+    按干支分组聚合K线的OHLCV指标，分组和求和在SQLite中完成
+    :param group_by: 分组列，"year"/"month"/"day"/"hour"、"day_gan" 等，或它们的列表
+    :param db_path: 数据库路径或路径列表，None表示使用分片配置或配置的 stock_kbar_path；多个库的结果按组合并
+    :param start_datetime: 开始时间，None表示不限制
+    :param end_datetime: 结束时间，None表示不限制
+    :param kbar_series_keys: 只统计这些K线序列，None表示全部
+    :param periods: 只统计这些周期，None表示全部
+    :return: 按周期和干支顺序排列的列表，每组一个字典:
+             {"period", <分组列>..., "bars", "<指标>_count", "<指标>_sum", "<指标>_mean", ...}
+    """
+    names = _normalize_group_by(group_by)
+    where, params = _build_where(start_datetime, end_datetime, kbar_series_keys, periods)
+    groups = ", ".join(names)
+    query = AGGREGATE_SQL.format(
+        groups=groups,
+        group_exprs=", ".join(f"{GROUP_COLUMNS[name]} AS {name}" for name in names),
+        aggregates=", ".join(f"COUNT({_MEASURE_SQL[m]}), SUM({_MEASURE_SQL[m]})" for m in MEASURES),
+        where=where,
+    )
+
+    timer = start_call("aggregate_by_pillar")
+    try:
+        merged: Dict[tuple, Dict] = {}
+        for path in source_paths(db_path):
+            conn = open_connection(path)
+            try:
+                rows = conn.execute(query, params).fetchall()
+            finally:
+                close_connection(conn)
+            timer.lap("sql_read")
+
+            # 分片之间按组合并个数和总和，均值最后计算
+            for row in rows:
+                group = tuple(row[:len(names) + 1])
+                values = row[len(names) + 1:]
+                entry = merged.get(group)
+                if entry is None:
+                    entry = merged[group] = {"period": group[0], **dict(zip(names, group[1:])), "bars": 0}
+                    for measure in MEASURES:
+                        entry[f"{measure}_count"] = 0
+                        entry[f"{measure}_sum"] = 0
+                entry["bars"] += values[0]
+                for i, measure in enumerate(MEASURES):
+                    entry[f"{measure}_count"] += values[1 + 2 * i]
+                    entry[f"{measure}_sum"] += values[2 + 2 * i] or 0
+
+        result = sorted(merged.values(), key=lambda row: _sort_key(names, row))
+        for entry in result:
+            for measure in MEASURES:
+                count = entry[f"{measure}_count"]
+                entry[f"{measure}_mean"] = entry[f"{measure}_sum"] / count if count else None
+        timer.lap("build")
+        timer.count("rows_returned", len(result))
+        return result
+    finally:
+        timer.finish()
@@ -0,0 +1,407 @@
+"""
+按干支分组的收益率统计（需要安装numpy）
+
+pillar_return_stats(close, pillar_codes, lengths, horizon=1, groups=...)   由数组计算每个干支组的收益率统计
+forward_returns(close, lengths, horizon=1)                                 计算向前收益率 close[i+h] / close[i] - 1
+load_pillar_arrays(db_path=None, ...)                                      从数据库读取收盘价和四柱序号数组
+kbar_series_pillar_arrays(series_list)                                     从 ColumnarKbarSeries / KbarFile 列表组装数组
+
+多个K线序列首尾相接成一组数组，lengths 为每个序列的长度，向前收益率不跨越序列边界，
+因此数千只股票可以在一次调用中完成。四柱为六十甲子序号（0=甲子 ... 59=癸亥，-1表示缺失，见 utils.ganzhi_codes）。
+
+groups 中每一项是一个分组：一柱（"year" / "month" / "day" / "hour"）、单独的天干或地支（如 "day_gan"、"hour_zhi"），
+或由它们组成的元组（组合分组，如 ("day", "hour")）。每个组的个数、均值、方差（样本方差）和胜率（收益率 > 0 的比例）
+用 numpy.bincount 按组求和得到，结果为按序号索引的稠密数组，例如 stats["day+hour"].mean[日柱序号, 时柱序号]。
+干支缺失或没有向前收益率（序列最后 horizon 根、前后收盘价不为正）的K线不计入。
+
+使用方法:
+    arrays = load_pillar_arrays(periods="1day")
+    stats = pillar_return_stats(arrays["close"], arrays["pillar_codes"], arrays["lengths"],
+                                groups=("day", ("day", "hour")))
+    stats["day"].to_rows()      # [{"day": "甲子", "count", "mean", "var", "hit_rate"}, ...]
+"""
+import warnings
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖，使用时再报错
+    np = None
+
+from ..config import gan, zhi
+from ..utils.ganzhi_codes import GANZHI_CYCLE, encode_ganzhi
+from ..utils.kbar_type import PILLAR_NAMES
+from .database import MISSING_PILLARS_CONDITION, open_connection, close_connection
+from .ganzhi_calculator import calculate_pillar_fields_batch, parse_time_range, parse_ts, parse_ts_with_hour
+from .kbar_query import build_kbar_queries, list_kbar_keys, pillar_code_sql, source_paths
+from .metrics import start_call
+from .profiling import profiled
+
+# 组合分组最多的组数（60^3），四柱组合等更稀疏的分组请先筛选后再分组
+MAX_GROUP_BINS = 60 ** 3
+
+_PART_LABELS = {"pillar": GANZHI_CYCLE, "gan": gan, "zhi": zhi}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("干支收益率统计需要安装numpy: pip install numpy")
+    return np
+
+
+def _parse_group(group: Union[str, Sequence[str]]) -> Tuple[str, ...]:
+    names = (group,) if isinstance(group, str) else tuple(group)
+    if not names:
+        raise ValueError("分组不能为空")
+    for name in names:
+        pillar, _, part = name.partition("_")
+        if pillar not in PILLAR_NAMES or part not in ("", "gan", "zhi"):
+            raise ValueError(f"不支持的分组: {name}，应为 {PILLAR_NAMES} 之一或加 _gan / _zhi 后缀")
+    if len(set(names)) != len(names):
+        raise ValueError(f"分组重复: {names}")
+    return names
+
+
+def _part(name: str) -> str:
+    return name.partition("_")[2] or "pillar"
+
+
+def _check_lengths(lengths, size: int) -> "np.ndarray":
+    if lengths is None:
+        return np.array([size], dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    if (lengths < 0).any() or int(lengths.sum()) != size:
+        raise ValueError(f"lengths 之和 {int(lengths.sum())} 与数组长度 {size} 不一致")
+    return lengths
+
+
+class PillarReturnStats:
+    """
+    一个分组的收益率统计，各数组的第k维按 groups[k] 的序号索引（一柱60，天干10，地支12）
+    count 为整数数组；组内没有数据时 mean / hit_rate 为NaN，少于2个时 var 为NaN
+    """
+
+    def __init__(self, groups: Tuple[str, ...], horizon: int, count, mean, var, hit_rate):
+        self.groups = groups
+        self.horizon = horizon
+        self.count = count
+        self.mean = mean
+        self.var = var
+        self.hit_rate = hit_rate
+
+    @property
+    def name(self) -> str:
+        return "+".join(self.groups)
+
+    def labels(self, axis: int = 0) -> List[str]:
+        """第axis维各序号对应的干支"""
+        return list(_PART_LABELS[_part(self.groups[axis])])
+
+    def to_rows(self, min_count: int = 1) -> List[Dict]:
+        """
+        转换为按序号排列的字典列表，只包含个数不少于 min_count 的组
+        :return: [{<分组名>: 干支, ..., "count", "mean", "var", "hit_rate"}, ...]
+        """
+        labels = [self.labels(axis) for axis in range(len(self.groups))]
+        rows = []
+        for index in zip(*np.nonzero(self.count >= max(min_count, 1))):
+            row = {name: labels[axis][i] for axis, (name, i) in enumerate(zip(self.groups, index))}
+            row.update({
+                "count": int(self.count[index]),
+                "mean": float(self.mean[index]),
+                "var": float(self.var[index]),
+                "hit_rate": float(self.hit_rate[index]),
+            })
+            rows.append(row)
+        return rows
+
+    def __str__(self):
+        return f"PillarReturnStats(groups={self.name}, horizon={self.horizon}, count={int(self.count.sum())})"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def forward_returns(close, lengths=None, horizon: int = 1) -> "np.ndarray":
+    """
+    计算向前收益率 close[i+horizon] / close[i] - 1，不跨越序列边界
+    :param close: 收盘价数组，多个序列首尾相接
+    :param lengths: 每个序列的长度，None表示只有一个序列
+    :return: float64数组，没有向前收益率的位置为NaN
+    """
+    _require_numpy()
+    if horizon < 1:
+        raise ValueError("horizon 必须大于0")
+    close = np.asarray(close, dtype=np.float64)
+    lengths = _check_lengths(lengths, len(close))
+    result = np.full(len(close), np.nan)
+    if len(close) <= horizon:
+        return result
+
+    # 每根K线所属的序列，i 与 i+horizon 属于同一序列时才有向前收益率
+    series_index = np.repeat(np.arange(len(lengths)), lengths)
+    same = series_index[horizon:] == series_index[:-horizon]
+    base, future = close[:-horizon], close[horizon:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = future / base - 1
+    valid = same & (base > 0) & (future > 0) & np.isfinite(values)
+    result[:-horizon][valid] = values[valid]
+    return result
+
+
+def _group_index(names: Tuple[str, ...], pillar_codes: Dict, size: int):
+    """把一个分组的各列序号合并为一维组号，返回 (组号, 有效掩码, 形状)"""
+    index = np.zeros(size, dtype=np.int64)
+    valid = np.ones(size, dtype=bool)
+    shape = []
+    for name in names:
+        pillar, part = name.partition("_")[0], _part(name)
+        codes = np.asarray(pillar_codes[pillar]).astype(np.int64)
+        if len(codes) != size:
+            raise ValueError(f"{pillar} 序号数组长度 {len(codes)} 与收盘价长度 {size} 不一致")
+        valid &= (codes >= 0) & (codes < 60)
+        radix = len(_PART_LABELS[part])
+        if part != "pillar":
+            codes = codes % radix
+        index = index * radix + codes
+        shape.append(radix)
+    return index, valid, tuple(shape)
+
+
+def _grouped_stats(index, returns, bins: int):
+    count = np.bincount(index, minlength=bins)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.bincount(index, weights=returns, minlength=bins) / count
+        # 第二遍按组均值求离差平方和，比 E[x^2]-E[x]^2 数值上更稳定
+        deviation = returns - mean[index]
+        var = np.bincount(index, weights=deviation * deviation, minlength=bins) / (count - 1)
+        var[count < 2] = np.nan
+        hit_rate = np.bincount(index, weights=(returns > 0).astype(np.float64), minlength=bins) / count
+    return count, mean, var, hit_rate
+
+
+@profiled("pillar_return_stats")
+def pillar_return_stats(close, pillar_codes: Dict, lengths=None, horizon: int = 1,
+                        groups: Iterable = PILLAR_NAMES) -> Dict[str, PillarReturnStats]:
+    """
+    计算每个干支组的向前收益率统计
+    :param close: 收盘价数组，多个序列首尾相接（每个序列按时间升序）
+    :param pillar_codes: {"year": 序号数组, "month": ..., "day": ..., "hour": ...}，只需包含 groups 用到的柱
+    :param lengths: 每个序列的长度，None表示只有一个序列
+    :param horizon: 向前收益率的K线数
+    :param groups: 分组列表，如 ("day", "hour_zhi", ("day", "hour"))
+    :return: {分组名: PillarReturnStats}，组合分组的名称以 "+" 连接，如 "day+hour"
+    """
+    _require_numpy()
+    timer = start_call("pillar_return_stats")
+    try:
+        returns = forward_returns(close, lengths, horizon)
+        has_return = ~np.isnan(returns)
+        timer.lap("returns")
+        timer.count("rows_scanned", len(returns))
+
+        result = {}
+        for group in groups:
+            names = _parse_group(group)
+            bins = int(np.prod([len(_PART_LABELS[_part(name)]) for name in names]))
+            if bins > MAX_GROUP_BINS:
+                raise ValueError(f"分组 {'+'.join(names)} 共 {bins} 组，超过 {MAX_GROUP_BINS}")
+            index, valid, shape = _group_index(names, pillar_codes, len(returns))
+            valid &= has_return
+            stats = _grouped_stats(index[valid], returns[valid], bins)
+            result["+".join(names)] = PillarReturnStats(names, horizon, *(array.reshape(shape) for array in stats))
+        timer.lap("compute")
+        return result
+    finally:
+        timer.finish()
+
+
+def _concat(keys, ts_parts, close_parts, code_parts) -> Dict:
+    lengths = np.array([len(part) for part in close_parts], dtype=np.int64)
+    empty_codes = np.empty(0, dtype=np.int8)
+    return {
+        "keys": keys,
+        "lengths": lengths,
+        "ts": np.concatenate(ts_parts) if ts_parts else np.empty(0, dtype="datetime64[ns]"),
+        "close": np.concatenate(close_parts) if close_parts else np.empty(0, dtype=np.float64),
+        "pillar_codes": {
+            name: np.concatenate([codes[name] for codes in code_parts]) if code_parts else empty_codes
+            for name in PILLAR_NAMES
+        },
+    }
+
+
+def _pillar_codes_for_ts(ts) -> Dict[str, "np.ndarray"]:
+    """
+    由K线时间计算四柱序号；相同时间只计算一次（多只股票的K线时间大多相同）
+    """
+    from ..utils.columnar_kbar import _ns_to_datetime
+
+    unique, inverse = np.unique(np.asarray(ts).view(np.int64), return_inverse=True)
+    fields_list = calculate_pillar_fields_batch([_ns_to_datetime(value) for value in unique.tolist()])
+    codes = {}
+    for i, name in enumerate(PILLAR_NAMES):
+        unique_codes = np.array([encode_ganzhi(fields[2 * i], fields[2 * i + 1]) for fields in fields_list],
+                                dtype=np.int8)
+        codes[name] = unique_codes[inverse]
+    return codes
+
+
+def kbar_series_pillar_arrays(series_list: Iterable) -> Dict:
+    """
+    把多个K线序列组装为 pillar_return_stats 的输入
+    :param series_list: ColumnarKbarSeries、KbarSeries 或 KbarFile（使用文件中保存的四柱序号）的列表
+    :return: {"keys", "lengths", "ts", "close", "pillar_codes"}
+    """
+    from ..utils.columnar_kbar import ColumnarKbarSeries
+
+    _require_numpy()
+    keys, ts_parts, close_parts, code_parts, missing = [], [], [], [], []
+    for series in series_list:
+        if hasattr(series, "pillar_codes"):        # KbarFile
+            keys.append(series.get_key())
+            ts_parts.append(series.ts.view("datetime64[ns]"))
+            close_parts.append(np.asarray(series.columns["close"], dtype=np.float64))
+            code_parts.append(series.pillar_codes)
+            continue
+        if not isinstance(series, ColumnarKbarSeries):
+            series = ColumnarKbarSeries.from_kbar_series(series)
+        keys.append(series.get_key())
+        ts_parts.append(series.get_ts_array())
+        close_parts.append(np.asarray(series.get_column("close"), dtype=np.float64))
+        code_parts.append(None)
+        missing.append(len(code_parts) - 1)
+
+    # 没有保存四柱序号的序列合并后一起计算
+    if missing:
+        codes = _pillar_codes_for_ts(np.concatenate([ts_parts[i] for i in missing]))
+        offset = 0
+        for i in missing:
+            end = offset + len(ts_parts[i])
+            code_parts[i] = {name: codes[name][offset:end] for name in PILLAR_NAMES}
+            offset = end
+    return _concat(keys, ts_parts, close_parts, code_parts)
+
+
+# load_pillar_arrays 的查询：四柱在SQL中编码为序号，missing 标记未回填（NULL）的记录
+PILLAR_ARRAY_SQL = (
+    "SELECT ts, close, " + MISSING_PILLARS_CONDITION + ", "
+    + ", ".join(pillar_code_sql(name) for name in PILLAR_NAMES)
+    + " FROM kbar_data"
+)
+
+
+def _ts_array(values) -> "np.ndarray":
+    """把ts字符串转换为datetime64[ns]；numpy不能解析的格式（如带时区）逐个用 parse_ts 解析"""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            return np.array(values, dtype="datetime64[us]").astype("datetime64[ns]")
+    except (ValueError, UserWarning, DeprecationWarning):
+        return np.array([parse_ts(value) for value in values], dtype="datetime64[ns]")
+
+
+def _chunk_arrays(rows, start_dt, end_dt) -> Tuple["np.ndarray", "np.ndarray", Dict[str, "np.ndarray"]]:
+    """把一块查询结果按列转换为数组，过滤精确的时间范围，并在内存中计算未回填的干支"""
+    size = len(rows)
+    ts_text, close, missing, *code_columns = zip(*rows)
+    ts = _ts_array(ts_text)
+    close = np.fromiter((np.nan if value is None else value for value in close), dtype=np.float64, count=size)
+    codes = {name: np.fromiter(column, dtype=np.int8, count=size) for name, column in zip(PILLAR_NAMES, code_columns)}
+
+    missing_index = np.flatnonzero(np.fromiter(missing, dtype=bool, count=size))
+    if missing_index.size:
+        # 只有NULL表示未计算；只有日期的K线时柱为空字符串，保持 MISSING_CODE
+        fields_list = calculate_pillar_fields_batch([parse_ts_with_hour(ts_text[i]) for i in missing_index])
+        for i, name in enumerate(PILLAR_NAMES):
+            codes[name][missing_index] = [encode_ganzhi(fields[2 * i], fields[2 * i + 1]) for fields in fields_list]
+
+    keep = np.ones(size, dtype=bool)
+    if start_dt is not None:
+        keep &= ts >= np.datetime64(start_dt, "ns")
+    if end_dt is not None:
+        keep &= ts <= np.datetime64(end_dt, "ns")
+    if keep.all():
+        return ts, close, codes
+    return ts[keep], close[keep], {name: values[keep] for name, values in codes.items()}
+
+
+@profiled("load_pillar_arrays")
+def load_pillar_arrays(db_path=None, start_datetime=None, end_datetime=None,
+                       kbar_series_keys=None, periods: Optional[Union[str, Iterable[str]]] = None,
+                       chunk_size: int = 100000) -> Dict:
+    """
+    从K线数据库读取收盘价和四柱序号，按序列首尾相接，供 pillar_return_stats 使用
+    四柱在SQL中编码为序号，每块查询结果按列直接转换为numpy数组；
+    数据库中缺失（NULL）的干支在内存中计算，不写回数据库；只有日期的K线时柱序号为 -1
+    :param db_path: 数据库路径或路径列表，None表示使用分片配置或配置的 stock_kbar_path
+    :param start_datetime: 开始时间，None表示不限制
+    :param end_datetime: 结束时间，None表示不限制
+    :param kbar_series_keys: 只读取这些K线序列，None表示全部
+    :param periods: 只读取这些周期，None表示全部
+    :param chunk_size: 每块从数据库读取的记录数
+    :return: {"keys": [KbarSeriesKey], "lengths", "ts", "close", "pillar_codes": {"year", "month", "day", "hour"}}
+    """
+    from ..utils import intern_kbar_series_key
+    from .kbarseriesganzhi import _normalize_kbar_series_key
+
+    _require_numpy()
+    if chunk_size < 1:
+        raise ValueError("chunk_size 必须大于0")
+    if isinstance(periods, str):
+        periods = [periods]
+    start_dt, end_dt = parse_time_range(start_datetime, end_datetime)
+
+    timer = start_call("load_pillar_arrays")
+    try:
+        key_index = {}
+        id_parts, ts_parts, close_parts, code_parts = [], [], [], []
+        for path in source_paths(db_path):
+            conn = open_connection(path)
+            try:
+                # 每个序列一条按键查询（可以使用索引），序列号按查询确定，不需要逐行比较键
+                keys = list_kbar_keys(conn) if kbar_series_keys is None else kbar_series_keys
+                keys = [_normalize_kbar_series_key(key) for key in keys]
+                if periods is not None:
+                    keys = [key for key in keys if key.period in periods]
+                for key in keys:
+                    series_id = key_index.setdefault((key.symbol, key.exchange, key.period), len(key_index))
+                    query, params = build_kbar_queries(start_dt, end_dt, [key], PILLAR_ARRAY_SQL)[0]
+                    cursor = conn.execute(query, params)
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        ts, close, codes = _chunk_arrays(rows, start_dt, end_dt)
+                        id_parts.append(np.full(len(ts), series_id, dtype=np.int64))
+                        ts_parts.append(ts)
+                        close_parts.append(close)
+                        code_parts.append(codes)
+            finally:
+                close_connection(conn)
+        timer.lap("sql_read")
+
+        series_ids = np.concatenate(id_parts) if id_parts else np.empty(0, dtype=np.int64)
+        timer.count("rows_scanned", len(series_ids))
+        ts = np.concatenate(ts_parts) if ts_parts else np.empty(0, dtype="datetime64[ns]")
+        # 库中ts的字符串格式可能不统一，分片之间同一序列也需要合并，按 (序列, 时间) 重新排序
+        order = np.lexsort((ts, series_ids))
+        keys = [intern_kbar_series_key(*key) for key in key_index]
+        lengths = np.bincount(series_ids, minlength=len(keys)).astype(np.int64)
+        # 时间范围内没有K线的序列不返回
+        nonempty = lengths > 0
+        result = {
+            "keys": [key for key, keep in zip(keys, nonempty) if keep],
+            "lengths": lengths[nonempty],
+            "ts": ts[order],
+            "close": np.concatenate(close_parts)[order] if close_parts else np.empty(0, dtype=np.float64),
+            "pillar_codes": {
+                name: np.concatenate([codes[name] for codes in code_parts])[order]
+                if code_parts else np.empty(0, dtype=np.int8)
+                for name in PILLAR_NAMES
+            },
+        }
+        timer.lap("build")
+        return result
+    finally:
+        timer.finish()
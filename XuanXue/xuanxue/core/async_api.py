@@ -0,0 +1,115 @@
+"""
+asyncio 接口
+
+KbarSeriesGanZhiAsync(start-datetime, end-datetime, K线序列, useDB=True, timeout=None)
+OnBoardDateGanZhiAsync(symbol, db_path=None, timeout=None)
+DateTimeGanZhiAsync(datetime_str, timeout=None)
+
+与同名的同步函数参数和返回值相同。数据库读取和历法计算在一个有界线程池中执行，
+不会阻塞事件循环，不同键的并发请求可以同时进行I/O。
+线程池中的每个线程复用自己的数据库连接。
+
+取消与超时:
+    等待中的协程被取消或超过 timeout 秒时抛出 asyncio.CancelledError / asyncio.TimeoutError，
+    同时通知工作线程中断正在执行的SQL，尽快释放线程
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .database import enable_thread_connection_cache, set_cancel_event
+from .ganzhi_calculator import DateTimeGanZhi
+from .kbarseriesganzhi import KbarSeriesGanZhi
+from .stock_ganzhi import OnBoardDateGanZhi
+
+DEFAULT_MAX_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+_executor = None
+_max_workers = DEFAULT_MAX_WORKERS
+_executor_lock = threading.Lock()
+
+
+def get_async_executor() -> ThreadPoolExecutor:
+    """获取异步接口使用的线程池（首次调用时创建）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_max_workers,
+                thread_name_prefix="xuanxue-async",
+                initializer=enable_thread_connection_cache,
+            )
+        return _executor
+
+
+def set_async_max_workers(max_workers: int):
+    """
+    设置异步接口线程池的最大线程数
+    已存在的线程池会在当前任务完成后关闭，之后的调用使用新的线程池
+    """
+    global _max_workers
+    if max_workers < 1:
+        raise ValueError("max_workers 必须大于0")
+    _max_workers = max_workers
+    shutdown_async_executor(wait=False)
+
+
+def shutdown_async_executor(wait: bool = True):
+    """关闭异步接口线程池"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+async def _run_in_executor(func, *args, timeout=None):
+    """
+    在线程池中执行同步函数
+    :param timeout: 超时时间（秒），None表示不超时
+    """
+    loop = asyncio.get_running_loop()
+    cancel_event = threading.Event()
+
+    def call():
+        set_cancel_event(cancel_event)
+        try:
+            return func(*args)
+        finally:
+            set_cancel_event(None)
+
+    future = loop.run_in_executor(get_async_executor(), call)
+    try:
+        if timeout is None:
+            return await future
+        return await asyncio.wait_for(future, timeout)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        # 通知工作线程中断正在执行的SQL
+        cancel_event.set()
+        raise
+
+
+async def KbarSeriesGanZhiAsync(start_datetime, end_datetime, kbar_series, useDB: bool = True, timeout=None):
+    """
+    KbarSeriesGanZhi 的异步版本
+    :param timeout: 超时时间（秒），None表示不超时
+    """
+    return await _run_in_executor(KbarSeriesGanZhi, start_datetime, end_datetime, kbar_series, useDB,
+                                  timeout=timeout)
+
+
+async def OnBoardDateGanZhiAsync(symbol, db_path=None, timeout=None):
+    """
+    OnBoardDateGanZhi 的异步版本
+    :param timeout: 超时时间（秒），None表示不超时
+    """
+    return await _run_in_executor(OnBoardDateGanZhi, symbol, db_path, timeout=timeout)
+
+
+async def DateTimeGanZhiAsync(datetime_str, timeout=None):
+    """
+    DateTimeGanZhi 的异步版本
+    :param timeout: 超时时间（秒），None表示不超时
+    """
+    return await _run_in_executor(DateTimeGanZhi, datetime_str, timeout=timeout)
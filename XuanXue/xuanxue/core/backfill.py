@@ -0,0 +1,159 @@
+"""
+kbar_data 干支回填
+
+backfill_pillars(db_path=None, chunk_size=10000, restart=False, progress=None)
+
+按id顺序分块回填所有缺失的干支：
+    - 通过部分索引 idx_kbar_missing_pillars 找到下一块待处理的记录
+    - 每块的UPDATE和检查点在同一个事务中提交，进程被杀掉后下次从检查点继续
+    - 处理完所有记录后清除检查点，下次运行从头扫描部分索引，检查点之前后来变为NULL的记录也会被回填
+    - 计算失败的记录会被跳过（保持NULL），下次运行时重新尝试；restart=True 时忽略检查点从头处理
+    - 未指定db_path且启用了分片存储（set_kbar_shards）时依次回填每个分片
+
+命令行: python -m XuanXue backfill [--db PATH] [--chunk-size N] [--restart]
+"""
+import sqlite3
+import time
+from typing import Callable, Dict, Optional
+
+from ..config import get_stock_kbar_path
+from .database import (
+    UPDATE_PILLARS_SQL,
+    count_missing_pillars,
+    ensure_missing_pillar_index,
+    find_missing_pillar_rows,
+    is_read_only,
+)
+from .ganzhi_calculator import calculate_pillar_fields
+from .kbar_shard import get_kbar_shard_router
+
+CHECKPOINT_NAME = "pillars"
+
+CHECKPOINT_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS xuanxue_backfill_checkpoint (
+    name TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def _load_checkpoint(conn: sqlite3.Connection) -> int:
+    row = conn.execute(
+        "SELECT last_id FROM xuanxue_backfill_checkpoint WHERE name=?", (CHECKPOINT_NAME,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def _save_checkpoint(conn: sqlite3.Connection, last_id: int):
+    conn.execute("""
+        INSERT INTO xuanxue_backfill_checkpoint (name, last_id, updated_at)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(name) DO UPDATE SET last_id=excluded.last_id, updated_at=excluded.updated_at
+    """, (CHECKPOINT_NAME, last_id))
+
+
+def _clear_checkpoint(conn: sqlite3.Connection):
+    conn.execute("DELETE FROM xuanxue_backfill_checkpoint WHERE name=?", (CHECKPOINT_NAME,))
+
+
+def backfill_pillars(db_path: Optional[str] = None, chunk_size: int = 10000, restart: bool = False,
+                     progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    回填kbar_data中所有缺失的干支
+    :param db_path: K线数据库路径，None表示依次回填分片配置的全部分片，未启用分片时使用配置的 stock_kbar_path
+    :param chunk_size: 每块处理（并提交）的记录数
+    :param restart: 是否忽略检查点从头开始
+    :param progress: 每提交一块后调用一次，参数为当前数据库的统计信息
+    :return: 统计信息 {db_path, total, processed, updated, failed, last_id, elapsed, rows_per_sec}；
+             回填全部分片时为各分片的合计 {db_path(路径列表), total, processed, updated, failed, elapsed,
+             rows_per_sec, shards(各分片的统计信息)}
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size 必须大于0")
+    if is_read_only():
+        raise RuntimeError("只读模式下不能回填干支")
+    if db_path is not None:
+        return _backfill_database(db_path, chunk_size, restart, progress)
+    router = get_kbar_shard_router()
+    if router is None:
+        return _backfill_database(get_stock_kbar_path(), chunk_size, restart, progress)
+
+    # 各分片有各自的部分索引和检查点，依次回填
+    shards = [_backfill_database(path, chunk_size, restart, progress) for path in router.get_all_paths()]
+    stats = {"db_path": router.get_all_paths(), "shards": shards}
+    for name in ("total", "processed", "updated", "failed", "elapsed"):
+        stats[name] = sum(shard[name] for shard in shards)
+    stats["rows_per_sec"] = stats["processed"] / stats["elapsed"] if stats["elapsed"] > 0 else 0.0
+    return stats
+
+
+def _backfill_database(db_path: str, chunk_size: int, restart: bool,
+                       progress: Optional[Callable[[Dict], None]]) -> Dict:
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        ensure_missing_pillar_index(conn)
+        conn.execute(CHECKPOINT_TABLE_SQL)
+        conn.commit()
+
+        last_id = 0 if restart else _load_checkpoint(conn)
+        total = count_missing_pillars(conn, after_id=last_id)
+
+        stats = {
+            "db_path": db_path,
+            "total": total,
+            "processed": 0,
+            "updated": 0,
+            "failed": 0,
+            "last_id": last_id,
+            "elapsed": 0.0,
+            "rows_per_sec": 0.0,
+        }
+        start_time = time.monotonic()
+
+        while True:
+            rows = find_missing_pillar_rows(conn, after_id=last_id, limit=chunk_size)
+            if not rows:
+                # 一遍处理完成，清除检查点
+                with conn:
+                    _clear_checkpoint(conn)
+                break
+
+            updates = []
+            for row_id, ts_value in rows:
+                try:
+                    fields = calculate_pillar_fields(ts_value)
+                except Exception:
+                    fields = None
+                if fields is None:
+                    stats["failed"] += 1
+                    continue
+                updates.append(fields + (row_id,))
+
+            last_id = rows[-1][0]
+            # UPDATE与检查点在同一事务中提交
+            with conn:
+                conn.executemany(UPDATE_PILLARS_SQL, updates)
+                _save_checkpoint(conn, last_id)
+
+            stats["processed"] += len(rows)
+            stats["updated"] += len(updates)
+            stats["last_id"] = last_id
+            stats["elapsed"] = time.monotonic() - start_time
+            stats["rows_per_sec"] = stats["processed"] / stats["elapsed"] if stats["elapsed"] > 0 else 0.0
+            if progress is not None:
+                progress(dict(stats))
+
+        stats["elapsed"] = time.monotonic() - start_time
+        return stats
+    finally:
+        conn.close()
+
+
+def format_eta(stats: Dict) -> str:
+    """根据统计信息估算剩余时间，返回 HH:MM:SS 字符串"""
+    remaining = max(stats["total"] - stats["processed"], 0)
+    if stats["rows_per_sec"] <= 0:
+        return "--:--:--"
+    seconds = int(remaining / stats["rows_per_sec"])
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
@@ -0,0 +1,272 @@
+"""
+K线数据库公共工具
+
+create_kbar_table(conn)    创建 kbar_data 表及其索引（已存在时跳过）
+ensure_missing_pillar_index(conn)   创建缺失干支记录的部分索引（回填、迁移时使用）
+has_missing_pillar_index(conn)      部分索引是否存在
+has_missing_pillars(conn)           是否还有缺失干支的记录（走部分索引，O(1)）
+find_missing_pillar_rows(conn, ...) 按id顺序查找缺失干支的记录（走部分索引）
+open_connection(db_path)   打开数据库连接，启用线程连接缓存的线程会复用连接
+close_connection(conn)     关闭 open_connection 打开的连接
+set_read_only(flag)        开启/关闭只读模式
+set_cancel_event(event)    设置当前线程的取消信号，propagate_cancel_event(func) 让子线程池继承它
+
+只读模式:
+    以 mode=ro&immutable=1 的URI打开数据库，SQLite不再加锁也不检测文件变化，
+    适合读取白天不会变化的数据库快照。只读模式下缺失的干支只在内存中计算，不写回数据库。
+    也可以通过环境变量 XUANXUE_READ_ONLY=1 开启
+
+kbar_data 的表结构与示范数据库 stock_kbar.db 保持一致
+"""
+import os
+import pathlib
+import sqlite3
+import threading
+
+KBAR_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS kbar_data (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL,
+    exchange TEXT NOT NULL,
+    period TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume INTEGER,
+    amount REAL,
+    year_gan TEXT,
+    year_zhi TEXT,
+    month_gan TEXT,
+    month_zhi TEXT,
+    day_gan TEXT,
+    day_zhi TEXT,
+    hour_gan TEXT,
+    hour_zhi TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(symbol, exchange, period, ts)
+)
+"""
+
+KBAR_INDEX_SQL = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_kbar_symbol_exchange_period_ts
+    ON kbar_data (symbol, exchange, period, ts)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_kbar_ts
+    ON kbar_data (ts)
+    """,
+]
+
+# 缺失干支的记录：任一干支字段为NULL
+# 部分索引只包含这些记录，回填完成后索引为空，查找待处理记录的代价与剩余工作量成正比
+MISSING_PILLARS_CONDITION = (
+    "(year_gan IS NULL OR year_zhi IS NULL OR month_gan IS NULL OR month_zhi IS NULL "
+    "OR day_gan IS NULL OR day_zhi IS NULL OR hour_gan IS NULL OR hour_zhi IS NULL)"
+)
+
+MISSING_PILLARS_INDEX_SQL = f"""
+CREATE INDEX IF NOT EXISTS idx_kbar_missing_pillars
+ON kbar_data (id) WHERE {MISSING_PILLARS_CONDITION}
+"""
+
+UPDATE_PILLARS_SQL = """
+UPDATE kbar_data 
+SET year_gan=?, year_zhi=?, month_gan=?, month_zhi=?, 
+    day_gan=?, day_zhi=?, hour_gan=?, hour_zhi=?
+WHERE id=?
+"""
+
+
+def create_kbar_table(conn: sqlite3.Connection):
+    """
+    创建 kbar_data 表及其索引
+    :param conn: SQLite连接
+    """
+    cursor = conn.cursor()
+    cursor.execute(KBAR_TABLE_SQL)
+    for index_sql in KBAR_INDEX_SQL:
+        cursor.execute(index_sql)
+    cursor.execute(MISSING_PILLARS_INDEX_SQL)
+    conn.commit()
+
+
+def has_missing_pillar_index(conn: sqlite3.Connection) -> bool:
+    """缺失干支记录的部分索引是否存在"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_kbar_missing_pillars'"
+    ).fetchone() is not None
+
+
+def ensure_missing_pillar_index(conn: sqlite3.Connection) -> bool:
+    """
+    为缺失干支的记录创建部分索引（已存在时跳过），用于回填和迁移旧库，读取路径不调用
+    第一次在大表上创建时需要扫描一遍全表，之后由SQLite随写入自动维护
+    :return: 索引是否可用（只读模式下不创建，只检查是否已存在）
+    """
+    if has_missing_pillar_index(conn):
+        return True
+    if is_read_only():
+        return False
+    conn.execute(MISSING_PILLARS_INDEX_SQL)
+    conn.commit()
+    return True
+
+
+def has_missing_pillars(conn: sqlite3.Connection) -> bool:
+    """
+    是否还有缺失干支的记录；有部分索引时只需读取索引的第一项，没有索引时需要扫描全表，
+    读取路径应先用 has_missing_pillar_index 判断
+    """
+    return conn.execute(
+        f"SELECT 1 FROM kbar_data WHERE {MISSING_PILLARS_CONDITION} LIMIT 1"
+    ).fetchone() is not None
+
+
+def count_missing_pillars(conn: sqlite3.Connection, after_id: int = 0) -> int:
+    """缺失干支且 id > after_id 的记录数（只扫描部分索引）"""
+    return conn.execute(
+        f"SELECT COUNT(*) FROM kbar_data WHERE {MISSING_PILLARS_CONDITION} AND id > ?", (after_id,)
+    ).fetchone()[0]
+
+
+def find_missing_pillar_rows(conn: sqlite3.Connection, after_id: int = 0, limit: int = None):
+    """
+    按id顺序查找缺失干支的记录
+    :param after_id: 只返回 id > after_id 的记录
+    :param limit: 最多返回的记录数，None表示不限制
+    :return: [(id, ts), ...]
+    """
+    query = f"SELECT id, ts FROM kbar_data WHERE {MISSING_PILLARS_CONDITION} AND id > ? ORDER BY id"
+    params = [after_id]
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+
+# 只读模式
+_read_only = os.environ.get("XUANXUE_READ_ONLY", "").lower() in ("1", "true", "yes", "on")
+
+
+def set_read_only(read_only: bool = True):
+    """
+    开启/关闭只读模式
+    :param read_only: True表示以只读、不可变方式打开数据库，并跳过所有写回
+    """
+    global _read_only
+    _read_only = bool(read_only)
+
+
+def is_read_only() -> bool:
+    """当前是否为只读模式"""
+    return _read_only
+
+
+def _read_only_uri(db_path: str) -> str:
+    """构造只读、不可变的SQLite URI"""
+    return pathlib.Path(os.path.abspath(db_path)).as_uri() + "?mode=ro&immutable=1"
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    if _read_only:
+        return sqlite3.connect(_read_only_uri(db_path), uri=True)
+    return sqlite3.connect(db_path)
+
+
+# 线程本地状态：connections 为该线程复用的连接，cancel_event 为当前调用的取消信号
+_thread_local = threading.local()
+
+# 取消检查的频率（SQLite虚拟机指令数）
+CANCEL_CHECK_INTERVAL = 1000
+
+
+def enable_thread_connection_cache():
+    """在当前线程中启用连接缓存，之后 open_connection 对同一路径返回同一连接"""
+    if getattr(_thread_local, "connections", None) is None:
+        _thread_local.connections = {}
+
+
+def thread_connection_cache_enabled() -> bool:
+    """当前线程是否启用了连接缓存"""
+    return getattr(_thread_local, "connections", None) is not None
+
+
+def close_thread_connections():
+    """关闭当前线程缓存的所有连接"""
+    connections = getattr(_thread_local, "connections", None) or {}
+    for conn in connections.values():
+        conn.close()
+    _thread_local.connections = None
+
+
+def set_cancel_event(cancel_event):
+    """
+    设置当前线程的取消信号
+    :param cancel_event: threading.Event，置位后当前线程正在执行的SQL会被中断；None表示清除
+    """
+    _thread_local.cancel_event = cancel_event
+
+
+def get_cancel_event():
+    """当前线程的取消信号，没有时返回None"""
+    return getattr(_thread_local, "cancel_event", None)
+
+
+def propagate_cancel_event(func):
+    """
+    包装要提交到子线程池的函数，使子线程继承当前线程的取消信号
+    当前线程没有取消信号时原样返回 func
+    """
+    cancel_event = get_cancel_event()
+    if cancel_event is None:
+        return func
+
+    def wrapper(*args, **kwargs):
+        previous = get_cancel_event()
+        set_cancel_event(cancel_event)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            set_cancel_event(previous)
+    return wrapper
+
+
+def open_connection(db_path: str) -> sqlite3.Connection:
+    """
+    打开数据库连接，只读模式下以只读、不可变的URI打开
+    在启用了线程连接缓存的线程中，对同一路径复用同一个连接
+    当前线程设置了取消信号时，信号置位后SQL执行会以 sqlite3.OperationalError 中断
+    """
+    connections = getattr(_thread_local, "connections", None)
+    if connections is None:
+        conn = _connect(db_path)
+    else:
+        # 只读模式和读写模式的连接分开缓存
+        cache_key = (db_path, _read_only)
+        conn = connections.get(cache_key)
+        if conn is None:
+            conn = _connect(db_path)
+            connections[cache_key] = conn
+
+    cancel_event = get_cancel_event()
+    if cancel_event is not None:
+        conn.set_progress_handler(lambda: 1 if cancel_event.is_set() else 0, CANCEL_CHECK_INTERVAL)
+    elif connections is not None:
+        conn.set_progress_handler(None, 0)
+    return conn
+
+
+def close_connection(conn: sqlite3.Connection):
+    """
+    关闭 open_connection 打开的连接
+    线程缓存的连接不会真正关闭，只回滚未提交的事务以便下次复用
+    """
+    connections = getattr(_thread_local, "connections", None)
+    if connections and any(cached is conn for cached in connections.values()):
+        if conn.in_transaction:
+            conn.rollback()
+        return
+    conn.close()
@@ -0,0 +1,339 @@
+"""
+干支序列的列式导出
+
+export_pillars(path, ...)           按扩展名导出为 Parquet / Arrow / NPZ
+export_pillars_parquet(path, ...)   导出为Parquet文件（需要安装pyarrow）
+export_pillars_arrow(path, ...)     导出为Arrow IPC文件（需要安装pyarrow）
+export_pillars_npz(path, ...)       导出为NumPy .npz文件（需要安装numpy）
+load_pillars_npz(path)              读取 export_pillars_npz 导出的文件
+export_kbar_files(directory, ...)   把每个K线序列导出为内存映射的二进制文件（见 utils.kbar_file）
+iter_pillar_chunks(...)             从数据库分块读取 (symbol, exchange, period, ts, 年, 月, 日, 时)
+
+导出的列: symbol, exchange, period, ts, year, month, day, hour
+四柱按六十甲子序号编码为int8（0=甲子 ... 59=癸亥，见 utils.ganzhi_codes），
+pillar_encoding="dictionary" 时Parquet/Arrow中为以六十甲子为字典的字典列。
+数据库中缺失（NULL）的干支在导出时于内存中计算，不写回数据库；
+只有日期的K线（如日K线）没有时柱，hour 为 -1。
+
+数据按 chunk_size 分块从数据库流式读取；Parquet/Arrow每块写一个row group/record batch，
+.npz格式不支持追加，各块编码为int8数组后在最后一次写入。
+
+命令行: python -m XuanXue export OUT [--db PATH] [--start S] [--end E] [--key SYMBOL EXCHANGE PERIOD]
+"""
+import os
+import time
+from typing import Dict, Iterable
+
+from ..utils.ganzhi_codes import GANZHI_CYCLE, MISSING_CODE, encode_ganzhi
+from ..utils.kbar_type import KBAR_VALUE_COLUMNS
+from .database import open_connection, close_connection
+from .ganzhi_calculator import calculate_pillar_fields_batch, parse_time_range, parse_ts, parse_ts_with_hour
+from .kbar_query import build_kbar_queries, list_kbar_keys, source_paths
+from .kbarseriesganzhi import _normalize_kbar_series_key
+
+PILLAR_COLUMNS = ("year", "month", "day", "hour")
+EXPORT_COLUMNS = ("symbol", "exchange", "period", "ts") + PILLAR_COLUMNS
+PILLAR_ENCODINGS = ("int8", "dictionary")
+
+SELECT_SQL = """
+SELECT symbol, exchange, period, ts,
+       year_gan, year_zhi, month_gan, month_zhi, day_gan, day_zhi, hour_gan, hour_zhi
+FROM kbar_data
+"""
+
+
+def _encode_rows(rows, start_dt, end_dt, extra_columns=()) -> Dict[str, list]:
+    """
+    把查询结果编码为列，extra_columns 为SELECT_SQL的12列之后附加的列名
+    """
+    columns = {name: [] for name in EXPORT_COLUMNS + tuple(extra_columns)}
+    missing = []
+    for row in rows:
+        ts = parse_ts(row[3])
+        if (start_dt is not None and ts < start_dt) or (end_dt is not None and ts > end_dt):
+            continue
+        codes = [encode_ganzhi(row[4 + 2 * i], row[5 + 2 * i]) for i in range(4)]
+        # 只有NULL表示未计算；只有日期的K线时柱为空字符串，保持 MISSING_CODE，不重新计算
+        if any(field is None for field in row[4:12]):
+            missing.append((len(columns["ts"]), parse_ts_with_hour(row[3])))
+        columns["symbol"].append(row[0])
+        columns["exchange"].append(row[1])
+        columns["period"].append(row[2])
+        columns["ts"].append(ts)
+        for name, code in zip(PILLAR_COLUMNS, codes):
+            columns[name].append(code)
+        for i, name in enumerate(extra_columns):
+            columns[name].append(row[12 + i])
+
+    # 数据库中缺失的干支在内存中计算
+    if missing:
+        fields_list = calculate_pillar_fields_batch([item for _, item in missing])
+        for (index, _), fields in zip(missing, fields_list):
+            for i, name in enumerate(PILLAR_COLUMNS):
+                columns[name][index] = encode_ganzhi(fields[2 * i], fields[2 * i + 1])
+    return columns
+
+
+def iter_pillar_chunks(db_path=None, start_datetime=None, end_datetime=None,
+                       kbar_series_keys=None, chunk_size: int = 100000) -> Iterable[Dict[str, list]]:
+    """
+    从K线数据库分块读取干支序列
+    :param db_path: 数据库路径或路径列表，None表示使用分片配置或配置的 stock_kbar_path
+    :param start_datetime: 开始时间，None表示不限制
+    :param end_datetime: 结束时间，None表示不限制
+    :param kbar_series_keys: 要导出的K线序列键列表，None表示全部
+    :param chunk_size: 每块从数据库读取的记录数
+    :return: 生成 {列名: 值列表} 字典，ts为datetime，四柱为六十甲子序号
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size 必须大于0")
+    start_dt, end_dt = parse_time_range(start_datetime, end_datetime)
+    queries = build_kbar_queries(start_dt, end_dt, kbar_series_keys, SELECT_SQL)
+
+    for path in source_paths(db_path):
+        conn = open_connection(path)
+        try:
+            for query, params in queries:
+                cursor = conn.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    columns = _encode_rows(rows, start_dt, end_dt)
+                    if columns["ts"]:
+                        yield columns
+        finally:
+            close_connection(conn)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("导出Parquet/Arrow文件需要安装pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _require_numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("导出.npz文件需要安装numpy: pip install numpy") from e
+    return numpy
+
+
+def _arrow_schema(pa, pillar_encoding: str):
+    if pillar_encoding == "dictionary":
+        pillar_type = pa.dictionary(pa.int8(), pa.string())
+    else:
+        pillar_type = pa.int8()
+    key_type = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [(name, key_type) for name in ("symbol", "exchange", "period")]
+        + [("ts", pa.timestamp("us"))]
+        + [(name, pillar_type) for name in PILLAR_COLUMNS]
+    )
+
+
+def _arrow_batch(pa, schema, columns: Dict[str, list], pillar_encoding: str, key_dictionaries):
+    arrays = []
+    for name in ("symbol", "exchange", "period"):
+        # 各块共用一个只在末尾追加的字典，Arrow IPC文件不允许批次间替换字典
+        dictionary = key_dictionaries[name]
+        indices = [dictionary.setdefault(value, len(dictionary)) for value in columns[name]]
+        arrays.append(pa.DictionaryArray.from_arrays(
+            pa.array(indices, pa.int32()), pa.array(list(dictionary), pa.string())))
+    arrays.append(pa.array(columns["ts"], pa.timestamp("us")))
+    ganzhi_dictionary = pa.array(GANZHI_CYCLE, pa.string())
+    for name in PILLAR_COLUMNS:
+        codes = pa.array([code if code != MISSING_CODE else None for code in columns[name]], pa.int8())
+        if pillar_encoding == "dictionary":
+            codes = pa.DictionaryArray.from_arrays(codes, ganzhi_dictionary)
+        arrays.append(codes)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _export_arrow(path, writer_factory, db_path, start_datetime, end_datetime, kbar_series_keys,
+                  chunk_size, pillar_encoding) -> Dict:
+    if pillar_encoding not in PILLAR_ENCODINGS:
+        raise ValueError(f"不支持的pillar_encoding: {pillar_encoding}，可选: {PILLAR_ENCODINGS}")
+    pa = _require_pyarrow()
+    schema = _arrow_schema(pa, pillar_encoding)
+    key_dictionaries = {"symbol": {}, "exchange": {}, "period": {}}
+
+    start_time = time.monotonic()
+    rows = 0
+    writer = writer_factory(path, schema)
+    try:
+        for columns in iter_pillar_chunks(db_path, start_datetime, end_datetime, kbar_series_keys, chunk_size):
+            writer.write_batch(_arrow_batch(pa, schema, columns, pillar_encoding, key_dictionaries))
+            rows += len(columns["ts"])
+    finally:
+        writer.close()
+    return {"path": path, "rows": rows, "elapsed": time.monotonic() - start_time}
+
+
+def export_pillars_parquet(path: str, db_path=None, start_datetime=None, end_datetime=None,
+                           kbar_series_keys=None, chunk_size: int = 100000,
+                           pillar_encoding: str = "int8", compression: str = "snappy") -> Dict:
+    """
+    导出干支序列为Parquet文件，每块数据写一个row group
+    :param path: 输出文件路径
+    :param pillar_encoding: "int8"（六十甲子序号）或 "dictionary"（以六十甲子为字典的字典列）
+    :param compression: Parquet压缩算法
+    其余参数同 iter_pillar_chunks
+    :return: 统计信息 {path, rows, elapsed}
+    """
+    _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    def writer_factory(out_path, schema):
+        return pq.ParquetWriter(out_path, schema, compression=compression)
+
+    return _export_arrow(path, writer_factory, db_path, start_datetime, end_datetime, kbar_series_keys,
+                         chunk_size, pillar_encoding)
+
+
+def export_pillars_arrow(path: str, db_path=None, start_datetime=None, end_datetime=None,
+                         kbar_series_keys=None, chunk_size: int = 100000,
+                         pillar_encoding: str = "int8") -> Dict:
+    """
+    导出干支序列为Arrow IPC文件（Feather V2），每块数据写一个record batch
+    参数同 export_pillars_parquet
+    """
+    pa = _require_pyarrow()
+
+    def writer_factory(out_path, schema):
+        # 字典只会在末尾追加，写为字典增量
+        options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        return pa.ipc.new_file(out_path, schema, options=options)
+
+    return _export_arrow(path, writer_factory, db_path, start_datetime, end_datetime, kbar_series_keys,
+                         chunk_size, pillar_encoding)
+
+
+def export_pillars_npz(path: str, db_path=None, start_datetime=None, end_datetime=None,
+                       kbar_series_keys=None, chunk_size: int = 100000, compressed: bool = True) -> Dict:
+    """
+    导出干支序列为NumPy .npz文件
+    文件中的数组:
+        symbol, exchange, period       int32 字典编码，对应 symbol_dict, exchange_dict, period_dict
+        ts                             datetime64[us]
+        year, month, day, hour         int8 六十甲子序号，缺失为-1
+        ganzhi_dict                    六十甲子名称，ganzhi_dict[code] 为干支字符串
+    :param compressed: 是否使用 np.savez_compressed
+    其余参数同 iter_pillar_chunks
+    :return: 统计信息 {path, rows, elapsed}
+    """
+    np = _require_numpy()
+    start_time = time.monotonic()
+    key_dictionaries = {"symbol": {}, "exchange": {}, "period": {}}
+    parts = {name: [] for name in EXPORT_COLUMNS}
+
+    for columns in iter_pillar_chunks(db_path, start_datetime, end_datetime, kbar_series_keys, chunk_size):
+        for name, dictionary in key_dictionaries.items():
+            parts[name].append(np.fromiter(
+                (dictionary.setdefault(value, len(dictionary)) for value in columns[name]),
+                dtype=np.int32, count=len(columns[name])))
+        parts["ts"].append(np.array(columns["ts"], dtype="datetime64[us]"))
+        for name in PILLAR_COLUMNS:
+            parts[name].append(np.array(columns[name], dtype=np.int8))
+
+    arrays = {}
+    for name in EXPORT_COLUMNS:
+        dtype = "datetime64[us]" if name == "ts" else (np.int8 if name in PILLAR_COLUMNS else np.int32)
+        arrays[name] = np.concatenate(parts[name]) if parts[name] else np.array([], dtype=dtype)
+    for name, dictionary in key_dictionaries.items():
+        arrays[f"{name}_dict"] = np.array(list(dictionary), dtype=str)
+    arrays["ganzhi_dict"] = np.array(GANZHI_CYCLE, dtype=str)
+
+    (np.savez_compressed if compressed else np.savez)(path, **arrays)
+    return {"path": path, "rows": int(arrays["ts"].shape[0]), "elapsed": time.monotonic() - start_time}
+
+
+def load_pillars_npz(path: str) -> Dict:
+    """
+    读取 export_pillars_npz 导出的文件
+    :return: {列名: numpy数组}，symbol/exchange/period 已解码为字符串数组，四柱保持int8序号
+    """
+    np = _require_numpy()
+    with np.load(path) as data:
+        result = {}
+        for name in ("symbol", "exchange", "period"):
+            dictionary = data[f"{name}_dict"]
+            result[name] = dictionary[data[name]] if len(dictionary) else np.array([], dtype=str)
+        for name in ("ts",) + PILLAR_COLUMNS + ("ganzhi_dict",):
+            result[name] = data[name]
+    return result
+
+
+def export_pillars(path: str, db_path=None, start_datetime=None, end_datetime=None,
+                   kbar_series_keys=None, chunk_size: int = 100000, **kwargs) -> Dict:
+    """
+    按扩展名导出干支序列: .parquet/.pq -> Parquet, .arrow/.feather/.ipc -> Arrow IPC, .npz -> NumPy
+    参数同对应的导出函数
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".parquet", ".pq"):
+        exporter = export_pillars_parquet
+    elif extension in (".arrow", ".feather", ".ipc"):
+        exporter = export_pillars_arrow
+    elif extension == ".npz":
+        exporter = export_pillars_npz
+    else:
+        raise ValueError(f"不支持的导出文件类型: {path}")
+    return exporter(path, db_path, start_datetime, end_datetime, kbar_series_keys, chunk_size, **kwargs)
+
+
+def export_kbar_files(directory: str, db_path=None, start_datetime=None, end_datetime=None,
+                      kbar_series_keys=None, chunk_size: int = 100000) -> Dict:
+    """
+    把kbar_data中的每个K线序列导出为一个K线二进制文件（含OHLCV和四柱序号），供 open_kbar_file 内存映射读取
+    :param directory: 输出目录，文件名为 {symbol}_{exchange}_{period}.xkb
+    其余参数同 iter_pillar_chunks
+    :return: 统计信息 {directory, files, rows, elapsed}
+    """
+    from ..utils.columnar_kbar import ColumnarKbarSeries
+    from ..utils.kbar_file import kbar_file_name, write_kbar_file
+
+    np = _require_numpy()
+    if chunk_size < 1:
+        raise ValueError("chunk_size 必须大于0")
+    os.makedirs(directory, exist_ok=True)
+    start_dt, end_dt = parse_time_range(start_datetime, end_datetime)
+    select_sql = SELECT_SQL.replace("\nFROM kbar_data", ", " + ", ".join(KBAR_VALUE_COLUMNS) + "\nFROM kbar_data")
+
+    start_time = time.monotonic()
+    stats = {"directory": directory, "files": 0, "rows": 0, "elapsed": 0.0}
+    for path in source_paths(db_path):
+        conn = open_connection(path)
+        try:
+            keys = kbar_series_keys if kbar_series_keys else list_kbar_keys(conn)
+            for key in keys:
+                key = _normalize_kbar_series_key(key)
+                query, params = build_kbar_queries(start_dt, end_dt, [key], select_sql)[0]
+                parts = {name: [] for name in ("ts",) + tuple(KBAR_VALUE_COLUMNS) + PILLAR_COLUMNS}
+                cursor = conn.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    columns = _encode_rows(rows, start_dt, end_dt, KBAR_VALUE_COLUMNS)
+                    for name, values in parts.items():
+                        values.extend(columns[name])
+                if not parts["ts"]:
+                    continue
+
+                # 库中ts的字符串格式可能不统一，按解析后的时间重新排序
+                ts = np.array(parts["ts"], dtype="datetime64[ns]")
+                order = np.argsort(ts, kind="stable")
+                series = ColumnarKbarSeries(key, ts[order], *(
+                    np.array(parts[name], dtype=np.float64)[order] for name in KBAR_VALUE_COLUMNS))
+                codes = {name: np.array(parts[name], dtype=np.int8)[order] for name in PILLAR_COLUMNS}
+                write_kbar_file(os.path.join(directory, kbar_file_name(key)), series, codes)
+                stats["files"] += 1
+                stats["rows"] += series.get_length()
+        finally:
+            close_connection(conn)
+    stats["elapsed"] = time.monotonic() - start_time
+    return stats
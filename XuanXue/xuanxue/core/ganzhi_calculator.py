@@ -8,7 +8,11 @@ calculate_hour_ganzhi(hour,day_gan_index)
 calculate_ms_ganzhi(ms)
 create_ganzhi_object(gan_index,zhi_index)
 parse_datetiem_string(datetime_str)
+parse_ts(value)
+parse_ts_with_hour(value)
 GanZhiCalculator(datetime_str)
+calculate_pillar_fields(ts_value)
+calculate_pillar_fields_batch(datetimes)
 
 最终导出函数：DateTimeGanZhi
 
@@ -16,6 +20,8 @@ GanZhiCalculator(datetime_str)
 import datetime
 import sxtwl
 from ..config.config import gan,zhi,gan_start_map
+from .metrics import start_call
+from .profiling import profiled
 
 def GanZhi_Str(gz):
     """将 sxtwl.GZ 对象转为字符串"""
@@ -130,6 +136,52 @@ def parse_datetime_string(datetime_str):
     
     raise ValueError(f"无法解析日期时间格式: {datetime_str}")
 
+def parse_ts(value) -> datetime.datetime:
+    """
+    解析K线时间，支持 datetime 对象、ISO格式字符串以及 parse_datetime_string 支持的格式
+    """
+    if isinstance(value, datetime.datetime):
+        return value.replace(tzinfo=None) if value.tzinfo else value
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    value = str(value).strip()
+    try:
+        result = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        year, month, day, hour, minute, second = parse_datetime_string(value)
+        return datetime.datetime(year, month, day, max(hour, 0), max(minute, 0), max(second, 0))
+    # 与datetime对象相同，去掉时区保留当地时间，使库中的时间都可以互相比较
+    return result.replace(tzinfo=None) if result.tzinfo else result
+
+def parse_ts_with_hour(value):
+    """
+    解析K线时间，同时返回是否带有时间部分
+    只有日期的值（datetime.date、"2024-01-02"、"20240102"）与 calculate_pillar_fields 一样没有时柱
+    :return: (datetime, has_hour)
+    """
+    if isinstance(value, datetime.datetime):
+        return parse_ts(value), True
+    if isinstance(value, datetime.date):
+        return parse_ts(value), False
+    value = str(value).strip()
+    return parse_ts(value), "T" in value or " " in value
+
+def parse_time_range(start_datetime, end_datetime):
+    """
+    把查询的时间范围解析为 (start, end) 两个datetime（包含边界）
+    开始时间缺少的时分秒取0，结束时间缺少的时分秒取23:59:59；为None的一端返回None（不限制）
+    """
+    start = end = None
+    if start_datetime is not None:
+        year, month, day, hour, minute, second = parse_datetime_string(start_datetime)
+        start = datetime.datetime(year, month, day, max(hour, 0), max(minute, 0), max(second, 0))
+    if end_datetime is not None:
+        year, month, day, hour, minute, second = parse_datetime_string(end_datetime)
+        end = datetime.datetime(year, month, day,
+                                hour if hour >= 0 else 23,
+                                minute if minute >= 0 else 59,
+                                second if second >= 0 else 59)
+    return start, end
 
 def GanZhiCalculator(datetiem_str):
     """
@@ -147,8 +199,92 @@ def GanZhiCalculator(datetiem_str):
             GanZhi.append(GanZhi_Str(gz))
     return GanZhi
 
+def calculate_pillar_fields(ts_value):
+    """
+    计算一条K线时间戳的干支字段（对应kbar_data表中的8个干支列）
+    :param ts_value: ts字段的值（ISO格式字符串或其他可解析的时间字符串）
+    :return: (year_gan, year_zhi, month_gan, month_zhi, day_gan, day_zhi, hour_gan, hour_zhi)，
+             计算结果不完整时返回None
+    """
+    # 时间格式转换：ISO格式转换为GanZhiCalculator期望的格式
+    if isinstance(ts_value, str) and 'T' in ts_value:
+        dt_obj = datetime.datetime.fromisoformat(ts_value.replace('T', ' '))
+        ts_str = dt_obj.strftime('%Y/%m/%d %H:%M:%S')
+    else:
+        ts_str = str(ts_value)
+    
+    ganzhi_result = GanZhiCalculator(ts_str)
+    if len(ganzhi_result) < 4:
+        return None
+    
+    year_ganzhi = ganzhi_result[0]
+    month_ganzhi = ganzhi_result[1] 
+    day_ganzhi = ganzhi_result[2]
+    hour_ganzhi = ganzhi_result[3]
+    
+    # 解析干支字符串
+    year_gan = year_ganzhi[0] if len(year_ganzhi) >= 2 else ""
+    year_zhi = year_ganzhi[1] if len(year_ganzhi) >= 2 else ""
+    month_gan = month_ganzhi[0] if len(month_ganzhi) >= 2 else ""
+    month_zhi = month_ganzhi[1] if len(month_ganzhi) >= 2 else ""
+    day_gan = day_ganzhi[0] if len(day_ganzhi) >= 2 else ""
+    day_zhi = day_ganzhi[1] if len(day_ganzhi) >= 2 else ""
+    hour_gan = hour_ganzhi[0] if len(hour_ganzhi) >= 2 and hour_ganzhi != "无值" else ""
+    hour_zhi = hour_ganzhi[1] if len(hour_ganzhi) >= 2 and hour_ganzhi != "无值" else ""
+    return (year_gan, year_zhi, month_gan, month_zhi, day_gan, day_zhi, hour_gan, hour_zhi)
+
+
+def calculate_pillar_fields_batch(datetimes):
+    """
+    批量计算一组时间的干支字段，结果与逐条调用 calculate_pillar_fields 相同
+    年、月、日干支只与日期有关，同一天的所有K线只调用一次sxtwl；
+    时干支由日干和小时决定，同样按 (日干, 小时) 缓存
+    :param datetimes: datetime.datetime 对象、datetime.date 对象（只有日期，时柱为空）
+                      或 parse_ts_with_hour 返回的 (datetime, has_hour) 的列表
+    :return: 与输入等长的 (year_gan, year_zhi, month_gan, month_zhi, day_gan, day_zhi, hour_gan, hour_zhi) 列表
+    """
+    date_cache = {}
+    hour_cache = {}
+    results = []
+    for item in datetimes:
+        if isinstance(item, tuple):
+            dt, has_hour = item
+        else:
+            dt, has_hour = item, isinstance(item, datetime.datetime)
+        date_key = (dt.year, dt.month, dt.day)
+        date_fields = date_cache.get(date_key)
+        if date_fields is None:
+            year_gz, month_gz, day_gz = GanZhiCalculator_Date(dt.year, dt.month, dt.day)
+            date_fields = (
+                gan[year_gz.tg], zhi[year_gz.dz],
+                gan[month_gz.tg], zhi[month_gz.dz],
+                gan[day_gz.tg], zhi[day_gz.dz],
+                day_gz.tg,
+            )
+            date_cache[date_key] = date_fields
+        
+        if not has_hour:
+            results.append(date_fields[:6] + ("", ""))
+            continue
+
+        hour_key = (date_fields[6], dt.hour)
+        hour_fields = hour_cache.get(hour_key)
+        if hour_fields is None:
+            hour_gz = sxtwl.getShiGz(date_fields[6], dt.hour)
+            hour_fields = (gan[hour_gz.tg], zhi[hour_gz.dz])
+            hour_cache[hour_key] = hour_fields
+        
+        results.append(date_fields[:6] + hour_fields)
+    return results
+
+
+@profiled("DateTimeGanZhi")
 def DateTimeGanZhi(datetime_str):
-    return GanZhiCalculator(datetime_str)
+    timer = start_call("DateTimeGanZhi")
+    try:
+        return GanZhiCalculator(datetime_str)
+    finally:
+        timer.finish()
 
 
 # 测试代码
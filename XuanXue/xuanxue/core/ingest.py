@@ -0,0 +1,277 @@
+"""
+K线数据批量导入
+
+ingest_kbar_file(path, db_path=None, ...)        按扩展名导入CSV或Parquet文件
+ingest_kbar_csv(path, db_path=None, ...)         分块读取CSV导入
+ingest_kbar_parquet(path, db_path=None, ...)     分块读取Parquet导入（需要安装pyarrow）
+ingest_kbar_columns(columns, db_path=None, ...)  导入一块按列组织的数据
+
+文件至少包含 ts, open, high, low, close, volume, amount 列；
+symbol, exchange, period 可以是文件中的列，也可以通过参数给出（整个文件相同）。
+OHLCV中的空值（CSV的空单元格、Parquet的null）存为NULL，其他无法转换为数字的值报错并指出行和列。
+
+每一块数据：
+    - 一次性计算整块的干支（同一天只调用一次sxtwl，见 calculate_pillar_fields_batch）
+    - 在一个事务中用 executemany 写入，默认遇到重复的 (symbol, exchange, period, ts) 时更新
+    - 未指定db_path且启用了分片存储（set_kbar_shards）时，每个序列写入 shard_for(key) 对应的分片
+ts 统一存为 ISO 格式 "YYYY-MM-DDTHH:MM:SS"，与示范数据库 stock_kbar.db 一致；
+只有日期的值（如日K线的 "2024-01-02"）存为 "YYYY-MM-DD"，时柱为空
+
+命令行: python -m XuanXue ingest FILE [FILE ...] [--db PATH] [--symbol S --exchange E --period P]
+"""
+import csv
+import os
+import sqlite3
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from ..config import get_stock_kbar_path
+from .database import create_kbar_table, is_read_only
+from .ganzhi_calculator import calculate_pillar_fields_batch, parse_ts_with_hour
+from .kbar_shard import get_kbar_shard_router
+from .result_cache import note_kbar_write
+
+VALUE_COLUMNS = ("ts", "open", "high", "low", "close", "volume", "amount")
+
+ON_CONFLICT_SQL = {
+    "update": """
+    ON CONFLICT(symbol, exchange, period, ts) DO UPDATE SET
+        open=excluded.open, high=excluded.high, low=excluded.low, close=excluded.close,
+        volume=excluded.volume, amount=excluded.amount,
+        year_gan=excluded.year_gan, year_zhi=excluded.year_zhi,
+        month_gan=excluded.month_gan, month_zhi=excluded.month_zhi,
+        day_gan=excluded.day_gan, day_zhi=excluded.day_zhi,
+        hour_gan=excluded.hour_gan, hour_zhi=excluded.hour_zhi
+    """,
+    "ignore": "ON CONFLICT(symbol, exchange, period, ts) DO NOTHING",
+    "none": "",
+}
+
+INSERT_SQL = """
+INSERT INTO kbar_data (
+    symbol, exchange, period, ts, open, high, low, close, volume, amount,
+    year_gan, year_zhi, month_gan, month_zhi, day_gan, day_zhi, hour_gan, hour_zhi
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _key_column(columns: Dict[str, list], name: str, constant: Optional[str], length: int) -> list:
+    if constant is not None:
+        return [constant] * length
+    if name not in columns:
+        raise ValueError(f"缺少 {name} 列，请在文件中提供或通过参数指定")
+    return [str(value) for value in columns[name]]
+
+
+def _value_column(columns: Dict[str, list], name: str) -> list:
+    values = []
+    for i, value in enumerate(columns[name]):
+        if value is None or (isinstance(value, str) and not value.strip()):
+            values.append(None)
+            continue
+        try:
+            values.append(float(value))
+        except (TypeError, ValueError):
+            raise ValueError(f"第 {i + 1} 行的 {name} 列无法转换为数字: {value!r}") from None
+    return values
+
+
+def _check_on_conflict(on_conflict: str):
+    if on_conflict not in ON_CONFLICT_SQL:
+        raise ValueError(f"不支持的on_conflict: {on_conflict}，可选: {tuple(ON_CONFLICT_SQL)}")
+
+
+def _build_records(columns: Dict[str, list], symbol: Optional[str], exchange: Optional[str],
+                   period: Optional[str]) -> List[tuple]:
+    """把一块按列组织的数据转换为 INSERT_SQL 的参数，同时计算整块的干支"""
+    missing = [name for name in VALUE_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"缺少必要的列: {missing}")
+
+    length = len(columns["ts"])
+    if length == 0:
+        return []
+
+    symbols = _key_column(columns, "symbol", symbol, length)
+    exchanges = _key_column(columns, "exchange", exchange, length)
+    periods = _key_column(columns, "period", period, length)
+    parsed = [parse_ts_with_hour(value) for value in columns["ts"]]
+    pillars = calculate_pillar_fields_batch(parsed)
+    # 只有日期的K线（如日K线）按日期保存，时柱为空，与逐条写入的数据一致
+    ts_values = [dt.isoformat() if has_hour else dt.date().isoformat() for dt, has_hour in parsed]
+
+    values = [_value_column(columns, name) for name in VALUE_COLUMNS[1:]]
+    return [
+        (symbols[i], exchanges[i], periods[i], ts_values[i]) + tuple(column[i] for column in values) + pillars[i]
+        for i in range(length)
+    ]
+
+
+def _route_records(records: List[tuple], db_path: Optional[str]) -> Dict[str, List[tuple]]:
+    """
+    按目标数据库分组：指定了db_path时全部写入db_path，启用了分片存储时按序列写入各自的分片，
+    否则写入配置的 stock_kbar_path
+    """
+    if db_path is not None:
+        return {db_path: records}
+    router = get_kbar_shard_router()
+    if router is None:
+        return {get_stock_kbar_path(): records}
+
+    from ..utils import intern_kbar_series_key
+
+    shards = {}
+    groups = {}
+    for record in records:
+        key = record[:3]
+        path = shards.get(key)
+        if path is None:
+            path = shards[key] = router.shard_for(intern_kbar_series_key(*key))
+        groups.setdefault(path, []).append(record)
+    return groups
+
+
+def _write_records(conn: sqlite3.Connection, records: List[tuple], on_conflict: str):
+    with conn:
+        conn.executemany(INSERT_SQL + ON_CONFLICT_SQL[on_conflict], records)
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    if db_file:
+        note_kbar_write(db_file, {record[:3] for record in records})
+
+
+def ingest_kbar_columns(columns: Dict[str, list], db_path: Optional[str] = None,
+                        symbol: Optional[str] = None, exchange: Optional[str] = None,
+                        period: Optional[str] = None, on_conflict: str = "update",
+                        conn: Optional[sqlite3.Connection] = None) -> int:
+    """
+    导入一块按列组织的K线数据，每个数据库在一个事务中写入
+    :param columns: {列名: 值列表}，至少包含 ts, open, high, low, close, volume, amount
+    :param db_path: K线数据库路径，None表示按分片配置写入各序列所在的分片，未启用分片时使用配置的 stock_kbar_path
+                    （传入conn时忽略）
+    :param symbol/exchange/period: 整块数据相同的键，为None时从columns中读取
+    :param on_conflict: 遇到重复记录时 "update"（覆盖）、"ignore"（跳过）或 "none"（不处理，表没有唯一约束时使用）
+    :param conn: 已打开的连接，为None时自动打开并关闭
+    :return: 写入的记录数
+    """
+    _check_on_conflict(on_conflict)
+    records = _build_records(columns, symbol, exchange, period)
+    if not records:
+        return 0
+
+    if conn is not None:
+        _write_records(conn, records, on_conflict)
+        return len(records)
+    for path, group in _route_records(records, db_path).items():
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            _write_records(conn, group, on_conflict)
+        finally:
+            conn.close()
+    return len(records)
+
+
+def _iter_csv_chunks(path: str, chunk_size: int) -> Iterable[Dict[str, list]]:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader, [])]
+        chunk = [[] for _ in header]
+        count = 0
+        for row in reader:
+            if not row:
+                continue
+            for column, value in zip(chunk, row):
+                column.append(value)
+            count += 1
+            if count >= chunk_size:
+                yield dict(zip(header, chunk))
+                chunk = [[] for _ in header]
+                count = 0
+        if count:
+            yield dict(zip(header, chunk))
+
+
+def _iter_parquet_chunks(path: str, chunk_size: int) -> Iterable[Dict[str, list]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("导入Parquet文件需要安装pyarrow: pip install pyarrow") from e
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+        yield batch.to_pydict()
+
+
+def _ingest_chunks(chunks: Iterable[Dict[str, list]], db_path: Optional[str], symbol, exchange, period,
+                   on_conflict: str, progress: Optional[Callable[[Dict], None]]) -> Dict:
+    if is_read_only():
+        raise RuntimeError("只读模式下不能导入K线数据")
+    _check_on_conflict(on_conflict)
+    router = get_kbar_shard_router() if db_path is None else None
+    if router is None:
+        db_path = db_path or get_stock_kbar_path()
+
+    stats = {"db_path": db_path if router is None else router.get_all_paths(),
+             "rows": 0, "chunks": 0, "elapsed": 0.0, "rows_per_sec": 0.0}
+    start_time = time.monotonic()
+    connections = {}    # 数据库路径 -> 连接，第一次写入该数据库时打开
+    try:
+        for columns in chunks:
+            records = _build_records(columns, symbol, exchange, period)
+            for path, group in _route_records(records, db_path).items():
+                conn = connections.get(path)
+                if conn is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                    conn = connections[path] = sqlite3.connect(path, timeout=30)
+                    create_kbar_table(conn)
+                _write_records(conn, group, on_conflict)
+            stats["rows"] += len(records)
+            stats["chunks"] += 1
+            stats["elapsed"] = time.monotonic() - start_time
+            stats["rows_per_sec"] = stats["rows"] / stats["elapsed"] if stats["elapsed"] > 0 else 0.0
+            if progress is not None:
+                progress(dict(stats))
+    finally:
+        for conn in connections.values():
+            conn.close()
+    stats["elapsed"] = time.monotonic() - start_time
+    return stats
+
+
+def ingest_kbar_csv(path: str, db_path: Optional[str] = None, chunk_size: int = 100000,
+                    symbol: Optional[str] = None, exchange: Optional[str] = None, period: Optional[str] = None,
+                    on_conflict: str = "update", progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    分块读取CSV文件导入kbar_data
+    :param path: CSV文件路径，第一行为列名
+    :param chunk_size: 每块（每个事务）的记录数
+    :param progress: 每写入一块后调用一次，参数为当前统计信息
+    :return: 统计信息 {db_path, rows, chunks, elapsed, rows_per_sec}
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size 必须大于0")
+    return _ingest_chunks(_iter_csv_chunks(path, chunk_size), db_path, symbol, exchange, period,
+                          on_conflict, progress)
+
+
+def ingest_kbar_parquet(path: str, db_path: Optional[str] = None, chunk_size: int = 100000,
+                        symbol: Optional[str] = None, exchange: Optional[str] = None, period: Optional[str] = None,
+                        on_conflict: str = "update", progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    分块读取Parquet文件导入kbar_data（需要安装pyarrow）
+    参数同 ingest_kbar_csv
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size 必须大于0")
+    return _ingest_chunks(_iter_parquet_chunks(path, chunk_size), db_path, symbol, exchange, period,
+                          on_conflict, progress)
+
+
+def ingest_kbar_file(path: str, db_path: Optional[str] = None, **kwargs) -> Dict:
+    """
+    按扩展名导入CSV（.csv）或Parquet（.parquet/.pq）文件，参数同 ingest_kbar_csv
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".parquet", ".pq"):
+        return ingest_kbar_parquet(path, db_path, **kwargs)
+    if extension in (".csv", ".txt"):
+        return ingest_kbar_csv(path, db_path, **kwargs)
+    raise ValueError(f"不支持的文件类型: {path}")
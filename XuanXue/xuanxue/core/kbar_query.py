@@ -0,0 +1,74 @@
+"""
+K线数据库的批量读取工具（供导出、聚合、统计等模块共用）
+
+source_paths(db_path)   要读取的数据库路径列表：指定的路径、分片配置的全部分片或配置的 stock_kbar_path
+list_kbar_keys(conn)    库中所有K线序列的 [symbol, exchange, period]，按键排序
+build_kbar_queries(start_dt, end_dt, kbar_series_keys, select_sql)   构建按时间范围和序列读取的查询语句
+pillar_code_sql(name)   在SQL中把一柱的天干、地支列编码为六十甲子序号的表达式
+"""
+import datetime
+from typing import List
+
+from ..config import gan, zhi, get_stock_kbar_path
+from .kbar_shard import get_kbar_shard_router
+from .kbarseriesganzhi import _normalize_kbar_series_key
+
+
+def source_paths(db_path) -> List[str]:
+    """
+    :param db_path: 数据库路径或路径列表，None表示使用分片配置或配置的 stock_kbar_path
+    """
+    if db_path is not None:
+        return [db_path] if isinstance(db_path, str) else list(db_path)
+    router = get_kbar_shard_router()
+    if router is not None:
+        return router.get_all_paths()
+    return [get_stock_kbar_path()]
+
+
+def list_kbar_keys(conn) -> List[list]:
+    """库中所有K线序列的 [symbol, exchange, period]"""
+    return [list(row) for row in conn.execute(
+        "SELECT DISTINCT symbol, exchange, period FROM kbar_data ORDER BY symbol, exchange, period"
+    ).fetchall()]
+
+
+def build_kbar_queries(start_dt, end_dt, kbar_series_keys, select_sql: str) -> List[tuple]:
+    """
+    构建查询语句
+    ts在库中可能是 "YYYY-MM-DDTHH:MM:SS" 或 "YYYY-MM-DD HH:MM:SS"，SQL中只按日期粗过滤，
+    精确的时间范围在读取后判断
+    :param select_sql: "SELECT ... FROM kbar_data"，不含WHERE
+    :return: [(query, params), ...]，没有指定序列时为一条按键和ts排序的查询，否则每个序列一条按ts排序的查询
+    """
+    conditions = []
+    params = []
+    if start_dt is not None:
+        conditions.append("ts >= ?")
+        params.append(start_dt.strftime("%Y-%m-%d"))
+    if end_dt is not None:
+        conditions.append("ts < ?")
+        params.append((end_dt.date() + datetime.timedelta(days=1)).strftime("%Y-%m-%d"))
+
+    if not kbar_series_keys:
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return [(select_sql + where + " ORDER BY symbol, exchange, period, ts", params)]
+
+    queries = []
+    for key in kbar_series_keys:
+        key = _normalize_kbar_series_key(key)
+        where = " AND ".join(["symbol = ?", "exchange = ?", "period = ?"] + conditions)
+        queries.append((select_sql + f" WHERE {where} ORDER BY ts",
+                        [key.symbol, key.exchange, key.period] + params))
+    return queries
+
+
+def pillar_code_sql(name: str) -> str:
+    """
+    一柱（"year"/"month"/"day"/"hour"）的六十甲子序号的SQL表达式
+    天干序号g、地支序号z阴阳相同时，序号为 (6g - 5z) mod 60；NULL、空字符串或不合法的干支为 -1（MISSING_CODE）
+    """
+    g = f"instr('{''.join(gan)}', {name}_gan)"
+    z = f"instr('{''.join(zhi)}', {name}_zhi)"
+    return (f"CASE WHEN length({name}_gan) = 1 AND length({name}_zhi) = 1 AND {g} > 0 AND {z} > 0 "
+            f"AND ({g} - {z}) % 2 = 0 THEN ((6 * {g} - 5 * {z} - 1) % 60 + 60) % 60 ELSE -1 END")
@@ -0,0 +1,131 @@
+"""
+K线数据分片存储
+
+把不同 KbarSeriesKey 的K线数据分散到多个SQLite文件中，每个键只落在一个分片上：
+    strategy="hash"    按 (symbol, exchange, period) 的稳定哈希取模分片
+    strategy="period"  按周期分片，可以用 period_map 显式指定 {period: 分片序号}
+
+使用方法:
+    set_kbar_shards(["kbar_0.db", "kbar_1.db", "kbar_2.db"])
+    KbarSeriesGanZhi("2019-01-01", "2024-01-31", ["600000", "SH", "1day"])
+
+配置分片后 KbarSeriesGanZhi 的调用方式不变，会自动路由到对应的分片文件
+"""
+import os
+import sqlite3
+import zlib
+from typing import Dict, List, Optional
+
+from ..utils import KbarSeriesKey
+from .database import create_kbar_table, is_read_only
+
+SHARD_STRATEGIES = ("hash", "period")
+
+
+class KbarShardRouter:
+    """K线分片路由器：KbarSeriesKey -> 分片数据库路径"""
+
+    def __init__(self, shard_paths: List[str], strategy: str = "hash",
+                 period_map: Optional[Dict[str, int]] = None):
+        if not shard_paths:
+            raise ValueError("分片路径列表不能为空")
+        if strategy not in SHARD_STRATEGIES:
+            raise ValueError(f"不支持的分片策略: {strategy}，可选: {SHARD_STRATEGIES}")
+
+        self.shard_paths = [os.path.abspath(path) for path in shard_paths]
+        self.strategy = strategy
+        self.period_map = dict(period_map or {})
+
+        for period, index in self.period_map.items():
+            if not 0 <= index < len(self.shard_paths):
+                raise ValueError(f"周期 {period} 的分片序号 {index} 超出范围")
+
+    def get_shard_count(self) -> int:
+        return len(self.shard_paths)
+
+    def get_all_paths(self) -> List[str]:
+        return list(self.shard_paths)
+
+    def shard_index(self, key: KbarSeriesKey) -> int:
+        """计算键所在的分片序号"""
+        if self.strategy == "period":
+            if key.period in self.period_map:
+                return self.period_map[key.period]
+            token = key.period
+        else:
+            token = f"{key.symbol}|{key.exchange}|{key.period}"
+        # 使用crc32而不是hash()，保证不同进程之间路由结果一致
+        return zlib.crc32(token.encode("utf-8")) % len(self.shard_paths)
+
+    def shard_for(self, key: KbarSeriesKey) -> str:
+        """获取键所在的分片数据库路径"""
+        return self.shard_paths[self.shard_index(key)]
+
+    def group_keys(self, keys: List[KbarSeriesKey]) -> Dict[str, List[KbarSeriesKey]]:
+        """按分片路径对键进行分组"""
+        groups = {}
+        for key in keys:
+            groups.setdefault(self.shard_for(key), []).append(key)
+        return groups
+
+    def ensure_schema(self):
+        """确保所有分片文件都存在 kbar_data 表"""
+        for path in self.shard_paths:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(path)
+            try:
+                create_kbar_table(conn)
+            finally:
+                conn.close()
+
+    def check_shards(self):
+        """
+        检查所有分片文件是否可用
+        :return: (是否可用, 提示信息)
+        """
+        for path in self.shard_paths:
+            if not os.path.isfile(path):
+                return False, f"分片数据库文件不存在: {path}"
+        return True, f"{len(self.shard_paths)} 个分片数据库正常"
+
+    def __str__(self):
+        return f"KbarShardRouter(strategy={self.strategy}, shards={len(self.shard_paths)})"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+# 全局分片路由器，为None时使用单文件的 stock_kbar_path
+_shard_router = None
+
+
+def set_kbar_shards(shard_paths: List[str], strategy: str = "hash",
+                    period_map: Optional[Dict[str, int]] = None,
+                    create: bool = True) -> KbarShardRouter:
+    """
+    启用K线分片存储
+    :param shard_paths: 分片数据库文件路径列表
+    :param strategy: 分片策略，"hash" 或 "period"
+    :param period_map: strategy="period" 时的 {period: 分片序号} 映射
+    :param create: 是否自动创建缺失的分片文件和 kbar_data 表（只读模式下不创建）
+    :return: 分片路由器
+    """
+    global _shard_router
+    router = KbarShardRouter(shard_paths, strategy, period_map)
+    if create and not is_read_only():
+        router.ensure_schema()
+    _shard_router = router
+    return router
+
+
+def get_kbar_shard_router() -> Optional[KbarShardRouter]:
+    """获取当前的分片路由器，未启用分片时返回None"""
+    return _shard_router
+
+
+def clear_kbar_shards():
+    """关闭分片存储，恢复使用单文件的 stock_kbar_path"""
+    global _shard_router
+    _shard_router = None
@@ -17,19 +17,41 @@ KbarSeriesGanZhi( start-datetime, end-datetime, K线序列, useDB=False)
 
 
 k线序列的键为：{symbol:股票代码,exchange:交易所,period:周期}
+
+KbarSeriesGanZhiMany( start-datetime, end-datetime, [键1, 键2, ...])
+批量查询多个k线序列的干支，启用分片存储（set_kbar_shards）时不同分片并行读取
 """
 
 import datetime
+import logging
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from ..utils import (
     Kbar,
     KbarSeriesKey,
     KbarSeries,
     KbarSeriesGanZhi as KbarSeriesGanZhiType, #导入别名，防止和函数重名
     KbarSeriesGanZhiList,
+    intern_kbar_series_key,
 )
 from ..config import get_stock_kbar_path,check_stock_kbar_path
-from .ganzhi_calculator import parse_datetime_string,GanZhiCalculator
+from .ganzhi_calculator import parse_datetime_string,parse_ts,parse_time_range,GanZhiCalculator,calculate_pillar_fields
+from .kbar_shard import get_kbar_shard_router
+from .database import (
+    open_connection,
+    close_connection,
+    is_read_only,
+    has_missing_pillar_index,
+    has_missing_pillars,
+    propagate_cancel_event,
+    UPDATE_PILLARS_SQL,
+)
+from .write_behind import get_write_behind
+from .result_cache import get_result_cache, note_kbar_write
+from .metrics import start_call
+from .profiling import profiled
+
+logger = logging.getLogger(__name__)
 
 
 def isindatetime(ts, start_datetime, end_datetime):
@@ -57,7 +79,7 @@ def isindatetime(ts, start_datetime, end_datetime):
                 # 没有微秒的情况：2023-08-25T11:15:30
                 ts_dt = datetime.datetime.fromisoformat(ts)
         else:
-            print(f"不支持的时间类型: {type(ts)}")
+            logger.debug("不支持的时间类型: %s", type(ts))
             return False
         
         # 解析开始时间
@@ -82,20 +104,116 @@ def isindatetime(ts, start_datetime, end_datetime):
         return start_dt <= ts_dt <= end_dt
         
     except Exception as e:
-        # 如果解析失败，打印错误信息并返回False
-        print(f"时间解析错误: ts='{ts}', start='{start_datetime}', end='{end_datetime}', error={e}")
+        # 如果解析失败，记录调试日志并返回False
+        logger.debug("时间解析错误: ts=%r, start=%r, end=%r, error=%s", ts, start_datetime, end_datetime, e)
         return False
 
 
+class _TimeRangeFilter:
+    """
+    逐行判断K线时间是否在范围内，与 isindatetime 结果相同，
+    但时间范围只解析一次，解析失败的行只计数，由 report() 在调用结束时汇总记录一次日志
+    """
+
+    def __init__(self, start_datetime, end_datetime):
+        self.errors = 0
+        self.range_error = None
+        try:
+            self.start, self.end = parse_time_range(start_datetime, end_datetime)
+        except Exception as e:
+            self.range_error = e
+
+    def __call__(self, ts) -> bool:
+        if self.range_error is not None:
+            return False
+        if not isinstance(ts, datetime.datetime):
+            try:
+                ts = datetime.datetime.fromisoformat(ts)
+            except (TypeError, ValueError):
+                self.errors += 1
+                logger.debug("时间解析错误: ts=%r", ts)
+                return False
+        try:
+            return self.start <= ts <= self.end
+        except TypeError:
+            # 带时区与不带时区的时间无法比较
+            self.errors += 1
+            logger.debug("时间无法比较: ts=%r", ts)
+            return False
+
+    def report(self, context: str):
+        if self.range_error is not None:
+            logger.warning("%s: 时间范围无法解析: %s", context, self.range_error)
+        elif self.errors:
+            logger.warning("%s: %d 条K线的时间无法解析，已跳过", context, self.errors)
+
+
+def _fill_missing_pillars(rows, missing_indexes):
+    """
+    在内存中为缺失干支的行计算干支
+    :param rows: 查询结果行列表，缺失干支的行会被替换为补全后的行
+    :param missing_indexes: rows中缺失干支的行下标
+    :return: 需要写回数据库的 (干支字段..., id) 列表
+    """
+    updates = []
+    failed = 0
+    for index in missing_indexes:
+        row = rows[index]
+        try:
+            fields = calculate_pillar_fields(row[4])
+        except Exception as e:
+            logger.debug("计算干支时出错 (ID: %s): %s", row[0], e)
+            failed += 1
+            continue
+        if fields is None:
+            logger.debug("干支计算结果不完整 (ID: %s)", row[0])
+            failed += 1
+            continue
+        rows[index] = row[:11] + fields + row[19:]
+        updates.append(fields + (row[0],))
+    if failed:
+        logger.warning("%d 条记录的干支计算失败或不完整", failed)
+    return updates
+
+
+def _write_back_pillars(conn, db_path, updates):
+    """
+    将计算出的干支写回数据库，只读模式下跳过
+    启用了后台写入队列时交给后台线程批量写入，不阻塞读取
+    :return: 同步写入的行数
+    """
+    if not updates or is_read_only():
+        return 0
+    writer = get_write_behind()
+    if writer is not None:
+        writer.submit(db_path, updates)
+        return 0
+    conn.executemany(UPDATE_PILLARS_SQL, updates)
+    conn.commit()
+    logger.info("已更新 %d 条记录的干支数据", len(updates))
+    return len(updates)
+
+
 def kbarseriesganzhi_none(db_path, start_datetime, end_datetime):
     """
     当kbar_series为None且useDB=True时，从数据库中获取所有K线数据并计算干支序列
+    缺失的干支在内存中计算后写回数据库（只读模式下不写回）
+    启用了结果缓存（enable_result_cache）时，相同的查询直接返回缓存结果
     """
+    cache = get_result_cache()
+    if cache is not None:
+        return cache.get_or_compute(db_path, None, start_datetime, end_datetime,
+                                    lambda: _kbarseriesganzhi_none(db_path, start_datetime, end_datetime))
+    return _kbarseriesganzhi_none(db_path, start_datetime, end_datetime)
+
+
+@profiled("kbarseriesganzhi_none")
+def _kbarseriesganzhi_none(db_path, start_datetime, end_datetime):
+    timer = start_call("kbarseriesganzhi_none")
     try:
-        conn = sqlite3.connect(db_path)
+        conn = open_connection(db_path)
         cursor = conn.cursor()
         
-        # 修复：先查询所有数据，然后处理缺失的干支
         query = """
         SELECT id, symbol, exchange, period, ts, open, high, low, close, volume, amount,
                year_gan, year_zhi, month_gan, month_zhi, day_gan, day_zhi, hour_gan, hour_zhi
@@ -105,162 +223,147 @@ def kbarseriesganzhi_none(db_path, start_datetime, end_datetime):
         
         cursor.execute(query)
         rows = cursor.fetchall()
+        timer.lap("sql_read")
+        timer.count("rows_scanned", len(rows))
         
         if not rows:
-            print("数据库中没有找到K线数据")
+            logger.info("数据库中没有找到K线数据")
             return KbarSeriesGanZhiList([])
         
-        # 处理缺失干支的记录
-        rows_to_update = []
+        # 有部分索引时先判断是否有缺失干支的记录，回填完成的库不必逐行检查；
+        # 没有索引时（旧库、只读副本）全表探测与逐行检查代价相同，直接逐行检查
+        check_missing = not has_missing_pillar_index(conn) or has_missing_pillars(conn)
+        
+        # 只保留时间范围内的记录，并找出缺失干支的记录
+        in_range = _TimeRangeFilter(start_datetime, end_datetime)
+        filtered_rows = []
+        missing_indexes = []
         for row in rows:
-            if isindatetime(row[4], start_datetime, end_datetime):
-                ganzhi_fields = row[11:19]  # year_gan 到 hour_zhi
-                if any(field is None or field == '' for field in ganzhi_fields):
-                    rows_to_update.append(row)
-        
-        # 计算并更新缺失的干支
-        if rows_to_update:
-            print(f"正在计算 {len(rows_to_update)} 条记录的干支数据...")
-            update_query = """
-            UPDATE kbar_data 
-            SET year_gan=?, year_zhi=?, month_gan=?, month_zhi=?, 
-                day_gan=?, day_zhi=?, hour_gan=?, hour_zhi=?
-            WHERE id=?
-            """
-            
-            for row in rows_to_update:
-                try:
-                    # 时间格式转换
-                    ts_value = row[4]
-                    if isinstance(ts_value, str) and 'T' in ts_value:
-                        dt_obj = datetime.datetime.fromisoformat(ts_value.replace('T', ' '))
-                        ts_str = dt_obj.strftime('%Y/%m/%d %H:%M:%S')
-                    else:
-                        ts_str = str(ts_value)
-                    
-                    ganzhi_result = GanZhiCalculator(ts_str)
-                    
-                    if len(ganzhi_result) >= 4:
-                        year_ganzhi = ganzhi_result[0]
-                        month_ganzhi = ganzhi_result[1] 
-                        day_ganzhi = ganzhi_result[2]
-                        hour_ganzhi = ganzhi_result[3] if len(ganzhi_result) > 3 else "无值"
-                        
-                        # 解析干支字符串
-                        year_gan = year_ganzhi[0] if len(year_ganzhi) >= 2 else ""
-                        year_zhi = year_ganzhi[1] if len(year_ganzhi) >= 2 else ""
-                        month_gan = month_ganzhi[0] if len(month_ganzhi) >= 2 else ""
-                        month_zhi = month_ganzhi[1] if len(month_ganzhi) >= 2 else ""
-                        day_gan = day_ganzhi[0] if len(day_ganzhi) >= 2 else ""
-                        day_zhi = day_ganzhi[1] if len(day_ganzhi) >= 2 else ""
-                        hour_gan = hour_ganzhi[0] if len(hour_ganzhi) >= 2 and hour_ganzhi != "无值" else ""
-                        hour_zhi = hour_ganzhi[1] if len(hour_ganzhi) >= 2 and hour_ganzhi != "无值" else ""
-                        
-                        cursor.execute(update_query, (
-                            year_gan, year_zhi, month_gan, month_zhi,
-                            day_gan, day_zhi, hour_gan, hour_zhi,
-                            row[0]  # id
-                        ))
-                except Exception as e:
-                    print(f"计算干支时出错 (ID: {row[0]}): {e}")
-                    continue
-            
-            conn.commit()
-            print(f"已更新 {len(rows_to_update)} 条记录的干支数据")
+            if in_range(row[4]):
+                if check_missing and any(field is None for field in row[11:19]):  # year_gan 到 hour_zhi
+                    missing_indexes.append(len(filtered_rows))
+                filtered_rows.append(row)
+        in_range.report("kbarseriesganzhi_none")
+        timer.lap("filter")
         
-        # 重新查询更新后的数据
-        cursor.execute(query)
-        updated_rows = cursor.fetchall()
+        # 计算缺失的干支并写回
+        timer.count("pillars_reused", len(filtered_rows) - len(missing_indexes))
+        if missing_indexes:
+            logger.info("正在计算 %d 条记录的干支数据", len(missing_indexes))
+            updates = _fill_missing_pillars(filtered_rows, missing_indexes)
+            timer.lap("compute")
+            timer.count("pillars_computed", len(updates))
+            timer.count("rows_written", _write_back_pillars(conn, db_path, updates))
+            timer.lap("write_back")
         
-        # 按key分组处理数据
+        # 按key分组处理数据，分组时直接使用 (symbol, exchange, period) 元组，每组只创建一个键对象
         data_dict = {}
-        for row in updated_rows:
-            if isindatetime(row[4], start_datetime, end_datetime):
-                symbol, exchange, period = row[1], row[2], row[3]
-                key = KbarSeriesKey(symbol, exchange, period)
-                
-                # 构建干支字符串
-                year_gan, year_zhi = row[11], row[12]
-                month_gan, month_zhi = row[13], row[14]
-                day_gan, day_zhi = row[15], row[16]
-                hour_gan, hour_zhi = row[17], row[18]
+        for row in filtered_rows:
+            key = row[1:4]
+            
+            # 构建干支字符串
+            year_gan, year_zhi = row[11], row[12]
+            month_gan, month_zhi = row[13], row[14]
+            day_gan, day_zhi = row[15], row[16]
+            hour_gan, hour_zhi = row[17], row[18]
+            
+            if year_gan and year_zhi:  # 确保有干支数据
+                ganzhi_str = f"{year_gan}{year_zhi}-{month_gan}{month_zhi}-{day_gan}{day_zhi}-{hour_gan}{hour_zhi}"
                 
-                if year_gan and year_zhi:  # 确保有干支数据
-                    ganzhi_str = f"{year_gan}{year_zhi}-{month_gan}{month_zhi}-{day_gan}{day_zhi}-{hour_gan}{hour_zhi}"
-                    
-                    if key not in data_dict:
-                        data_dict[key] = []
-                    data_dict[key].append(ganzhi_str)
+                if key not in data_dict:
+                    data_dict[key] = ([], [])
+                data_dict[key][0].append(ganzhi_str)
+                data_dict[key][1].append(parse_ts(row[4]))
         
         # 构建返回结果
         result_list = []
-        for key, ganzhi_list in data_dict.items():
+        for key, (ganzhi_list, ts_list) in data_dict.items():
             if ganzhi_list:  # 只添加有数据的序列
-                result_list.append(KbarSeriesGanZhiType(key, ganzhi_list))
+                result_list.append(KbarSeriesGanZhiType(intern_kbar_series_key(*key), ganzhi_list, ts_list))
         
-        print(f"返回 {len(result_list)} 个K线序列的干支数据")
+        logger.debug("返回 %d 个K线序列的干支数据", len(result_list))
+        timer.lap("build")
+        timer.count("rows_returned", sum(len(series.get_ganzhi_list()) for series in result_list))
         return KbarSeriesGanZhiList(result_list)
         
     except sqlite3.OperationalError as e:
         if "unable to open database file" in str(e):
             raise FileNotFoundError(f"无法打开数据库文件: {db_path}") from e
         else:
-            print(f"数据库操作错误: {e}")
+            logger.error("数据库操作错误: %s", e)
             return KbarSeriesGanZhiList([])
     except Exception as e:
-        print(f"kbarseriesganzhi_none 执行出错: {e}")
+        logger.exception("kbarseriesganzhi_none 执行出错: %s", e)
         return KbarSeriesGanZhiList([])
     finally:
         if 'conn' in locals():
-            conn.close()
+            close_connection(conn)
+        timer.finish()
+
+
+def _normalize_kbar_series_key(kbar_series_key):
+    """
+    将列表、字典或KbarSeriesKey对象统一转换为KbarSeriesKey对象
+    """
+    if isinstance(kbar_series_key, list):
+        # 如果是列表，创建KbarSeriesKey对象
+        if len(kbar_series_key) != 3:
+            raise ValueError("列表必须包含3个元素: [symbol, exchange, period]")
+        
+        return intern_kbar_series_key(
+            symbol=kbar_series_key[0],
+            exchange=kbar_series_key[1],
+            period=kbar_series_key[2]
+        )
+    elif isinstance(kbar_series_key, dict):
+        # 如果是字典，创建KbarSeriesKey对象
+        if not all(key in kbar_series_key for key in ['symbol', 'exchange', 'period']):
+            raise ValueError("字典必须包含 'symbol', 'exchange', 'period' 三个键")
+        
+        return intern_kbar_series_key(
+            symbol=kbar_series_key['symbol'],
+            exchange=kbar_series_key['exchange'],
+            period=kbar_series_key['period']
+        )
+    elif hasattr(kbar_series_key, 'symbol') and hasattr(kbar_series_key, 'exchange') and hasattr(kbar_series_key, 'period'):
+        # 如果是KbarSeriesKey对象
+        return kbar_series_key
+    else:
+        raise TypeError("kbar_series_key 必须是列表、字典或KbarSeriesKey对象")
 
 
 def kbarseriesganzhi_DB(db_path, start_datetime, end_datetime, kbar_series_key):
     """
     当kbar_series为KbarSeriesKey或字典时，从数据库中查询指定键的k线数据并计算干支
-    如果数据库中没有干支记录，则计算并插入数据库中
+    如果数据库中没有干支记录，则计算并插入数据库中（只读模式下只在内存中计算，不写回）
+    
+    启用了结果缓存（enable_result_cache）时，相同的查询直接返回缓存结果
     
     参数:
         kbar_series_key: 可以是KbarSeriesKey对象或字典格式 {"symbol":..., "exchange":..., "period":...}
     """
+    cache = get_result_cache()
+    if cache is not None:
+        try:
+            key_obj = _normalize_kbar_series_key(kbar_series_key)
+        except (TypeError, ValueError):
+            key_obj = None
+        if key_obj is not None:
+            return cache.get_or_compute(db_path, key_obj, start_datetime, end_datetime,
+                                        lambda: _kbarseriesganzhi_DB(db_path, start_datetime, end_datetime, key_obj))
+    return _kbarseriesganzhi_DB(db_path, start_datetime, end_datetime, kbar_series_key)
+
+
+@profiled("kbarseriesganzhi_DB")
+def _kbarseriesganzhi_DB(db_path, start_datetime, end_datetime, kbar_series_key):
+    timer = start_call("kbarseriesganzhi_DB")
     try:
-        # 处理输入参数：支持列表格式、字典格式和KbarSeriesKey对象
-        if isinstance(kbar_series_key, list):
-            # 如果是列表，创建KbarSeriesKey对象
-            if len(kbar_series_key) != 3:
-                raise ValueError("列表必须包含3个元素: [symbol, exchange, period]")
-            
-            key_obj = KbarSeriesKey(
-                symbol=kbar_series_key[0],
-                exchange=kbar_series_key[1],
-                period=kbar_series_key[2]
-            )
-            symbol = kbar_series_key[0]
-            exchange = kbar_series_key[1]
-            period = kbar_series_key[2]
-        elif isinstance(kbar_series_key, dict):
-            # 如果是字典，创建KbarSeriesKey对象
-            if not all(key in kbar_series_key for key in ['symbol', 'exchange', 'period']):
-                raise ValueError("字典必须包含 'symbol', 'exchange', 'period' 三个键")
-            
-            key_obj = KbarSeriesKey(
-                symbol=kbar_series_key['symbol'],
-                exchange=kbar_series_key['exchange'],
-                period=kbar_series_key['period']
-            )
-            symbol = kbar_series_key['symbol']
-            exchange = kbar_series_key['exchange']
-            period = kbar_series_key['period']
-        elif hasattr(kbar_series_key, 'symbol') and hasattr(kbar_series_key, 'exchange') and hasattr(kbar_series_key, 'period'):
-            # 如果是KbarSeriesKey对象
-            key_obj = kbar_series_key
-            symbol = kbar_series_key.symbol
-            exchange = kbar_series_key.exchange
-            period = kbar_series_key.period
-        else:
-            raise TypeError("kbar_series_key 必须是列表、字典或KbarSeriesKey对象")
+        key_obj = _normalize_kbar_series_key(kbar_series_key)
+        symbol = key_obj.symbol
+        exchange = key_obj.exchange
+        period = key_obj.period
         
-        conn = sqlite3.connect(db_path)
+        conn = open_connection(db_path)
         cursor = conn.cursor()
         
         # 查询指定键的K线数据
@@ -274,97 +377,52 @@ def kbarseriesganzhi_DB(db_path, start_datetime, end_datetime, kbar_series_key):
         
         cursor.execute(query, (symbol, exchange, period))
         rows = cursor.fetchall()
+        timer.lap("sql_read")
+        timer.count("rows_scanned", len(rows))
         
         if not rows:
-            print(f"未找到匹配的K线数据: {symbol}-{exchange}-{period}")
+            logger.info("未找到匹配的K线数据: %s-%s-%s", symbol, exchange, period)
             return KbarSeriesGanZhiType(key_obj, [])
         
-        # 过滤时间范围内的数据
+        # 过滤时间范围内的数据，并找出缺失干支的记录
+        in_range = _TimeRangeFilter(start_datetime, end_datetime)
         filtered_rows = []
-        rows_to_update = []  # 需要更新干支的行
+        missing_indexes = []
         
         for row in rows:
-            if isindatetime(row[4], start_datetime, end_datetime):  # row[4] 是 ts
+            if in_range(row[4]):  # row[4] 是 ts
+                # 检查是否需要计算干支（任一干支字段为空），只检查本序列已读取的记录
+                if any(field is None for field in row[11:19]):  # year_gan 到 hour_zhi
+                    missing_indexes.append(len(filtered_rows))
                 filtered_rows.append(row)
-                
-                # 检查是否需要计算干支（任一干支字段为空）
-                ganzhi_fields = row[11:19]  # year_gan 到 hour_zhi
-                if any(field is None for field in ganzhi_fields):
-                    rows_to_update.append(row)
-        
-        # 计算缺失的干支数据
-        if rows_to_update:
-            print(f"正在计算 {len(rows_to_update)} 条记录的干支数据...")
-            
-            update_query = """
-            UPDATE kbar_data 
-            SET year_gan=?, year_zhi=?, month_gan=?, month_zhi=?, 
-                day_gan=?, day_zhi=?, hour_gan=?, hour_zhi=?
-            WHERE id=?
-            """
-            
-            for row in rows_to_update:
-                try:
-                    # 修复：确保时间格式正确转换
-                    ts_value = row[4]  # ts字段
-                    if isinstance(ts_value, str) and 'T' in ts_value:
-                        # ISO格式转换为GanZhiCalculator期望的格式
-                        dt_obj = datetime.datetime.fromisoformat(ts_value.replace('T', ' '))
-                        ts_str = dt_obj.strftime('%Y/%m/%d %H:%M:%S')
-                    else:
-                        ts_str = str(ts_value)
-                    
-                    # 使用 GanZhiCalculator 函数计算干支
-                    ganzhi_result = GanZhiCalculator(ts_str)
-                    
-                    if len(ganzhi_result) >= 4:
-                        year_ganzhi = ganzhi_result[0]
-                        month_ganzhi = ganzhi_result[1] 
-                        day_ganzhi = ganzhi_result[2]
-                        hour_ganzhi = ganzhi_result[3] if len(ganzhi_result) > 3 else "无值"
-                        
-                        # 解析干支字符串
-                        year_gan = year_ganzhi[0] if len(year_ganzhi) >= 2 else ""
-                        year_zhi = year_ganzhi[1] if len(year_ganzhi) >= 2 else ""
-                        month_gan = month_ganzhi[0] if len(month_ganzhi) >= 2 else ""
-                        month_zhi = month_ganzhi[1] if len(month_ganzhi) >= 2 else ""
-                        day_gan = day_ganzhi[0] if len(day_ganzhi) >= 2 else ""
-                        day_zhi = day_ganzhi[1] if len(day_ganzhi) >= 2 else ""
-                        hour_gan = hour_ganzhi[0] if len(hour_ganzhi) >= 2 and hour_ganzhi != "无值" else ""
-                        hour_zhi = hour_ganzhi[1] if len(hour_ganzhi) >= 2 and hour_ganzhi != "无值" else ""
-                        
-                        # 更新数据库
-                        cursor.execute(update_query, (
-                            year_gan, year_zhi, month_gan, month_zhi,
-                            day_gan, day_zhi, hour_gan, hour_zhi,
-                            row[0]  # id
-                        ))
-                    else:
-                        print(f"干支计算结果不完整 (ID: {row[0]}): {ganzhi_result}")
-                        
-                except Exception as e:
-                    print(f"计算干支时出错 (ID: {row[0]}): {e}")
-                    continue
-            
-            conn.commit()
-            print(f"已更新 {len(rows_to_update)} 条记录的干支数据")
+        in_range.report("kbarseriesganzhi_DB")
+        timer.lap("filter")
         
-        # 重新查询更新后的数据
-        cursor.execute(query, (symbol, exchange, period))
-        updated_rows = cursor.fetchall()
+        # 在内存中计算缺失的干支数据，然后写回数据库（只读模式下不写回）
+        timer.count("pillars_reused", len(filtered_rows) - len(missing_indexes))
+        if missing_indexes:
+            logger.info("正在计算 %d 条记录的干支数据", len(missing_indexes))
+            updates = _fill_missing_pillars(filtered_rows, missing_indexes)
+            timer.lap("compute")
+            timer.count("pillars_computed", len(updates))
+            timer.count("rows_written", _write_back_pillars(conn, db_path, updates))
+            timer.lap("write_back")
         
         # 构建结果
         ganzhi_list = []
-        for row in updated_rows:
-            if isindatetime(row[4], start_datetime, end_datetime):
-                # 构建干支字符串
-                ganzhi_str = f"{row[11] or ''}{row[12] or ''}-{row[13] or ''}{row[14] or ''}-{row[15] or ''}{row[16] or ''}-{row[17] or ''}{row[18] or ''}"
-                ganzhi_list.append(ganzhi_str)
+        ts_list = []
+        for row in filtered_rows:
+            # 构建干支字符串
+            ganzhi_str = f"{row[11] or ''}{row[12] or ''}-{row[13] or ''}{row[14] or ''}-{row[15] or ''}{row[16] or ''}-{row[17] or ''}{row[18] or ''}"
+            ganzhi_list.append(ganzhi_str)
+            ts_list.append(parse_ts(row[4]))
+        timer.lap("build")
+        timer.count("rows_returned", len(ganzhi_list))
         
-        return KbarSeriesGanZhiType(key_obj, ganzhi_list)
+        return KbarSeriesGanZhiType(key_obj, ganzhi_list, ts_list)
         
     except Exception as e:
-        print(f"kbarseriesganzhi_DB 执行出错: {e}")
+        logger.exception("kbarseriesganzhi_DB 执行出错: %s", e)
         # 确保返回时使用正确的key_obj
         if 'key_obj' in locals():
             return KbarSeriesGanZhiType(key_obj, [])
@@ -374,7 +432,8 @@ def kbarseriesganzhi_DB(db_path, start_datetime, end_datetime, kbar_series_key):
             return KbarSeriesGanZhiType(default_key, [])
     finally:
         if 'conn' in locals():
-            conn.close()
+            close_connection(conn)
+        timer.finish()
 
 
 def _convert_dict_to_kbar_series(kbar_dict):
@@ -388,7 +447,7 @@ def _convert_dict_to_kbar_series(kbar_dict):
         raise ValueError("字典必须包含 'symbol', 'exchange', 'period', 'kbar' 四个键")
     
     # 创建KbarSeriesKey
-    key_obj = KbarSeriesKey(
+    key_obj = intern_kbar_series_key(
         symbol=kbar_dict['symbol'],
         exchange=kbar_dict['exchange'],
         period=kbar_dict['period']
@@ -432,19 +491,22 @@ def _convert_dict_to_kbar_series(kbar_dict):
     return KbarSeries(key_obj, kbar_list)
 
 
+@profiled("kbarseriesganzhi_noDB")
 def kbarseriesganzhi_noDB(db_path, start_datetime, end_datetime, kbar_series):
     """
     当kbar_series为KbarSeries或字典且useDB=False时，实时计算干支序列
-    并将数据库中不存在的记录连带干支信息插入数据库中
+    并将数据库中不存在的记录连带干支信息插入数据库中（只读模式下不访问数据库）
     
     参数:
         kbar_series: 可以是KbarSeries对象或包含kbar数据的字典
     """
+    timer = start_call("kbarseriesganzhi_noDB")
     try:
-        conn = sqlite3.connect(db_path)
+        conn = open_connection(db_path)
         cursor = conn.cursor()
         
         result_list = []  # 改为列表存储 KbarSeriesGanZhi 对象
+        read_only = is_read_only()  # 只读模式下不查询也不插入数据库
         
         # 检查输入类型并进行转换
         if isinstance(kbar_series, dict) and 'kbar' in kbar_series:
@@ -458,22 +520,28 @@ def kbarseriesganzhi_noDB(db_path, start_datetime, end_datetime, kbar_series):
             kbar_list = kbar_series.get_kbar_list()
             
             ganzhi_list = []
+            ts_list = []  # 与ganzhi_list一一对应的K线时间
             new_records = []  # 需要插入数据库的新记录
+            in_range = _TimeRangeFilter(start_datetime, end_datetime)
+            failed = 0  # 干支计算失败的K线数，结束时汇总记录一次日志
             
             for kbar in kbar_list:
                 # 检查时间范围
-                if not isindatetime(kbar.ts, start_datetime, end_datetime):
+                if not in_range(kbar.ts):
                     continue
                 
                 # 检查数据库中是否已存在该记录
-                check_query = """
-                SELECT id FROM kbar_data 
-                WHERE symbol=? AND exchange=? AND period=? AND ts=?
-                """
-                cursor.execute(check_query, (key.symbol, key.exchange, key.period, kbar.ts))
-                existing = cursor.fetchone()
+                existing = None
+                if not read_only:
+                    check_query = """
+                    SELECT id FROM kbar_data 
+                    WHERE symbol=? AND exchange=? AND period=? AND ts=?
+                    """
+                    cursor.execute(check_query, (key.symbol, key.exchange, key.period, kbar.ts))
+                    existing = cursor.fetchone()
                 
                 # 计算干支
+                ts_list.append(kbar.ts)
                 try:
                     # 将datetime对象转换为字符串格式供GanZhiCalculator使用
                     if isinstance(kbar.ts, datetime.datetime):
@@ -501,7 +569,7 @@ def kbarseriesganzhi_noDB(db_path, start_datetime, end_datetime, kbar_series):
                         ganzhi_list.append(ganzhi_str)
                         
                         # 如果数据库中不存在，准备插入
-                        if not existing:
+                        if not existing and not read_only:
                             # 解析干支字符串以便存储到数据库
                             year_gan = year_ganzhi[0] if len(year_ganzhi) >= 2 else ""
                             year_zhi = year_ganzhi[1] if len(year_ganzhi) >= 2 else ""
@@ -522,13 +590,22 @@ def kbarseriesganzhi_noDB(db_path, start_datetime, end_datetime, kbar_series):
                             ))
                     
                     else:
-                        print(f"警告：无法计算时间 {ts_str} 的干支")
+                        logger.debug("无法计算时间 %s 的干支", ts_str)
+                        failed += 1
                         ganzhi_list.append("计算失败")
                         
                 except Exception as e:
-                    print(f"计算干支时出错: {e}")
+                    logger.debug("计算时间 %s 的干支时出错: %s", kbar.ts, e)
+                    failed += 1
                     ganzhi_list.append("计算出错")
             
+            in_range.report("kbarseriesganzhi_noDB")
+            if failed:
+                logger.warning("kbarseriesganzhi_noDB: %d 根K线的干支计算失败", failed)
+            timer.lap("compute")
+            timer.count("rows_scanned", len(kbar_list))
+            timer.count("pillars_computed", len(ganzhi_list) - failed)
+            
             # 批量插入新记录
             if new_records:
                 insert_query = """
@@ -538,14 +615,19 @@ def kbarseriesganzhi_noDB(db_path, start_datetime, end_datetime, kbar_series):
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """
                 cursor.executemany(insert_query, new_records)
-                print(f"已插入 {len(new_records)} 条新的K线记录到数据库")
+                logger.info("已插入 %d 条新的K线记录到数据库", len(new_records))
             
             # 创建 KbarSeriesGanZhi 对象
-            kbar_series_ganzhi = KbarSeriesGanZhiType(key, ganzhi_list)
+            kbar_series_ganzhi = KbarSeriesGanZhiType(key, ganzhi_list, ts_list)
             result_list.append(kbar_series_ganzhi)
             
             conn.commit()
-            conn.close()
+            close_connection(conn)
+            if new_records:
+                note_kbar_write(db_path, [key])
+            timer.lap("write_back")
+            timer.count("rows_written", len(new_records))
+            timer.count("rows_returned", len(ganzhi_list))
             
             # 返回单个 KbarSeriesGanZhi 对象
             return kbar_series_ganzhi
@@ -554,20 +636,99 @@ def kbarseriesganzhi_noDB(db_path, start_datetime, end_datetime, kbar_series):
             raise TypeError("kbar_series 必须是 KbarSeries 对象或包含kbar数据的字典")
             
     except Exception as e:
-        print(f"处理过程中出错: {e}")
+        logger.debug("kbarseriesganzhi_noDB 处理过程中出错: %s", e)
         if 'conn' in locals():
-            conn.close()
+            close_connection(conn)
         raise
+    finally:
+        timer.finish()
 
 
-def KbarSeriesGanZhi(start_datetime, end_datetime, kbar_series, useDB: bool = True):
+def kbarseriesganzhi_none_sharded(router, start_datetime, end_datetime, max_workers=None):
+    """
+    分片模式下kbar_series为None时，并行读取所有分片并合并为一个KbarSeriesGanZhiList
+    """
+    shard_paths = router.get_all_paths()
+    with ThreadPoolExecutor(max_workers=max_workers or len(shard_paths)) as executor:
+        # 子线程继承调用线程的取消信号（异步接口超时/取消时中断各分片的SQL）
+        shard_results = list(executor.map(
+            propagate_cancel_event(lambda path: kbarseriesganzhi_none(path, start_datetime, end_datetime)),
+            shard_paths
+        ))
+    
+    merged = KbarSeriesGanZhiList([])
+    for shard_result in shard_results:
+        for kbar_series_ganzhi in shard_result.get_kbar_series_ganzhi_list():
+            merged.add_kbar_series_ganzhi(kbar_series_ganzhi)
+    return merged
+
+
+def _kbarseriesganzhi_sharded(router, start_datetime, end_datetime, kbar_series, useDB):
+    """
+    分片模式下的KbarSeriesGanZhi：按键路由到对应的分片文件
+    """
+    is_valid, message = router.check_shards()
+    if not is_valid:
+        raise FileNotFoundError(message)
+    
+    if kbar_series is None:
+        return kbarseriesganzhi_none_sharded(router, start_datetime, end_datetime)
+    
+    if useDB:
+        try:
+            key_obj = _normalize_kbar_series_key(kbar_series)
+        except (TypeError, ValueError):
+            # 非法的键交给kbarseriesganzhi_DB按原有方式处理
+            return kbarseriesganzhi_DB(router.get_all_paths()[0], start_datetime, end_datetime, kbar_series)
+        return kbarseriesganzhi_DB(router.shard_for(key_obj), start_datetime, end_datetime, key_obj)
+    
+    if isinstance(kbar_series, dict) and 'kbar' in kbar_series:
+        kbar_series = _convert_dict_to_kbar_series(kbar_series)
+    if not hasattr(kbar_series, 'get_key'):
+        raise TypeError("kbar_series 必须是 KbarSeries 对象或包含kbar数据的字典")
+    return kbarseriesganzhi_noDB(router.shard_for(kbar_series.get_key()), start_datetime, end_datetime, kbar_series)
+
+
+def _read_many(groups, key_objs, start_datetime, end_datetime, max_workers=None):
+    """
+    按数据库分组读取多个键，不同数据库并行读取，同一数据库上的键在一个线程中依次读取
+    :param groups: {数据库路径: [key_objs中的下标, ...]}
+    """
+    results = [None] * len(key_objs)
+    
+    def read_shard(db_path, indexes):
+        for index in indexes:
+            results[index] = kbarseriesganzhi_DB(db_path, start_datetime, end_datetime, key_objs[index])
     
-    db_path = get_stock_kbar_path()
+    if groups:
+        with ThreadPoolExecutor(max_workers=max_workers or len(groups)) as executor:
+            read = propagate_cancel_event(read_shard)
+            futures = [executor.submit(read, path, indexes) for path, indexes in groups.items()]
+            for future in futures:
+                future.result()
+    
+    return KbarSeriesGanZhiList(results)
+
 
-    if not check_stock_kbar_path():
-        raise FileNotFoundError("kbar数据库文件不存在,请先配置kbar数据库文件路径")
-        return None
+def KbarSeriesGanZhiMany(start_datetime, end_datetime, kbar_series_keys, max_workers=None):
+    """
+    批量查询多个k线序列的干支（useDB=True）
+    启用分片时，不同分片上的键并行读取；同一分片上的键在一个线程中依次读取
+    通过默认的 XuanXueSession 调用，数据库只在第一次使用时检查
+    
+    参数:
+        kbar_series_keys: 键的列表，每个元素可以是KbarSeriesKey对象、列表或字典
+    返回:
+        KbarSeriesGanZhiList，顺序与输入的键一致
+    """
+    from .session import get_default_session
+    return get_default_session().KbarSeriesGanZhiMany(start_datetime, end_datetime, kbar_series_keys, max_workers)
 
+
+def _kbarseriesganzhi_single(db_path, start_datetime, end_datetime, kbar_series, useDB):
+    """
+    未启用分片时的KbarSeriesGanZhi，db_path 已由调用方检查过
+    """
     if kbar_series is None:
         """
         当kbar_series为None时，从数据库中查询所有在时间范围内的k线序列
@@ -605,4 +766,10 @@ def KbarSeriesGanZhi(start_datetime, end_datetime, kbar_series, useDB: bool = Tr
             return kbar_series_ganzhi
 
 
-
+def KbarSeriesGanZhi(start_datetime, end_datetime, kbar_series, useDB: bool = True):
+    """
+    通过默认的 XuanXueSession 调用：数据库路径只在第一次使用时检查，之后每次调用只执行查询本身
+    启用了分片存储（set_kbar_shards）时自动路由到对应的分片文件
+    """
+    from .session import get_default_session
+    return get_default_session().KbarSeriesGanZhi(start_datetime, end_datetime, kbar_series, useDB)
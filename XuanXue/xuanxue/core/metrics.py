@@ -0,0 +1,233 @@
+"""
+运行指标
+
+记录各接口的调用次数、耗时直方图，以及读取路径上每个阶段（SQL读取、时间过滤、干支计算、写回）的耗时
+和行数计数（扫描行数/返回行数、计算/复用的干支数、写入行数、结果缓存命中），用于定位慢调用的耗时所在。
+
+默认关闭：未启用时埋点只是一次全局变量判断和空方法调用，不计时也不加锁。
+
+使用方法:
+    import XuanXue as xx
+    xx.enable_metrics()
+    xx.KbarSeriesGanZhi("2023-08-01", "2023-08-31", ["600000", "SH", "1h"])
+    xx.stats()                  # 字典
+    xx.stats_prometheus()       # Prometheus 文本格式
+    xx.reset_stats()
+"""
+import bisect
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# 耗时直方图的桶上界（秒），最后一个桶为 +Inf
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# Prometheus 指标名前缀
+METRIC_PREFIX = "xuanxue"
+
+
+class _Histogram:
+    """固定桶的耗时直方图"""
+
+    __slots__ = ("counts", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def snapshot(self) -> Dict:
+        cumulative = []
+        total = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {"count": total, "sum": self.sum, "max": self.max, "buckets": cumulative}
+
+
+class MetricsRegistry:
+    """
+    指标注册表，所有指标按 api 标签区分：
+        计数器 counters[名称][api]
+        耗时直方图 latency[api][阶段]，阶段 "total" 为整次调用
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, str], float] = {}
+        self._histograms: Dict[Tuple[str, str], _Histogram] = {}
+
+    def inc(self, name: str, api: str, value=1):
+        key = (name, api)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, api: str, stage: str, seconds: float):
+        key = (api, stage)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(seconds)
+
+    def start_call(self, api: str) -> "CallTimer":
+        return CallTimer(self, api)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict:
+        """
+        :return: {"counters": {名称: {api: 值}}, "latency": {api: {阶段: {"count", "sum", "max", "buckets"}}}}
+                 buckets 为累计计数 [(上界秒数, 次数), ...]，与 Prometheus 的 le 桶相同
+        """
+        with self._lock:
+            counters = {}
+            for (name, api), value in sorted(self._counters.items()):
+                counters.setdefault(name, {})[api] = value
+            latency = {}
+            for (api, stage), histogram in sorted(self._histograms.items()):
+                latency.setdefault(api, {})[stage] = histogram.snapshot()
+        return {"counters": counters, "latency": latency}
+
+    def to_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, values in snapshot["counters"].items():
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for api, value in values.items():
+                lines.append(f'{metric}{{api="{_escape(api)}"}} {_format_value(value)}')
+
+        if snapshot["latency"]:
+            metric = f"{METRIC_PREFIX}_latency_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for api, stages in snapshot["latency"].items():
+                for stage, histogram in stages.items():
+                    labels = f'api="{_escape(api)}",stage="{_escape(stage)}"'
+                    for bound, count in histogram["buckets"]:
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {count}')
+                    lines.append(f"{metric}_sum{{{labels}}} {_format_value(histogram['sum'])}")
+                    lines.append(f"{metric}_count{{{labels}}} {histogram['count']}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class CallTimer:
+    """
+    一次调用的分阶段计时：lap(阶段) 记录上一次 lap 以来的耗时，finish() 记录整次调用的耗时和调用次数
+    """
+
+    __slots__ = ("registry", "api", "_start", "_last")
+
+    def __init__(self, registry: MetricsRegistry, api: str):
+        self.registry = registry
+        self.api = api
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.registry.observe(self.api, stage, now - self._last)
+        self._last = now
+
+    def count(self, name: str, value=1):
+        if value:
+            self.registry.inc(name, self.api, value)
+
+    def finish(self):
+        self.registry.observe(self.api, "total", time.perf_counter() - self._start)
+        self.registry.inc("calls", self.api)
+
+
+class _NullTimer:
+    """未启用指标时使用的空计时器"""
+
+    __slots__ = ()
+
+    def lap(self, stage: str):
+        pass
+
+    def count(self, name: str, value=1):
+        pass
+
+    def finish(self):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+# 全局指标注册表，None表示未启用
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def enable_metrics() -> MetricsRegistry:
+    """启用指标收集，已启用时返回现有的注册表"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
+
+
+def disable_metrics():
+    """停止指标收集并丢弃已收集的数据"""
+    global _registry
+    with _registry_lock:
+        _registry = None
+
+
+def get_metrics() -> Optional[MetricsRegistry]:
+    """获取全局指标注册表，未启用时返回None"""
+    return _registry
+
+
+def start_call(api: str):
+    """开始记录一次调用，未启用时返回空计时器"""
+    registry = _registry
+    if registry is None:
+        return _NULL_TIMER
+    return registry.start_call(api)
+
+
+def inc(name: str, api: str, value=1):
+    """计数器加 value，未启用时不做任何事"""
+    registry = _registry
+    if registry is not None and value:
+        registry.inc(name, api, value)
+
+
+def stats() -> Dict:
+    """当前指标的字典形式，未启用时返回空字典"""
+    registry = _registry
+    return registry.snapshot() if registry is not None else {}
+
+
+def stats_prometheus() -> str:
+    """当前指标的 Prometheus 文本格式，未启用时返回空字符串"""
+    registry = _registry
+    return registry.to_prometheus() if registry is not None else ""
+
+
+def reset_stats():
+    """清零已收集的指标（保持启用状态）"""
+    registry = _registry
+    if registry is not None:
+        registry.reset()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value) -> str:
+    return str(value) if isinstance(value, int) else repr(float(value))
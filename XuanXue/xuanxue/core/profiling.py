@@ -0,0 +1,176 @@
+"""
+接口调用性能分析
+
+在不修改库代码的情况下，用 cProfile 分析生产环境中的慢调用：每次公开接口调用（DateTimeGanZhi、
+OnBoardDateGanZhi、KbarSeriesGanZhi、KbarSeriesGanZhiMany）以及内部读取阶段（kbarseriesganzhi_*）
+在没有外层分析时单独分析，结束后向目录写入一份报告：
+
+    <时间>_<接口>_<耗时>ms_<进程>_<线程>.txt   按累计耗时、自身耗时排序的前N个函数
+    <时间>_<接口>_<耗时>ms_<进程>_<线程>.prof  pstats 原始数据，可用 snakeviz 等工具查看
+
+嵌套的调用计入最外层调用的报告中；线程池中执行的读取阶段在各自的线程中单独生成报告。
+默认关闭，未启用时每次调用只多一次全局变量判断。
+
+启用方式:
+    with xx.profile("profile_reports", min_ms=200):     # 只保存耗时超过200毫秒的调用
+        xx.KbarSeriesGanZhi("2023-08-01", "2023-08-31", ["600000", "SH", "1h"])
+
+    或设置环境变量（导入时读取）:
+        XUANXUE_PROFILE=profile_reports
+        XUANXUE_PROFILE_MIN_MS=200
+"""
+import contextlib
+import cProfile
+import datetime
+import functools
+import io
+import logging
+import os
+import pstats
+import reprlib
+import threading
+import time
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV_VAR = "XUANXUE_PROFILE"
+PROFILE_MIN_MS_ENV_VAR = "XUANXUE_PROFILE_MIN_MS"
+
+
+class ProfileSettings:
+    """性能分析设置，reports 记录本次启用期间写入的报告路径"""
+
+    def __init__(self, output_dir: str, min_ms: float = 0.0, top: int = 30, save_raw: bool = True):
+        self.output_dir = os.path.abspath(output_dir)
+        self.min_ms = min_ms
+        self.top = top
+        self.save_raw = save_raw
+        self.reports: List[str] = []
+        self.skipped = 0    # 其他分析工具已启用等原因未能分析的调用数
+        self._lock = threading.Lock()
+        self._sequence = 0
+
+    def _next_sequence(self) -> int:
+        with self._lock:
+            self._sequence += 1
+            return self._sequence
+
+
+def _settings_from_env() -> Optional[ProfileSettings]:
+    output_dir = os.environ.get(PROFILE_ENV_VAR)
+    if not output_dir:
+        return None
+    try:
+        min_ms = float(os.environ.get(PROFILE_MIN_MS_ENV_VAR, "0") or 0)
+    except ValueError:
+        logger.warning("%s 不是有效的毫秒数，忽略", PROFILE_MIN_MS_ENV_VAR)
+        min_ms = 0.0
+    return ProfileSettings(output_dir, min_ms=min_ms)
+
+
+# 全局设置，None表示未启用
+_settings: Optional[ProfileSettings] = _settings_from_env()
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def profile(output_dir: str = "xuanxue_profile", min_ms: float = 0.0, top: int = 30, save_raw: bool = True):
+    """
+    在 with 块内分析每次接口调用并写入报告
+    :param output_dir: 报告目录，不存在时自动创建
+    :param min_ms: 只保存耗时不少于该毫秒数的调用
+    :param top: 报告中列出的函数个数
+    :param save_raw: 是否同时保存 .prof 原始数据
+    :return: ProfileSettings，with 块结束后可通过 reports 获取写入的报告路径
+    """
+    global _settings
+    settings = ProfileSettings(output_dir, min_ms=min_ms, top=top, save_raw=save_raw)
+    previous = _settings
+    _settings = settings
+    try:
+        yield settings
+    finally:
+        _settings = previous
+
+
+def is_profiling() -> bool:
+    """当前是否启用了性能分析"""
+    return _settings is not None
+
+
+def profiled(api: str):
+    """
+    装饰器：启用性能分析时分析被装饰函数的调用，当前线程已在分析外层调用时直接执行
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            settings = _settings
+            if settings is None or getattr(_local, "active", False):
+                return func(*args, **kwargs)
+            return _run_profiled(settings, api, func, args, kwargs)
+        return wrapper
+    return decorator
+
+
+def _run_profiled(settings: ProfileSettings, api: str, func, args, kwargs):
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # 其他分析工具已启用（Python 3.12 起同一时间只能有一个 cProfile）
+        with settings._lock:
+            settings.skipped += 1
+        return func(*args, **kwargs)
+
+    _local.active = True
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        _local.active = False
+        if elapsed_ms >= settings.min_ms:
+            try:
+                _write_report(settings, api, profiler, elapsed_ms, args)
+            except OSError as e:
+                logger.warning("写入性能分析报告失败: %s", e)
+
+
+def _write_report(settings: ProfileSettings, api: str, profiler: cProfile.Profile, elapsed_ms: float, args):
+    os.makedirs(settings.output_dir, exist_ok=True)
+    now = datetime.datetime.now()
+    base_name = "%s-%04d_%s_%dms_%d_%d" % (now.strftime("%Y%m%d-%H%M%S"), settings._next_sequence(), api,
+                                           round(elapsed_ms), os.getpid(), threading.get_ident())
+    base_path = os.path.join(settings.output_dir, base_name)
+
+    buffer = io.StringIO()
+    buffer.write(f"接口: {api}\n")
+    buffer.write(f"时间: {now.isoformat()}\n")
+    buffer.write(f"耗时: {elapsed_ms:.3f} ms\n")
+    buffer.write(f"参数: {_format_args(args)}\n")
+    stats = pstats.Stats(profiler, stream=buffer)
+    for sort_key, title in (("cumulative", "按累计耗时排序"), ("tottime", "按自身耗时排序")):
+        buffer.write(f"\n===== {title}（前{settings.top}个） =====\n")
+        stats.sort_stats(sort_key).print_stats(settings.top)
+
+    with open(base_path + ".txt", "w", encoding="utf-8") as f:
+        f.write(buffer.getvalue())
+    if settings.save_raw:
+        stats.dump_stats(base_path + ".prof")
+    with settings._lock:
+        settings.reports.append(base_path + ".txt")
+    logger.info("已写入性能分析报告: %s", base_path + ".txt")
+
+
+# 参数的repr按大小截断，不会为大列表、长字符串生成完整的repr
+_args_repr = reprlib.Repr()
+_args_repr.maxlist = _args_repr.maxtuple = _args_repr.maxdict = _args_repr.maxset = 5
+_args_repr.maxstring = _args_repr.maxother = 60
+
+
+def _format_args(args, limit: int = 200) -> str:
+    text = ", ".join(_args_repr.repr(arg) for arg in args)
+    return text if len(text) <= limit else text[:limit] + "..."
@@ -0,0 +1,256 @@
+"""
+K线周期重采样
+
+resample_kbar_series(kbar_series_key, target_period, db_path=None, ...)   把一个K线序列聚合为目标周期
+resample_kbar_database(target_periods, source_period="1min", ...)          把库中某个周期的全部序列聚合为多个目标周期
+
+由数据库中的细粒度K线（通常为1分钟）生成 5min / 15min / 1h / 1day 等周期：
+    - 在SQL中按目标周期分桶聚合OHLCV（开盘取桶内第一根，收盘取最后一根，最高/最低取极值，成交量/额求和）
+    - 干支只按聚合后的时间计算一次（每根目标K线一次，见 calculate_pillar_fields_batch），与结果一起批量写入
+    - 每个 (序列, 目标周期) 记录已处理到的源K线时间，再次运行时只重新聚合最后一个（可能未完整的）桶及之后的新K线
+      早于检查点补录的源K线不会被处理，此时使用 full=True 全部重新聚合
+
+分桶按K线时间（不考虑时区）向下对齐到周期的整数倍，offset_minutes 可以平移对齐点，
+例如A股1小时K线从9:30开始时使用 offset_minutes=30；1day 按日期分桶。目标K线的时间为桶的开始时间，
+1day 的时间只有日期，时柱为空。
+
+未指定db_path且启用了分片存储（set_kbar_shards）时，从源序列所在的分片读取，聚合结果和检查点写入目标序列所在的分片。
+
+命令行: python -m XuanXue resample 5min 1h 1day [--db PATH] [--source-period 1min] [--key S E P] [--full]
+"""
+import datetime
+import re
+import sqlite3
+import time
+from typing import Dict, Iterable, Optional, Union
+
+from ..config import get_stock_kbar_path
+from .database import create_kbar_table, is_read_only
+from .ganzhi_calculator import parse_ts
+from .ingest import ingest_kbar_columns
+from .kbar_shard import get_kbar_shard_router
+
+CHECKPOINT_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS xuanxue_resample_checkpoint (
+    symbol TEXT NOT NULL,
+    exchange TEXT NOT NULL,
+    source_period TEXT NOT NULL,
+    target_period TEXT NOT NULL,
+    last_source_ts TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (symbol, exchange, source_period, target_period)
+)
+"""
+
+# 在每个桶内按时间取第一根的开盘价和最后一根的收盘价，再按桶聚合
+AGGREGATE_SQL = """
+SELECT bucket, MAX(high), MIN(low), SUM(volume), SUM(amount), COUNT(*), MAX(ts),
+       MAX(first_open), MAX(last_close)
+FROM (
+    SELECT {bucket} AS bucket, ts, high, low, volume, amount,
+           FIRST_VALUE(open) OVER w AS first_open,
+           LAST_VALUE(close) OVER w AS last_close
+    FROM kbar_data
+    WHERE symbol = ? AND exchange = ? AND period = ? AND ts >= ?
+    WINDOW w AS (PARTITION BY {bucket} ORDER BY ts ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+)
+GROUP BY bucket
+ORDER BY bucket
+"""
+
+_PERIOD_PATTERN = re.compile(r"^(\d+)(min|h|day)$")
+_UNIT_MINUTES = {"min": 1, "h": 60, "day": 24 * 60}
+
+
+def period_minutes(period: str) -> int:
+    """
+    周期的分钟数，支持 Nmin、Nh 和 1day
+    """
+    match = _PERIOD_PATTERN.match(period)
+    if not match or int(match.group(1)) < 1:
+        raise ValueError(f"不支持的周期: {period}，应为 Nmin、Nh 或 1day")
+    minutes = int(match.group(1)) * _UNIT_MINUTES[match.group(2)]
+    if match.group(2) == "day" and minutes != _UNIT_MINUTES["day"]:
+        raise ValueError(f"不支持的周期: {period}，按日只支持 1day")
+    return minutes
+
+
+def _bucket_sql(minutes: int, offset_minutes: int) -> str:
+    """
+    返回把 ts 对齐到桶开始时间（"YYYY-MM-DD HH:MM:SS"）的SQL表达式；
+    1day 只取日期（"YYYY-MM-DD"），写入时与原生的日K线一样没有时柱
+    """
+    if minutes == _UNIT_MINUTES["day"]:
+        return "date(ts)"
+    seconds = minutes * 60
+    offset = (offset_minutes % minutes) * 60
+    return (f"datetime(((CAST(strftime('%s', ts) AS INTEGER) - {offset}) / {seconds}) * {seconds} + {offset}, "
+            f"'unixepoch')")
+
+
+def _bucket_start(ts: datetime.datetime, minutes: int, offset_minutes: int) -> datetime.datetime:
+    """与 _bucket_sql 相同的分桶，在Python中计算"""
+    if minutes == _UNIT_MINUTES["day"]:
+        return datetime.datetime(ts.year, ts.month, ts.day)
+    epoch = datetime.datetime(1970, 1, 1)
+    seconds = minutes * 60
+    offset = (offset_minutes % minutes) * 60
+    elapsed = int((ts.replace(tzinfo=None) - epoch).total_seconds())
+    return epoch + datetime.timedelta(seconds=(elapsed - offset) // seconds * seconds + offset)
+
+
+def _format_like(value: datetime.datetime, sample: str) -> str:
+    """按已存储的ts的格式（"T"或空格分隔）格式化，使字符串比较与时间顺序一致"""
+    return value.isoformat(sep="T" if "T" in sample else " ")
+
+
+def _load_checkpoint(conn: sqlite3.Connection, key, target_period: str) -> Optional[str]:
+    row = conn.execute(
+        "SELECT last_source_ts FROM xuanxue_resample_checkpoint "
+        "WHERE symbol=? AND exchange=? AND source_period=? AND target_period=?",
+        (key.symbol, key.exchange, key.period, target_period)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def _save_checkpoint(conn: sqlite3.Connection, key, target_period: str, last_source_ts: str):
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO xuanxue_resample_checkpoint "
+            "(symbol, exchange, source_period, target_period, last_source_ts) VALUES (?, ?, ?, ?, ?)",
+            (key.symbol, key.exchange, key.period, target_period, last_source_ts)
+        )
+
+
+def _resample(source_conn: sqlite3.Connection, target_conn: sqlite3.Connection, key, target_period: str,
+              offset_minutes: int, full: bool) -> Dict:
+    """从 source_conn 读取源序列，聚合结果和检查点写入 target_conn（未分片时两者是同一个连接）"""
+    source_minutes = period_minutes(key.period)
+    target_minutes = period_minutes(target_period)
+    if target_minutes <= source_minutes or target_minutes % source_minutes:
+        raise ValueError(f"目标周期 {target_period} 必须是源周期 {key.period} 的整数倍")
+
+    # 从上次最后一根源K线所在的桶开始重新聚合，该桶上次可能还不完整
+    checkpoint = None if full else _load_checkpoint(target_conn, key, target_period)
+    since = ""
+    if checkpoint is not None:
+        since = _format_like(_bucket_start(parse_ts(checkpoint), target_minutes, offset_minutes), checkpoint)
+
+    bucket = _bucket_sql(target_minutes, offset_minutes)
+    rows = source_conn.execute(AGGREGATE_SQL.format(bucket=bucket),
+                               (key.symbol, key.exchange, key.period, since)).fetchall()
+    stats = {"source_rows": sum(row[5] for row in rows), "bars": len(rows), "last_source_ts": checkpoint}
+    if not rows:
+        return stats
+
+    columns = {
+        "ts": [row[0] for row in rows],
+        "open": [row[7] for row in rows],
+        "high": [row[1] for row in rows],
+        "low": [row[2] for row in rows],
+        "close": [row[8] for row in rows],
+        "volume": [row[3] for row in rows],
+        "amount": [row[4] for row in rows],
+    }
+    ingest_kbar_columns(columns, symbol=key.symbol, exchange=key.exchange, period=target_period,
+                        on_conflict="update", conn=target_conn)
+    stats["last_source_ts"] = max(row[6] for row in rows)
+    _save_checkpoint(target_conn, key, target_period, stats["last_source_ts"])
+    return stats
+
+
+def _open(db_path: str) -> sqlite3.Connection:
+    if is_read_only():
+        raise RuntimeError("只读模式下不能写入重采样结果")
+    conn = sqlite3.connect(db_path, timeout=30)
+    create_kbar_table(conn)
+    conn.execute(CHECKPOINT_TABLE_SQL)
+    conn.commit()
+    return conn
+
+
+def _connection(connections: Dict[str, sqlite3.Connection], db_path: str) -> sqlite3.Connection:
+    """每个数据库只打开一个连接"""
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = connections[db_path] = _open(db_path)
+    return conn
+
+
+def _series_path(router, db_path: str, symbol: str, exchange: str, period: str) -> str:
+    """序列所在的数据库：未启用分片时为 db_path，否则为 shard_for(key) 对应的分片"""
+    if router is None:
+        return db_path
+    from ..utils import intern_kbar_series_key
+    return router.shard_for(intern_kbar_series_key(symbol, exchange, period))
+
+
+def _close_all(connections: Dict[str, sqlite3.Connection]):
+    for conn in connections.values():
+        conn.close()
+
+
+def resample_kbar_series(kbar_series_key, target_period: str, db_path: Optional[str] = None,
+                         offset_minutes: int = 0, full: bool = False) -> Dict:
+    """
+    把数据库中的一个K线序列聚合为目标周期并写入同一数据库（period=target_period），同时计算干支
+    :param kbar_series_key: 源序列的键（KbarSeriesKey、列表或字典），period 为源周期，如 ["600000", "SH", "1min"]
+    :param target_period: 目标周期，如 "5min"、"1h"、"1day"，必须是源周期的整数倍
+    :param db_path: K线数据库路径，None表示按分片配置读写各序列所在的分片，未启用分片时使用配置的 stock_kbar_path
+    :param offset_minutes: 分桶对齐点的平移分钟数
+    :param full: 忽略检查点，全部重新聚合
+    :return: 统计信息 {source_rows, bars, last_source_ts, elapsed}
+    """
+    from .kbarseriesganzhi import _normalize_kbar_series_key
+
+    key = _normalize_kbar_series_key(kbar_series_key)
+    router = get_kbar_shard_router() if db_path is None else None
+    db_path = db_path or get_stock_kbar_path()
+    start = time.time()
+    connections = {}
+    try:
+        source_conn = _connection(connections, _series_path(router, db_path, key.symbol, key.exchange, key.period))
+        target_conn = _connection(connections, _series_path(router, db_path, key.symbol, key.exchange, target_period))
+        stats = _resample(source_conn, target_conn, key, target_period, offset_minutes, full)
+    finally:
+        _close_all(connections)
+    stats["elapsed"] = time.time() - start
+    return stats
+
+
+def resample_kbar_database(target_periods: Union[str, Iterable[str]], source_period: str = "1min",
+                           db_path: Optional[str] = None, offset_minutes: int = 0, full: bool = False) -> Dict:
+    """
+    把数据库中周期为 source_period 的全部K线序列聚合为每个目标周期
+    未指定db_path且启用了分片存储时处理全部分片中的序列，结果写入目标序列所在的分片
+    :return: 统计信息 {series, source_rows, bars, elapsed}
+    """
+    from ..utils import intern_kbar_series_key
+
+    if isinstance(target_periods, str):
+        target_periods = [target_periods]
+    router = get_kbar_shard_router() if db_path is None else None
+    db_path = db_path or get_stock_kbar_path()
+    start = time.time()
+    connections = {}
+    totals = {"series": 0, "source_rows": 0, "bars": 0}
+    try:
+        for source_path in ([db_path] if router is None else router.get_all_paths()):
+            source_conn = _connection(connections, source_path)
+            keys = source_conn.execute(
+                "SELECT DISTINCT symbol, exchange FROM kbar_data WHERE period = ? ORDER BY symbol, exchange",
+                (source_period,)
+            ).fetchall()
+            for symbol, exchange in keys:
+                key = intern_kbar_series_key(symbol, exchange, source_period)
+                totals["series"] += 1
+                for target_period in target_periods:
+                    target_conn = _connection(connections,
+                                              _series_path(router, db_path, symbol, exchange, target_period))
+                    stats = _resample(source_conn, target_conn, key, target_period, offset_minutes, full)
+                    totals["source_rows"] += stats["source_rows"]
+                    totals["bars"] += stats["bars"]
+    finally:
+        _close_all(connections)
+    totals["elapsed"] = time.time() - start
+    return totals
@@ -0,0 +1,437 @@
+"""
+KbarSeriesGanZhi 数据库查询的结果缓存（默认关闭）
+
+同一个 (数据库, K线序列的键, 开始时间, 结束时间) 的查询结果保存在内存中，再次查询时直接返回副本，
+不再读取和解析 kbar_data：
+    - 键统一为 (symbol, exchange, period)，时间范围按 isindatetime 的规则解析为datetime，
+      "2023-08-25" 与 "2023/08/25" 命中同一条缓存
+    - LRU淘汰，总内存占用（估算）不超过 max_bytes
+    - 失效检测：
+        PRAGMA data_version   其他连接/进程提交写入后变化，该数据库的缓存全部失效
+        写入计数              本包写入某个键的K线后（useDB=False插入、批量导入）该键的缓存立即失效
+    - 可选的磁盘缓存（disk_dir）：四柱以int8的六十甲子序号、时间以int64保存为紧凑文件，
+      不同进程之间共享；以数据库文件头的修改计数及文件（和-wal文件）的修改时间判断是否失效
+空结果不缓存（查询出错时也返回空结果）。
+
+使用方法:
+    enable_result_cache(max_bytes=256 * 1024 * 1024, disk_dir="cache/ganzhi")
+    KbarSeriesGanZhi("2023-08-01", "2023-08-31", ["600000", "SH", "1h"])   # 第二次起命中缓存
+    result_cache_stats()      # {"hits", "misses", "hit_rate", "bytes", "entries", ...}
+    clear_result_cache()
+    disable_result_cache()
+"""
+import datetime
+import hashlib
+import os
+import sqlite3
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional
+
+from ..utils import KbarSeriesGanZhi, KbarSeriesGanZhiList, intern_kbar_series_key
+from ..utils.ganzhi_codes import GANZHI_CYCLE, MISSING_CODE
+from .ganzhi_calculator import parse_time_range
+from . import metrics
+
+_DISK_MAGIC = b"XXRC0001"
+_DISK_SUFFIX = ".xrc"
+# magic, 数据库指纹(5个int64), 是否为列表, 序列个数
+_DISK_HEADER = struct.Struct("<8s5qBI")
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+_GANZHI_INDEX = {name: index for index, name in enumerate(GANZHI_CYCLE)}
+_GANZHI_INDEX[""] = MISSING_CODE
+
+
+def _key_tuple(key):
+    return None if key is None else (key.symbol, key.exchange, key.period)
+
+
+def _series_list(result):
+    if isinstance(result, KbarSeriesGanZhiList):
+        return result.get_kbar_series_ganzhi_list()
+    return [result]
+
+
+def _copy_result(result):
+    """返回结果的副本，调用方修改返回值不会影响缓存"""
+    copies = [
+        KbarSeriesGanZhi(series.get_key(), list(series.get_ganzhi_list()),
+                         None if series.get_ts_list() is None else list(series.get_ts_list()))
+        for series in _series_list(result)
+    ]
+    if isinstance(result, KbarSeriesGanZhiList):
+        return KbarSeriesGanZhiList(copies)
+    return copies[0]
+
+
+def _estimate_size(result) -> int:
+    """估算结果占用的内存（同一序列中的字符串和datetime大小基本相同，按第一项估算）"""
+    size = sys.getsizeof(result)
+    for series in _series_list(result):
+        ganzhi_list = series.get_ganzhi_list()
+        ts_list = series.get_ts_list()
+        size += sys.getsizeof(series) + sys.getsizeof(ganzhi_list)
+        if ganzhi_list:
+            size += len(ganzhi_list) * sys.getsizeof(ganzhi_list[0])
+        if ts_list:
+            size += sys.getsizeof(ts_list) + len(ts_list) * sys.getsizeof(ts_list[0])
+    return size
+
+
+def _is_empty(result) -> bool:
+    return all(series.get_length() == 0 for series in _series_list(result))
+
+
+def _db_fingerprint(db_path: str):
+    """
+    用于判断磁盘缓存是否失效的数据库指纹：
+    数据库文件头中的修改计数（每次提交加1）、修改时间，以及-wal文件的大小、修改时间和salt（WAL模式下提交写入-wal文件）
+    """
+    with open(db_path, "rb") as f:
+        header = f.read(28)
+    change_counter = struct.unpack_from(">I", header, 24)[0] if len(header) == 28 else 0
+    stat = os.stat(db_path)
+    try:
+        with open(db_path + "-wal", "rb") as f:
+            wal_header = f.read(24)
+        wal = os.stat(db_path + "-wal")
+        wal_salt = struct.unpack_from("<q", wal_header, 16)[0] if len(wal_header) == 24 else 0
+        wal_fields = (wal.st_size, wal.st_mtime_ns, wal_salt)
+    except OSError:
+        wal_fields = (0, 0, 0)
+    return (change_counter, stat.st_mtime_ns) + wal_fields
+
+
+def _pack_text(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return struct.pack("<H", len(data)) + data
+
+
+def _unpack_text(data: bytes, offset: int):
+    (length,) = struct.unpack_from("<H", data, offset)
+    offset += 2
+    return data[offset:offset + length].decode("utf-8"), offset + length
+
+
+def _encode_pillars(ganzhi_list):
+    """把 "年-月-日-时" 列表编码为4个int8数组，有无法编码的干支时返回None"""
+    columns = [array("b") for _ in range(4)]
+    try:
+        for ganzhi in ganzhi_list:
+            parts = ganzhi.split("-")
+            if len(parts) != 4:
+                return None
+            for column, part in zip(columns, parts):
+                column.append(_GANZHI_INDEX[part])
+    except KeyError:
+        return None
+    return columns
+
+
+def _decode_pillars(columns, length):
+    names = GANZHI_CYCLE + [""]     # -1 对应最后一个空字符串
+    return ["-".join(names[column[i]] for column in columns) for i in range(length)]
+
+
+class ResultCache:
+    """KbarSeriesGanZhi 查询结果的LRU缓存"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, disk_dir: Optional[str] = None):
+        """
+        :param max_bytes: 内存缓存的总大小上限（估算值）
+        :param disk_dir: 磁盘缓存目录，None表示只使用内存缓存
+        """
+        if max_bytes < 1:
+            raise ValueError("max_bytes 必须大于0")
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()       # 缓存键 -> (结果, 大小, data_version, 写入计数)
+        self._bytes = 0
+        self._watchers = {}                 # 数据库路径 -> 用于读取 PRAGMA data_version 的连接
+        self._write_counters = {}           # (数据库路径, 键) -> 写入计数，键为None表示整个数据库
+        self._stats = {"hits": 0, "misses": 0, "disk_hits": 0, "evictions": 0,
+                       "invalidations": 0, "disk_writes": 0, "bypassed": 0}
+
+    # ---- 查询 ----
+
+    def get_or_compute(self, db_path: str, key, start_datetime, end_datetime, compute: Callable):
+        """
+        命中缓存时返回缓存结果的副本，否则调用 compute() 查询并缓存
+        :param key: KbarSeriesKey，None表示查询数据库中的全部K线序列
+        """
+        try:
+            start, end = parse_time_range(start_datetime, end_datetime)
+            db_path = os.path.abspath(db_path)
+            version = self._data_version(db_path)
+        except (ValueError, TypeError, OSError, sqlite3.Error):
+            # 时间无法解析或数据库无法打开时不使用缓存，由原有逻辑处理
+            with self._lock:
+                self._stats["bypassed"] += 1
+            return compute()
+
+        key_tuple = _key_tuple(key)
+        cache_key = (db_path, key_tuple, start, end)
+        counter = self._write_counter(db_path, key_tuple)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                result, size, entry_version, entry_counter = entry
+                if entry_version == version and entry_counter == counter:
+                    self._entries.move_to_end(cache_key)
+                    self._stats["hits"] += 1
+                    metrics.inc("cache_hits", "result_cache")
+                    return _copy_result(result)
+                self._remove(cache_key)
+                self._stats["invalidations"] += 1
+
+        result = self._load_disk(cache_key)
+        if result is not None:
+            with self._lock:
+                self._stats["hits"] += 1
+                self._stats["disk_hits"] += 1
+            metrics.inc("cache_hits", "result_cache")
+        else:
+            with self._lock:
+                self._stats["misses"] += 1
+            metrics.inc("cache_misses", "result_cache")
+            fingerprint = self._fingerprint(db_path)
+            result = compute()
+            if result is None or _is_empty(result):
+                return result
+            self._store_disk(cache_key, result, fingerprint)
+
+        self._store(cache_key, _copy_result(result), version, counter)
+        return result
+
+    # ---- 失效 ----
+
+    def note_write(self, db_path: str, keys: Optional[Iterable] = None):
+        """
+        记录本包对数据库的写入，相关的缓存立即失效
+        :param keys: 写入的 (symbol, exchange, period) 或 KbarSeriesKey 列表，None表示不确定写入了哪些键
+        """
+        db_path = os.path.abspath(db_path)
+        with self._lock:
+            # 查询全部K线序列的缓存（键为None）依赖所有键，任何写入都使其失效
+            self._bump(db_path, None)
+            if keys is None:
+                self._bump(db_path, "*")
+                return
+            for key in {key if isinstance(key, tuple) else _key_tuple(key) for key in keys}:
+                self._bump(db_path, key)
+
+    def clear(self):
+        """清空内存缓存和磁盘缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.disk_dir and os.path.isdir(self.disk_dir):
+            for name in os.listdir(self.disk_dir):
+                if name.endswith(_DISK_SUFFIX):
+                    try:
+                        os.remove(os.path.join(self.disk_dir, name))
+                    except OSError:
+                        pass
+
+    def close(self):
+        """关闭检测 data_version 的连接并清空内存缓存"""
+        with self._lock:
+            for conn in self._watchers.values():
+                conn.close()
+            self._watchers = {}
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict:
+        """缓存统计：命中率、内存占用等"""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["max_bytes"] = self.max_bytes
+            return stats
+
+    # ---- 内部方法 ----
+
+    def _data_version(self, db_path: str) -> int:
+        with self._lock:
+            conn = self._watchers.get(db_path)
+            if conn is None:
+                if not os.path.exists(db_path):
+                    raise OSError(f"数据库文件不存在: {db_path}")
+                uri = "file:" + db_path.replace("?", "%3f").replace("#", "%23") + "?mode=ro"
+                conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                self._watchers[db_path] = conn
+            return conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _write_counter(self, db_path: str, key_tuple):
+        with self._lock:
+            counters = self._write_counters
+            # 不确定键的写入（"*"）使该数据库的所有缓存失效
+            return (counters.get((db_path, key_tuple), 0), counters.get((db_path, "*"), 0))
+
+    def _bump(self, db_path: str, key_tuple):
+        counter_key = (db_path, key_tuple)
+        self._write_counters[counter_key] = self._write_counters.get(counter_key, 0) + 1
+
+    def _store(self, cache_key, result, version, counter):
+        size = _estimate_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if cache_key in self._entries:
+                self._remove(cache_key)
+            self._entries[cache_key] = (result, size, version, counter)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def _remove(self, cache_key):
+        entry = self._entries.pop(cache_key)
+        self._bytes -= entry[1]
+
+    def _fingerprint(self, db_path: str):
+        if not self.disk_dir:
+            return None
+        try:
+            return _db_fingerprint(db_path)
+        except OSError:
+            return None
+
+    def _disk_path(self, cache_key) -> str:
+        db_path, key_tuple, start, end = cache_key
+        token = repr((db_path, key_tuple, start.isoformat(), end.isoformat())).encode("utf-8")
+        return os.path.join(self.disk_dir, hashlib.sha1(token).hexdigest() + _DISK_SUFFIX)
+
+    def _store_disk(self, cache_key, result, fingerprint):
+        """写入磁盘缓存，含无法编码的干支或时间时跳过"""
+        if not self.disk_dir or fingerprint is None:
+            return
+        parts = [_DISK_HEADER.pack(_DISK_MAGIC, *fingerprint,
+                                   isinstance(result, KbarSeriesGanZhiList), len(_series_list(result)))]
+        for series in _series_list(result):
+            ts_list = series.get_ts_list()
+            columns = _encode_pillars(series.get_ganzhi_list())
+            if columns is None or ts_list is None or len(ts_list) != series.get_length():
+                return
+            if any(not isinstance(ts, datetime.datetime) or ts.tzinfo is not None for ts in ts_list):
+                return
+            ts_array = array("q", ((ts - _EPOCH) // datetime.timedelta(microseconds=1) for ts in ts_list))
+            key = series.get_key()
+            parts.append(_pack_text(key.symbol) + _pack_text(key.exchange) + _pack_text(key.period))
+            parts.append(struct.pack("<Q", len(ts_array)))
+            parts.append(ts_array.tobytes())
+            parts.extend(column.tobytes() for column in columns)
+
+        path = self._disk_path(cache_key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(b"".join(parts))
+            os.replace(temp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self._stats["disk_writes"] += 1
+
+    def _load_disk(self, cache_key):
+        """读取磁盘缓存，数据库已变化或文件无效时返回None"""
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(cache_key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            magic, *fields = _DISK_HEADER.unpack_from(data, 0)
+            if magic != _DISK_MAGIC or tuple(fields[:5]) != _db_fingerprint(cache_key[0]):
+                return None
+            is_list, count = fields[5], fields[6]
+            offset = _DISK_HEADER.size
+            series_list = []
+            for _ in range(count):
+                symbol, offset = _unpack_text(data, offset)
+                exchange, offset = _unpack_text(data, offset)
+                period, offset = _unpack_text(data, offset)
+                (length,) = struct.unpack_from("<Q", data, offset)
+                offset += 8
+                ts_array = array("q")
+                ts_array.frombytes(data[offset:offset + 8 * length])
+                offset += 8 * length
+                columns = []
+                for _ in range(4):
+                    column = array("b")
+                    column.frombytes(data[offset:offset + length])
+                    offset += length
+                    columns.append(column)
+                if len(ts_array) != length or any(len(column) != length for column in columns):
+                    return None
+                ts_list = [_EPOCH + datetime.timedelta(microseconds=value) for value in ts_array]
+                series_list.append(KbarSeriesGanZhi(intern_kbar_series_key(symbol, exchange, period),
+                                                    _decode_pillars(columns, length), ts_list))
+        except (OSError, struct.error, UnicodeDecodeError, IndexError):
+            return None
+        if is_list:
+            return KbarSeriesGanZhiList(series_list)
+        return series_list[0] if series_list else None
+
+
+# 全局结果缓存，为None时不缓存
+_result_cache = None
+
+
+def enable_result_cache(max_bytes: int = 256 * 1024 * 1024, disk_dir: Optional[str] = None) -> ResultCache:
+    """
+    启用 KbarSeriesGanZhi 的结果缓存
+    :param max_bytes: 内存缓存的总大小上限（估算值）
+    :param disk_dir: 磁盘缓存目录，None表示只使用内存缓存
+    :return: 结果缓存
+    """
+    global _result_cache
+    disable_result_cache()
+    _result_cache = ResultCache(max_bytes, disk_dir)
+    return _result_cache
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """获取当前的结果缓存，未启用时返回None"""
+    return _result_cache
+
+
+def disable_result_cache():
+    """关闭结果缓存（磁盘缓存文件保留）"""
+    global _result_cache
+    cache, _result_cache = _result_cache, None
+    if cache is not None:
+        cache.close()
+
+
+def clear_result_cache():
+    """清空结果缓存，未启用时不做任何事"""
+    cache = _result_cache
+    if cache is not None:
+        cache.clear()
+
+
+def result_cache_stats() -> Dict:
+    """结果缓存的统计信息，未启用时返回空字典"""
+    cache = _result_cache
+    return cache.get_stats() if cache is not None else {}
+
+
+def note_kbar_write(db_path: str, keys: Optional[Iterable] = None):
+    """记录本包对数据库的写入，使相关缓存失效；未启用缓存时不做任何事"""
+    cache = _result_cache
+    if cache is not None:
+        cache.note_write(db_path, keys)
@@ -0,0 +1,215 @@
+"""
+XuanXue 会话
+
+XuanXueSession 持有数据库路径及其检查结果，数据库只在第一次使用时检查一次
+（check_stock_kbar_path / check_stock_meta_path 需要打开SQLite并读取表结构），
+之后每次调用只执行查询本身。模块级的 KbarSeriesGanZhi、KbarSeriesGanZhiMany、
+OnBoardDateGanZhi 都是默认会话（跟随配置的路径）上同名方法的简单包装。
+
+    - 未指定路径时跟随配置（config.txt、环境变量、进程内设置），配置的路径变化后对新路径重新检查一次
+    - 检查失败不缓存，数据库文件之后创建好即可直接使用
+    - reuse_connections=True 时每个调用线程复用自己的数据库连接，close() 关闭当前线程的连接
+
+使用方法:
+    with XuanXueSession(stock_kbar_path="kbar.db", reuse_connections=True) as session:
+        session.validate()                      # 可选：提前检查，不可用时抛出异常
+        session.KbarSeriesGanZhi("2023-08-01", "2023-08-31", ["600000", "SH", "1h"])
+        session.OnBoardDateGanZhi("000001.SZ")
+"""
+import os
+import threading
+from typing import Optional
+
+from ..config import StockPathManager
+from . import kbarseriesganzhi as _kbar
+from . import stock_ganzhi as _stock
+from .database import enable_thread_connection_cache, close_thread_connections, thread_connection_cache_enabled
+from .ganzhi_calculator import DateTimeGanZhi as _DateTimeGanZhi
+from .metrics import start_call
+from .profiling import profiled
+
+
+def _check_ok(check_result):
+    """检查函数返回 (是否可用, 提示信息) 或 bool，统一为 (bool, 提示信息)"""
+    if isinstance(check_result, tuple):
+        return bool(check_result[0]), check_result[1] if len(check_result) > 1 else ""
+    return bool(check_result), ""
+
+
+class XuanXueSession:
+    """持有数据库路径和检查结果的会话"""
+
+    def __init__(self, stock_meta_path: Optional[str] = None, stock_kbar_path: Optional[str] = None,
+                 reuse_connections: bool = False):
+        """
+        :param stock_meta_path: 股票元数据数据库路径，None表示跟随配置
+        :param stock_kbar_path: K线数据库路径，None表示跟随配置
+        :param reuse_connections: 是否在调用线程中复用数据库连接
+        """
+        self._stock_meta_path = os.path.abspath(stock_meta_path) if stock_meta_path else None
+        self._stock_kbar_path = os.path.abspath(stock_kbar_path) if stock_kbar_path else None
+        self.reuse_connections = reuse_connections
+        self._lock = threading.Lock()
+        self._valid_kbar_paths = set()
+        self._calculators = {}      # 元数据数据库路径 -> 已检查过的 StockGanZhiCalculator
+        self._connection_threads = set()    # 由会话启用了连接缓存的线程
+
+    # ---- 路径 ----
+
+    def get_stock_kbar_path(self) -> str:
+        if self._stock_kbar_path is not None:
+            return self._stock_kbar_path
+        # 通过模块属性获取，便于测试替换
+        return _kbar.get_stock_kbar_path()
+
+    def get_stock_meta_path(self) -> str:
+        if self._stock_meta_path is not None:
+            return self._stock_meta_path
+        return _stock.get_stock_meta_path()
+
+    # ---- 检查 ----
+
+    def _validate_kbar(self, db_path: str):
+        if db_path in self._valid_kbar_paths:
+            return
+        if self._stock_kbar_path is None:
+            is_valid, message = _check_ok(_kbar.check_stock_kbar_path())
+        else:
+            is_valid, message = StockPathManager.check_file(db_path, "stock_kbar_path")
+        if not is_valid:
+            raise FileNotFoundError(f"kbar数据库文件不存在,请先配置kbar数据库文件路径 ({message or db_path})")
+        with self._lock:
+            self._valid_kbar_paths.add(db_path)
+
+    def _get_calculator(self, db_path: Optional[str] = None):
+        db_path = os.path.abspath(db_path) if db_path else self.get_stock_meta_path()
+        calculator = self._calculators.get(db_path)
+        if calculator is None:
+            if self._stock_meta_path is None and db_path == _stock.get_stock_meta_path():
+                # 跟随配置：按配置检查，检查失败时抛出异常
+                calculator = _stock.StockGanZhiCalculator(None)
+            else:
+                calculator = _stock.StockGanZhiCalculator(db_path)
+            with self._lock:
+                calculator = self._calculators.setdefault(db_path, calculator)
+        return calculator
+
+    def validate(self, stock_meta: bool = True, stock_kbar: bool = True):
+        """
+        立即检查数据库，不可用时抛出异常（不调用时在第一次使用时检查）
+        启用分片存储时K线数据库由分片路由器检查
+        """
+        if stock_kbar and _kbar.get_kbar_shard_router() is None:
+            self._validate_kbar(self.get_stock_kbar_path())
+        if stock_meta:
+            self._get_calculator()
+
+    def reset(self):
+        """清除检查结果，下次使用时重新检查"""
+        with self._lock:
+            self._valid_kbar_paths.clear()
+            self._calculators.clear()
+
+    # ---- 连接 ----
+
+    def _enter_call(self):
+        if self.reuse_connections and not thread_connection_cache_enabled():
+            enable_thread_connection_cache()
+            with self._lock:
+                self._connection_threads.add(threading.get_ident())
+
+    def close(self):
+        """关闭当前线程中由会话复用的数据库连接（其他代码启用的连接缓存不受影响），并清除检查结果"""
+        thread_id = threading.get_ident()
+        if thread_id in self._connection_threads:
+            close_thread_connections()
+            with self._lock:
+                self._connection_threads.discard(thread_id)
+        self.reset()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # ---- 接口 ----
+
+    @profiled("KbarSeriesGanZhi")
+    def KbarSeriesGanZhi(self, start_datetime, end_datetime, kbar_series, useDB: bool = True):
+        """与模块级 KbarSeriesGanZhi 相同"""
+        timer = start_call("KbarSeriesGanZhi")
+        try:
+            self._enter_call()
+            router = _kbar.get_kbar_shard_router()
+            if router is not None:
+                # 启用了分片存储，调用方式保持不变
+                return _kbar._kbarseriesganzhi_sharded(router, start_datetime, end_datetime, kbar_series, useDB)
+
+            db_path = self.get_stock_kbar_path()
+            self._validate_kbar(db_path)
+            return _kbar._kbarseriesganzhi_single(db_path, start_datetime, end_datetime, kbar_series, useDB)
+        finally:
+            timer.finish()
+
+    @profiled("KbarSeriesGanZhiMany")
+    def KbarSeriesGanZhiMany(self, start_datetime, end_datetime, kbar_series_keys, max_workers=None):
+        """与模块级 KbarSeriesGanZhiMany 相同"""
+        timer = start_call("KbarSeriesGanZhiMany")
+        try:
+            return self._kbar_series_ganzhi_many(start_datetime, end_datetime, kbar_series_keys, max_workers)
+        finally:
+            timer.finish()
+
+    def _kbar_series_ganzhi_many(self, start_datetime, end_datetime, kbar_series_keys, max_workers):
+        key_objs = [_kbar._normalize_kbar_series_key(key) for key in kbar_series_keys]
+        router = _kbar.get_kbar_shard_router()
+
+        if router is not None:
+            is_valid, message = router.check_shards()
+            if not is_valid:
+                raise FileNotFoundError(message)
+            groups = {}
+            for index, key_obj in enumerate(key_objs):
+                groups.setdefault(router.shard_for(key_obj), []).append(index)
+        else:
+            db_path = self.get_stock_kbar_path()
+            self._validate_kbar(db_path)
+            groups = {db_path: list(range(len(key_objs)))}
+
+        return _kbar._read_many(groups, key_objs, start_datetime, end_datetime, max_workers)
+
+    @profiled("OnBoardDateGanZhi")
+    def OnBoardDateGanZhi(self, symbol, db_path=None):
+        """与模块级 OnBoardDateGanZhi 相同，db_path为None时使用会话的元数据数据库"""
+        timer = start_call("OnBoardDateGanZhi")
+        try:
+            self._enter_call()
+            return self._get_calculator(db_path).OnBoardDateGanZhi(symbol)
+        finally:
+            timer.finish()
+
+    def DateTimeGanZhi(self, datetime_str):
+        """与模块级 DateTimeGanZhi 相同"""
+        return _DateTimeGanZhi(datetime_str)
+
+    def __repr__(self):
+        return (f"XuanXueSession(stock_meta_path={self._stock_meta_path or '<config>'}, "
+                f"stock_kbar_path={self._stock_kbar_path or '<config>'})")
+
+
+# 默认会话：跟随配置的路径，不复用连接
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+def get_default_session() -> XuanXueSession:
+    """获取模块级函数使用的默认会话"""
+    global _default_session
+    session = _default_session
+    if session is None:
+        with _default_session_lock:
+            if _default_session is None:
+                _default_session = XuanXueSession()
+            session = _default_session
+    return session
@@ -1,11 +1,16 @@
 """
 股票干支计算模块
 """
+import logging
 import sqlite3
 import os
 from datetime import datetime
 from .ganzhi_calculator import GanZhiCalculator
-from ..config import get_stock_meta_path, check_stock_meta_path
+from ..config import get_stock_meta_path, check_stock_meta_path, StockPathManager
+from .database import open_connection, close_connection, is_read_only
+from . import metrics
+
+logger = logging.getLogger(__name__)
 
 class StockGanZhiCalculator:
     def __init__(self, db_path=None):
@@ -13,6 +18,7 @@ class StockGanZhiCalculator:
         初始化股票干支计算器
         :param db_path: 数据库路径，如果为None则使用配置文件中的路径
         """
+        self._use_config = db_path is None
         if db_path is None:
             # 使用配置文件中的路径
             self.db_path = get_stock_meta_path()
@@ -23,12 +29,15 @@ class StockGanZhiCalculator:
         self._check_database()
     
     def _check_database(self):
-        """检查数据库是否可用"""
-        is_valid, message = check_stock_meta_path()
+        """检查数据库是否可用（检查实际使用的db_path，而不总是配置中的路径）"""
+        if self._use_config:
+            is_valid, message = check_stock_meta_path()
+        else:
+            is_valid, message = StockPathManager.check_file(self.db_path, "stock_meta_path")
         if not is_valid:
             raise Exception(f"数据库路径不可用: {message}")
         
-        print(f"✓ 数据库路径检查通过: {self.db_path}")
+        logger.debug("数据库路径检查通过: %s", self.db_path)
     
     def get_stock_info(self, symbol):
         """
@@ -37,7 +46,7 @@ class StockGanZhiCalculator:
         :return: 股票信息字典
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = open_connection(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -45,7 +54,7 @@ class StockGanZhiCalculator:
                 FROM stock_meta WHERE symbol = ?
             """, (symbol,))
             result = cursor.fetchone()
-            conn.close()
+            close_connection(conn)
             
             if result:
                 return {
@@ -80,7 +89,7 @@ class StockGanZhiCalculator:
     
     def _calculate_and_save_ganzhi(self, symbol, list_date):
         """
-        计算并保存干支到数据库
+        计算并保存干支到数据库（只读模式下只计算，不保存）
         :param symbol: 股票代码
         :param list_date: 上市日期
         :return: 干支结果
@@ -105,9 +114,25 @@ class StockGanZhiCalculator:
         month_gan, month_zhi = month_ganzhi[0], month_ganzhi[1]
         day_gan, day_zhi = day_ganzhi[0], day_ganzhi[1]
         
+        ganzhi_data = {
+            'year_gan': year_gan,
+            'year_zhi': year_zhi,
+            'month_gan': month_gan,
+            'month_zhi': month_zhi,
+            'day_gan': day_gan,
+            'day_zhi': day_zhi,
+            'year_ganzhi': year_ganzhi,
+            'month_ganzhi': month_ganzhi,
+            'day_ganzhi': day_ganzhi
+        }
+        
+        # 只读模式下不写回数据库
+        if is_read_only():
+            return ganzhi_data
+        
         # 保存到数据库
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = open_connection(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -117,21 +142,11 @@ class StockGanZhiCalculator:
             """, (year_gan, year_zhi, month_gan, month_zhi, day_gan, day_zhi, symbol))
             
             conn.commit()
-            conn.close()
+            close_connection(conn)
             
-            print(f"✓ 已计算并保存 {symbol} 的干支信息")
+            logger.debug("已计算并保存 %s 的干支信息", symbol)
             
-            return {
-                'year_gan': year_gan,
-                'year_zhi': year_zhi,
-                'month_gan': month_gan,
-                'month_zhi': month_zhi,
-                'day_gan': day_gan,
-                'day_zhi': day_zhi,
-                'year_ganzhi': year_ganzhi,
-                'month_ganzhi': month_ganzhi,
-                'day_ganzhi': day_ganzhi
-            }
+            return ganzhi_data
             
         except sqlite3.Error as e:
             raise Exception(f"保存干支信息到数据库失败: {e}")
@@ -150,7 +165,8 @@ class StockGanZhiCalculator:
             # 检查是否已有干支数据
             if self._has_ganzhi_data(stock_info):
                 # 直接从数据库返回
-                print(f"✓ 从数据库获取 {symbol} 的干支信息")
+                logger.debug("从数据库获取 %s 的干支信息", symbol)
+                metrics.inc("pillars_reused", "OnBoardDateGanZhi")
                 ganzhi_data = {
                     'year_gan': stock_info['year_gan'],
                     'year_zhi': stock_info['year_zhi'],
@@ -164,8 +180,9 @@ class StockGanZhiCalculator:
                 }
             else:
                 # 计算并保存干支
-                print(f"⚡ 计算 {symbol} 的干支信息...")
+                logger.debug("计算 %s 的干支信息", symbol)
                 ganzhi_data = self._calculate_and_save_ganzhi(symbol, stock_info['list_date'])
+                metrics.inc("pillars_computed", "OnBoardDateGanZhi")
             
             # 转换日期格式用于显示
             list_date = stock_info['list_date']
@@ -200,8 +217,11 @@ class StockGanZhiCalculator:
         :param limit: 限制更新数量，None表示更新所有
         :return: 更新统计信息
         """
+        if is_read_only():
+            raise Exception("只读模式下不能批量更新干支信息")
+        
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = open_connection(self.db_path)
             cursor = conn.cursor()
             
             # 获取需要更新的股票（年干为空的）
@@ -211,13 +231,13 @@ class StockGanZhiCalculator:
                 cursor.execute("SELECT symbol FROM stock_meta WHERE 年干 IS NULL")
             
             symbols = [row[0] for row in cursor.fetchall()]
-            conn.close()
+            close_connection(conn)
             
             success_count = 0
             error_count = 0
             errors = []
             
-            print(f"开始批量更新 {len(symbols)} 只股票的干支信息...")
+            logger.info("开始批量更新 %d 只股票的干支信息", len(symbols))
             
             for symbol in symbols:
                 try:
@@ -226,7 +246,9 @@ class StockGanZhiCalculator:
                 except Exception as e:
                     error_count += 1
                     errors.append(f"{symbol}: {e}")
-                    print(f"✗ 更新 {symbol} 失败: {e}")
+                    logger.debug("更新 %s 失败: %s", symbol, e)
+            
+            logger.info("批量更新完成: 成功 %d, 失败 %d", success_count, error_count)
             
             return {
                 'total': len(symbols),
@@ -247,11 +269,12 @@ def OnBoardDateGanZhi(symbol, db_path=None):
     :param db_path: 数据库路径，可选（如果不提供则使用配置文件中的路径）
     :return: 干支信息
     """
+    # 通过默认会话调用，数据库只在第一次使用时检查
+    from .session import get_default_session
     try:
-        calculator = StockGanZhiCalculator(db_path)
-        return calculator.OnBoardDateGanZhi(symbol)
+        return get_default_session().OnBoardDateGanZhi(symbol, db_path)
     except Exception as e:
-        print(f"查询股票 {symbol} 干支失败: {e}")
+        logger.debug("查询股票 %s 干支失败: %s", symbol, e)
         raise
 
 def DateTimeGanZhi(datetime_str):
@@ -263,7 +286,7 @@ def DateTimeGanZhi(datetime_str):
     try:
         return GanZhiCalculator(datetime_str)
     except Exception as e:
-        print(f"计算日期 {datetime_str} 干支失败: {e}")
+        logger.debug("计算日期 %s 干支失败: %s", datetime_str, e)
         raise
 
 def check_database_status():
@@ -0,0 +1,265 @@
+"""
+干支写回的后台写入队列
+
+数据库模式下，读取时发现缺失的干支会先在内存中计算并直接返回结果，
+写回数据库的工作交给后台线程：
+    - 队列有界，队列满时提交方阻塞等待（反压），不会无限占用内存
+    - 后台线程把队列中积压的更新按数据库合并，在一个事务中批量写入
+    - 进程退出时自动把队列中剩余的更新写完
+    - 关闭后提交的更新在提交方线程中同步写入
+    - 写入失败的记录数计入 get_stats() 的 failed_rows，不重试
+
+使用方法:
+    enable_write_behind(max_queue_size=1000, batch_size=20000)
+    KbarSeriesGanZhi(...)          # 读取不再等待UPDATE和commit
+    write_behind_queue_depth()     # 等待写入的记录数
+    flush_write_behind()           # 等待队列写完
+    disable_write_behind()         # 写完剩余更新并停止后台线程
+"""
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .database import UPDATE_PILLARS_SQL
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class PillarWriteBehind:
+    """干支后台写入器"""
+
+    def __init__(self, max_queue_size: int = 1000, batch_size: int = 20000, autostart: bool = True):
+        """
+        :param max_queue_size: 队列中最多积压的提交次数，超过后 submit 阻塞
+        :param batch_size: 一个事务最多合并写入的记录数
+        :param autostart: 是否立即启动后台线程
+        """
+        if max_queue_size < 1 or batch_size < 1:
+            raise ValueError("max_queue_size 和 batch_size 必须大于0")
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Condition()
+        self._pending_rows = 0
+        self._written_rows = 0
+        self._transactions = 0
+        self._errors = 0
+        self._failed_rows = 0
+        self._closed = False
+        self._thread = None
+        self._connections = {}
+
+        if autostart:
+            self.start()
+
+    def start(self):
+        """启动后台写入线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="xuanxue-write-behind", daemon=True)
+            self._thread.start()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, db_path: str, updates: List[tuple]):
+        """
+        提交一批干支更新
+        :param db_path: 数据库路径
+        :param updates: (year_gan, year_zhi, month_gan, month_zhi, day_gan, day_zhi, hour_gan, hour_zhi, id) 列表
+        """
+        if not updates:
+            return
+        with self._lock:
+            self._pending_rows += len(updates)
+        if self._closed:
+            # 已关闭：不再进入队列，在当前线程同步写入
+            self._write_now([(db_path, list(updates))])
+            return
+        self._queue.put((db_path, list(updates)))
+        if self._closed:
+            # 与 close 并发时，放入队列的更新可能已没有后台线程处理
+            self._drain()
+
+    def queue_depth(self) -> int:
+        """等待写入的记录数"""
+        with self._lock:
+            return self._pending_rows
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待队列中的更新全部写入
+        :param timeout: 最长等待秒数，None表示一直等待
+        :return: 是否已全部写入
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._pending_rows > 0:
+                if not self.is_running():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._lock.wait(remaining if remaining is not None else 0.1)
+            return True
+
+    def close(self, timeout: Optional[float] = None):
+        """写完剩余的更新并停止后台线程，之后提交的更新同步写入"""
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+        # 未启动过后台线程，或 _STOP 之后还有更新时，在当前线程写完
+        self._drain()
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取写入统计"""
+        with self._lock:
+            return {
+                "queue_depth": self._pending_rows,
+                "written_rows": self._written_rows,
+                "transactions": self._transactions,
+                "errors": self._errors,
+                "failed_rows": self._failed_rows,
+            }
+
+    @staticmethod
+    def _merge(batches: Dict[str, Dict[int, tuple]], db_path: str, updates: List[tuple]) -> int:
+        """按数据库合并更新，同一条记录只保留最后一次的值，返回合并的记录数"""
+        merged = batches.setdefault(db_path, {})
+        for update in updates:
+            merged[update[-1]] = update
+        return len(updates)
+
+    def _write_now(self, items: List[tuple]):
+        """在当前线程同步写入 [(db_path, updates), ...]，使用临时连接"""
+        batches = {}
+        rows = sum(self._merge(batches, db_path, updates) for db_path, updates in items)
+        connections = {}
+        try:
+            self._write(batches, connections)
+        finally:
+            for conn in connections.values():
+                conn.close()
+        with self._lock:
+            self._pending_rows -= rows
+            self._lock.notify_all()
+
+    def _drain(self):
+        """把队列中剩余的更新在当前线程写完"""
+        items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                items.append(item)
+        if items:
+            self._write_now(items)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            # 合并队列中已积压的更新，同一条记录只保留最后一次的值
+            batches = {}
+            rows = 0
+            while True:
+                rows += self._merge(batches, *item)
+                if rows >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+
+            self._write(batches, self._connections)
+            with self._lock:
+                self._pending_rows -= rows
+                self._lock.notify_all()
+
+        for conn in self._connections.values():
+            conn.close()
+        self._connections = {}
+
+    def _write(self, batches: Dict[str, Dict[int, tuple]], connections: Dict[str, sqlite3.Connection]):
+        for db_path, merged in batches.items():
+            try:
+                conn = connections.get(db_path)
+                if conn is None:
+                    conn = sqlite3.connect(db_path, timeout=30)
+                    connections[db_path] = conn
+                with conn:
+                    conn.executemany(UPDATE_PILLARS_SQL, list(merged.values()))
+                with self._lock:
+                    self._written_rows += len(merged)
+                    self._transactions += 1
+                metrics.inc("rows_written", "write_behind", len(merged))
+            except Exception as e:
+                logger.error("后台写入干支失败 (%s)，丢弃 %d 条记录: %s", db_path, len(merged), e)
+                with self._lock:
+                    self._errors += 1
+                    self._failed_rows += len(merged)
+
+
+# 全局后台写入器，为None时同步写回
+_write_behind = None
+
+
+def enable_write_behind(max_queue_size: int = 1000, batch_size: int = 20000) -> PillarWriteBehind:
+    """
+    启用干支后台写入
+    :param max_queue_size: 队列中最多积压的提交次数
+    :param batch_size: 一个事务最多合并写入的记录数
+    :return: 后台写入器
+    """
+    global _write_behind
+    disable_write_behind()
+    _write_behind = PillarWriteBehind(max_queue_size, batch_size)
+    return _write_behind
+
+
+def get_write_behind() -> Optional[PillarWriteBehind]:
+    """获取当前的后台写入器，未启用时返回None"""
+    return _write_behind
+
+
+def disable_write_behind():
+    """写完剩余的更新并关闭后台写入，之后恢复同步写回"""
+    global _write_behind
+    writer, _write_behind = _write_behind, None
+    if writer is not None:
+        writer.close()
+
+
+def flush_write_behind(timeout: Optional[float] = None) -> bool:
+    """等待后台写入队列写完，未启用时直接返回True"""
+    writer = _write_behind
+    if writer is None:
+        return True
+    return writer.flush(timeout)
+
+
+def write_behind_queue_depth() -> int:
+    """后台写入队列中等待写入的记录数"""
+    writer = _write_behind
+    return writer.queue_depth() if writer is not None else 0
+
+
+# 进程退出时写完剩余的更新
+atexit.register(disable_write_behind)
@@ -3,15 +3,28 @@ from .kbar_type import (
     KbarSeriesGanZhi,
     KbarSeriesGanZhiList,
     KbarSeriesKey,
+    intern_kbar_series_key,
     
     )
+from .ganzhi_codes import GANZHI_CYCLE, encode_ganzhi, decode_ganzhi
+from .columnar_kbar import ColumnarKbarSeries
+from .kbar_file import KbarFile, open_kbar_file, write_kbar_file, kbar_file_name
 
 
 __all__=[
     "Kbar",
     "KbarSeriesKey",
+    "intern_kbar_series_key",
     "KbarSeries",
     "KbarSeriesGanZhi",
-    "KbarSeriesGanZhiList"
+    "KbarSeriesGanZhiList",
+    "ColumnarKbarSeries",
+    "KbarFile",
+    "open_kbar_file",
+    "write_kbar_file",
+    "kbar_file_name",
+    "GANZHI_CYCLE",
+    "encode_ganzhi",
+    "decode_ganzhi",
 
 ]
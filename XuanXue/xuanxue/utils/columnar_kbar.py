@@ -0,0 +1,284 @@
+"""
+列式存储的K线序列（需要安装numpy）
+
+ColumnarKbarSeries 与 KbarSeries 接口兼容，但不再为每根K线保存一个 Kbar 对象：
+    ts                               int64 数组（自1970-01-01起的纳秒数，无时区）
+    open, high, low, close,
+    volume, amount                   float64（或float32）数组
+每根K线约占 8 + 6*8 = 56 字节（float32时32字节），而 Kbar 对象约500字节。
+
+get_kbar_list() 返回按需创建 Kbar 的只读视图，原有按 Kbar 遍历的代码无需修改；
+长度为O(1)，切片返回共享内存的视图，append_chunk 按块追加（容量按倍数增长）。
+与 KbarSeries 一样始终按 ts 升序保存：追加乱序数据时自动排序，
+因此 filter_by_time_range 用 searchsorted 返回切片视图，get_latest_kbar 为O(1)。
+
+使用方法:
+    series = ColumnarKbarSeries(KbarSeriesKey("600000", "SH", "1min"))
+    series.append_chunk(ts_array, open_array, high_array, low_array, close_array, volume_array, amount_array)
+    KbarSeriesGanZhi(start, end, series, useDB=False)
+"""
+import datetime
+from collections.abc import Sequence
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖，使用时再报错
+    np = None
+
+from .kbar_type import (
+    Kbar, KbarSeries, KbarSeriesKey, KBAR_VALUE_COLUMNS, _dataframe_key_and_ts, _require_pandas,
+)
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("列式K线序列需要安装numpy: pip install numpy")
+    return np
+
+
+def _to_ts_array(ts) -> "np.ndarray":
+    """把datetime列表、datetime64数组或int64纳秒数组转换为int64纳秒数组"""
+    array = np.asarray(ts)
+    if array.dtype.kind == "M":
+        return array.astype("datetime64[ns]").view(np.int64)
+    if array.dtype.kind in "iu":
+        return array.astype(np.int64, copy=False)
+    if array.dtype == object or array.dtype.kind == "U":
+        return np.array(array, dtype="datetime64[ns]").view(np.int64)
+    raise TypeError(f"不支持的时间数组类型: {array.dtype}")
+
+
+def _ns_to_datetime(value: int) -> datetime.datetime:
+    return _EPOCH + datetime.timedelta(microseconds=int(value) // 1000)
+
+
+def _datetime_to_ns(value: datetime.datetime) -> int:
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000_000 + delta.microseconds * 1000
+
+
+class _KbarListView(Sequence):
+    """ColumnarKbarSeries 的 Kbar 只读视图，访问时才创建 Kbar 对象"""
+
+    def __init__(self, series: "ColumnarKbarSeries"):
+        self._series = series
+
+    def __len__(self):
+        return self._series.get_length()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._series.get_kbar(i) for i in range(*index.indices(len(self)))]
+        return self._series.get_kbar(index)
+
+    def __iter__(self):
+        series = self._series
+        length = series.get_length()
+        columns = [series.get_column(name).tolist() for name in KBAR_VALUE_COLUMNS]
+        ts = series.get_column("ts")
+        for i in range(length):
+            yield Kbar(_ns_to_datetime(ts[i]), *(column[i] for column in columns))
+
+    def __repr__(self):
+        return f"_KbarListView(length={len(self)})"
+
+
+class ColumnarKbarSeries(KbarSeries):
+    """列式存储的K线序列"""
+
+    def __init__(self, kbar_series_key: KbarSeriesKey, ts=None, open=None, high=None, low=None,
+                 close=None, volume=None, amount=None, dtype=None):
+        """
+        :param kbar_series_key: K线序列的键
+        :param ts: K线时间，datetime列表、datetime64数组或int64纳秒数组
+        :param open/high/low/close/volume/amount: 与ts等长的数值数组，volume/amount缺失时为0
+        :param dtype: 数值列的类型，默认float64，可使用float32进一步减小内存
+        """
+        _require_numpy()
+        self.kbar_series_key = kbar_series_key
+        self.dtype = np.dtype(dtype or np.float64)
+        self._length = 0
+        self._ts = np.empty(0, dtype=np.int64)
+        self._values = {name: np.empty(0, dtype=self.dtype) for name in KBAR_VALUE_COLUMNS}
+        if ts is not None:
+            self.append_chunk(ts, open, high, low, close, volume, amount)
+
+    # ---- 兼容 KbarSeries 的接口 ----
+
+    @property
+    def kbar_list(self):
+        return _KbarListView(self)
+
+    def get_kbar_list(self):
+        """返回按需创建 Kbar 的只读视图"""
+        return _KbarListView(self)
+
+    def get_length(self):
+        return self._length
+
+    def __len__(self):
+        return self._length
+
+    def ensure_sorted(self):
+        """检查并修复K线的顺序（append_chunk 已保证有序，这里只在列被外部修改后使用）"""
+        if np.any(np.diff(self.get_column("ts")) < 0):
+            self._sort()
+
+    def _sync(self):
+        # 列式存储没有需要与K线列表同步的时间列表
+        pass
+
+    def add_kbar(self, kbar: Kbar):
+        """添加一根K线（逐根添加请优先使用 append_chunk）"""
+        self.append_chunk([_datetime_to_ns(kbar.ts)], [kbar.open], [kbar.high], [kbar.low],
+                          [kbar.close], [kbar.volume], [kbar.amount])
+
+    def get_latest_kbar(self) -> Optional[Kbar]:
+        """获取最新的K线数据（O(1)）"""
+        if self._length == 0:
+            return None
+        return self.get_kbar(self._length - 1)
+
+    def filter_by_time_range(self, start_time: datetime.datetime, end_time: datetime.datetime) -> 'ColumnarKbarSeries':
+        """按时间范围过滤（包含边界），searchsorted 定位后返回共享内存的切片视图"""
+        ts = self.get_column("ts")
+        start = int(np.searchsorted(ts, _datetime_to_ns(start_time), side="left"))
+        end = int(np.searchsorted(ts, _datetime_to_ns(end_time), side="right"))
+        return self[start:end]
+
+    # ---- 列式接口 ----
+
+    def get_kbar(self, index: int) -> Kbar:
+        """创建第index根K线的 Kbar 对象"""
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("K线下标超出范围")
+        return Kbar(_ns_to_datetime(self._ts[index]),
+                    *(float(self._values[name][index]) for name in KBAR_VALUE_COLUMNS))
+
+    def get_column(self, name: str) -> "np.ndarray":
+        """
+        获取一列数据（共享内存的视图，不要修改）
+        :param name: "ts"（int64纳秒）或 open, high, low, close, volume, amount
+        """
+        if name == "ts":
+            return self._ts[:self._length]
+        return self._values[name][:self._length]
+
+    def get_ts_array(self) -> "np.ndarray":
+        """以 datetime64[ns] 数组返回K线时间"""
+        return self.get_column("ts").view("datetime64[ns]")
+
+    def append_chunk(self, ts, open, high, low, close, volume=None, amount=None):
+        """
+        按块追加K线，容量不足时按倍数扩容，摊还O(1)
+        参数同构造函数
+        """
+        ts_array = _to_ts_array(ts)
+        count = len(ts_array)
+        columns = {}
+        for name, values in zip(KBAR_VALUE_COLUMNS, (open, high, low, close, volume, amount)):
+            if values is None:
+                if name in ("volume", "amount"):
+                    columns[name] = np.zeros(count, dtype=self.dtype)
+                    continue
+                raise ValueError(f"缺少 {name} 列")
+            columns[name] = np.asarray(values, dtype=self.dtype)
+            if len(columns[name]) != count:
+                raise ValueError(f"{name} 列长度 {len(columns[name])} 与ts长度 {count} 不一致")
+        if count == 0:
+            return
+
+        end = self._length + count
+        if end > len(self._ts):
+            self._reserve(max(end, 2 * len(self._ts), 1024))
+        self._ts[self._length:end] = ts_array
+        for name, values in columns.items():
+            self._values[name][self._length:end] = values
+        check_from = max(self._length - 1, 0)
+        self._length = end
+        if np.any(np.diff(self._ts[check_from:end]) < 0):
+            self._sort()
+
+    def nbytes(self) -> int:
+        """已使用的K线数据占用的字节数"""
+        return self._length * (8 + len(KBAR_VALUE_COLUMNS) * self.dtype.itemsize)
+
+    def __getitem__(self, index):
+        """整数下标返回 Kbar，切片返回共享内存的 ColumnarKbarSeries 视图"""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            ts = self.get_column("ts")[start:stop:step]
+            return self._from_columns(ts, {name: column[start:stop:step] for name, column in self._columns().items()})
+        return self.get_kbar(index)
+
+    def __iter__(self):
+        return iter(_KbarListView(self))
+
+    def __str__(self):
+        return f"ColumnarKbarSeries(key={self.kbar_series_key}, length={self._length}, dtype={self.dtype})"
+
+    def __repr__(self):
+        return self.__str__()
+
+    # ---- 转换 ----
+
+    @classmethod
+    def from_kbar_series(cls, kbar_series: KbarSeries, dtype=None) -> 'ColumnarKbarSeries':
+        """从 KbarSeries 转换"""
+        kbar_list = kbar_series.get_kbar_list()
+        return cls(kbar_series.get_key(),
+                   [_datetime_to_ns(kbar.ts) for kbar in kbar_list],
+                   *([getattr(kbar, name) for kbar in kbar_list] for name in KBAR_VALUE_COLUMNS),
+                   dtype=dtype)
+
+    @classmethod
+    def from_dataframe(cls, df, key, dtype=None) -> 'ColumnarKbarSeries':
+        """
+        从pandas DataFrame创建（直接复制列，不创建 Kbar 对象）
+        参数同 KbarSeries.from_dataframe
+        """
+        key, ts_index = _dataframe_key_and_ts(df, key)
+        return cls(key, ts_index.to_numpy(dtype="datetime64[ns]"),
+                   *(df[name].to_numpy() if name in df.columns else None for name in KBAR_VALUE_COLUMNS),
+                   dtype=dtype)
+
+    def to_frame(self):
+        """转换为以DatetimeIndex（ts）为索引的pandas DataFrame"""
+        pd = _require_pandas()
+        index = pd.DatetimeIndex(self.get_ts_array(), name="ts")
+        frame = pd.DataFrame({name: self.get_column(name) for name in KBAR_VALUE_COLUMNS}, index=index)
+        frame.attrs["key"] = (self.kbar_series_key.symbol, self.kbar_series_key.exchange,
+                              self.kbar_series_key.period)
+        return frame
+
+    # ---- 内部方法 ----
+
+    def _columns(self):
+        return {name: self.get_column(name) for name in KBAR_VALUE_COLUMNS}
+
+    def _from_columns(self, ts, columns) -> 'ColumnarKbarSeries':
+        series = ColumnarKbarSeries(self.kbar_series_key, dtype=self.dtype)
+        series._ts = ts
+        series._values = columns
+        series._length = len(ts)
+        return series
+
+    def _sort(self):
+        # 追加了乱序的K线：按ts稳定排序，生成新数组，不影响已取出的切片视图
+        order = np.argsort(self._ts[:self._length], kind="stable")
+        self._ts = self._ts[:self._length][order]
+        self._values = {name: column[:self._length][order] for name, column in self._values.items()}
+
+    def _reserve(self, capacity: int):
+        ts = np.empty(capacity, dtype=np.int64)
+        ts[:self._length] = self._ts[:self._length]
+        self._ts = ts
+        for name, column in self._values.items():
+            grown = np.empty(capacity, dtype=self.dtype)
+            grown[:self._length] = column[:self._length]
+            self._values[name] = grown
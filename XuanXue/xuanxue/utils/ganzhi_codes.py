@@ -0,0 +1,37 @@
+"""
+六十甲子编码
+
+把一柱干支（如 "甲子"）编码为 0-59 的整数（六十甲子中的序号），便于按 int8 列式存储：
+    encode_ganzhi("甲", "子") -> 0
+    encode_ganzhi("癸", "亥") -> 59
+    decode_ganzhi(0) -> "甲子"
+缺失或不合法的干支编码为 MISSING_CODE(-1)，解码为空字符串
+"""
+from typing import Optional
+
+from ..config import gan, zhi
+
+MISSING_CODE = -1
+
+# 六十甲子: 甲子, 乙丑, 丙寅, ..., 癸亥
+GANZHI_CYCLE = [gan[i % 10] + zhi[i % 12] for i in range(60)]
+
+_CODE_MAP = {name: code for code, name in enumerate(GANZHI_CYCLE)}
+
+
+def encode_ganzhi(gan_char: Optional[str], zhi_char: Optional[str]) -> int:
+    """
+    把天干和地支编码为六十甲子序号
+    :return: 0-59，缺失或天干地支阴阳不匹配时返回 MISSING_CODE
+    """
+    if not gan_char or not zhi_char:
+        return MISSING_CODE
+    return _CODE_MAP.get(gan_char + zhi_char, MISSING_CODE)
+
+
+def decode_ganzhi(code: int) -> str:
+    """把六十甲子序号解码为干支字符串，MISSING_CODE 解码为空字符串"""
+    code = int(code)
+    if 0 <= code < 60:
+        return GANZHI_CYCLE[code]
+    return ""
@@ -0,0 +1,213 @@
+"""
+K线二进制文件格式（需要安装numpy）
+
+每个 KbarSeriesKey 一个文件（默认文件名 {symbol}_{exchange}_{period}.xkb），按列存储，
+读取时通过 numpy.memmap 映射文件，各列直接是文件内容的视图，不复制也不逐行解码。
+
+文件布局（小端）:
+    头部 128 字节:
+        magic      8 字节  b"XXKBAR01"
+        version    uint32  当前为1
+        reserved   uint32
+        count      uint64  K线数量
+        symbol     32 字节 UTF-8，末尾补0
+        exchange   16 字节
+        period     16 字节
+        其余补0
+    ts                        int64[count]    自1970-01-01起的纳秒数
+    open, high, low, close,
+    volume, amount            float64[count]  各一列
+    year, month, day, hour    int8[count]     六十甲子序号（0=甲子 ... 59=癸亥），-1表示缺失
+
+使用方法:
+    write_kbar_file("600000_SH_1day.xkb", kbar_series, pillar_codes)
+    kbar_file = open_kbar_file("600000_SH_1day.xkb")
+    series = kbar_file.to_series()        # ColumnarKbarSeries，与文件共享内存
+    ganzhi = kbar_file.to_ganzhi()        # KbarSeriesGanZhi
+"""
+import os
+import struct
+import threading
+from typing import Dict, Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖，使用时再报错
+    np = None
+
+from .columnar_kbar import ColumnarKbarSeries, _ns_to_datetime
+from .ganzhi_codes import GANZHI_CYCLE, MISSING_CODE
+from .kbar_type import KbarSeries, KbarSeriesGanZhi, KbarSeriesKey, KBAR_VALUE_COLUMNS, PILLAR_NAMES
+
+KBAR_FILE_MAGIC = b"XXKBAR01"
+KBAR_FILE_VERSION = 1
+KBAR_FILE_SUFFIX = ".xkb"
+HEADER_SIZE = 128
+
+# magic, version, reserved, count, symbol, exchange, period
+_HEADER_STRUCT = struct.Struct("<8sIIQ32s16s16s")
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("K线二进制文件需要安装numpy: pip install numpy")
+    return np
+
+
+def kbar_file_name(key: KbarSeriesKey) -> str:
+    """K线序列对应的默认文件名"""
+    return f"{key.symbol}_{key.exchange}_{key.period}{KBAR_FILE_SUFFIX}"
+
+
+def _encode_field(value: str, size: int) -> bytes:
+    data = str(value).encode("utf-8")
+    if len(data) > size:
+        raise ValueError(f"字段 {value!r} 超过 {size} 字节")
+    return data
+
+
+def _decode_field(data: bytes) -> str:
+    return data.rstrip(b"\0").decode("utf-8")
+
+
+def _column_offsets(count: int) -> Dict[str, int]:
+    """各列在文件中的偏移量"""
+    offsets = {"ts": HEADER_SIZE}
+    offset = HEADER_SIZE + 8 * count
+    for name in KBAR_VALUE_COLUMNS:
+        offsets[name] = offset
+        offset += 8 * count
+    for name in PILLAR_NAMES:
+        offsets[name] = offset
+        offset += count
+    offsets["end"] = offset
+    return offsets
+
+
+def write_kbar_file(path: str, kbar_series: KbarSeries, pillar_codes: Optional[Dict[str, "np.ndarray"]] = None):
+    """
+    写入K线二进制文件（先写临时文件再替换，读取方不会看到写了一半的文件）
+    :param path: 文件路径
+    :param kbar_series: KbarSeries 或 ColumnarKbarSeries
+    :param pillar_codes: 可选，{"year"/"month"/"day"/"hour": 与K线等长的六十甲子序号数组}，缺失的柱写为-1
+    """
+    _require_numpy()
+    if not isinstance(kbar_series, ColumnarKbarSeries):
+        kbar_series = ColumnarKbarSeries.from_kbar_series(kbar_series)
+    key = kbar_series.get_key()
+    count = kbar_series.get_length()
+
+    # 先检查四柱再打开文件，不会因长度不一致留下写了一半的临时文件
+    pillars = []
+    for name in PILLAR_NAMES:
+        codes = (pillar_codes or {}).get(name)
+        if codes is None:
+            codes = np.full(count, MISSING_CODE, dtype=np.int8)
+        codes = np.asarray(codes, dtype=np.int8)
+        if len(codes) != count:
+            raise ValueError(f"{name} 柱的长度 {len(codes)} 与K线数量 {count} 不一致")
+        pillars.append(codes)
+
+    header = _HEADER_STRUCT.pack(
+        KBAR_FILE_MAGIC, KBAR_FILE_VERSION, 0, count,
+        _encode_field(key.symbol, 32), _encode_field(key.exchange, 16), _encode_field(key.period, 16),
+    )
+    # 临时文件名包含进程和线程，同时写同一个文件时不会互相覆盖
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            f.write(np.ascontiguousarray(kbar_series.get_column("ts"), dtype="<i8").tobytes())
+            for name in KBAR_VALUE_COLUMNS:
+                f.write(np.ascontiguousarray(kbar_series.get_column(name), dtype="<f8").tobytes())
+            for codes in pillars:
+                f.write(codes.tobytes())
+        os.replace(temp_path, path)
+    except Exception:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class KbarFile:
+    """通过内存映射打开的K线二进制文件"""
+
+    def __init__(self, path: str):
+        _require_numpy()
+        self.path = path
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        if len(self._map) < HEADER_SIZE:
+            raise ValueError(f"不是有效的K线文件: {path}")
+        magic, version, _, count, symbol, exchange, period = _HEADER_STRUCT.unpack_from(self._map, 0)
+        if magic != KBAR_FILE_MAGIC:
+            raise ValueError(f"不是有效的K线文件: {path}")
+        if version != KBAR_FILE_VERSION:
+            raise ValueError(f"不支持的K线文件版本: {version}")
+
+        offsets = _column_offsets(count)
+        if len(self._map) < offsets["end"]:
+            raise ValueError(f"K线文件不完整: {path}")
+        self.key = KbarSeriesKey(_decode_field(symbol), _decode_field(exchange), _decode_field(period))
+        self.length = count
+
+        buffer = self._map
+        self.ts = np.frombuffer(buffer, dtype="<i8", count=count, offset=offsets["ts"])
+        self.columns = {
+            name: np.frombuffer(buffer, dtype="<f8", count=count, offset=offsets[name])
+            for name in KBAR_VALUE_COLUMNS
+        }
+        self.pillar_codes = {
+            name: np.frombuffer(buffer, dtype=np.int8, count=count, offset=offsets[name])
+            for name in PILLAR_NAMES
+        }
+
+    def get_key(self) -> KbarSeriesKey:
+        return self.key
+
+    def get_length(self) -> int:
+        return self.length
+
+    def to_series(self) -> ColumnarKbarSeries:
+        """返回与文件共享内存的 ColumnarKbarSeries（只读，追加时会复制到新的内存）"""
+        series = ColumnarKbarSeries(self.key)
+        return series._from_columns(self.ts, dict(self.columns))
+
+    def to_ganzhi(self) -> KbarSeriesGanZhi:
+        """把文件中的干支序号还原为 KbarSeriesGanZhi（"年-月-日-时" 字符串）"""
+        names = np.array(GANZHI_CYCLE + [""], dtype=object)
+        # -1 对应最后一个空字符串
+        pillars = [names[self.pillar_codes[name].astype(np.int16) % 61] for name in PILLAR_NAMES]
+        ganzhi_list = ["-".join(parts) for parts in zip(*pillars)]
+        ts_list = [_ns_to_datetime(value) for value in self.ts.tolist()]
+        return KbarSeriesGanZhi(self.key, ganzhi_list, ts_list)
+
+    def close(self):
+        """释放内存映射（之后不要再使用取出的数组）"""
+        mmap_obj = getattr(self._map, "_mmap", None)
+        self.ts = self.columns = self.pillar_codes = None
+        self._map = None
+        if mmap_obj is not None:
+            try:
+                mmap_obj.close()
+            except BufferError:
+                # 仍有数组引用映射时由垃圾回收释放
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __str__(self):
+        return f"KbarFile(path={self.path}, key={self.key}, length={self.length})"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def open_kbar_file(path: str) -> KbarFile:
+    """通过内存映射打开K线二进制文件"""
+    return KbarFile(path)
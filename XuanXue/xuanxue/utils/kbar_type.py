@@ -1,7 +1,78 @@
+import bisect
 import datetime
+import threading
+import weakref
 from typing import List, Optional
 
+from .ganzhi_codes import GANZHI_CYCLE
+
+KBAR_VALUE_COLUMNS = ("open", "high", "low", "close", "volume", "amount")
+PILLAR_NAMES = ("year", "month", "day", "hour")
+
+
+def _require_pandas():
+    try:
+        import pandas
+    except ImportError as e:
+        raise ImportError("DataFrame转换需要安装pandas: pip install pandas") from e
+    return pandas
+
+
+def _as_kbar_series_key(key) -> "KbarSeriesKey":
+    """把KbarSeriesKey、[symbol, exchange, period] 或 {"symbol":..., "exchange":..., "period":...} 转为KbarSeriesKey"""
+    if isinstance(key, KbarSeriesKey):
+        return key
+    if isinstance(key, dict):
+        return intern_kbar_series_key(key["symbol"], key["exchange"], key["period"])
+    if isinstance(key, (list, tuple)) and len(key) == 3:
+        return intern_kbar_series_key(*key)
+    raise TypeError("key 必须是KbarSeriesKey对象、[symbol, exchange, period] 或包含这三个键的字典")
+
+
+def _dataframe_key_and_ts(df, key):
+    """
+    检查 from_dataframe 的参数，返回 (KbarSeriesKey, 去掉时区的DatetimeIndex)
+    df 以DatetimeIndex为索引或包含ts列，且包含 open, high, low, close 列
+    """
+    pd = _require_pandas()
+    key = _as_kbar_series_key(key)
+    if "ts" in df.columns:
+        ts_index = pd.DatetimeIndex(pd.to_datetime(df["ts"]))
+    elif isinstance(df.index, pd.DatetimeIndex):
+        ts_index = df.index
+    else:
+        raise ValueError("DataFrame必须以DatetimeIndex为索引或包含ts列")
+    if ts_index.tz is not None:
+        ts_index = ts_index.tz_localize(None)
+
+    missing = [name for name in KBAR_VALUE_COLUMNS[:4] if name not in df.columns]
+    if missing:
+        raise ValueError(f"DataFrame缺少必要的列: {missing}")
+    return key, ts_index
+
+
+def _split_ganzhi_columns(ganzhi_list: List[str]):
+    """把 "年-月-日-时" 干支字符串列表拆成四个柱的列，不完整的部分为None"""
+    columns = ([], [], [], [])
+    for ganzhi in ganzhi_list:
+        parts = ganzhi.split("-") if ganzhi else []
+        for i, column in enumerate(columns):
+            column.append(parts[i] if i < len(parts) else None)
+    return columns
+
+
+_GANZHI_NAMES = frozenset(GANZHI_CYCLE)
+
+
+def _pillar_categorical(pd, values):
+    """四柱列使用以六十甲子为类别的Categorical，不在六十甲子中的值（如"无值"）为NaN"""
+    values = [value if value in _GANZHI_NAMES else None for value in values]
+    return pd.Categorical(values, categories=GANZHI_CYCLE)
+
+
 class Kbar:
+    __slots__ = ("ts", "open", "high", "low", "close", "volume", "amount")
+
     def __init__(self, ts: datetime.datetime, open: float, high: float, low: float, close: float, volume: float, amount: float):
         self.ts = ts
         self.open = open
@@ -39,10 +110,20 @@ class Kbar:
         return self.__str__()
 
 class KbarSeriesKey:
+    # _hash 缓存哈希值；__weakref__ 供 intern_kbar_series_key 的弱引用缓存使用
+    __slots__ = ("symbol", "exchange", "period", "_hash", "__weakref__")
+
     def __init__(self, symbol: str, exchange: str, period: str):
-        self.symbol = symbol
-        self.exchange = exchange
-        self.period = period
+        object.__setattr__(self, "symbol", symbol)
+        object.__setattr__(self, "exchange", exchange)
+        object.__setattr__(self, "period", period)
+        object.__setattr__(self, "_hash", hash((symbol, exchange, period)))
+    
+    def __setattr__(self, name, value):
+        # 修改键的字段后重新计算缓存的哈希值
+        object.__setattr__(self, name, value)
+        if name != "_hash":
+            object.__setattr__(self, "_hash", hash((self.symbol, self.exchange, self.period)))
     
     def get_symbol(self):
         return self.symbol
@@ -60,19 +141,73 @@ class KbarSeriesKey:
         return self.__str__()
     
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, KbarSeriesKey):
             return False
-        return (self.symbol == other.symbol and 
+        return (self._hash == other._hash and
+                self.symbol == other.symbol and 
                 self.exchange == other.exchange and 
                 self.period == other.period)
     
     def __hash__(self):
-        return hash((self.symbol, self.exchange, self.period))
+        return self._hash
+    
+    def __reduce__(self):
+        return (KbarSeriesKey, (self.symbol, self.exchange, self.period))
+
+
+# 已创建的键：(symbol, exchange, period) -> KbarSeriesKey，不再被引用的键自动释放
+_interned_keys = weakref.WeakValueDictionary()
+_interned_keys_lock = threading.Lock()
+
+
+def intern_kbar_series_key(symbol: str, exchange: str, period: str) -> KbarSeriesKey:
+    """
+    获取 (symbol, exchange, period) 对应的共享 KbarSeriesKey 实例
+    相同的键只创建一个对象，哈希值只计算一次；返回的键被多处共享，不要修改它的字段
+    """
+    token = (symbol, exchange, period)
+    key = _interned_keys.get(token)
+    if key is None:
+        with _interned_keys_lock:
+            key = _interned_keys.get(token)
+            if key is None:
+                key = KbarSeriesKey(symbol, exchange, period)
+                _interned_keys[token] = key
+    return key
 
 class KbarSeries:
+    """
+    K线序列，kbar_list 始终按 ts 升序排列：
+    创建时检查顺序（乱序时排序），add_kbar 追加乱序K线时插入到正确位置，
+    因此按时间范围过滤可以用二分查找，最新K线就是最后一根
+    """
+
     def __init__(self, kbar_series_key: KbarSeriesKey, kbar_list: List[Kbar]):
         self.kbar_series_key = kbar_series_key
         self.kbar_list = kbar_list
+        self.ensure_sorted()
+    
+    def ensure_sorted(self):
+        """
+        检查并修复 kbar_list 的顺序，同时重建用于二分查找的时间列表
+        直接修改了 get_kbar_list() 返回的列表后可调用此方法；只追加元素时会自动调用
+        """
+        ts_list = [kbar.ts for kbar in self.kbar_list]
+        try:
+            if any(ts_list[i] > ts_list[i + 1] for i in range(len(ts_list) - 1)):
+                # 乱序时排序一份新列表，不修改调用方传入的列表
+                self.kbar_list = sorted(self.kbar_list, key=lambda kbar: kbar.ts)
+                ts_list = [kbar.ts for kbar in self.kbar_list]
+        except TypeError:
+            raise TypeError("K线序列中的ts类型不一致，无法按时间排序") from None
+        self._ts_list = ts_list
+    
+    def _sync(self):
+        # kbar_list 被外部直接追加时，长度不一致，重新检查顺序
+        if len(self._ts_list) != len(self.kbar_list):
+            self.ensure_sorted()
     
     def get_key(self):
         return self.kbar_series_key
@@ -84,27 +219,77 @@ class KbarSeries:
         return len(self.kbar_list)
     
     def add_kbar(self, kbar: Kbar):
-        """添加K线数据"""
-        self.kbar_list.append(kbar)
+        """添加K线数据，时间早于最后一根时插入到对应位置以保持有序"""
+        self._sync()
+        if not self._ts_list or self._ts_list[-1] <= kbar.ts:
+            self.kbar_list.append(kbar)
+            self._ts_list.append(kbar.ts)
+            return
+        index = bisect.bisect_right(self._ts_list, kbar.ts)
+        self.kbar_list.insert(index, kbar)
+        self._ts_list.insert(index, kbar.ts)
     
     def get_latest_kbar(self) -> Optional[Kbar]:
-        """获取最新的K线数据"""
+        """获取最新的K线数据（O(1)）"""
+        self._sync()
         if self.kbar_list:
-            return max(self.kbar_list, key=lambda x: x.ts)
+            return self.kbar_list[-1]
         return None
     
     def filter_by_time_range(self, start_time: datetime.datetime, end_time: datetime.datetime) -> 'KbarSeries':
-        """按时间范围过滤"""
-        filtered_kbars = [
-            kbar for kbar in self.kbar_list 
-            if start_time <= kbar.ts <= end_time
+        """按时间范围过滤（包含边界），二分查找后直接切片"""
+        self._sync()
+        start = bisect.bisect_left(self._ts_list, start_time)
+        end = bisect.bisect_right(self._ts_list, end_time)
+        return self._from_sorted(self.kbar_list[start:end], self._ts_list[start:end])
+    
+    def _from_sorted(self, kbar_list: List[Kbar], ts_list: list) -> 'KbarSeries':
+        # 已知有序的切片，跳过顺序检查
+        series = KbarSeries.__new__(KbarSeries)
+        series.kbar_series_key = self.kbar_series_key
+        series.kbar_list = kbar_list
+        series._ts_list = ts_list
+        return series
+
+    @classmethod
+    def from_dataframe(cls, df, key) -> 'KbarSeries':
+        """
+        从pandas DataFrame创建KbarSeries（按列转换，不逐个元素解析）
+        :param df: 以DatetimeIndex为索引或包含ts列的DataFrame，
+                   需要 open, high, low, close 列，volume, amount 列缺失时为0
+        :param key: KbarSeriesKey、[symbol, exchange, period] 或字典
+        """
+        key, ts_index = _dataframe_key_and_ts(df, key)
+        length = len(df)
+        values = [
+            df[name].to_numpy(dtype=float).tolist() if name in df.columns else [0.0] * length
+            for name in KBAR_VALUE_COLUMNS
         ]
-        return KbarSeries(self.kbar_series_key, filtered_kbars)
+        kbar_list = list(map(Kbar, ts_index.to_pydatetime().tolist(), *values))
+        return cls(key, kbar_list)
+
+    def to_frame(self):
+        """
+        转换为以DatetimeIndex（ts）为索引的pandas DataFrame，列为 open, high, low, close, volume, amount
+        """
+        pd = _require_pandas()
+        kbar_list = self.kbar_list
+        data = {name: [getattr(kbar, name) for kbar in kbar_list] for name in KBAR_VALUE_COLUMNS}
+        index = pd.DatetimeIndex([kbar.ts for kbar in kbar_list], name="ts")
+        frame = pd.DataFrame(data, index=index, columns=list(KBAR_VALUE_COLUMNS))
+        frame.attrs["key"] = (self.kbar_series_key.symbol, self.kbar_series_key.exchange,
+                              self.kbar_series_key.period)
+        return frame
 
 class KbarSeriesGanZhi:
-    def __init__(self, kbar_series_key: KbarSeriesKey, ganzhi_list: List[str]):
+    __slots__ = ("kbar_series_key", "ganzhi_list", "ts_list")
+
+    def __init__(self, kbar_series_key: KbarSeriesKey, ganzhi_list: List[str],
+                 ts_list: Optional[List[datetime.datetime]] = None):
         self.kbar_series_key = kbar_series_key
         self.ganzhi_list = ganzhi_list
+        # 与ganzhi_list一一对应的K线时间，由计算函数填充，为None时表示未记录
+        self.ts_list = ts_list
     
     def get_key(self):
         return self.kbar_series_key
@@ -112,12 +297,44 @@ class KbarSeriesGanZhi:
     def get_ganzhi_list(self):
         return self.ganzhi_list
     
+    def get_ts_list(self):
+        return self.ts_list
+    
     def get_length(self):
         return len(self.ganzhi_list)
     
-    def add_ganzhi(self, ganzhi: str):
+    def add_ganzhi(self, ganzhi: str, ts: Optional[datetime.datetime] = None):
         """添加干支数据"""
         self.ganzhi_list.append(ganzhi)
+        if self.ts_list is not None:
+            self.ts_list.append(ts)
+    
+    def to_frame(self, kbar_series: Optional[KbarSeries] = None):
+        """
+        转换为pandas DataFrame（按列构建）
+        索引为K线时间的DatetimeIndex（未记录时间时为RangeIndex），
+        year, month, day, hour 四柱为以六十甲子为类别的Categorical列
+        :param kbar_series: 可选，对应的KbarSeries，按时间对齐加入 open, high, low, close, volume, amount 列
+        """
+        pd = _require_pandas()
+        columns = _split_ganzhi_columns(self.ganzhi_list)
+        data = {name: _pillar_categorical(pd, column) for name, column in zip(PILLAR_NAMES, columns)}
+        if self.ts_list is not None:
+            index = pd.DatetimeIndex(self.ts_list, name="ts")
+        else:
+            index = pd.RangeIndex(len(self.ganzhi_list))
+        frame = pd.DataFrame(data, index=index)
+
+        if kbar_series is not None:
+            if self.ts_list is None:
+                raise ValueError("干支序列没有记录K线时间，无法与KbarSeries对齐")
+            kbar_frame = kbar_series.to_frame()
+            kbar_frame = kbar_frame[~kbar_frame.index.duplicated(keep="last")]
+            frame = frame.join(kbar_frame, how="left")
+
+        frame.attrs["key"] = (self.kbar_series_key.symbol, self.kbar_series_key.exchange,
+                              self.kbar_series_key.period)
+        return frame
     
     def info(self):
         return {
@@ -131,8 +348,31 @@ class KbarSeriesGanZhi:
     
 
 class KbarSeriesGanZhiList:
+    # _by_key: (symbol, exchange, period) -> 序列；_by_symbol: symbol -> 序列列表
+    # _indexed: 已建立索引的序列数，直接修改 kbar_series_ganzhi_list 后会自动重建索引
+    __slots__ = ("kbar_series_ganzhi_list", "_by_key", "_by_symbol", "_indexed")
+
     def __init__(self, kbar_series_ganzhi_list: List[KbarSeriesGanZhi] = None):
         self.kbar_series_ganzhi_list = kbar_series_ganzhi_list or []
+        self._rebuild_index()
+    
+    def _rebuild_index(self):
+        self._by_key = {}
+        self._by_symbol = {}
+        self._indexed = 0
+        for kbar_series_ganzhi in self.kbar_series_ganzhi_list:
+            self._index(kbar_series_ganzhi)
+    
+    def _index(self, kbar_series_ganzhi: KbarSeriesGanZhi):
+        key = kbar_series_ganzhi.get_key()
+        # 同一个键出现多次时保留第一个，与按顺序查找的结果一致
+        self._by_key.setdefault((key.symbol, key.exchange, key.period), kbar_series_ganzhi)
+        self._by_symbol.setdefault(key.symbol, []).append(kbar_series_ganzhi)
+        self._indexed += 1
+    
+    def _ensure_index(self):
+        if self._indexed != len(self.kbar_series_ganzhi_list):
+            self._rebuild_index()
     
     def get_kbar_series_ganzhi_list(self):
         return self.kbar_series_ganzhi_list
@@ -142,29 +382,70 @@ class KbarSeriesGanZhiList:
     
     def add_kbar_series_ganzhi(self, kbar_series_ganzhi: KbarSeriesGanZhi):
         """添加K线干支序列"""
+        self._ensure_index()
         self.kbar_series_ganzhi_list.append(kbar_series_ganzhi)
+        self._index(kbar_series_ganzhi)
     
     def find_kbar_series(self, symbol: str, exchange: str, period: str) -> Optional[KbarSeriesGanZhi]:
-        """查找指定的K线序列"""
-        for kbar_series_ganzhi in self.kbar_series_ganzhi_list:
-            key = kbar_series_ganzhi.get_key()
-            if (key.get_symbol() == symbol and 
-                key.get_exchange() == exchange and 
-                key.get_period() == period):
-                return kbar_series_ganzhi
-        return None
+        """查找指定的K线序列（O(1)）"""
+        self._ensure_index()
+        return self._by_key.get((symbol, exchange, period))
     
     def get_all_symbols(self) -> List[str]:
         """获取所有股票代码"""
-        return list(set(series.get_key().get_symbol() for series in self.kbar_series_ganzhi_list))
+        self._ensure_index()
+        return list(self._by_symbol)
     
     def filter_by_symbol(self, symbol: str) -> 'KbarSeriesGanZhiList':
         """按股票代码过滤"""
-        filtered_list = [
-            series for series in self.kbar_series_ganzhi_list
-            if series.get_key().get_symbol() == symbol
-        ]
-        return KbarSeriesGanZhiList(filtered_list)
+        self._ensure_index()
+        return KbarSeriesGanZhiList(list(self._by_symbol.get(symbol, [])))
+    
+    def __getitem__(self, key) -> KbarSeriesGanZhi:
+        """
+        按键或下标获取序列
+        :param key: KbarSeriesKey、(symbol, exchange, period) 或整数下标
+        """
+        if isinstance(key, int):
+            return self.kbar_series_ganzhi_list[key]
+        key = _as_kbar_series_key(key)
+        result = self.find_kbar_series(key.symbol, key.exchange, key.period)
+        if result is None:
+            raise KeyError(key)
+        return result
+    
+    def __contains__(self, key) -> bool:
+        try:
+            key = _as_kbar_series_key(key)
+        except (TypeError, KeyError):
+            return False
+        return self.find_kbar_series(key.symbol, key.exchange, key.period) is not None
+    
+    def __iter__(self):
+        return iter(self.kbar_series_ganzhi_list)
+    
+    def to_frame(self):
+        """
+        把所有序列合并为一个pandas DataFrame（按列构建）
+        索引为K线时间的DatetimeIndex，symbol, exchange, period 和四柱均为Categorical列
+        """
+        pd = _require_pandas()
+        keys = {"symbol": [], "exchange": [], "period": []}
+        ganzhi_list = []
+        ts_list = []
+        for series in self.kbar_series_ganzhi_list:
+            length = series.get_length()
+            key = series.get_key()
+            keys["symbol"].extend([key.symbol] * length)
+            keys["exchange"].extend([key.exchange] * length)
+            keys["period"].extend([key.period] * length)
+            ganzhi_list.extend(series.get_ganzhi_list())
+            ts_list.extend(series.get_ts_list() if series.get_ts_list() is not None else [None] * length)
+
+        data = {name: pd.Categorical(values) for name, values in keys.items()}
+        columns = _split_ganzhi_columns(ganzhi_list)
+        data.update({name: _pillar_categorical(pd, column) for name, column in zip(PILLAR_NAMES, columns)})
+        return pd.DataFrame(data, index=pd.DatetimeIndex(ts_list, name="ts"))
     
     def info(self):
         info_list=[]
@@ -0,0 +1,11 @@
+"""
+XuanXue 基准测试
+
+    python -m benchmarks --size 1m --output results/1.0.0.json
+    python -m benchmarks --memory --memory-sizes 100000,1000000 --output results/memory.json
+    python -m benchmarks --compare results/0.9.0.json results/1.0.0.json
+
+synthetic.py  确定性的合成数据库生成器（N只股票 × M根K线 × 多个周期）
+suite.py      基准测试用例，结果写入JSON便于不同版本之间对比
+memory.py     内存占用基准（tracemalloc 和峰值RSS，按每根K线报告）
+"""
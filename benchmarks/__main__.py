@@ -0,0 +1,114 @@
+"""
+命令行入口
+
+    python -m benchmarks --size 1m --output results/1m.json
+    python -m benchmarks --symbols 50 --bars 2000 --periods 1min,5min,1day --cases db.key.cold,db.key.warm
+    python -m benchmarks --memory --memory-sizes 100000,1000000 --output results/memory.json
+    python -m benchmarks --compare results/old.json results/new.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from .memory import DEFAULT_MEMORY_SIZES, MEMORY_CASES, compare_memory_results, run_memory_suite
+from .suite import CASES, SIZES, compare_results, run_suite
+from .synthetic import DEFAULT_PERIODS, PERIOD_MINUTES
+
+
+def _print_result(name, result):
+    if "skipped" in result:
+        print(f"{name:32s} 跳过: {result['skipped']}", file=sys.stderr)
+        return
+    rate = result["rows_per_second"]
+    print(f"{name:32s} {result['seconds']:10.4f} s  {result['rows']:>10d} 行  "
+          f"{rate if rate is None else round(rate):>12} 行/秒", file=sys.stderr)
+
+
+def _print_memory_point(name, point):
+    rss = point["rss_growth_bytes_per_bar"]
+    print(f"{name:28s} {point['bars']:>10d} 根  保留 {point['retained_bytes_per_bar']:8.1f} B/根  "
+          f"{point['retained_blocks_per_bar']:6.2f} 块/根  峰值 {point['peak_bytes_per_bar']:8.1f} B/根  "
+          f"RSS增长 {'-' if rss is None else f'{rss:.1f}'} B/根", file=sys.stderr)
+
+
+def _compare(old_path, new_path):
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    if old.get("kind") == new.get("kind") == "memory":
+        print(f"{'用例':28s} {'规模':>10s} {'指标':24s} {'旧':>10s} {'新':>10s} {'比例':>8s}")
+        for row in compare_memory_results(old, new):
+            ratio = "-" if row["ratio"] is None else f"{row['ratio']:.2f}x"
+            print(f"{row['case']:28s} {row['size']:>10d} {row['metric']:24s} "
+                  f"{row['old']:10.1f} {row['new']:10.1f} {ratio:>8s}")
+        return
+    if old.get("dataset", {}).get("rows") != new.get("dataset", {}).get("rows"):
+        print("警告: 两次结果的数据规模不同", file=sys.stderr)
+    print(f"{'用例':32s} {'旧(s)':>10s} {'新(s)':>10s} {'加速比':>8s}")
+    for row in compare_results(old, new):
+        speedup = "-" if row["speedup"] is None else f"{row['speedup']:.2f}x"
+        print(f"{row['case']:32s} {row['old_seconds']:10.4f} {row['new_seconds']:10.4f} {speedup:>8s}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="XuanXue 基准测试")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small",
+                        help="预设数据规模: small=2万行, 1m=100万行, 10m=1000万行")
+    parser.add_argument("--symbols", type=int, help="股票数，覆盖 --size")
+    parser.add_argument("--bars", type=int, help="每只股票每个周期的K线数，覆盖 --size")
+    parser.add_argument("--periods", default=",".join(DEFAULT_PERIODS),
+                        help=f"逗号分隔的周期，可选: {','.join(PERIOD_MINUTES)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="热数据用例的重复次数，取最快的一次")
+    parser.add_argument("--cases", help=f"逗号分隔的用例，默认全部: {','.join(CASES)}；"
+                                        f"内存基准: {','.join(MEMORY_CASES)}")
+    parser.add_argument("--all-max-rows", type=int, default=2_000_000,
+                        help="数据库超过该行数时跳过 db.all.warm（读取整个库需要大量内存）")
+    parser.add_argument("--memory", action="store_true", help="运行内存占用基准（tracemalloc 和峰值RSS）")
+    parser.add_argument("--memory-sizes", default=",".join(str(size) for size in DEFAULT_MEMORY_SIZES),
+                        help="内存基准的数据规模（总K线数），逗号分隔")
+    parser.add_argument("--work-dir", help="存放生成的数据库的目录，默认使用临时目录并在结束后删除")
+    parser.add_argument("--output", "-o", help="结果JSON文件，默认输出到标准输出")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="对比两个结果JSON文件")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        _compare(*args.compare)
+        return 0
+
+    symbols, bars = SIZES[args.size]
+    symbols = args.symbols if args.symbols is not None else symbols
+    bars = args.bars if args.bars is not None else bars
+    periods = [period.strip() for period in args.periods.split(",") if period.strip()]
+    cases = [case.strip() for case in args.cases.split(",")] if args.cases else None
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="xuanxue_bench_")
+    try:
+        if args.memory:
+            sizes = [int(size) for size in args.memory_sizes.split(",") if size.strip()]
+            result = run_memory_suite(work_dir, sizes, seed=args.seed, cases=cases, progress=_print_memory_point)
+        else:
+            print(f"生成数据: {symbols} 只股票 × {bars} 根K线 × {len(periods)} 个周期", file=sys.stderr)
+            result = run_suite(work_dir, symbols, bars, periods, seed=args.seed, repeat=args.repeat,
+                               all_max_rows=args.all_max_rows, cases=cases, progress=_print_result)
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"结果已写入: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
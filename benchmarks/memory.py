@@ -0,0 +1,258 @@
+"""
+内存占用基准
+
+每个用例在每个数据规模下各启动两个独立的子进程运行，互不影响：
+    tracemalloc 进程：用例执行后仍被引用的字节数/内存块数（结果本身的表示开销）和执行过程中的峰值字节数
+    RSS 进程：不开启 tracemalloc，记录执行前的RSS和执行过程中的峰值RSS，即操作系统看到的内存增长
+              （Linux上执行前通过 /proc/self/clear_refs 重置峰值，其他平台使用 ru_maxrss，包含准备阶段的峰值）
+
+用例:
+    KbarSeries                  由K线数据构建 KbarSeries
+    KbarSeriesGanZhi            KbarSeriesGanZhi(键, useDB=True) 读取一个序列
+    KbarSeriesGanZhiList.info   对整库结果调用 info()
+    kbarseriesganzhi_none       KbarSeriesGanZhi(None, useDB=True) 读取整个库（整库运行时OOM的路径）
+
+结果按每根K线的字节数/内存块数报告，数据表示的退化可以直接看出。
+"""
+import datetime
+import gc
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+from typing import Callable, Dict, Optional, Sequence
+
+MEMORY_CASES = (
+    "KbarSeries",
+    "KbarSeriesGanZhi",
+    "KbarSeriesGanZhiList.info",
+    "kbarseriesganzhi_none",
+)
+
+DEFAULT_MEMORY_SIZES = (10000, 100000)
+MEMORY_PERIOD = "5min"
+START = "2015-01-01"
+END = "2099-12-31"
+
+
+def _proc_status(field: str) -> Optional[int]:
+    """读取 /proc/self/status 中的内存字段（字节），只支持Linux"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _current_rss() -> Optional[int]:
+    """当前RSS（字节），只支持Linux"""
+    return _proc_status("VmRSS")
+
+
+def _reset_peak_rss() -> bool:
+    """重置进程的峰值RSS（Linux 4.0+），成功时返回True"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss() -> Optional[int]:
+    """进程的峰值RSS（字节），Windows上不可用"""
+    peak = _proc_status("VmHWM")
+    if peak is not None:
+        return peak
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _prepare_case(case: str, db_path: str, symbols: int, bars_per_symbol: int, seed: int):
+    """
+    准备用例，返回 (被测函数, K线数)；准备过程的内存不计入测量
+    """
+    import XuanXue as xx
+    from .synthetic import iter_bars, symbol_keys
+
+    symbol, exchange = symbol_keys(1)[0]
+    session = xx.XuanXueSession(stock_kbar_path=db_path)
+    session.validate(stock_meta=False)
+
+    if case == "KbarSeries":
+        key = xx.KbarSeriesKey(symbol, exchange, MEMORY_PERIOD)
+        return (lambda: xx.KbarSeries(key, [xx.Kbar(*bar) for bar in iter_bars(symbol, MEMORY_PERIOD,
+                                                                                   bars_per_symbol, seed)]),
+                bars_per_symbol)
+    if case == "KbarSeriesGanZhi":
+        key = [symbol, exchange, MEMORY_PERIOD]
+        return lambda: session.KbarSeriesGanZhi(START, END, key), bars_per_symbol
+    if case == "KbarSeriesGanZhiList.info":
+        result = session.KbarSeriesGanZhi(START, END, None)
+        return result.info, symbols * bars_per_symbol
+    if case == "kbarseriesganzhi_none":
+        return lambda: session.KbarSeriesGanZhi(START, END, None), symbols * bars_per_symbol
+    raise ValueError(f"未知的内存用例: {case}，可选: {MEMORY_CASES}")
+
+
+def _measure_tracemalloc(func: Callable) -> Dict:
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot().filter_traces(ignore)
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    gc.collect()
+    after = tracemalloc.take_snapshot().filter_traces(ignore)
+    tracemalloc.stop()
+
+    diff = after.compare_to(before, "filename")
+    retained = {
+        "retained_bytes": sum(stat.size_diff for stat in diff),
+        "retained_blocks": sum(stat.count_diff for stat in diff),
+        "peak_bytes": peak - base,
+    }
+    del result
+    return retained
+
+
+def _measure_rss(func: Callable) -> Dict:
+    gc.collect()
+    peak_reset = _reset_peak_rss()
+    rss_before = _current_rss()
+    result = func()
+    peak = _peak_rss()
+    del result
+    return {
+        "rss_before_bytes": rss_before,
+        "peak_rss_bytes": peak,
+        # 未能重置峰值时，峰值可能来自准备阶段，此值只是执行过程中RSS增长的上界
+        "rss_growth_bytes": peak - rss_before if peak is not None and rss_before is not None else None,
+        "peak_rss_reset": peak_reset,
+    }
+
+
+def _worker(args: Dict) -> Dict:
+    func, bars = _prepare_case(args["case"], args["db_path"], args["symbols"], args["bars_per_symbol"],
+                               args["seed"])
+    measure = _measure_tracemalloc if args["mode"] == "tracemalloc" else _measure_rss
+    result = measure(func)
+    result["bars"] = bars
+    return result
+
+
+def _run_worker(**args) -> Dict:
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [repo_root, env.get("PYTHONPATH")]))
+    completed = subprocess.run([sys.executable, "-m", "benchmarks.memory", json.dumps(args)],
+                               capture_output=True, text=True, cwd=repo_root, env=env)
+    if completed.returncode != 0:
+        raise RuntimeError(f"内存基准子进程失败 ({args['case']}, {args['mode']}):\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _per_bar(value, bars):
+    return value / bars if value is not None and bars else None
+
+
+def run_memory_suite(work_dir: str, sizes: Sequence[int] = DEFAULT_MEMORY_SIZES, symbols: int = 10, seed: int = 0,
+                     cases: Optional[Sequence[str]] = None,
+                     progress: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+    """
+    在多个数据规模下运行内存基准
+    :param sizes: 数据库的总K线数（symbols 只股票平分，单个周期）
+    :param cases: 只运行这些用例，None表示全部
+    :param progress: 每个测量点完成后调用 progress(用例名, 结果)
+    :return: {"results": {用例: [每个规模的结果, ...]}, ...}
+    """
+    import XuanXue as xx
+    from .suite import _environment
+    from .synthetic import generate_kbar_db
+
+    selected = list(MEMORY_CASES if cases is None else cases)
+    unknown = set(selected) - set(MEMORY_CASES)
+    if unknown:
+        raise ValueError(f"未知的内存用例: {sorted(unknown)}，可选: {MEMORY_CASES}")
+    os.makedirs(work_dir, exist_ok=True)
+
+    results = {case: [] for case in selected}
+    for size in sizes:
+        bars_per_symbol = max(1, size // symbols)
+        db_path = os.path.join(work_dir, f"kbar_memory_{size}.db")
+        generate_kbar_db(db_path, symbols, bars_per_symbol, (MEMORY_PERIOD,), seed)
+        xx.backfill_pillars(db_path, chunk_size=50000)      # 热库：只测读取和表示，不含写回
+        try:
+            for case in selected:
+                args = dict(case=case, db_path=db_path, symbols=symbols, bars_per_symbol=bars_per_symbol, seed=seed)
+                traced = _run_worker(mode="tracemalloc", **args)
+                rss = _run_worker(mode="rss", **args)
+                bars = traced["bars"]
+                point = {
+                    "size": size,
+                    "bars": bars,
+                    "retained_bytes": traced["retained_bytes"],
+                    "retained_bytes_per_bar": _per_bar(traced["retained_bytes"], bars),
+                    "retained_blocks_per_bar": _per_bar(traced["retained_blocks"], bars),
+                    "peak_bytes": traced["peak_bytes"],
+                    "peak_bytes_per_bar": _per_bar(traced["peak_bytes"], bars),
+                    "peak_rss_bytes": rss["peak_rss_bytes"],
+                    "rss_growth_bytes": rss["rss_growth_bytes"],
+                    "rss_growth_bytes_per_bar": _per_bar(rss["rss_growth_bytes"], bars),
+                    "peak_rss_reset": rss["peak_rss_reset"],
+                }
+                results[case].append(point)
+                if progress is not None:
+                    progress(case, point)
+        finally:
+            os.remove(db_path)
+
+    return {
+        "schema": 1,
+        "kind": "memory",
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": _environment(),
+        "dataset": {"sizes": list(sizes), "symbols": symbols, "period": MEMORY_PERIOD, "seed": seed},
+        "results": results,
+    }
+
+
+def compare_memory_results(old: Dict, new: Dict) -> list:
+    """
+    对比两次内存基准结果中相同规模的测量点（每根K线的保留字节数和峰值字节数），ratio > 1 表示新版本占用更多内存
+    :return: [{"case", "size", "metric", "old", "new", "ratio"}, ...]
+    """
+    rows = []
+    for case in MEMORY_CASES:
+        old_points = {point["size"]: point for point in old.get("results", {}).get(case, [])}
+        for point in new.get("results", {}).get(case, []):
+            old_point = old_points.get(point["size"])
+            if old_point is None:
+                continue
+            for metric in ("retained_bytes_per_bar", "peak_bytes_per_bar"):
+                old_value, new_value = old_point[metric], point[metric]
+                rows.append({
+                    "case": case,
+                    "size": point["size"],
+                    "metric": metric,
+                    "old": old_value,
+                    "new": new_value,
+                    "ratio": new_value / old_value if old_value else None,
+                })
+    return rows
+
+
+if __name__ == "__main__":
+    # 子进程入口：参数为JSON，结果JSON输出到标准输出的最后一行
+    print(json.dumps(_worker(json.loads(sys.argv[1]))))
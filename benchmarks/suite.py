@@ -0,0 +1,264 @@
+"""
+基准测试用例
+
+run_suite() 生成合成数据库后依次运行各用例，返回可直接写入JSON的结果：
+
+    calculator.DateTimeGanZhi        逐个计算日期时间字符串的干支
+    calculator.pillar_fields_batch   批量计算K线时间的干支字段（导入、回填使用的路径）
+    db.key.cold / db.key.warm        KbarSeriesGanZhi(键, useDB=True)：冷库（干支缺失，计算并写回）/ 热库
+    db.many.warm                     KbarSeriesGanZhiMany 批量查询
+    backfill                         backfill_pillars 回填全部干支的吞吐量
+    db.all.warm                      KbarSeriesGanZhi(None, useDB=True)，读取整个库，超过 all_max_rows 行时跳过
+    nodb.cold / nodb.warm            KbarSeriesGanZhi(KbarSeries, useDB=False)：首次（插入数据库）/ 再次（记录已存在）
+    onboard.cold / onboard.warm      OnBoardDateGanZhi 批量查询：首次（计算并保存）/ 再次（直接读取）
+
+冷/热指数据库中的干支是否已经计算过，不涉及操作系统的文件缓存。
+"""
+import datetime
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import XuanXue as xx
+from XuanXue.xuanxue.core.ganzhi_calculator import calculate_pillar_fields_batch
+
+from .synthetic import (
+    DEFAULT_PERIODS,
+    generate_kbar_db,
+    generate_stock_meta_db,
+    iter_bars,
+    make_kbar_series,
+    symbol_keys,
+)
+
+# 预设数据规模：(股票数, 每只股票每个周期的K线数)，默认两个周期
+SIZES = {
+    "small": (20, 500),         # 2万行
+    "1m": (100, 5000),          # 100万行
+    "10m": (500, 10000),        # 1000万行
+}
+
+CASES = (
+    "calculator.DateTimeGanZhi",
+    "calculator.pillar_fields_batch",
+    "db.key.cold",
+    "db.key.warm",
+    "db.many.warm",
+    "backfill",
+    "db.all.warm",
+    "nodb.cold",
+    "nodb.warm",
+    "onboard.cold",
+    "onboard.warm",
+)
+
+START = "2015-01-01"
+END = "2099-12-31"
+RESULT_SCHEMA = 1
+
+
+def _time_once(func: Callable) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def _result(times: List[float], rows: int) -> Dict:
+    best = min(times)
+    return {
+        "seconds": best,
+        "median_seconds": statistics.median(times),
+        "runs": len(times),
+        "rows": rows,
+        "rows_per_second": rows / best if best > 0 else None,
+    }
+
+
+def _repeat(func: Callable, repeat: int) -> List[float]:
+    return [_time_once(func) for _ in range(repeat)]
+
+
+def _environment() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "xuanxue_version": xx.__version__,
+        "git_commit": commit or None,
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "sqlite_version": sqlite3.sqlite_version,
+    }
+
+
+def run_suite(work_dir: str, symbols: int, bars: int, periods: Sequence[str] = DEFAULT_PERIODS, seed: int = 0,
+              repeat: int = 3, sample_symbols: int = 10, calculator_rows: int = 20000,
+              all_max_rows: int = 2_000_000, cases: Optional[Sequence[str]] = None,
+              progress: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+    """
+    生成数据并运行基准测试
+    :param work_dir: 存放生成的数据库的目录
+    :param sample_symbols: 按键查询的用例使用的股票数（每只股票查询全部周期）
+    :param calculator_rows: 计算器用例计算的时间个数
+    :param all_max_rows: 数据库超过该行数时跳过读取整个库的用例
+    :param cases: 只运行这些用例，None表示全部
+    :param progress: 每个用例完成后调用 progress(用例名, 结果)
+    """
+    selected = set(CASES if cases is None else cases)
+    unknown = selected - set(CASES)
+    if unknown:
+        raise ValueError(f"未知的用例: {sorted(unknown)}，可选: {CASES}")
+    os.makedirs(work_dir, exist_ok=True)
+    results: Dict[str, Dict] = {}
+
+    def record(name: str, result: Dict):
+        results[name] = result
+        if progress is not None:
+            progress(name, result)
+
+    base_db = os.path.join(work_dir, "kbar_base.db")
+    generate_seconds = time.perf_counter()
+    total_rows = generate_kbar_db(base_db, symbols, bars, periods, seed)
+    generate_seconds = time.perf_counter() - generate_seconds
+
+    keys = [[symbol, exchange, period] for symbol, exchange in symbol_keys(min(sample_symbols, symbols))
+            for period in periods]
+
+    # ---- 干支计算器 ----
+    calculator_count = min(calculator_rows, total_rows)
+    datetimes = []
+    for symbol, _ in symbol_keys(symbols):
+        for period in periods:
+            datetimes.extend(bar[0] for bar in iter_bars(symbol, period, min(bars, calculator_count), seed))
+            if len(datetimes) >= calculator_count:
+                break
+        if len(datetimes) >= calculator_count:
+            break
+    datetimes = datetimes[:calculator_count]
+
+    if "calculator.DateTimeGanZhi" in selected:
+        strings = [ts.strftime("%Y/%m/%d %H:%M:%S") for ts in datetimes]
+
+        def calculate_strings():
+            for value in strings:
+                xx.DateTimeGanZhi(value)
+        record("calculator.DateTimeGanZhi", _result(_repeat(calculate_strings, repeat), len(strings)))
+
+    if "calculator.pillar_fields_batch" in selected:
+        record("calculator.pillar_fields_batch",
+               _result(_repeat(lambda: calculate_pillar_fields_batch(datetimes), repeat), len(datetimes)))
+
+    # ---- useDB=True，按键查询 ----
+    if selected & {"db.key.cold", "db.key.warm", "db.many.warm"}:
+        key_db = os.path.join(work_dir, "kbar_key.db")
+        shutil.copyfile(base_db, key_db)
+        with xx.XuanXueSession(stock_kbar_path=key_db) as session:
+            returned = [0]
+
+            def read_keys():
+                returned[0] = sum(session.KbarSeriesGanZhi(START, END, key).get_length() for key in keys)
+
+            cold = _time_once(read_keys)
+            if "db.key.cold" in selected:
+                record("db.key.cold", _result([cold], returned[0]))
+            if "db.key.warm" in selected:
+                record("db.key.warm", _result(_repeat(read_keys, repeat), returned[0]))
+            if "db.many.warm" in selected:
+                record("db.many.warm", _result(
+                    _repeat(lambda: session.KbarSeriesGanZhiMany(START, END, keys), repeat), returned[0]))
+        os.remove(key_db)
+
+    # ---- 回填，以及回填后读取整个库 ----
+    if selected & {"backfill", "db.all.warm"}:
+        backfill_db = os.path.join(work_dir, "kbar_backfill.db")
+        shutil.copyfile(base_db, backfill_db)
+        stats = {}
+        seconds = _time_once(lambda: stats.update(xx.backfill_pillars(backfill_db, chunk_size=50000)))
+        if "backfill" in selected:
+            record("backfill", _result([seconds], stats.get("updated", 0)))
+
+        if "db.all.warm" in selected:
+            if total_rows > all_max_rows:
+                record("db.all.warm", {"skipped": f"数据库 {total_rows} 行，超过 all_max_rows={all_max_rows}"})
+            else:
+                with xx.XuanXueSession(stock_kbar_path=backfill_db) as session:
+                    record("db.all.warm", _result(
+                        _repeat(lambda: session.KbarSeriesGanZhi(START, END, None), repeat), total_rows))
+        os.remove(backfill_db)
+
+    # ---- useDB=False ----
+    if selected & {"nodb.cold", "nodb.warm"}:
+        nodb_db = os.path.join(work_dir, "kbar_nodb.db")
+        generate_kbar_db(nodb_db, 0, 0, periods, seed)
+        symbol, exchange = symbol_keys(1)[0]
+        series = make_kbar_series(symbol, exchange, periods[0], bars, seed)
+        with xx.XuanXueSession(stock_kbar_path=nodb_db) as session:
+            compute = lambda: session.KbarSeriesGanZhi(START, END, series, useDB=False)
+            cold = _time_once(compute)
+            if "nodb.cold" in selected:
+                record("nodb.cold", _result([cold], series.get_length()))
+            if "nodb.warm" in selected:
+                record("nodb.warm", _result(_repeat(compute, repeat), series.get_length()))
+        os.remove(nodb_db)
+
+    # ---- OnBoardDateGanZhi ----
+    if selected & {"onboard.cold", "onboard.warm"}:
+        meta_db = os.path.join(work_dir, "stock_meta.db")
+        stock_symbols = generate_stock_meta_db(meta_db, symbols, seed)
+        with xx.XuanXueSession(stock_meta_path=meta_db) as session:
+            lookup = lambda: [session.OnBoardDateGanZhi(symbol) for symbol in stock_symbols]
+            cold = _time_once(lookup)
+            if "onboard.cold" in selected:
+                record("onboard.cold", _result([cold], len(stock_symbols)))
+            if "onboard.warm" in selected:
+                record("onboard.warm", _result(_repeat(lookup, repeat), len(stock_symbols)))
+        os.remove(meta_db)
+
+    os.remove(base_db)
+    return {
+        "schema": RESULT_SCHEMA,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": _environment(),
+        "dataset": {
+            "symbols": symbols,
+            "bars": bars,
+            "periods": list(periods),
+            "seed": seed,
+            "rows": total_rows,
+            "generate_seconds": generate_seconds,
+        },
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare_results(old: Dict, new: Dict) -> List[Dict]:
+    """
+    对比两次基准结果，speedup > 1 表示新结果更快
+    :return: [{"case", "old_seconds", "new_seconds", "speedup"}, ...]
+    """
+    rows = []
+    for case in CASES:
+        old_result = old.get("results", {}).get(case, {})
+        new_result = new.get("results", {}).get(case, {})
+        if "seconds" not in old_result or "seconds" not in new_result:
+            continue
+        old_seconds, new_seconds = old_result["seconds"], new_result["seconds"]
+        rows.append({
+            "case": case,
+            "old_seconds": old_seconds,
+            "new_seconds": new_seconds,
+            "speedup": old_seconds / new_seconds if new_seconds > 0 else None,
+        })
+    return rows
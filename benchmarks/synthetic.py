@@ -0,0 +1,151 @@
+"""
+合成基准数据
+
+generate_kbar_db(db_path, symbols, bars, periods)   生成 kbar_data 数据库，干支字段为空（冷数据库）
+generate_stock_meta_db(db_path, count)               生成 stock_meta 数据库，干支字段为空
+make_kbar_series(symbol, exchange, period, bars)     生成内存中的 KbarSeries，与数据库中的同名序列数据相同
+
+相同的参数和 seed 总是生成完全相同的数据，不同版本的基准结果可以直接对比
+"""
+import datetime
+import os
+import random
+import sqlite3
+import zlib
+from typing import Iterator, Sequence, Tuple
+
+from XuanXue import Kbar, KbarSeries, KbarSeriesKey
+from XuanXue.xuanxue.core.database import create_kbar_table
+
+# 周期 -> 分钟数
+PERIOD_MINUTES = {
+    "1min": 1,
+    "5min": 5,
+    "15min": 15,
+    "30min": 30,
+    "1h": 60,
+    "1day": 24 * 60,
+}
+
+DEFAULT_PERIODS = ("5min", "1day")
+START_TS = datetime.datetime(2015, 1, 5, 9, 30)
+
+INSERT_SQL = """
+INSERT INTO kbar_data (symbol, exchange, period, ts, open, high, low, close, volume, amount)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def symbol_keys(symbols: int) -> list:
+    """第 i 只股票的 (symbol, exchange)"""
+    return [(f"{600000 + i:06d}", "SH") if i % 2 == 0 else (f"{i:06d}", "SZ") for i in range(symbols)]
+
+
+def _rng(seed: int, *parts) -> random.Random:
+    # 每个序列单独的随机数发生器，序列之间互不影响
+    return random.Random(zlib.crc32(":".join(str(part) for part in (seed,) + parts).encode()))
+
+
+def iter_bars(symbol: str, period: str, bars: int, seed: int = 0) -> Iterator[Tuple]:
+    """
+    生成一个序列的K线 (ts, open, high, low, close, volume, amount)，价格为随机游走
+    """
+    if period not in PERIOD_MINUTES:
+        raise ValueError(f"不支持的周期: {period}，可选: {tuple(PERIOD_MINUTES)}")
+    rng = _rng(seed, symbol, period)
+    step = datetime.timedelta(minutes=PERIOD_MINUTES[period])
+    price = rng.uniform(5.0, 100.0)
+    ts = START_TS
+    for _ in range(bars):
+        open_price = price
+        close_price = max(0.01, open_price * (1.0 + rng.gauss(0.0, 0.01)))
+        high = max(open_price, close_price) * (1.0 + rng.random() * 0.005)
+        low = min(open_price, close_price) * (1.0 - rng.random() * 0.005)
+        volume = rng.randint(100, 100000)
+        yield (ts, round(open_price, 2), round(high, 2), round(low, 2), round(close_price, 2),
+               volume, round(volume * close_price, 2))
+        price = close_price
+        ts += step
+
+
+def generate_kbar_db(db_path: str, symbols: int, bars: int, periods: Sequence[str] = DEFAULT_PERIODS,
+                     seed: int = 0, chunk_size: int = 50000) -> int:
+    """
+    生成 symbols × bars × len(periods) 行的 kbar_data 数据库，干支字段为空
+    :param db_path: 数据库路径，已存在时覆盖
+    :param bars: 每只股票每个周期的K线数
+    :return: 写入的行数
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=MEMORY")
+        conn.execute("PRAGMA synchronous=OFF")
+        create_kbar_table(conn)
+
+        rows = 0
+        chunk = []
+        for symbol, exchange in symbol_keys(symbols):
+            for period in periods:
+                for ts, open_price, high, low, close_price, volume, amount in iter_bars(symbol, period, bars, seed):
+                    chunk.append((symbol, exchange, period, ts.isoformat(),
+                                  open_price, high, low, close_price, volume, amount))
+                    if len(chunk) >= chunk_size:
+                        with conn:
+                            conn.executemany(INSERT_SQL, chunk)
+                        rows += len(chunk)
+                        chunk = []
+        if chunk:
+            with conn:
+                conn.executemany(INSERT_SQL, chunk)
+            rows += len(chunk)
+        conn.execute("ANALYZE")
+        return rows
+    finally:
+        conn.close()
+
+
+def generate_stock_meta_db(db_path: str, count: int, seed: int = 0) -> list:
+    """
+    生成 stock_meta 数据库，上市日期在1990-2023年之间，干支字段为空
+    :return: 股票代码列表（如 600000.SH）
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    rng = _rng(seed, "stock_meta")
+    first_day = datetime.date(1990, 12, 19)
+    span = (datetime.date(2023, 12, 29) - first_day).days
+    records = []
+    for symbol, exchange in symbol_keys(count):
+        list_date = first_day + datetime.timedelta(days=rng.randrange(span))
+        records.append((f"{symbol}.{exchange}", f"股票{symbol}", exchange, list_date.strftime("%Y%m%d")))
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("""
+            CREATE TABLE stock_meta (
+                symbol TEXT PRIMARY KEY,
+                name TEXT,
+                exchange TEXT,
+                list_date TEXT,
+                年干 TEXT,
+                年支 TEXT,
+                月干 TEXT,
+                月支 TEXT,
+                日干 TEXT,
+                日支 TEXT
+            )
+        """)
+        with conn:
+            conn.executemany("INSERT INTO stock_meta (symbol, name, exchange, list_date) VALUES (?, ?, ?, ?)",
+                             records)
+    finally:
+        conn.close()
+    return [record[0] for record in records]
+
+
+def make_kbar_series(symbol: str, exchange: str, period: str, bars: int, seed: int = 0) -> KbarSeries:
+    """生成内存中的 KbarSeries（useDB=False 模式的输入）"""
+    return KbarSeries(KbarSeriesKey(symbol, exchange, period),
+                      [Kbar(*bar) for bar in iter_bars(symbol, period, bars, seed)])
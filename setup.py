@@ -29,7 +29,7 @@ setup(
     long_description=read_readme(),
     long_description_content_type="text/markdown",
     url="https://github.com/yourusername/xuanxue",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
@@ -47,6 +47,12 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=read_requirements(),
+    extras_require={
+        # 可选依赖：列式导入导出
+        'parquet': ['pyarrow'],
+        'numpy': ['numpy'],
+        'pandas': ['pandas'],
+    },
     include_package_data=True,
     package_data={
         'XuanXue': ['*.txt', '*.md'],
@@ -103,4 +103,41 @@ def sample_stocks():
         "600000.SH",
         "600036.SH",
         "301117.SZ"  # 已有干支数据
-    ]
\ No newline at end of file
+    ]
+
+
+@pytest.fixture
+def kbar_db_factory(tmp_path, monkeypatch):
+    """
+    K线数据库工厂，数据库建在 tmp_path 下，测试结束后自动删除
+    kbar_db_factory(series, name="kbar.db", with_pillars=True, configure=False) -> db_path
+        series: {(symbol, exchange, period): {"ts": [...], "open": [...], ..., "amount": [...]}}
+        with_pillars: True 用 ingest_kbar_columns 写入并计算干支；False 只插入OHLCV，干支留空（NULL）
+        configure: True 时把 kbarseriesganzhi 使用的K线数据库路径指向该库（测试结束后恢复）
+    """
+    from XuanXue.xuanxue.core.database import create_kbar_table
+    from XuanXue.xuanxue.core.ingest import ingest_kbar_columns
+
+    def factory(series, name="kbar.db", with_pillars=True, configure=False):
+        db_path = str(tmp_path / name)
+        conn = sqlite3.connect(db_path)
+        create_kbar_table(conn)
+        for (symbol, exchange, period), columns in series.items():
+            if with_pillars:
+                ingest_kbar_columns(columns, symbol=symbol, exchange=exchange, period=period, conn=conn)
+                continue
+            ts = [value.isoformat() if hasattr(value, "isoformat") else value for value in columns["ts"]]
+            conn.executemany("""
+                INSERT INTO kbar_data (symbol, exchange, period, ts, open, high, low, close, volume, amount)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(symbol, exchange, period) + row for row in zip(
+                ts, *(columns[name] for name in ("open", "high", "low", "close", "volume", "amount")))])
+        conn.commit()
+        conn.close()
+
+        if configure:
+            monkeypatch.setattr("XuanXue.xuanxue.core.kbarseriesganzhi.get_stock_kbar_path", lambda: db_path)
+            monkeypatch.setattr("XuanXue.xuanxue.core.kbarseriesganzhi.check_stock_kbar_path", lambda: True)
+        return db_path
+
+    return factory
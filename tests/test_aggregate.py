@@ -0,0 +1,88 @@
+"""
+测试按干支分组的聚合统计
+"""
+import datetime
+import sqlite3
+import pytest
+
+import XuanXue as xx
+from XuanXue.xuanxue.core.ganzhi_calculator import calculate_pillar_fields
+
+DAYS = [datetime.datetime(2023, 8, 21) + datetime.timedelta(days=i) for i in range(5)]
+
+
+def _columns(closes, ts=DAYS):
+    return {"ts": ts, "open": [10.0] * len(ts), "high": [12.0] * len(ts), "low": [9.0] * len(ts),
+            "close": closes, "volume": [100] * len(ts), "amount": [1000.0] * len(ts)}
+
+
+@pytest.fixture
+def kbar_db(kbar_db_factory):
+    """两只股票各5根日K线，另有5根5分钟K线"""
+    return kbar_db_factory({
+        ("600000", "SH", "1day"): _columns([10.0, 11.0, 12.1, 11.0, 11.0]),
+        ("000001", "SH", "1day"): _columns([10.0, 10.0, 10.0, 10.0, 10.0]),
+        ("600000", "SH", "5min"): _columns([10.0] * 5, [datetime.datetime(2023, 8, 21, 9, 30)
+                                                       + datetime.timedelta(minutes=5 * i) for i in range(5)]),
+    })
+
+
+def _day(ts):
+    fields = calculate_pillar_fields(ts)
+    return fields[4] + fields[5]
+
+
+class TestAggregateByPillar:
+    """按干支聚合测试类"""
+
+    def test_day_pillar(self, kbar_db):
+        """测试按日柱聚合收盘到收盘收益率和OHLCV指标"""
+        result = xx.aggregate_by_pillar("day", kbar_db, periods="1day")
+        assert [row["day"] for row in result] == [_day(ts) for ts in DAYS]
+
+        first, second, third = result[:3]
+        assert first["bars"] == 2 and first["return_count"] == 0 and first["return_mean"] is None
+        assert second["return_count"] == 2 and second["return_mean"] == pytest.approx(0.05)
+        assert third["return_sum"] == pytest.approx(0.1)
+        assert third["intrabar_return_mean"] == pytest.approx((0.21 + 0.0) / 2)
+        assert third["range_mean"] == pytest.approx(0.3)
+        assert third["volume_sum"] == 200 and third["amount_mean"] == 1000.0
+
+    def test_filters(self, kbar_db):
+        """测试时间、序列和周期过滤，不同周期分开统计"""
+        result = xx.aggregate_by_pillar("day", kbar_db, "2023-08-22", "2023-08-23")
+        assert [(row["period"], row["bars"]) for row in result] == [("1day", 2), ("1day", 2)]
+        # 时间范围内第一根没有前一根
+        assert [row["return_count"] for row in result] == [0, 2]
+
+        result = xx.aggregate_by_pillar("hour", kbar_db, kbar_series_keys=[["600000", "SH", "5min"]])
+        assert [(row["period"], row["hour"], row["bars"]) for row in result] == [("5min", "癸巳", 5)]
+        assert {row["period"] for row in xx.aggregate_by_pillar("year", kbar_db)} == {"1day", "5min"}
+
+    def test_group_columns_and_shards(self, kbar_db, kbar_db_factory):
+        """测试多维分组、缺失干支和多个数据库合并"""
+        result = xx.aggregate_by_pillar(["year_gan", "day_zhi"], kbar_db, periods=["1day"])
+        assert len(result) == 5 and all(row["year_gan"] == "癸" for row in result)
+
+        other = kbar_db_factory({("600001", "SH", "1day"): _columns([10.0] * 5)}, name="other.db")
+        conn = sqlite3.connect(other)
+        conn.execute("UPDATE kbar_data SET day_gan = NULL, day_zhi = NULL WHERE ts LIKE '2023-08-25%'")
+        conn.commit()
+        conn.close()
+        result = xx.aggregate_by_pillar("day", [kbar_db, other], periods="1day")
+        assert [row["bars"] for row in result] == [3, 3, 3, 3, 2, 1]
+        assert result[-1]["day"] is None
+        assert result[1]["return_count"] == 3 and result[1]["return_mean"] == pytest.approx(0.1 / 3)
+
+    def test_date_only_hour_group(self, kbar_db_factory):
+        """测试只有日期的日K线按时柱分组时归入 None 组"""
+        db_path = kbar_db_factory({("600000", "SH", "1day"): _columns([10.0] * 5, [ts.date().isoformat() for ts in DAYS])},
+                                  name="daily.db")
+        result = xx.aggregate_by_pillar(["hour", "hour_gan"], db_path)
+        assert [(row["hour"], row["hour_gan"], row["bars"]) for row in result] == [(None, None, 5)]
+
+    def test_invalid_group_by(self, kbar_db):
+        """测试不支持的分组列"""
+        for group_by in ("minute", "day; DROP TABLE kbar_data", [], ["day", "day"]):
+            with pytest.raises(ValueError):
+                xx.aggregate_by_pillar(group_by, kbar_db)
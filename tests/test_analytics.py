@@ -0,0 +1,119 @@
+"""
+测试按干支分组的收益率统计
+"""
+import datetime
+import sqlite3
+import pytest
+
+import XuanXue as xx
+from XuanXue.xuanxue.config import gan, zhi
+from XuanXue.xuanxue.core.ganzhi_calculator import calculate_pillar_fields
+from XuanXue.xuanxue.core.kbar_query import pillar_code_sql
+from XuanXue.xuanxue.utils.ganzhi_codes import encode_ganzhi
+
+np = pytest.importorskip("numpy")
+
+DAYS = [datetime.datetime(2023, 8, 21) + datetime.timedelta(days=i) for i in range(5)]
+CLOSES = {"600000": [10.0, 11.0, 12.1, 11.0, 11.0], "000001": [10.0] * 5}
+
+
+@pytest.fixture
+def kbar_db(kbar_db_factory):
+    """两只股票各5根日K线"""
+    return kbar_db_factory({
+        (symbol, "SH", "1day"): {"ts": DAYS, "open": closes, "high": closes, "low": closes, "close": closes,
+                                 "volume": [100] * 5, "amount": [1000.0] * 5}
+        for symbol, closes in CLOSES.items()
+    })
+
+
+class TestPillarReturnStats:
+    """干支收益率统计测试类"""
+
+    def test_forward_returns(self):
+        """测试向前收益率不跨越序列边界"""
+        returns = xx.forward_returns([10.0, 11.0, 0.0, 5.0, 6.0], lengths=[3, 2])
+        assert returns[0] == pytest.approx(0.1)
+        assert np.isnan(returns[1:3]).all()         # 收盘价为0，以及序列最后一根
+        assert returns[3] == pytest.approx(0.2) and np.isnan(returns[4])
+        assert np.isnan(xx.forward_returns([1.0, 2.0, 3.0], horizon=2)[1:]).all()
+        with pytest.raises(ValueError):
+            xx.forward_returns([1.0, 2.0], lengths=[1])
+
+    def test_group_stats(self):
+        """测试个数、均值、方差、胜率，以及组合分组、天干分组和缺失序号"""
+        close = np.array([10.0, 11.0, 9.9, 9.9, 10.0])
+        codes = {"day": np.array([0, 0, 1, -1, 2], dtype=np.int8),
+                 "hour": np.array([5, 6, 5, 5, 5], dtype=np.int8)}
+        stats = xx.pillar_return_stats(close, codes, groups=("day", ("day", "hour"), "day_gan"))
+
+        day = stats["day"]
+        assert day.count.shape == (60,) and day.count[:3].tolist() == [2, 1, 0]
+        assert day.mean[0] == pytest.approx((0.1 - 0.1) / 2)
+        assert day.var[0] == pytest.approx(0.02)
+        assert day.hit_rate[0] == 0.5 and np.isnan(day.var[1]) and np.isnan(day.mean[2])
+
+        combo = stats["day+hour"]
+        assert combo.count.shape == (60, 60) and combo.count[0, 5] == 1 and combo.count[0, 6] == 1
+        assert [row["hour"] for row in combo.to_rows()] == ["己巳", "庚午", "己巳"]
+        assert stats["day_gan"].count.shape == (10,) and stats["day_gan"].to_rows()[0]["day_gan"] == "甲"
+
+        with pytest.raises(ValueError):
+            xx.pillar_return_stats(close, codes, groups=("minute",))
+        with pytest.raises(ValueError):
+            xx.pillar_return_stats(close, codes, groups=(("year", "month", "day", "hour"),))
+
+    def test_from_database(self, kbar_db):
+        """测试从数据库读取多个序列后一次计算"""
+        arrays = xx.load_pillar_arrays(kbar_db, periods="1day")
+        assert [key.symbol for key in arrays["keys"]] == ["000001", "600000"]
+        assert arrays["lengths"].tolist() == [5, 5]
+        assert arrays["close"][5:].tolist() == CLOSES["600000"]
+        assert xx.load_pillar_arrays(kbar_db, periods="5min")["close"].size == 0
+
+        stats = xx.pillar_return_stats(arrays["close"], arrays["pillar_codes"], arrays["lengths"])
+        rows = stats["day"].to_rows()
+        assert [row["count"] for row in rows] == [2, 2, 2, 2]
+        assert rows[0]["mean"] == pytest.approx(0.05) and rows[0]["hit_rate"] == 0.5
+        assert rows[3]["mean"] == pytest.approx(0.0)
+
+    def test_from_database_codes(self, kbar_db):
+        """测试SQL中的六十甲子编码、未回填干支的补算以及日K线的空时柱"""
+        conn = sqlite3.connect(kbar_db)
+        conn.execute("UPDATE kbar_data SET day_gan=NULL WHERE symbol='600000' AND ts LIKE '2023-08-22%'")
+        conn.execute("UPDATE kbar_data SET hour_gan='', hour_zhi='' WHERE symbol='000001'")
+        conn.commit()
+        conn.close()
+
+        arrays = xx.load_pillar_arrays(kbar_db, start_datetime="2023-08-22")
+        assert arrays["lengths"].tolist() == [4, 4]
+        assert arrays["pillar_codes"]["hour"][:4].tolist() == [-1] * 4
+        for offset, day in enumerate(DAYS[1:]):
+            fields = calculate_pillar_fields(day)
+            assert arrays["pillar_codes"]["day"][4 + offset] == encode_ganzhi(fields[4], fields[5])
+            assert arrays["pillar_codes"]["hour"][4 + offset] == encode_ganzhi(fields[6], fields[7])
+
+        # 六十甲子全部序号与 encode_ganzhi 一致，阴阳不匹配、空字符串和NULL为 -1
+        conn = sqlite3.connect(":memory:")
+        pairs = [(g, z) for g in gan for z in zhi]
+        invalid = [("", ""), (None, "子"), ("甲子", "子")]
+        codes = [conn.execute(f"SELECT {pillar_code_sql('day')} FROM (SELECT ? AS day_gan, ? AS day_zhi)",
+                              pair).fetchone()[0] for pair in pairs + invalid]
+        assert codes == [encode_ganzhi(g, z) for g, z in pairs] + [-1] * len(invalid)
+
+    def test_from_kbar_series(self, kbar_db, tmp_path):
+        """测试由列式K线序列和K线文件组装数组，结果与数据库一致"""
+        series = xx.ColumnarKbarSeries(xx.KbarSeriesKey("600000", "SH", "1day"), DAYS,
+                                       CLOSES["600000"], CLOSES["600000"], CLOSES["600000"], CLOSES["600000"])
+        xx.export_kbar_files(str(tmp_path / "files"), kbar_db, kbar_series_keys=[["000001", "SH", "1day"]])
+        with xx.open_kbar_file(str(tmp_path / "files" / "000001_SH_1day.xkb")) as kbar_file:
+            arrays = xx.kbar_series_pillar_arrays([kbar_file, series])
+            assert arrays["lengths"].tolist() == [5, 5]
+            assert arrays["pillar_codes"]["day"][5] == encode_ganzhi("辛", "亥")
+
+            expected = xx.load_pillar_arrays(kbar_db)
+            for name in ("year", "month", "day", "hour"):
+                assert arrays["pillar_codes"][name].tolist() == expected["pillar_codes"][name].tolist()
+            stats = xx.pillar_return_stats(arrays["close"], arrays["pillar_codes"], arrays["lengths"],
+                                           groups=("hour",))
+            assert stats["hour"].count.sum() == 8
@@ -0,0 +1,143 @@
+"""
+测试asyncio接口
+"""
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import pytest
+
+import XuanXue as xx
+from XuanXue.xuanxue.core import async_api
+from XuanXue.xuanxue.core.database import open_connection, close_connection, set_cancel_event
+
+ENDLESS_QUERY = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT COUNT(*) FROM c"
+
+
+class TestAsyncApi:
+    """asyncio接口测试类"""
+
+    @pytest.fixture
+    def shard_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        xx.set_kbar_shards([os.path.join(temp_dir, f"kbar_{i}.db") for i in range(2)])
+        yield temp_dir
+        xx.clear_kbar_shards()
+        xx.shutdown_async_executor()
+        shutil.rmtree(temp_dir)
+
+    def _insert_series(self, symbol):
+        xx.KbarSeriesGanZhi("2023-08-25 09:00:00", "2023-08-25 12:00:00", {
+            "symbol": symbol,
+            "exchange": "SZ",
+            "period": "1h",
+            "kbar": [
+                ["2023-08-25 09:30:00", 20.0, 20.5, 19.8, 20.2, 500000, 10100000],
+                ["2023-08-25 10:30:00", 20.2, 20.8, 20.0, 20.6, 600000, 12360000],
+            ]
+        }, useDB=False)
+
+    def test_concurrent_queries(self, shard_dir):
+        """测试并发查询多个键"""
+        symbols = ["TEST001", "TEST002", "TEST003"]
+        for symbol in symbols:
+            self._insert_series(symbol)
+
+        async def main():
+            return await asyncio.gather(*[
+                xx.KbarSeriesGanZhiAsync("2023-08-25 09:00:00", "2023-08-25 12:00:00",
+                                         [symbol, "SZ", "1h"], useDB=True)
+                for symbol in symbols
+            ])
+
+        results = asyncio.run(main())
+        assert [result.get_key().get_symbol() for result in results] == symbols
+        assert all(result.get_length() == 2 for result in results)
+
+    def test_datetime_ganzhi_async(self):
+        """测试异步日期干支计算与同步结果一致"""
+        result = asyncio.run(xx.DateTimeGanZhiAsync("2023/10/10 15:30:45"))
+        assert result == xx.DateTimeGanZhi("2023/10/10 15:30:45")
+
+    def test_timeout(self, shard_dir):
+        """测试超时"""
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(async_api._run_in_executor(time.sleep, 0.5, timeout=0.05))
+
+    def test_timeout_interrupts_sql(self, shard_dir):
+        """测试超时后工作线程中的SQL被中断，线程可以继续处理后续请求"""
+        xx.set_async_max_workers(1)
+        interrupted = threading.Event()
+
+        def endless_query():
+            conn = open_connection(":memory:")
+            try:
+                conn.execute(ENDLESS_QUERY).fetchone()
+            except sqlite3.OperationalError:
+                interrupted.set()
+                raise
+            finally:
+                close_connection(conn)
+
+        async def main():
+            with pytest.raises(asyncio.TimeoutError):
+                await async_api._run_in_executor(endless_query, timeout=0.1)
+            return await xx.DateTimeGanZhiAsync("2023/10/10", timeout=5)
+
+        assert asyncio.run(main()) == xx.DateTimeGanZhi("2023/10/10")
+        assert interrupted.is_set()
+
+    def test_timeout_interrupts_fan_out(self, shard_dir, monkeypatch):
+        """测试超时后批量读取的子线程池中的SQL也被中断"""
+        from XuanXue.xuanxue.core import kbarseriesganzhi
+        interrupted = threading.Event()
+
+        def endless_read(db_path, start_datetime, end_datetime, key):
+            conn = open_connection(":memory:")
+            try:
+                conn.execute(ENDLESS_QUERY).fetchone()
+            except sqlite3.OperationalError:
+                interrupted.set()
+                raise
+            finally:
+                close_connection(conn)
+
+        monkeypatch.setattr(kbarseriesganzhi, "kbarseriesganzhi_DB", endless_read)
+        groups = {"a.db": [0], "b.db": [1]}
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(async_api._run_in_executor(kbarseriesganzhi._read_many, groups, [None, None],
+                                                   None, None, timeout=0.1))
+        assert interrupted.wait(5)
+
+    def test_worker_reuses_connection(self, shard_dir):
+        """测试线程池中的线程复用数据库连接"""
+        xx.set_async_max_workers(1)
+
+        def connection_id():
+            conn = open_connection(":memory:")
+            close_connection(conn)
+            return id(conn)
+
+        async def main():
+            first = await async_api._run_in_executor(connection_id)
+            second = await async_api._run_in_executor(connection_id)
+            return first, second
+
+        first, second = asyncio.run(main())
+        assert first == second
+
+    def test_cancel_event_interrupts_query(self):
+        """测试取消信号中断SQL执行"""
+        cancel_event = threading.Event()
+        cancel_event.set()
+        set_cancel_event(cancel_event)
+        try:
+            conn = open_connection(":memory:")
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute(ENDLESS_QUERY).fetchone()
+            close_connection(conn)
+        finally:
+            set_cancel_event(None)
@@ -0,0 +1,135 @@
+"""
+测试干支回填
+"""
+import sqlite3
+import pytest
+
+import XuanXue as xx
+from XuanXue.xuanxue.cli import main
+from XuanXue.xuanxue.core.backfill import backfill_pillars, format_eta
+from XuanXue.xuanxue.core.database import create_kbar_table
+
+
+class TestBackfill:
+    """干支回填测试类"""
+
+    @pytest.fixture
+    def kbar_db(self, tmp_path):
+        db_path = str(tmp_path / "kbar.db")
+        conn = sqlite3.connect(db_path)
+        create_kbar_table(conn)
+        conn.executemany("""
+            INSERT INTO kbar_data (symbol, exchange, period, ts, open, high, low, close, volume, amount)
+            VALUES ('600000', 'SH', '1day', ?, 10.0, 10.5, 9.8, 10.2, 1000, 10000.0)
+        """, [(f"2023-08-{day:02d}T15:00:00",) for day in range(1, 26)])
+        conn.commit()
+        conn.close()
+        return db_path
+
+    def _missing_count(self, db_path):
+        conn = sqlite3.connect(db_path)
+        count = conn.execute("SELECT COUNT(*) FROM kbar_data WHERE year_gan IS NULL").fetchone()[0]
+        conn.close()
+        return count
+
+    def test_backfill_all(self, kbar_db):
+        """测试分块回填所有缺失干支"""
+        progress = []
+        stats = backfill_pillars(kbar_db, chunk_size=10, progress=progress.append)
+
+        assert stats["total"] == 25
+        assert stats["processed"] == 25
+        assert stats["updated"] == 25
+        assert stats["failed"] == 0
+        assert [item["processed"] for item in progress] == [10, 20, 25]
+        assert self._missing_count(kbar_db) == 0
+
+        conn = sqlite3.connect(kbar_db)
+        row = conn.execute("SELECT year_gan, year_zhi, day_gan, day_zhi FROM kbar_data WHERE id=1").fetchone()
+        conn.close()
+        assert row == tuple(xx.DateTimeGanZhi("2023/08/01")[0] + xx.DateTimeGanZhi("2023/08/01")[2])
+
+    def test_resume_from_checkpoint(self, kbar_db):
+        """测试中断后从检查点继续"""
+        def stop_after_first_chunk(stats):
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            backfill_pillars(kbar_db, chunk_size=10, progress=stop_after_first_chunk)
+        assert self._missing_count(kbar_db) == 15
+
+        stats = backfill_pillars(kbar_db, chunk_size=10)
+        assert stats["total"] == 15
+        assert stats["processed"] == 15
+        assert self._missing_count(kbar_db) == 0
+
+        # 已回填完成的库再次运行几乎没有工作
+        stats = backfill_pillars(kbar_db, chunk_size=10)
+        assert stats["processed"] == 0
+
+    def test_rows_before_checkpoint_revisited(self, kbar_db):
+        """测试回填完成后检查点之前又变为NULL的记录在下次运行时被回填"""
+        backfill_pillars(kbar_db, chunk_size=10)
+        conn = sqlite3.connect(kbar_db)
+        conn.execute("UPDATE kbar_data SET year_gan=NULL WHERE id IN (2, 24)")
+        conn.commit()
+        conn.close()
+
+        stats = backfill_pillars(kbar_db, chunk_size=10)
+        assert stats["total"] == 2 and stats["updated"] == 2
+        assert self._missing_count(kbar_db) == 0
+
+    def test_failed_rows_skipped(self, kbar_db):
+        """测试无法计算的记录被跳过，下次运行或restart时重新处理"""
+        conn = sqlite3.connect(kbar_db)
+        conn.execute("UPDATE kbar_data SET ts='invalid' WHERE id=3")
+        conn.commit()
+        conn.close()
+
+        stats = backfill_pillars(kbar_db, chunk_size=10)
+        assert stats["failed"] == 1
+        assert stats["updated"] == 24
+
+        # 一遍完成后检查点被清除，失败的记录下次运行时重新尝试
+        stats = backfill_pillars(kbar_db, chunk_size=10)
+        assert stats["processed"] == 1 and stats["failed"] == 1
+
+        stats = backfill_pillars(kbar_db, chunk_size=10, restart=True)
+        assert stats["processed"] == 1
+
+    def test_backfill_all_shards(self, kbar_db, tmp_path):
+        """测试启用分片存储且未指定db_path时回填每个分片"""
+        shard_path = str(tmp_path / "kbar_1.db")
+        conn = sqlite3.connect(shard_path)
+        create_kbar_table(conn)
+        conn.execute("""
+            INSERT INTO kbar_data (symbol, exchange, period, ts, open, high, low, close, volume, amount)
+            VALUES ('000001', 'SZ', '1day', '2023-08-25T15:00:00', 20.0, 20.5, 19.8, 20.2, 500, 10100.0)
+        """)
+        conn.commit()
+        conn.close()
+
+        xx.set_kbar_shards([kbar_db, shard_path])
+        try:
+            stats = backfill_pillars(chunk_size=10)
+        finally:
+            xx.clear_kbar_shards()
+
+        assert stats["db_path"] == [kbar_db, shard_path]
+        assert [shard["processed"] for shard in stats["shards"]] == [25, 1]
+        assert stats["processed"] == stats["updated"] == 26
+        assert self._missing_count(kbar_db) == 0
+        assert self._missing_count(shard_path) == 0
+
+    def test_format_eta(self):
+        """测试剩余时间估算"""
+        assert format_eta({"total": 7300, "processed": 100, "rows_per_sec": 2.0}) == "01:00:00"
+        assert format_eta({"total": 10, "processed": 0, "rows_per_sec": 0.0}) == "--:--:--"
+
+    def test_cli(self, kbar_db, capsys):
+        """测试命令行回填"""
+        assert main(["backfill", "--db", kbar_db, "--chunk-size", "5"]) == 0
+        output = capsys.readouterr().out
+        assert "条/秒" in output
+        assert "预计剩余" in output
+        assert self._missing_count(kbar_db) == 0
@@ -0,0 +1,64 @@
+"""
+测试基准测试套件（小规模数据，只检查能够运行和结果格式）
+"""
+import json
+import sqlite3
+
+from benchmarks.__main__ import main
+from benchmarks.memory import compare_memory_results, run_memory_suite
+from benchmarks.suite import CASES, compare_results, run_suite
+from benchmarks.synthetic import generate_kbar_db, make_kbar_series
+
+
+class TestBenchmarks:
+    """基准测试套件测试类"""
+
+    def test_generator_deterministic(self, tmp_path):
+        """测试相同参数生成相同的数据"""
+        paths = [str(tmp_path / "a.db"), str(tmp_path / "b.db")]
+        for path in paths:
+            assert generate_kbar_db(path, 3, 10, ("1min", "1day"), seed=7) == 60
+        rows = []
+        for path in paths:
+            conn = sqlite3.connect(path)
+            rows.append(conn.execute("SELECT symbol, exchange, period, ts, open, close, volume FROM kbar_data "
+                                     "ORDER BY id").fetchall())
+            conn.close()
+        assert rows[0] == rows[1]
+        assert make_kbar_series("600000", "SH", "1min", 10, seed=7).get_kbar_list()[-1].close == \
+            next(row[5] for row in reversed(rows[0]) if row[0] == "600000" and row[2] == "1min")
+
+    def test_run_suite(self, tmp_path):
+        """测试全部用例在小数据集上运行并生成可对比的结果"""
+        result = run_suite(str(tmp_path), symbols=2, bars=20, repeat=1, sample_symbols=1, calculator_rows=50)
+        assert result["dataset"]["rows"] == 80
+        assert set(result["results"]) == set(CASES)
+        assert result["results"]["backfill"]["rows"] == 80
+        assert result["results"]["db.key.cold"]["rows"] == 40
+        json.dumps(result)
+        assert [row["speedup"] for row in compare_results(result, result)] == [1.0] * len(CASES)
+
+        skipped = run_suite(str(tmp_path), symbols=2, bars=20, repeat=1, all_max_rows=10, cases=["db.all.warm"])
+        assert "skipped" in skipped["results"]["db.all.warm"]
+
+    def test_cli_output(self, tmp_path, capsys):
+        """测试命令行写入结果文件"""
+        output = str(tmp_path / "result.json")
+        assert main(["--symbols", "1", "--bars", "10", "--repeat", "1", "--cases", "db.key.warm",
+                     "--work-dir", str(tmp_path / "work"), "--output", output]) == 0
+        with open(output, encoding="utf-8") as f:
+            assert list(json.load(f)["results"]) == ["db.key.warm"]
+
+    def test_memory_suite(self, tmp_path):
+        """测试内存基准按每根K线报告，数据规模之间结果相近"""
+        result = run_memory_suite(str(tmp_path), sizes=[200, 400], symbols=2,
+                                  cases=["KbarSeries", "kbarseriesganzhi_none"])
+        assert result["kind"] == "memory"
+        series_points = result["results"]["KbarSeries"]
+        assert [point["bars"] for point in series_points] == [100, 200]
+        for point in series_points + result["results"]["kbarseriesganzhi_none"]:
+            assert point["retained_bytes_per_bar"] > 0
+            assert point["peak_bytes_per_bar"] >= point["retained_bytes_per_bar"] * 0.9
+        # 每根K线至少一个Kbar对象和一个datetime
+        assert all(point["retained_blocks_per_bar"] >= 2 for point in series_points)
+        assert all(row["ratio"] == 1.0 for row in compare_memory_results(result, result))
@@ -0,0 +1,143 @@
+"""
+测试列式存储的K线序列
+"""
+import datetime
+import sqlite3
+import pytest
+from unittest.mock import patch
+
+import XuanXue as xx
+from XuanXue import ColumnarKbarSeries, KbarSeries, KbarSeriesKey, Kbar
+from XuanXue.xuanxue.core.database import create_kbar_table
+
+np = pytest.importorskip("numpy")
+
+KEY = KbarSeriesKey("600000", "SH", "1min")
+
+
+def _make_series(count=10, dtype=None):
+    start = np.datetime64("2023-08-25T09:30:00", "ns")
+    ts = start + np.arange(count) * np.timedelta64(1, "m")
+    prices = 10.0 + np.arange(count) * 0.1
+    return ColumnarKbarSeries(KEY, ts, prices, prices + 0.5, prices - 0.5, prices + 0.2,
+                              np.full(count, 1000.0), np.full(count, 10000.0), dtype=dtype)
+
+
+class TestColumnarKbarSeries:
+    """列式K线序列测试类"""
+
+    def test_basic_access(self):
+        """测试长度、下标访问和 Kbar 视图"""
+        series = _make_series()
+        assert isinstance(series, KbarSeries)
+        assert series.get_length() == len(series) == 10
+
+        kbar = series[1]
+        assert isinstance(kbar, Kbar)
+        assert kbar.ts == datetime.datetime(2023, 8, 25, 9, 31)
+        assert kbar.open == pytest.approx(10.1)
+        assert series[-1].ts == datetime.datetime(2023, 8, 25, 9, 39)
+
+        kbar_list = series.get_kbar_list()
+        assert len(kbar_list) == 10
+        assert [k.ts.minute for k in kbar_list] == list(range(30, 40))
+        assert kbar_list[2].close == pytest.approx(10.4)
+        assert series.get_latest_kbar().ts == datetime.datetime(2023, 8, 25, 9, 39)
+
+    def test_slice_is_view(self):
+        """测试切片共享内存"""
+        series = _make_series()
+        view = series[2:5]
+        assert isinstance(view, ColumnarKbarSeries)
+        assert len(view) == 3
+        assert np.shares_memory(view.get_column("close"), series.get_column("close"))
+        assert view[0].ts == datetime.datetime(2023, 8, 25, 9, 32)
+
+        # 在视图上追加不影响原序列
+        view.add_kbar(Kbar(datetime.datetime(2023, 8, 25, 9, 35), 1.0, 1.0, 1.0, 1.0, 1.0, 1.0))
+        assert len(view) == 4
+        assert series[5].open == pytest.approx(10.5)
+
+    def test_append_chunk(self):
+        """测试按块追加"""
+        series = ColumnarKbarSeries(KEY)
+        assert series.get_latest_kbar() is None
+        for day in range(1, 4):
+            ts = [datetime.datetime(2023, 8, day, 9, 30) + datetime.timedelta(minutes=i) for i in range(500)]
+            series.append_chunk(ts, [1.0] * 500, [2.0] * 500, [0.5] * 500, [1.5] * 500)
+        assert len(series) == 1500
+        assert series[1000].ts == datetime.datetime(2023, 8, 3, 9, 30)
+        assert series[1000].amount == 0.0
+
+        with pytest.raises(ValueError):
+            series.append_chunk(ts, [1.0], [2.0], [0.5], [1.5])
+        with pytest.raises(IndexError):
+            series[1500]
+
+    def test_memory_footprint(self):
+        """测试内存占用"""
+        assert _make_series(1000).nbytes() == 1000 * 56
+        float32 = _make_series(1000, dtype=np.float32)
+        assert float32.nbytes() == 1000 * 32
+        assert float32.get_column("open").dtype == np.float32
+
+    def test_filter_and_convert(self):
+        """测试按时间过滤以及与 KbarSeries 互相转换"""
+        series = _make_series()
+        filtered = series.filter_by_time_range(datetime.datetime(2023, 8, 25, 9, 33),
+                                               datetime.datetime(2023, 8, 25, 9, 35))
+        assert [k.ts.minute for k in filtered.get_kbar_list()] == [33, 34, 35]
+
+        plain = KbarSeries(KEY, list(series.get_kbar_list()))
+        columnar = ColumnarKbarSeries.from_kbar_series(plain)
+        assert np.array_equal(columnar.get_column("ts"), series.get_column("ts"))
+        assert np.allclose(columnar.get_column("high"), series.get_column("high"))
+
+    def test_dataframe_round_trip(self):
+        """测试DataFrame转换"""
+        pd = pytest.importorskip("pandas")
+        frame = _make_series().to_frame()
+        assert isinstance(frame.index, pd.DatetimeIndex)
+        columnar = ColumnarKbarSeries.from_dataframe(frame, KEY)
+        pd.testing.assert_frame_equal(columnar.to_frame(), frame)
+
+    def test_ganzhi_without_db(self, tmp_path):
+        """测试列式序列可直接用于 useDB=False 的干支计算"""
+        series = _make_series(3)
+        plain = KbarSeries(KEY, list(series.get_kbar_list()))
+        db_path = str(tmp_path / "kbar.db")
+        conn = sqlite3.connect(db_path)
+        create_kbar_table(conn)
+        conn.close()
+        with patch('XuanXue.xuanxue.core.kbarseriesganzhi.get_stock_kbar_path', return_value=db_path), \
+             patch('XuanXue.xuanxue.core.kbarseriesganzhi.check_stock_kbar_path', return_value=True):
+            columnar_result = xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", series, useDB=False)
+            plain_result = xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", plain, useDB=False)
+        assert columnar_result.get_ganzhi_list() == plain_result.get_ganzhi_list()
+        assert columnar_result.get_length() == 3
+
+    def test_sorted_invariant(self):
+        """测试追加乱序数据后保持有序，范围过滤返回视图"""
+        series = _make_series(5)
+        earlier = np.array(["2023-08-25T09:00:00", "2023-08-25T09:32:30"], dtype="datetime64[ns]")
+        series.append_chunk(earlier, [1.0, 2.0], [1.0, 2.0], [1.0, 2.0], [1.0, 2.0])
+        minutes = [k.ts.strftime("%H:%M:%S") for k in series.get_kbar_list()]
+        assert minutes == sorted(minutes)
+        assert minutes[0] == "09:00:00"
+        assert series.get_latest_kbar().ts == datetime.datetime(2023, 8, 25, 9, 34)
+
+        view = series.filter_by_time_range(datetime.datetime(2023, 8, 25, 9, 31),
+                                           datetime.datetime(2023, 8, 25, 9, 33))
+        assert [k.ts.strftime("%M:%S") for k in view.get_kbar_list()] == ["31:00", "32:00", "32:30", "33:00"]
+        assert np.shares_memory(view.get_column("ts"), series.get_column("ts"))
+
+    def test_ensure_sorted(self):
+        """测试继承自 KbarSeries 的 ensure_sorted / _sync 可以调用"""
+        series = _make_series(5)
+        series._sync()
+        series.ensure_sorted()
+        assert series.get_length() == 5
+
+        series._ts[:2] = series._ts[1::-1].copy()
+        series.ensure_sorted()
+        assert (np.diff(series.get_column("ts")) >= 0).all()
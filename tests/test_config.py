@@ -48,4 +48,66 @@ class TestConfigManager:
         
         # 应该转换为绝对路径
         assert os.path.isabs(path)
-        assert path.endswith("test.db")
\ No newline at end of file
+        assert path.endswith("test.db")
+
+    def test_config_cached_until_modified(self, tmp_path):
+        """测试配置文件只在修改后重新解析"""
+        from unittest.mock import patch
+        from XuanXue.xuanxue.config.config_manager import StockPathManager
+
+        config_file = str(tmp_path / "config.txt")
+        manager = StockPathManager(config_file)
+        with patch.object(manager, "_read_paths", wraps=manager._read_paths) as read_paths:
+            for _ in range(10):
+                manager.get_path("stock_kbar_path")
+            assert read_paths.call_count == 0
+
+            # 其他进程修改了配置文件
+            with open(config_file, "w", encoding="utf-8") as f:
+                f.write("stock_kbar_path=/data/other_kbar.db\n")
+            assert manager.get_path("stock_kbar_path") == "/data/other_kbar.db"
+            assert read_paths.call_count == 1
+
+    def test_atomic_set_path(self, tmp_path):
+        """测试写配置时保留另一项且不留下临时文件"""
+        from XuanXue.xuanxue.config.config_manager import StockPathManager
+
+        config_file = str(tmp_path / "config.txt")
+        manager = StockPathManager(config_file)
+        assert manager.set_path("stock_meta_path", "/data/meta.db")
+        assert manager.set_path("stock_kbar_path", "/data/kbar.db")
+        assert StockPathManager(config_file).get_path("stock_meta_path") == "/data/meta.db"
+        assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+    def test_overrides(self, tmp_path, monkeypatch):
+        """测试环境变量和进程内覆盖不写配置文件"""
+        from XuanXue.xuanxue.config.config_manager import StockPathManager
+
+        config_file = str(tmp_path / "config.txt")
+        manager = StockPathManager(config_file)
+        manager.set_path("stock_kbar_path", "/data/kbar.db")
+        with open(config_file, "rb") as f:
+            content = f.read()
+
+        monkeypatch.setenv("XUANXUE_STOCK_KBAR_PATH", "/env/kbar.db")
+        assert manager.get_path("stock_kbar_path") == "/env/kbar.db"
+        assert manager.set_path("stock_kbar_path", "/override/kbar.db", persist=False)
+        assert manager.get_path("stock_kbar_path") == "/override/kbar.db"
+        with open(config_file, "rb") as f:
+            assert f.read() == content
+
+        manager.clear_overrides()
+        assert manager.get_path("stock_kbar_path") == "/env/kbar.db"
+        monkeypatch.delenv("XUANXUE_STOCK_KBAR_PATH")
+        assert manager.get_path("stock_kbar_path") == "/data/kbar.db"
+
+    def test_persist_shadowed_by_env(self, tmp_path, monkeypatch, caplog):
+        """测试环境变量已设置时写入配置文件会记录警告"""
+        from XuanXue.xuanxue.config.config_manager import StockPathManager
+
+        manager = StockPathManager(str(tmp_path / "config.txt"))
+        monkeypatch.setenv("XUANXUE_STOCK_KBAR_PATH", "/env/kbar.db")
+        with caplog.at_level("WARNING"):
+            assert manager.set_path("stock_kbar_path", "/data/kbar.db")
+        assert "XUANXUE_STOCK_KBAR_PATH" in caplog.text
+        assert manager.get_path("stock_kbar_path") == "/env/kbar.db"
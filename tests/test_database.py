@@ -0,0 +1,106 @@
+"""
+测试K线数据库公共工具
+"""
+import sqlite3
+import pytest
+
+from XuanXue.xuanxue.core.database import (
+    create_kbar_table,
+    ensure_missing_pillar_index,
+    has_missing_pillars,
+    count_missing_pillars,
+    find_missing_pillar_rows,
+    MISSING_PILLARS_CONDITION,
+    UPDATE_PILLARS_SQL,
+)
+
+FIELDS = ("癸", "卯", "庚", "申", "辛", "巳", "癸", "巳")
+
+
+class TestMissingPillarIndex:
+    """缺失干支部分索引测试类"""
+
+    @pytest.fixture
+    def conn(self):
+        conn = sqlite3.connect(":memory:")
+        create_kbar_table(conn)
+        conn.executemany("""
+            INSERT INTO kbar_data (symbol, exchange, period, ts, open, high, low, close, volume, amount)
+            VALUES ('600000', 'SH', '1h', ?, 10.0, 10.5, 9.8, 10.2, 1000, 10000.0)
+        """, [(f"2023-08-{day:02d}T10:30:00",) for day in range(1, 11)])
+        conn.commit()
+        yield conn
+        conn.close()
+
+    def test_query_uses_partial_index(self, conn):
+        """测试查找缺失干支的查询走部分索引"""
+        for query in [
+            f"SELECT 1 FROM kbar_data WHERE {MISSING_PILLARS_CONDITION} LIMIT 1",
+            f"SELECT id, ts FROM kbar_data WHERE {MISSING_PILLARS_CONDITION} AND id > 0 ORDER BY id",
+        ]:
+            plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query))
+            assert "idx_kbar_missing_pillars" in plan
+
+    def test_find_and_resolve_missing(self, conn):
+        """测试查找缺失记录，回填后索引为空"""
+        assert has_missing_pillars(conn)
+        assert count_missing_pillars(conn) == 10
+
+        rows = find_missing_pillar_rows(conn, after_id=3, limit=4)
+        assert [row[0] for row in rows] == [4, 5, 6, 7]
+
+        conn.executemany(UPDATE_PILLARS_SQL, [FIELDS + (row_id,) for row_id in range(1, 11)])
+        conn.commit()
+        assert not has_missing_pillars(conn)
+        assert find_missing_pillar_rows(conn) == []
+
+    def test_partial_fields_count_as_missing(self, conn):
+        """测试任一干支字段为NULL都算缺失，空字符串不算"""
+        conn.executemany(UPDATE_PILLARS_SQL, [FIELDS[:6] + ("", "") + (row_id,) for row_id in range(1, 11)])
+        conn.execute("UPDATE kbar_data SET hour_zhi=NULL WHERE id=5")
+        conn.commit()
+        assert [row[0] for row in find_missing_pillar_rows(conn)] == [5]
+
+    def test_ensure_index_on_existing_table(self):
+        """测试为旧表补建部分索引"""
+        conn = sqlite3.connect(":memory:")
+        conn.execute("""
+            CREATE TABLE kbar_data (id INTEGER PRIMARY KEY, ts TEXT,
+                year_gan TEXT, year_zhi TEXT, month_gan TEXT, month_zhi TEXT,
+                day_gan TEXT, day_zhi TEXT, hour_gan TEXT, hour_zhi TEXT)
+        """)
+        assert ensure_missing_pillar_index(conn)
+        assert conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name='idx_kbar_missing_pillars'"
+        ).fetchone()
+        conn.close()
+
+    def test_read_path_does_not_create_index(self, tmp_path):
+        """测试读取不创建部分索引，没有索引的旧库逐行检查缺失的干支"""
+        import XuanXue as xx
+        from XuanXue.xuanxue.core.database import KBAR_TABLE_SQL, has_missing_pillar_index
+        from XuanXue.xuanxue.core.kbarseriesganzhi import kbarseriesganzhi_DB, kbarseriesganzhi_none
+
+        db_path = str(tmp_path / "old.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(KBAR_TABLE_SQL)
+        conn.execute("""
+            INSERT INTO kbar_data (symbol, exchange, period, ts, open, high, low, close, volume, amount)
+            VALUES ('600000', 'SH', '1h', '2023-08-25T10:30:00', 10.0, 10.5, 9.8, 10.2, 1000, 10000.0)
+        """)
+        conn.commit()
+        conn.close()
+
+        xx.set_read_only(True)
+        try:
+            result = kbarseriesganzhi_none(db_path, "2023-08-25", "2023-08-25")
+        finally:
+            xx.set_read_only(False)
+        assert result[0].get_ganzhi_list() == ["癸卯-庚申-乙卯-辛巳"]
+
+        series = kbarseriesganzhi_DB(db_path, "2023-08-25", "2023-08-25", ["600000", "SH", "1h"])
+        assert series.get_ganzhi_list() == ["癸卯-庚申-乙卯-辛巳"]
+        conn = sqlite3.connect(db_path)
+        assert not has_missing_pillar_index(conn)
+        assert not has_missing_pillars(conn)      # 非只读时已写回
+        conn.close()
@@ -0,0 +1,105 @@
+"""
+测试pandas DataFrame转换
+"""
+import datetime
+import pytest
+
+import XuanXue as xx
+from XuanXue import KbarSeries, KbarSeriesKey
+from XuanXue.xuanxue.utils import KbarSeriesGanZhi, KbarSeriesGanZhiList
+
+pd = pytest.importorskip("pandas")
+
+
+@pytest.fixture
+def kbar_frame():
+    index = pd.date_range("2023-08-25 09:30:00", periods=4, freq="h", name="ts")
+    return pd.DataFrame({
+        "open": [10.0, 10.2, 10.6, 10.4],
+        "high": [10.5, 10.8, 10.9, 10.7],
+        "low": [9.8, 10.0, 10.3, 10.1],
+        "close": [10.2, 10.6, 10.4, 10.5],
+        "volume": [1000, 1200, 900, 1100],
+        "amount": [10000.0, 12500.0, 9400.0, 11500.0],
+    }, index=index)
+
+
+@pytest.fixture
+def kbar_db(kbar_db_factory):
+    def columns(ts):
+        return {"ts": ts, "open": [10.0] * len(ts), "high": [10.5] * len(ts), "low": [9.8] * len(ts),
+                "close": [10.2] * len(ts), "volume": [1000] * len(ts), "amount": [10000.0] * len(ts)}
+
+    return kbar_db_factory({
+        ("600000", "SH", "1h"): columns(["2023-08-25T09:30:00", "2023-08-25T10:30:00"]),
+        ("000001", "SZ", "1h"): columns(["2023-08-25T09:30:00"]),
+    }, with_pillars=False, configure=True)
+
+
+class TestDataFrame:
+    """DataFrame转换测试类"""
+
+    def test_kbar_series_round_trip(self, kbar_frame):
+        """测试KbarSeries与DataFrame互相转换"""
+        series = KbarSeries.from_dataframe(kbar_frame, ["600000", "SH", "1h"])
+        assert series.get_key() == KbarSeriesKey("600000", "SH", "1h")
+        assert series.get_length() == 4
+        assert series.get_kbar_list()[1].ts == datetime.datetime(2023, 8, 25, 10, 30)
+        assert series.get_kbar_list()[1].close == 10.6
+
+        frame = series.to_frame()
+        pd.testing.assert_frame_equal(frame, kbar_frame.astype(float), check_freq=False)
+        assert frame.attrs["key"] == ("600000", "SH", "1h")
+
+    def test_from_dataframe_ts_column(self, kbar_frame):
+        """测试从ts列创建，缺失volume/amount列时为0"""
+        df = kbar_frame.reset_index()[["ts", "open", "high", "low", "close"]]
+        df["ts"] = df["ts"].dt.strftime("%Y-%m-%d %H:%M:%S")
+        series = KbarSeries.from_dataframe(df, {"symbol": "600000", "exchange": "SH", "period": "1h"})
+        assert series.get_kbar_list()[0].ts == datetime.datetime(2023, 8, 25, 9, 30)
+        assert series.get_kbar_list()[0].amount == 0.0
+
+        with pytest.raises(ValueError):
+            KbarSeries.from_dataframe(df.drop(columns=["close"]), ["600000", "SH", "1h"])
+        with pytest.raises(ValueError):
+            KbarSeries.from_dataframe(df.drop(columns=["ts"]), ["600000", "SH", "1h"])
+
+    def test_ganzhi_to_frame(self, kbar_frame, kbar_db):
+        """测试干支结果转换为DataFrame并对齐OHLCV"""
+        series = KbarSeries.from_dataframe(kbar_frame, ["600000", "SH", "1h"])
+        result = xx.KbarSeriesGanZhi("2023-08-25 09:00:00", "2023-08-25 23:00:00", series, useDB=False)
+
+        frame = result.to_frame(series)
+        assert isinstance(frame.index, pd.DatetimeIndex)
+        assert list(frame.columns) == ["year", "month", "day", "hour",
+                                       "open", "high", "low", "close", "volume", "amount"]
+        assert isinstance(frame["year"].dtype, pd.CategoricalDtype)
+        assert len(frame["day"].cat.categories) == 60
+        assert list(frame.iloc[0][["year", "month", "day", "hour"]]) == \
+            xx.DateTimeGanZhi("2023/08/25 09:30:00")
+        assert frame["close"].tolist() == kbar_frame["close"].tolist()
+
+    def test_db_results_to_frame(self, kbar_db):
+        """测试数据库查询结果携带K线时间"""
+        result = xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", ["600000", "SH", "1h"])
+        assert result.get_ts_list() == [datetime.datetime(2023, 8, 25, 9, 30),
+                                        datetime.datetime(2023, 8, 25, 10, 30)]
+
+        frame = xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", None).to_frame()
+        assert len(frame) == 3
+        assert set(frame["symbol"]) == {"600000", "000001"}
+        assert isinstance(frame["exchange"].dtype, pd.CategoricalDtype)
+        assert frame.index.name == "ts"
+
+    def test_to_frame_without_ts(self):
+        """测试没有记录时间的干支序列"""
+        ganzhi = KbarSeriesGanZhi(KbarSeriesKey("600000", "SH", "1h"), ["癸卯-庚申-丙子-无值"])
+        frame = ganzhi.to_frame()
+        assert isinstance(frame.index, pd.RangeIndex)
+        assert frame["day"].iloc[0] == "丙子"
+        assert pd.isna(frame["hour"].iloc[0])
+        with pytest.raises(ValueError):
+            ganzhi.to_frame(KbarSeries(KbarSeriesKey("600000", "SH", "1h"), []))
+
+        empty = KbarSeriesGanZhiList([]).to_frame()
+        assert len(empty) == 0
@@ -0,0 +1,158 @@
+"""
+测试干支序列的列式导出
+"""
+import sqlite3
+import pytest
+
+import XuanXue as xx
+from XuanXue.xuanxue.cli import main
+from XuanXue.xuanxue.core.database import create_kbar_table
+from XuanXue.xuanxue.core.export import iter_pillar_chunks, export_pillars
+from XuanXue.xuanxue.core.ingest import ingest_kbar_columns
+from XuanXue.xuanxue.utils.ganzhi_codes import GANZHI_CYCLE, MISSING_CODE
+
+
+class TestExport:
+    """列式导出测试类"""
+
+    @pytest.fixture
+    def kbar_db(self, tmp_path):
+        """三个K线序列各20天，前4条记录缺失年干"""
+        db_path = str(tmp_path / "kbar.db")
+        conn = sqlite3.connect(db_path)
+        create_kbar_table(conn)
+        ts_list = [f"2023-08-{day:02d} 10:30:00" for day in range(1, 21)]
+        for symbol in ("600000", "000001", "000002"):
+            ingest_kbar_columns({
+                "ts": ts_list, "open": [10.0] * 20, "high": [10.5] * 20, "low": [9.8] * 20,
+                "close": [10.2] * 20, "volume": [1000] * 20, "amount": [10000.0] * 20,
+            }, symbol=symbol, exchange="SH", period="1h", conn=conn)
+        conn.execute("UPDATE kbar_data SET year_gan=NULL WHERE id <= 4")
+        conn.commit()
+        conn.close()
+        return db_path
+
+    def _expected_codes(self, date_str):
+        return [GANZHI_CYCLE.index(pillar) for pillar in xx.DateTimeGanZhi(date_str)]
+
+    def test_ganzhi_codes(self):
+        """测试六十甲子编码"""
+        assert xx.encode_ganzhi("甲", "子") == 0
+        assert xx.encode_ganzhi("癸", "亥") == 59
+        assert xx.encode_ganzhi("甲", "丑") == MISSING_CODE
+        assert xx.encode_ganzhi(None, "子") == MISSING_CODE
+        assert all(xx.decode_ganzhi(xx.encode_ganzhi(name[0], name[1])) == name for name in GANZHI_CYCLE)
+        assert xx.decode_ganzhi(MISSING_CODE) == ""
+
+    def test_iter_chunks(self, kbar_db):
+        """测试分块读取并补全缺失的干支"""
+        chunks = list(iter_pillar_chunks(kbar_db, chunk_size=7))
+        assert sum(len(chunk["ts"]) for chunk in chunks) == 60
+        assert max(len(chunk["ts"]) for chunk in chunks) == 7
+        assert all(code != MISSING_CODE for chunk in chunks for code in chunk["year"])
+
+        first = chunks[0]
+        assert first["symbol"][0] == "000001"
+        assert [first[name][0] for name in ("year", "month", "day", "hour")] == \
+            self._expected_codes("2023/08/01 10:30:00")
+
+        # 缺失的干支不写回数据库
+        conn = sqlite3.connect(kbar_db)
+        assert conn.execute("SELECT COUNT(*) FROM kbar_data WHERE year_gan IS NULL").fetchone()[0] == 4
+        conn.close()
+
+    def test_time_range_and_keys(self, kbar_db):
+        """测试按时间范围和键过滤"""
+        chunks = list(iter_pillar_chunks(kbar_db, "2023-08-05", "2023-08-06 10:00:00",
+                                         [["600000", "SH", "1h"]]))
+        assert len(chunks) == 1
+        assert chunks[0]["symbol"] == ["600000"]
+        assert chunks[0]["ts"][0].day == 5
+
+    def test_date_only_rows(self, tmp_path):
+        """测试日K线的空时柱导出为 MISSING_CODE，不按0点补算；时柱为NULL时同样不补算"""
+        db_path = str(tmp_path / "daily.db")
+        conn = sqlite3.connect(db_path)
+        create_kbar_table(conn)
+        ingest_kbar_columns({
+            "ts": ["2024-01-02", "2024-01-03"], "open": [10.0] * 2, "high": [10.5] * 2, "low": [9.8] * 2,
+            "close": [10.2] * 2, "volume": [1000] * 2, "amount": [10000.0] * 2,
+        }, symbol="600000", exchange="SH", period="1day", conn=conn)
+        conn.execute("UPDATE kbar_data SET year_gan=NULL, hour_gan=NULL, hour_zhi=NULL WHERE ts='2024-01-03'")
+        conn.commit()
+        conn.close()
+
+        chunk = next(iter_pillar_chunks(db_path))
+        assert chunk["hour"] == [MISSING_CODE, MISSING_CODE]
+        assert chunk["year"][1] == self._expected_codes("2024/01/03 00:00:00")[0]
+
+    def test_export_subsecond_timestamps(self, tmp_path):
+        """测试Parquet/Arrow/NPZ保留毫秒以下的时间"""
+        pa = pytest.importorskip("pyarrow")
+        db_path = str(tmp_path / "tick.db")
+        conn = sqlite3.connect(db_path)
+        create_kbar_table(conn)
+        ingest_kbar_columns({
+            "ts": ["2024-01-02T09:30:00.500000"], "open": [10.0], "high": [10.5], "low": [9.8],
+            "close": [10.2], "volume": [1000], "amount": [10000.0],
+        }, symbol="600000", exchange="SH", period="tick", conn=conn)
+        conn.close()
+
+        path = str(tmp_path / "pillars.arrow")
+        export_pillars(path, db_path)
+        ts = pa.ipc.open_file(path).read_all().column("ts").to_pylist()[0]
+        assert ts.microsecond == 500000
+
+        np = pytest.importorskip("numpy")
+        path = str(tmp_path / "pillars.npz")
+        export_pillars(path, db_path)
+        assert xx.load_pillars_npz(path)["ts"][0] == np.datetime64("2024-01-02T09:30:00.500000")
+
+    def test_export_npz(self, kbar_db, tmp_path):
+        """测试导出NPZ"""
+        np = pytest.importorskip("numpy")
+        path = str(tmp_path / "pillars.npz")
+        stats = xx.export_pillars(path, kbar_db, chunk_size=7)
+        assert stats["rows"] == 60
+
+        data = xx.load_pillars_npz(path)
+        assert data["year"].dtype == np.int8
+        assert list(np.unique(data["symbol"])) == ["000001", "000002", "600000"]
+        assert data["ts"][0] == np.datetime64("2023-08-01T10:30:00")
+        assert [data["ganzhi_dict"][data[name][0]] for name in ("year", "month", "day", "hour")] == \
+            xx.DateTimeGanZhi("2023/08/01 10:30:00")
+
+    @pytest.mark.parametrize("filename", ["pillars.parquet", "pillars.arrow"])
+    def test_export_arrow_formats(self, kbar_db, tmp_path, filename):
+        """测试导出Parquet和Arrow IPC"""
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+
+        path = str(tmp_path / filename)
+        assert export_pillars(path, kbar_db, chunk_size=7)["rows"] == 60
+        table = pq.read_table(path) if filename.endswith(".parquet") else pa.ipc.open_file(path).read_all()
+        assert table.num_rows == 60
+        assert table.schema.field("year").type == pa.int8()
+        assert table.column("symbol").to_pylist()[0] == "000001"
+        assert table.column("day").to_pylist()[0] == self._expected_codes("2023/08/01 10:30:00")[2]
+
+    def test_export_dictionary_encoding(self, kbar_db, tmp_path):
+        """测试四柱字典编码"""
+        pa = pytest.importorskip("pyarrow")
+        path = str(tmp_path / "pillars.arrow")
+        export_pillars(path, kbar_db, chunk_size=7, pillar_encoding="dictionary")
+        table = pa.ipc.open_file(path).read_all()
+        assert table.column("year").to_pylist()[0] == xx.DateTimeGanZhi("2023/08/01 10:30:00")[0]
+
+    def test_unsupported_format(self, kbar_db, tmp_path):
+        """测试不支持的文件类型"""
+        with pytest.raises(ValueError):
+            export_pillars(str(tmp_path / "pillars.csv"), kbar_db)
+
+    def test_cli_export(self, kbar_db, tmp_path, capsys):
+        """测试命令行导出"""
+        pytest.importorskip("numpy")
+        path = str(tmp_path / "600000.npz")
+        assert main(["export", path, "--db", kbar_db, "--key", "600000", "SH", "1h"]) == 0
+        assert "导出 20 条" in capsys.readouterr().out
+        assert len(xx.load_pillars_npz(path)["ts"]) == 20
@@ -86,4 +86,42 @@ class TestGanZhiCalculator:
         
         # 单独测试None
         with pytest.raises(Exception):
-            xx.DateTimeGanZhi(None)
\ No newline at end of file
+            xx.DateTimeGanZhi(None)
+    
+    def test_pillar_fields_batch(self):
+        """测试批量计算干支字段与逐条计算一致"""
+        import datetime
+        from XuanXue.xuanxue.core.ganzhi_calculator import (
+            calculate_pillar_fields,
+            calculate_pillar_fields_batch,
+        )
+        
+        datetimes = [
+            datetime.datetime(2023, 8, 25, hour, minute)
+            for hour in (0, 9, 11, 13, 23) for minute in (0, 30)
+        ] + [datetime.datetime(2024, 2, 4, 16, 30), datetime.datetime(2024, 2, 4, 17, 30)]
+        
+        batch = calculate_pillar_fields_batch(datetimes)
+        assert len(batch) == len(datetimes)
+        for dt, fields in zip(datetimes, batch):
+            assert fields == calculate_pillar_fields(dt.isoformat())
+
+    def test_pillar_fields_batch_date_only(self):
+        """测试只有日期的时间与逐条计算一样没有时柱，带时区的字符串去掉时区"""
+        import datetime
+        from XuanXue.xuanxue.core.ganzhi_calculator import (
+            calculate_pillar_fields,
+            calculate_pillar_fields_batch,
+            parse_ts,
+            parse_ts_with_hour,
+        )
+
+        values = ["2024-01-02", "20240103", "2024-01-02T00:00:00", "2024/01/02 09:30:00"]
+        batch = calculate_pillar_fields_batch([parse_ts_with_hour(value) for value in values])
+        for value, fields in zip(values, batch):
+            assert fields == calculate_pillar_fields(value)
+        assert batch[0][6:] == ("", "") and batch[2][6:] != ("", "")
+        assert calculate_pillar_fields_batch([datetime.date(2024, 1, 2)]) == batch[:1]
+
+        assert parse_ts("2024-01-02T09:30:00+08:00") == datetime.datetime(2024, 1, 2, 9, 30)
+        assert parse_ts("2024-01-02T09:30:00Z").tzinfo is None
@@ -0,0 +1,202 @@
+"""
+测试K线批量导入
+"""
+import csv
+import sqlite3
+import pytest
+
+import XuanXue as xx
+from XuanXue.xuanxue.cli import main
+from XuanXue.xuanxue.core.ganzhi_calculator import calculate_pillar_fields
+from XuanXue.xuanxue.core.ingest import ingest_kbar_csv, ingest_kbar_file, ingest_kbar_columns
+
+
+def _write_csv(path, rows, header=("ts", "open", "high", "low", "close", "volume", "amount")):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+class TestIngest:
+    """K线批量导入测试类"""
+
+    @pytest.fixture
+    def csv_file(self, tmp_path):
+        path = str(tmp_path / "600000_1h.csv")
+        _write_csv(path, [
+            (f"2023-08-{day:02d} {hour:02d}:30:00", 10.0, 10.5, 9.8, 10.2, 1000, 10000.0)
+            for day in range(1, 11) for hour in (9, 10, 13, 14)
+        ])
+        return path
+
+    def _fetch(self, db_path, sql):
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute(sql).fetchall()
+        conn.close()
+        return rows
+
+    def test_ingest_csv(self, csv_file, tmp_path):
+        """测试分块导入CSV并计算干支"""
+        db_path = str(tmp_path / "kbar.db")
+        progress = []
+        stats = ingest_kbar_csv(csv_file, db_path, chunk_size=15, symbol="600000", exchange="SH",
+                                period="1h", progress=progress.append)
+
+        assert stats["rows"] == 40
+        assert stats["chunks"] == 3
+        assert [item["rows"] for item in progress] == [15, 30, 40]
+
+        rows = self._fetch(db_path, """
+            SELECT ts, year_gan, year_zhi, month_gan, month_zhi, day_gan, day_zhi, hour_gan, hour_zhi
+            FROM kbar_data ORDER BY ts
+        """)
+        assert len(rows) == 40
+        assert rows[0][0] == "2023-08-01T09:30:00"
+        for row in rows:
+            assert row[1:] == calculate_pillar_fields(row[0])
+
+    def test_ingest_is_idempotent(self, csv_file, tmp_path):
+        """测试重复导入时覆盖已有记录"""
+        db_path = str(tmp_path / "kbar.db")
+        ingest_kbar_csv(csv_file, db_path, symbol="600000", exchange="SH", period="1h")
+
+        updated = str(tmp_path / "updated.csv")
+        _write_csv(updated, [("2023-08-01T09:30:00", 11.0, 11.5, 10.8, 11.2, 2000, 22000.0)])
+        ingest_kbar_csv(updated, db_path, symbol="600000", exchange="SH", period="1h")
+
+        assert self._fetch(db_path, "SELECT COUNT(*) FROM kbar_data")[0][0] == 40
+        assert self._fetch(db_path, "SELECT close FROM kbar_data WHERE ts='2023-08-01T09:30:00'")[0][0] == 11.2
+
+        ingest_kbar_csv(csv_file, db_path, symbol="600000", exchange="SH", period="1h", on_conflict="ignore")
+        assert self._fetch(db_path, "SELECT close FROM kbar_data WHERE ts='2023-08-01T09:30:00'")[0][0] == 11.2
+
+    def test_date_only_rows(self, tmp_path):
+        """测试只有日期的日K线按日期保存，时柱为空"""
+        db_path = str(tmp_path / "kbar.db")
+        path = str(tmp_path / "daily.csv")
+        _write_csv(path, [("2024-01-02", 10.0, 10.5, 9.8, 10.2, 1000, 10200.0),
+                          ("2024-01-03", 10.2, 10.6, 10.0, 10.4, 1000, 10400.0)])
+        ingest_kbar_csv(path, db_path, symbol="600000", exchange="SH", period="1day")
+
+        rows = self._fetch(db_path, """
+            SELECT ts, year_gan, year_zhi, month_gan, month_zhi, day_gan, day_zhi, hour_gan, hour_zhi
+            FROM kbar_data ORDER BY ts
+        """)
+        assert [row[0] for row in rows] == ["2024-01-02", "2024-01-03"]
+        for row in rows:
+            assert row[7:] == ("", "")
+            assert row[1:] == calculate_pillar_fields(row[0])
+
+    def test_key_columns_in_file(self, tmp_path):
+        """测试文件中包含symbol/exchange/period列"""
+        path = str(tmp_path / "mixed.csv")
+        _write_csv(path, [
+            ("600000", "SH", "1day", "2023-08-25", 10.0, 10.5, 9.8, 10.2, 1000, 10000.0),
+            ("000001", "SZ", "1day", "2023-08-25", 20.0, 20.5, 19.8, 20.2, 500, 10100.0),
+        ], header=("symbol", "exchange", "period", "ts", "open", "high", "low", "close", "volume", "amount"))
+        db_path = str(tmp_path / "kbar.db")
+        ingest_kbar_file(path, db_path)
+
+        rows = self._fetch(db_path, "SELECT symbol, exchange FROM kbar_data ORDER BY symbol")
+        assert rows == [("000001", "SZ"), ("600000", "SH")]
+
+    def test_sharded_ingest(self, tmp_path):
+        """测试启用分片存储且未指定db_path时每个序列写入所在的分片"""
+        path = str(tmp_path / "mixed.csv")
+        symbols = [f"TEST{i:03d}" for i in range(8)]
+        _write_csv(path, [
+            (symbol, "SZ", "1day", "2023-08-25", 10.0, 10.5, 9.8, 10.2, 1000, 10000.0) for symbol in symbols
+        ], header=("symbol", "exchange", "period", "ts", "open", "high", "low", "close", "volume", "amount"))
+        router = xx.set_kbar_shards([str(tmp_path / f"kbar_{i}.db") for i in range(2)])
+        try:
+            stats = ingest_kbar_file(path, chunk_size=3)
+            ingest_kbar_columns({"symbol": ["TEST100"], "exchange": ["SZ"], "period": ["1day"],
+                                 "ts": ["2023-08-25"], "open": [1], "high": [1], "low": [1], "close": [1],
+                                 "volume": [1], "amount": [1]})
+        finally:
+            xx.clear_kbar_shards()
+
+        assert stats["rows"] == 8
+        assert stats["db_path"] == router.get_all_paths()
+        for symbol in symbols + ["TEST100"]:
+            key = xx.KbarSeriesKey(symbol, "SZ", "1day")
+            for shard_path in router.get_all_paths():
+                count = self._fetch(shard_path, f"SELECT COUNT(*) FROM kbar_data WHERE symbol = '{symbol}'")[0][0]
+                assert count == (1 if shard_path == router.shard_for(key) else 0)
+
+    def test_missing_columns(self, tmp_path):
+        """测试缺少必要列或键时报错"""
+        db_path = str(tmp_path / "kbar.db")
+        with pytest.raises(ValueError):
+            ingest_kbar_columns({"ts": ["2023-08-25"]}, db_path)
+
+        path = str(tmp_path / "no_key.csv")
+        _write_csv(path, [("2023-08-25", 10.0, 10.5, 9.8, 10.2, 1000, 10000.0)])
+        with pytest.raises(ValueError):
+            ingest_kbar_csv(path, db_path)
+
+        with pytest.raises(ValueError):
+            ingest_kbar_file(str(tmp_path / "data.json"), db_path)
+
+    def test_ingest_parquet(self, tmp_path):
+        """测试导入Parquet文件"""
+        pa = pytest.importorskip("pyarrow")
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = str(tmp_path / "600000_1day.parquet")
+        table = pa.table({
+            "ts": ["2023-08-24", "2023-08-25"],
+            "open": [10.0, 10.2], "high": [10.5, 10.8], "low": [9.8, 10.0],
+            "close": [10.2, 10.6], "volume": [1000, 1200], "amount": [10000.0, 12500.0],
+        })
+        pq.write_table(table, path)
+
+        db_path = str(tmp_path / "kbar.db")
+        stats = xx.ingest_kbar_file(path, db_path, symbol="600000", exchange="SH", period="1day")
+        assert stats["rows"] == 2
+        rows = self._fetch(db_path, "SELECT ts, day_gan, hour_gan FROM kbar_data ORDER BY ts")
+        assert rows[1][0] == "2023-08-25"
+        assert rows[1][1] == calculate_pillar_fields(rows[1][0])[4]
+        assert rows[1][2] == ""
+
+    def test_empty_cells_stored_as_null(self, tmp_path):
+        """测试CSV空单元格存为NULL，无法转换的值报错并指出行和列"""
+        path = str(tmp_path / "gaps.csv")
+        _write_csv(path, [
+            ("2023-08-25 09:30:00", 10.0, 10.5, 9.8, 10.2, "", 10000.0),
+            ("2023-08-25 10:30:00", "", 10.8, 10.0, 10.6, 1200, ""),
+        ])
+        db_path = str(tmp_path / "kbar.db")
+        assert ingest_kbar_csv(path, db_path, symbol="600000", exchange="SH", period="1h")["rows"] == 2
+        rows = self._fetch(db_path, "SELECT open, volume, amount, day_gan FROM kbar_data ORDER BY ts")
+        assert rows[0][:3] == (10.0, None, 10000.0)
+        assert rows[1][:3] == (None, 1200, None)
+        assert rows[1][3] is not None
+
+        _write_csv(path, [("2023-08-25 09:30:00", 10.0, 10.5, 9.8, "n/a", 1000, 10000.0)])
+        with pytest.raises(ValueError, match="第 1 行的 close 列"):
+            ingest_kbar_csv(path, db_path, symbol="600000", exchange="SH", period="1h")
+
+    def test_parquet_nulls(self, tmp_path):
+        """测试Parquet中的null存为NULL"""
+        pa = pytest.importorskip("pyarrow")
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = str(tmp_path / "gaps.parquet")
+        pq.write_table(pa.table({
+            "ts": ["2023-08-24", "2023-08-25"],
+            "open": [10.0, None], "high": [10.5, 10.8], "low": [9.8, 10.0],
+            "close": [10.2, 10.6], "volume": [None, 1200], "amount": [10000.0, 12500.0],
+        }), path)
+
+        db_path = str(tmp_path / "kbar.db")
+        assert xx.ingest_kbar_file(path, db_path, symbol="600000", exchange="SH", period="1day")["rows"] == 2
+        rows = self._fetch(db_path, "SELECT open, volume FROM kbar_data ORDER BY ts")
+        assert rows == [(10.0, None), (None, 1200)]
+
+    def test_cli_ingest(self, csv_file, tmp_path, capsys):
+        """测试命令行导入"""
+        db_path = str(tmp_path / "kbar.db")
+        assert main(["ingest", csv_file, "--db", db_path, "--symbol", "600000",
+                     "--exchange", "SH", "--period", "1h"]) == 0
+        assert "共导入 40 条" in capsys.readouterr().out
+        assert self._fetch(db_path, "SELECT COUNT(*) FROM kbar_data")[0][0] == 40
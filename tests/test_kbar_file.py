@@ -0,0 +1,106 @@
+"""
+测试K线二进制文件格式
+"""
+import datetime
+import sqlite3
+import pytest
+from unittest.mock import patch
+
+import XuanXue as xx
+from XuanXue import ColumnarKbarSeries, KbarSeries, KbarSeriesKey
+from XuanXue.xuanxue.core.database import create_kbar_table
+from XuanXue.xuanxue.core.ingest import ingest_kbar_columns
+from XuanXue.xuanxue.utils.kbar_file import kbar_file_name
+
+np = pytest.importorskip("numpy")
+
+KEY = KbarSeriesKey("600000", "SH", "1h")
+
+
+def _make_series(count=5):
+    ts = [datetime.datetime(2023, 8, 25, 9, 30) + datetime.timedelta(hours=i) for i in range(count)]
+    prices = [10.0 + i for i in range(count)]
+    return ColumnarKbarSeries(KEY, ts, prices, [p + 0.5 for p in prices], [p - 0.5 for p in prices],
+                              [p + 0.2 for p in prices], [1000.0] * count, [10000.0] * count)
+
+
+class TestKbarFile:
+    """K线二进制文件测试类"""
+
+    def test_round_trip(self, tmp_path):
+        """测试写入后内存映射读取"""
+        path = str(tmp_path / kbar_file_name(KEY))
+        series = _make_series()
+        xx.write_kbar_file(path, series)
+        assert path.endswith("600000_SH_1h.xkb")
+
+        with xx.open_kbar_file(path) as kbar_file:
+            assert kbar_file.get_key() == KEY
+            assert kbar_file.get_length() == 5
+            loaded = kbar_file.to_series()
+            assert isinstance(loaded, ColumnarKbarSeries)
+            assert np.array_equal(loaded.get_column("ts"), series.get_column("ts"))
+            assert np.allclose(loaded.get_column("close"), series.get_column("close"))
+            assert loaded[2].ts == datetime.datetime(2023, 8, 25, 11, 30)
+            # 列直接是映射文件的视图
+            assert np.shares_memory(loaded.get_column("open"), kbar_file._map)
+            assert all(code == -1 for code in kbar_file.pillar_codes["day"].tolist())
+
+    def test_plain_kbar_series(self, tmp_path):
+        """测试写入普通 KbarSeries"""
+        path = str(tmp_path / "plain.xkb")
+        plain = KbarSeries(KEY, list(_make_series(3).get_kbar_list()))
+        xx.write_kbar_file(path, plain)
+        with xx.open_kbar_file(path) as kbar_file:
+            assert [k.ts for k in kbar_file.to_series().get_kbar_list()] == \
+                   [k.ts for k in plain.get_kbar_list()]
+
+    def test_invalid_file(self, tmp_path):
+        """测试无效文件和长度不一致的四柱"""
+        path = tmp_path / "bad.xkb"
+        path.write_bytes(b"NOTKBAR!" + b"\0" * 200)
+        with pytest.raises(ValueError):
+            xx.open_kbar_file(str(path))
+        with pytest.raises(ValueError):
+            xx.write_kbar_file(str(tmp_path / "short.xkb"), _make_series(), {"year": [0, 1]})
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["bad.xkb"]
+
+    def test_failed_write_removes_temp_file(self, tmp_path):
+        """测试写入失败时删除临时文件，不影响已有的文件"""
+        path = tmp_path / "series.xkb"
+        path.write_bytes(b"old")
+
+        with patch("os.replace", side_effect=OSError("disk full")):
+            with pytest.raises(OSError, match="disk full"):
+                xx.write_kbar_file(str(path), _make_series())
+        assert [p.name for p in tmp_path.iterdir()] == ["series.xkb"]
+        assert path.read_bytes() == b"old"
+
+    def test_export_from_db(self, tmp_path):
+        """测试从kbar_data导出，缺失的干支在导出时计算"""
+        db_path = str(tmp_path / "kbar.db")
+        ts = [datetime.datetime(2023, 8, 25, 9, 30) + datetime.timedelta(hours=i) for i in range(4)]
+        columns = {"ts": ts, "open": [1.0] * 4, "high": [2.0] * 4, "low": [0.5] * 4,
+                   "close": [1.5, 1.6, 1.7, 1.8], "volume": [100.0] * 4, "amount": [1000.0] * 4}
+        conn = sqlite3.connect(db_path)
+        create_kbar_table(conn)
+        ingest_kbar_columns(columns, symbol="600000", exchange="SH", period="1h", conn=conn)
+        ingest_kbar_columns(columns, symbol="000001", exchange="SZ", period="1h", conn=conn)
+        with conn:
+            conn.execute("UPDATE kbar_data SET day_gan=NULL, day_zhi=NULL WHERE symbol='000001'")
+        conn.close()
+
+        output = tmp_path / "files"
+        stats = xx.export_kbar_files(str(output), db_path)
+        assert stats["files"] == 2
+        assert stats["rows"] == 8
+
+        with patch('XuanXue.xuanxue.core.kbarseriesganzhi.get_stock_kbar_path', return_value=db_path), \
+             patch('XuanXue.xuanxue.core.kbarseriesganzhi.check_stock_kbar_path', return_value=True):
+            expected = xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", _make_series(4), useDB=False)
+        for name in ("600000_SH_1h.xkb", "000001_SZ_1h.xkb"):
+            with xx.open_kbar_file(str(output / name)) as kbar_file:
+                assert kbar_file.to_series().get_column("close").tolist() == [1.5, 1.6, 1.7, 1.8]
+                ganzhi = kbar_file.to_ganzhi()
+                assert ganzhi.get_ganzhi_list() == expected.get_ganzhi_list()
+                assert ganzhi.get_ts_list() == ts
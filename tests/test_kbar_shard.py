@@ -0,0 +1,118 @@
+"""
+测试K线分片存储
+"""
+import os
+import sqlite3
+import tempfile
+import shutil
+import pytest
+
+import XuanXue as xx
+from XuanXue.xuanxue.utils.kbar_type import KbarSeriesKey, KbarSeriesGanZhiList
+from XuanXue.xuanxue.core.kbar_shard import KbarShardRouter
+
+
+class TestKbarShard:
+    """K线分片存储测试类"""
+
+    @pytest.fixture
+    def shard_dir(self):
+        """创建临时分片目录，测试结束后关闭分片"""
+        temp_dir = tempfile.mkdtemp()
+        yield temp_dir
+        xx.clear_kbar_shards()
+        shutil.rmtree(temp_dir)
+
+    def _kbar_dict(self, symbol, period="1h"):
+        return {
+            "symbol": symbol,
+            "exchange": "SZ",
+            "period": period,
+            "kbar": [
+                ["2023-08-25 09:30:00", 20.0, 20.5, 19.8, 20.2, 500000, 10100000],
+                ["2023-08-25 10:30:00", 20.2, 20.8, 20.0, 20.6, 600000, 12360000],
+            ]
+        }
+
+    def test_router_is_stable(self, shard_dir):
+        """测试路由结果稳定且在分片范围内"""
+        paths = [os.path.join(shard_dir, f"kbar_{i}.db") for i in range(4)]
+        router1 = KbarShardRouter(paths)
+        router2 = KbarShardRouter(paths)
+
+        for i in range(50):
+            key = KbarSeriesKey(f"{i:06d}", "SH", "1day")
+            assert router1.shard_for(key) == router2.shard_for(key)
+            assert 0 <= router1.shard_index(key) < 4
+
+    def test_router_period_map(self, shard_dir):
+        """测试按周期分片"""
+        paths = [os.path.join(shard_dir, f"kbar_{i}.db") for i in range(2)]
+        router = KbarShardRouter(paths, strategy="period", period_map={"1min": 0, "1day": 1})
+
+        assert router.shard_for(KbarSeriesKey("600000", "SH", "1min")) == router.get_all_paths()[0]
+        assert router.shard_for(KbarSeriesKey("000001", "SZ", "1day")) == router.get_all_paths()[1]
+
+    def test_router_invalid_args(self, shard_dir):
+        """测试非法参数"""
+        with pytest.raises(ValueError):
+            KbarShardRouter([])
+        with pytest.raises(ValueError):
+            KbarShardRouter([os.path.join(shard_dir, "a.db")], strategy="unknown")
+        with pytest.raises(ValueError):
+            KbarShardRouter([os.path.join(shard_dir, "a.db")], strategy="period", period_map={"1min": 3})
+
+    def test_sharded_write_and_read(self, shard_dir):
+        """测试分片模式下写入、按键读取和全库读取"""
+        paths = [os.path.join(shard_dir, f"kbar_{i}.db") for i in range(3)]
+        router = xx.set_kbar_shards(paths)
+        for path in paths:
+            assert os.path.isfile(path)
+
+        symbols = ["TEST001", "TEST002", "TEST003", "TEST004"]
+        for symbol in symbols:
+            result = xx.KbarSeriesGanZhi("2023-08-25 09:00:00", "2023-08-25 12:00:00",
+                                         self._kbar_dict(symbol), useDB=False)
+            assert result.get_length() == 2
+
+        # 每个键只写入它所在的分片
+        for symbol in symbols:
+            key = KbarSeriesKey(symbol, "SZ", "1h")
+            for path in paths:
+                conn = sqlite3.connect(path)
+                count = conn.execute("SELECT COUNT(*) FROM kbar_data WHERE symbol=?", (symbol,)).fetchone()[0]
+                conn.close()
+                assert count == (2 if path == router.shard_for(key) else 0)
+
+        result = xx.KbarSeriesGanZhi("2023-08-25 09:00:00", "2023-08-25 12:00:00",
+                                     ["TEST003", "SZ", "1h"], useDB=True)
+        assert result.get_key().get_symbol() == "TEST003"
+        assert result.get_length() == 2
+
+        all_result = xx.KbarSeriesGanZhi("2023-08-25 09:00:00", "2023-08-25 12:00:00", None, useDB=True)
+        assert isinstance(all_result, KbarSeriesGanZhiList)
+        assert sorted(all_result.get_all_symbols()) == symbols
+
+    def test_many_keys_keep_order(self, shard_dir):
+        """测试批量查询并行读取且保持输入顺序"""
+        paths = [os.path.join(shard_dir, f"kbar_{i}.db") for i in range(2)]
+        xx.set_kbar_shards(paths)
+
+        symbols = ["TEST005", "TEST006", "TEST007"]
+        for symbol in symbols:
+            xx.KbarSeriesGanZhi("2023-08-25 09:00:00", "2023-08-25 12:00:00",
+                                self._kbar_dict(symbol), useDB=False)
+
+        keys = [[symbol, "SZ", "1h"] for symbol in reversed(symbols)]
+        result = xx.KbarSeriesGanZhiMany("2023-08-25 09:00:00", "2023-08-25 12:00:00", keys)
+
+        assert [series.get_key().get_symbol() for series in result.get_kbar_series_ganzhi_list()] == list(reversed(symbols))
+        assert all(series.get_length() == 2 for series in result.get_kbar_series_ganzhi_list())
+
+    def test_missing_shard_file(self, shard_dir):
+        """测试分片文件缺失时报错"""
+        paths = [os.path.join(shard_dir, f"kbar_{i}.db") for i in range(2)]
+        xx.set_kbar_shards(paths, create=False)
+
+        with pytest.raises(FileNotFoundError, match="分片数据库文件不存在"):
+            xx.KbarSeriesGanZhi("2023-08-25 09:00:00", "2023-08-25 12:00:00", None, useDB=True)
@@ -0,0 +1,146 @@
+"""
+测试K线数据类型
+"""
+import datetime
+import gc
+import pickle
+import pytest
+
+from XuanXue import Kbar, KbarSeries, KbarSeriesKey, intern_kbar_series_key
+from XuanXue.xuanxue.utils import KbarSeriesGanZhi, KbarSeriesGanZhiList
+from XuanXue.xuanxue.utils.kbar_type import _interned_keys
+
+
+class TestKbarType:
+    """K线数据类型测试类"""
+
+    def test_slots(self):
+        """测试使用__slots__，实例没有__dict__"""
+        key = KbarSeriesKey("600000", "SH", "1h")
+        kbar = Kbar(datetime.datetime(2023, 8, 25, 9, 30), 10.0, 10.5, 9.8, 10.2, 1000, 10000.0)
+        ganzhi = KbarSeriesGanZhi(key, [])
+        for obj in (key, kbar, ganzhi, KbarSeriesGanZhiList()):
+            assert not hasattr(obj, "__dict__")
+        with pytest.raises(AttributeError):
+            kbar.extra = 1
+
+        # 公共属性仍可读写
+        kbar.close = 10.3
+        assert kbar.get_close() == 10.3
+
+    def test_key_hash_and_equality(self):
+        """测试键的哈希缓存和相等比较"""
+        key = KbarSeriesKey("600000", "SH", "1h")
+        same = KbarSeriesKey("600000", "SH", "1h")
+        assert key == same and hash(key) == hash(same)
+        assert key != KbarSeriesKey("600000", "SH", "1day")
+        assert key != ("600000", "SH", "1h")
+
+        # 修改字段后哈希值随之更新
+        same.period = "1day"
+        assert hash(same) == hash(KbarSeriesKey("600000", "SH", "1day"))
+        assert pickle.loads(pickle.dumps(key)) == key
+
+    def test_interning(self):
+        """测试相同的键共享一个实例"""
+        key = intern_kbar_series_key("600000", "SH", "1h")
+        assert intern_kbar_series_key("600000", "SH", "1h") is key
+        assert key == KbarSeriesKey("600000", "SH", "1h")
+        assert intern_kbar_series_key("600000", "SH", "1day") is not key
+
+        # 不再被引用的键会被释放
+        intern_kbar_series_key("000001", "SZ", "1h")
+        gc.collect()
+        assert ("000001", "SZ", "1h") not in _interned_keys
+
+
+class TestKbarSeriesGanZhiListIndex:
+    """KbarSeriesGanZhiList 索引测试类"""
+
+    @pytest.fixture
+    def series_list(self):
+        return KbarSeriesGanZhiList([
+            KbarSeriesGanZhi(KbarSeriesKey("600000", "SH", "1h"), ["a"]),
+            KbarSeriesGanZhi(KbarSeriesKey("600000", "SH", "1day"), ["b"]),
+            KbarSeriesGanZhi(KbarSeriesKey("000001", "SZ", "1h"), ["c"]),
+        ])
+
+    def test_lookup(self, series_list):
+        """测试按键和股票代码查找"""
+        assert series_list.find_kbar_series("600000", "SH", "1day").get_ganzhi_list() == ["b"]
+        assert series_list.find_kbar_series("600000", "SZ", "1day") is None
+        assert series_list.get_all_symbols() == ["600000", "000001"]
+        assert [s.get_ganzhi_list() for s in series_list.filter_by_symbol("600000")] == [["a"], ["b"]]
+        assert series_list.filter_by_symbol("300750").get_series_amount() == 0
+
+    def test_container_protocol(self, series_list):
+        """测试 __getitem__ / __contains__ / __iter__ / __len__"""
+        assert series_list[KbarSeriesKey("000001", "SZ", "1h")].get_ganzhi_list() == ["c"]
+        assert series_list[("600000", "SH", "1h")].get_ganzhi_list() == ["a"]
+        assert series_list[0].get_ganzhi_list() == ["a"]
+        with pytest.raises(KeyError):
+            series_list[["600000", "SH", "5min"]]
+
+        assert ["000001", "SZ", "1h"] in series_list
+        assert KbarSeriesKey("000001", "SZ", "1day") not in series_list
+        assert "600000" not in series_list
+        assert [s.get_ganzhi_list()[0] for s in series_list] == ["a", "b", "c"]
+        assert len(series_list.get_kbar_series_ganzhi_list()) == 3
+
+    def test_index_updates(self, series_list):
+        """测试添加序列和直接修改列表后索引保持正确"""
+        series_list.add_kbar_series_ganzhi(KbarSeriesGanZhi(KbarSeriesKey("300750", "SZ", "1h"), ["d"]))
+        assert series_list[("300750", "SZ", "1h")].get_ganzhi_list() == ["d"]
+        assert "300750" in series_list.get_all_symbols()
+
+        series_list.get_kbar_series_ganzhi_list().append(
+            KbarSeriesGanZhi(KbarSeriesKey("000002", "SZ", "1h"), ["e"]))
+        assert series_list.find_kbar_series("000002", "SZ", "1h").get_ganzhi_list() == ["e"]
+
+        # 重复的键保留第一个
+        series_list.add_kbar_series_ganzhi(KbarSeriesGanZhi(KbarSeriesKey("600000", "SH", "1h"), ["f"]))
+        assert series_list[("600000", "SH", "1h")].get_ganzhi_list() == ["a"]
+        assert len(series_list.filter_by_symbol("600000").get_kbar_series_ganzhi_list()) == 3
+
+
+class TestSortedKbarSeries:
+    """有序K线序列测试类"""
+
+    def _kbar(self, hour, close=10.0):
+        return Kbar(datetime.datetime(2023, 8, 25, hour, 30), 10.0, 10.5, 9.8, close, 1000, 10000.0)
+
+    def test_sorted_on_create(self):
+        """测试创建时乱序的K线被排序，且不修改传入的列表"""
+        kbar_list = [self._kbar(h) for h in (11, 9, 10)]
+        series = KbarSeries(KbarSeriesKey("600000", "SH", "1h"), kbar_list)
+        assert [k.ts.hour for k in series.get_kbar_list()] == [9, 10, 11]
+        assert [k.ts.hour for k in kbar_list] == [11, 9, 10]
+
+        ordered = [self._kbar(h) for h in (9, 10)]
+        assert KbarSeries(KbarSeriesKey("600000", "SH", "1h"), ordered).get_kbar_list() is ordered
+
+    def test_add_kbar_keeps_order(self):
+        """测试追加乱序K线时插入到正确位置"""
+        series = KbarSeries(KbarSeriesKey("600000", "SH", "1h"), [])
+        assert series.get_latest_kbar() is None
+        for hour in (9, 13, 10, 14, 11):
+            series.add_kbar(self._kbar(hour))
+        assert [k.ts.hour for k in series.get_kbar_list()] == [9, 10, 11, 13, 14]
+        assert series.get_latest_kbar().ts.hour == 14
+
+        # 直接追加到列表后同样保持正确
+        series.get_kbar_list().append(self._kbar(8))
+        assert series.get_latest_kbar().ts.hour == 14
+        assert [k.ts.hour for k in series.get_kbar_list()][0] == 8
+
+    def test_filter_by_time_range(self):
+        """测试二分查找按时间范围过滤（包含边界）"""
+        series = KbarSeries(KbarSeriesKey("600000", "SH", "1h"), [self._kbar(h) for h in range(9, 16)])
+        filtered = series.filter_by_time_range(datetime.datetime(2023, 8, 25, 10, 30),
+                                               datetime.datetime(2023, 8, 25, 13, 0))
+        assert [k.ts.hour for k in filtered.get_kbar_list()] == [10, 11, 12]
+        assert filtered.get_key() == series.get_key()
+        assert filtered.get_latest_kbar().ts.hour == 12
+
+        empty = series.filter_by_time_range(datetime.datetime(2023, 8, 26), datetime.datetime(2023, 8, 27))
+        assert empty.get_length() == 0
@@ -0,0 +1,57 @@
+"""
+测试库日志输出
+"""
+import logging
+import sqlite3
+import pytest
+from unittest.mock import patch
+
+import XuanXue as xx
+from XuanXue import KbarSeries, KbarSeriesKey, Kbar
+from XuanXue.xuanxue.core.database import create_kbar_table
+
+LOGGER = "XuanXue.xuanxue.core.kbarseriesganzhi"
+
+
+def _series(ts_list):
+    return KbarSeries(KbarSeriesKey("600000", "SH", "1h"),
+                      [Kbar(ts, 1.0, 2.0, 0.5, 1.5, 100.0, 1000.0) for ts in ts_list])
+
+
+@pytest.fixture(autouse=True)
+def kbar_db(tmp_path):
+    """创建空的K线数据库"""
+    db_path = str(tmp_path / "kbar.db")
+    conn = sqlite3.connect(db_path)
+    create_kbar_table(conn)
+    conn.close()
+    with patch('XuanXue.xuanxue.core.kbarseriesganzhi.get_stock_kbar_path', return_value=db_path), \
+         patch('XuanXue.xuanxue.core.kbarseriesganzhi.check_stock_kbar_path', return_value=True):
+        yield db_path
+
+
+class TestLogging:
+    """日志测试类"""
+
+    def test_silent_by_default(self, capsys):
+        """测试默认不向标准输出打印任何内容"""
+        xx.KbarSeriesGanZhi("2023-08-25", "2023-08-26",
+                            _series(["2023-08-25T09:30:00", "not a time"]), useDB=False)
+        captured = capsys.readouterr()
+        assert captured.out == ""
+
+    def test_row_errors_aggregated(self, caplog):
+        """测试逐行的时间解析错误只汇总为一条警告"""
+        series = _series(["bad-%d" % i for i in range(5)] + ["2023-08-25T09:30:00"])
+        with caplog.at_level(logging.WARNING, logger=LOGGER):
+            result = xx.KbarSeriesGanZhi("2023-08-25", "2023-08-26", series, useDB=False)
+        assert result.get_length() == 1
+        warnings = [record for record in caplog.records if record.levelno == logging.WARNING]
+        assert len(warnings) == 1
+        assert "5" in warnings[0].getMessage()
+
+    def test_row_details_at_debug(self, caplog):
+        """测试DEBUG级别记录每一行的详情"""
+        with caplog.at_level(logging.DEBUG, logger=LOGGER):
+            xx.KbarSeriesGanZhi("2023-08-25", "2023-08-26", _series(["bad-0", "bad-1"]), useDB=False)
+        assert len([record for record in caplog.records if record.levelno == logging.DEBUG]) >= 2
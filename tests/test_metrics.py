@@ -0,0 +1,80 @@
+"""
+测试运行指标
+"""
+import datetime
+import pytest
+
+import XuanXue as xx
+from XuanXue.xuanxue.core.metrics import MetricsRegistry
+
+KEY = ["600000", "SH", "1h"]
+
+
+@pytest.fixture
+def kbar_db(kbar_db_factory):
+    """创建K线数据库（干支缺失），测试结束后关闭指标"""
+    ts = [datetime.datetime(2023, 8, 25, 9, 30) + datetime.timedelta(hours=i) for i in range(4)]
+    yield kbar_db_factory({("600000", "SH", "1h"): {
+        "ts": ts, "open": [1.0] * 4, "high": [2.0] * 4, "low": [0.5] * 4,
+        "close": [1.5] * 4, "volume": [100.0] * 4, "amount": [1000.0] * 4,
+    }}, with_pillars=False, configure=True)
+    xx.disable_metrics()
+    xx.disable_result_cache()
+
+
+class TestMetrics:
+    """运行指标测试类"""
+
+    def test_disabled_by_default(self, kbar_db):
+        """测试默认不收集"""
+        xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY)
+        assert xx.stats() == {}
+        assert xx.stats_prometheus() == ""
+
+    def test_stage_counters(self, kbar_db):
+        """测试第一次调用计算并写回干支，第二次直接复用数据库中的干支"""
+        xx.enable_metrics()
+        xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25 10:30:00", KEY)
+        xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25 10:30:00", KEY)
+        stats = xx.stats()
+        counters = stats["counters"]
+        assert counters["calls"]["KbarSeriesGanZhi"] == 2
+        assert counters["rows_scanned"]["kbarseriesganzhi_DB"] == 8
+        assert counters["rows_returned"]["kbarseriesganzhi_DB"] == 4
+        assert counters["pillars_computed"]["kbarseriesganzhi_DB"] == 2
+        assert counters["rows_written"]["kbarseriesganzhi_DB"] == 2
+        assert counters["pillars_reused"]["kbarseriesganzhi_DB"] == 2
+
+        latency = stats["latency"]
+        assert latency["KbarSeriesGanZhi"]["total"]["count"] == 2
+        assert latency["kbarseriesganzhi_DB"]["sql_read"]["count"] == 2
+        assert latency["kbarseriesganzhi_DB"]["compute"]["count"] == 1
+        assert latency["kbarseriesganzhi_DB"]["total"]["buckets"][-1] == (float("inf"), 2)
+
+        xx.reset_stats()
+        assert xx.stats() == {"counters": {}, "latency": {}}
+
+    def test_cache_hits(self, kbar_db):
+        """测试结果缓存命中计数"""
+        xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY)     # 先写回缺失的干支
+        xx.enable_metrics()
+        xx.enable_result_cache()
+        for _ in range(3):
+            xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY)
+        counters = xx.stats()["counters"]
+        assert counters["cache_hits"]["result_cache"] == 2
+        assert counters["cache_misses"]["result_cache"] == 1
+
+    def test_prometheus_format(self):
+        """测试 Prometheus 文本格式"""
+        registry = MetricsRegistry()
+        registry.inc("calls", "KbarSeriesGanZhi", 3)
+        registry.observe("KbarSeriesGanZhi", "total", 0.002)
+        registry.observe("KbarSeriesGanZhi", "total", 2.0)
+        text = registry.to_prometheus()
+        assert '# TYPE xuanxue_calls_total counter' in text
+        assert 'xuanxue_calls_total{api="KbarSeriesGanZhi"} 3' in text
+        assert 'xuanxue_latency_seconds_bucket{api="KbarSeriesGanZhi",stage="total",le="0.005"} 1' in text
+        assert 'xuanxue_latency_seconds_bucket{api="KbarSeriesGanZhi",stage="total",le="+Inf"} 2' in text
+        assert 'xuanxue_latency_seconds_count{api="KbarSeriesGanZhi",stage="total"} 2' in text
+        assert text.endswith("\n")
@@ -0,0 +1,74 @@
+"""
+测试接口调用性能分析
+"""
+import datetime
+import os
+import pytest
+
+import XuanXue as xx
+from XuanXue.xuanxue.core import profiling
+
+KEY = ["600000", "SH", "1h"]
+
+
+@pytest.fixture
+def kbar_db(kbar_db_factory):
+    """创建K线数据库"""
+    ts = [datetime.datetime(2023, 8, 25, 9, 30) + datetime.timedelta(hours=i) for i in range(4)]
+    return kbar_db_factory({("600000", "SH", "1h"): {
+        "ts": ts, "open": [1.0] * 4, "high": [2.0] * 4, "low": [0.5] * 4,
+        "close": [1.5] * 4, "volume": [100.0] * 4, "amount": [1000.0] * 4,
+    }}, configure=True)
+
+
+class TestProfiling:
+    """性能分析测试类"""
+
+    def test_disabled_by_default(self):
+        """测试默认不分析"""
+        assert not xx.is_profiling()
+
+    def test_report_per_outer_call(self, kbar_db, tmp_path):
+        """测试每次外层调用写入一份报告，内部阶段计入外层报告"""
+        output_dir = str(tmp_path / "reports")
+        with xx.profile(output_dir) as settings:
+            assert xx.is_profiling()
+            xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY)
+            xx.DateTimeGanZhi("2023/10/10 12:00:00")
+        assert not xx.is_profiling()
+
+        assert len(settings.reports) == 2
+        names = sorted(os.listdir(output_dir))
+        assert len(names) == 4      # .txt 和 .prof
+        assert any("_KbarSeriesGanZhi_" in name for name in names)
+        assert any("_DateTimeGanZhi_" in name for name in names)
+
+        with open(next(path for path in settings.reports if "_KbarSeriesGanZhi_" in path), encoding="utf-8") as f:
+            report = f.read()
+        assert "接口: KbarSeriesGanZhi" in report
+        assert "_kbarseriesganzhi_DB" in report
+        assert "sqlite3" in report
+
+    def test_min_ms_threshold(self, tmp_path):
+        """测试只保存超过阈值的调用"""
+        with xx.profile(str(tmp_path / "reports"), min_ms=60_000, save_raw=False) as settings:
+            xx.DateTimeGanZhi("2023/10/10")
+        assert settings.reports == []
+        assert not os.path.exists(str(tmp_path / "reports"))
+
+    def test_env_switch(self, monkeypatch, tmp_path):
+        """测试通过环境变量启用"""
+        monkeypatch.setenv(profiling.PROFILE_ENV_VAR, str(tmp_path))
+        monkeypatch.setenv(profiling.PROFILE_MIN_MS_ENV_VAR, "5")
+        settings = profiling._settings_from_env()
+        assert settings.output_dir == str(tmp_path)
+        assert settings.min_ms == 5.0
+
+        monkeypatch.delenv(profiling.PROFILE_ENV_VAR)
+        assert profiling._settings_from_env() is None
+
+    def test_format_args_bounded(self):
+        """测试参数按大小截断，不生成大参数的完整repr"""
+        text = profiling._format_args((list(range(1_000_000)), "x" * 10_000, KEY))
+        assert len(text) <= 203
+        assert text.startswith("[0, 1, 2, 3, 4, ...]")
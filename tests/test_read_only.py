@@ -0,0 +1,102 @@
+"""
+测试只读模式
+"""
+import os
+import sqlite3
+import pytest
+
+import XuanXue as xx
+from XuanXue.xuanxue.core.database import open_connection, close_connection
+
+
+class TestReadOnly:
+    """只读模式测试类"""
+
+    @pytest.fixture
+    def kbar_db(self, kbar_db_factory):
+        """创建缺失干支的K线数据库，测试结束后关闭只读模式"""
+        yield kbar_db_factory({("600000", "SH", "1h"): {
+            "ts": ["2023-08-25T09:30:00", "2023-08-25T10:30:00"], "open": [10.0, 10.2], "high": [10.5, 10.8],
+            "low": [9.8, 10.0], "close": [10.2, 10.6], "volume": [1000, 1000], "amount": [10000.0, 10000.0],
+        }}, with_pillars=False, configure=True)
+        xx.set_read_only(False)
+
+    def _missing_count(self, db_path):
+        conn = sqlite3.connect(db_path)
+        count = conn.execute("SELECT COUNT(*) FROM kbar_data WHERE year_gan IS NULL").fetchone()[0]
+        conn.close()
+        return count
+
+    def test_compute_in_memory_without_write_back(self, kbar_db):
+        """测试只读模式下缺失干支在内存中计算且不写回"""
+        xx.set_read_only(True)
+        mtime = os.path.getmtime(kbar_db)
+
+        result = xx.KbarSeriesGanZhi("2023-08-25 09:00:00", "2023-08-25 12:00:00",
+                                     ["600000", "SH", "1h"], useDB=True)
+        assert result.get_length() == 2
+        assert all(ganzhi.startswith("癸卯-") for ganzhi in result.get_ganzhi_list())
+
+        all_result = xx.KbarSeriesGanZhi("2023-08-25 09:00:00", "2023-08-25 12:00:00", None, useDB=True)
+        assert all_result.get_series_amount() == 1
+
+        assert self._missing_count(kbar_db) == 2
+        assert os.path.getmtime(kbar_db) == mtime
+
+    def test_write_back_when_not_read_only(self, kbar_db):
+        """测试非只读模式下仍然写回"""
+        result = xx.KbarSeriesGanZhi("2023-08-25 09:00:00", "2023-08-25 12:00:00",
+                                     ["600000", "SH", "1h"], useDB=True)
+        assert result.get_length() == 2
+        assert self._missing_count(kbar_db) == 0
+
+    def test_read_only_connection_rejects_writes(self, kbar_db):
+        """测试只读连接不能写入"""
+        xx.set_read_only(True)
+        conn = open_connection(kbar_db)
+        try:
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM kbar_data")
+        finally:
+            close_connection(conn)
+
+    def test_nodb_skips_insert(self, kbar_db):
+        """测试只读模式下useDB=False不插入数据"""
+        xx.set_read_only(True)
+        result = xx.KbarSeriesGanZhi("2023-08-25 09:00:00", "2023-08-25 12:00:00", {
+            "symbol": "000001",
+            "exchange": "SZ",
+            "period": "1h",
+            "kbar": [["2023-08-25 09:30:00", 20.0, 20.5, 19.8, 20.2, 500000, 10100000]]
+        }, useDB=False)
+        assert result.get_length() == 1
+
+        conn = sqlite3.connect(kbar_db)
+        count = conn.execute("SELECT COUNT(*) FROM kbar_data WHERE symbol='000001'").fetchone()[0]
+        conn.close()
+        assert count == 0
+
+    def test_onboard_date_read_only(self, setup_xuanxue, tmp_path):
+        """测试只读模式下上市日期干支只计算不保存"""
+        xx = setup_xuanxue
+        meta_db = str(tmp_path / "meta.db")
+        conn = sqlite3.connect(meta_db)
+        conn.execute("""
+            CREATE TABLE stock_meta (symbol TEXT, name TEXT, exchange TEXT, list_date TEXT,
+                                     年干 TEXT, 年支 TEXT, 月干 TEXT, 月支 TEXT, 日干 TEXT, 日支 TEXT)
+        """)
+        conn.execute("INSERT INTO stock_meta (symbol, name, exchange, list_date) VALUES ('000001.SZ', '平安银行', 'SZ', '19910403')")
+        conn.commit()
+        conn.close()
+
+        xx.set_stock_meta_path(meta_db)
+        xx.set_read_only(True)
+        try:
+            result = xx.OnBoardDateGanZhi('000001.SZ')
+        finally:
+            xx.set_read_only(False)
+
+        assert len(result['ganzhi']) == 3
+        conn = sqlite3.connect(meta_db)
+        assert conn.execute("SELECT 年干 FROM stock_meta").fetchone()[0] is None
+        conn.close()
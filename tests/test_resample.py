@@ -0,0 +1,121 @@
+"""
+测试K线周期重采样
+"""
+import datetime
+import sqlite3
+import pytest
+
+import XuanXue as xx
+from XuanXue.xuanxue.core.ganzhi_calculator import calculate_pillar_fields
+from XuanXue.xuanxue.core.ingest import ingest_kbar_columns
+from XuanXue.xuanxue.core.resample import period_minutes
+from XuanXue.xuanxue.cli import main as cli_main
+
+SOURCE = ["600000", "SH", "1min"]
+
+
+def _columns(start, count, base=1.0):
+    ts = [start + datetime.timedelta(minutes=i) for i in range(count)]
+    return {"ts": ts, "open": [base + i for i in range(count)], "high": [base + i + 0.5 for i in range(count)],
+            "low": [base + i - 0.5 for i in range(count)], "close": [base + i + 0.1 for i in range(count)],
+            "volume": [10] * count, "amount": [100.0] * count}
+
+
+@pytest.fixture
+def kbar_db(kbar_db_factory):
+    """创建包含12根1分钟K线（9:30-9:41）的数据库"""
+    return kbar_db_factory({("600000", "SH", "1min"): _columns(datetime.datetime(2023, 8, 25, 9, 30), 12)})
+
+
+def _bars(db_path, period):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT ts, open, high, low, close, volume, amount, year_gan, year_zhi, month_gan, month_zhi, "
+        "day_gan, day_zhi, hour_gan, hour_zhi FROM kbar_data WHERE period=? ORDER BY ts", (period,)
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+class TestResample:
+    """周期重采样测试类"""
+
+    def test_aggregate_ohlcv_and_pillars(self, kbar_db):
+        """测试OHLCV聚合，干支按聚合后的时间计算"""
+        stats = xx.resample_kbar_series(SOURCE, "5min", kbar_db)
+        assert stats["source_rows"] == 12 and stats["bars"] == 3
+
+        rows = _bars(kbar_db, "5min")
+        assert [row[0] for row in rows] == ["2023-08-25T09:30:00", "2023-08-25T09:35:00", "2023-08-25T09:40:00"]
+        assert rows[0][1:7] == (1.0, 5.5, 0.5, 5.1, 50, 500.0)
+        assert rows[2][1:7] == (11.0, 12.5, 10.5, 12.1, 20, 200.0)
+        assert rows[1][7:] == calculate_pillar_fields(datetime.datetime(2023, 8, 25, 9, 35))
+
+    def test_incremental(self, kbar_db):
+        """测试再次运行只处理最后一个桶和新的K线"""
+        xx.resample_kbar_series(SOURCE, "5min", kbar_db)
+        assert xx.resample_kbar_series(SOURCE, "5min", kbar_db)["source_rows"] == 2
+
+        ingest_kbar_columns(_columns(datetime.datetime(2023, 8, 25, 9, 42), 5, base=13.0), kbar_db,
+                            symbol="600000", exchange="SH", period="1min")
+        stats = xx.resample_kbar_series(SOURCE, "5min", kbar_db)
+        assert stats["source_rows"] == 7 and stats["bars"] == 2
+        assert stats["last_source_ts"] == "2023-08-25T09:46:00"
+
+        rows = _bars(kbar_db, "5min")
+        assert len(rows) == 4
+        assert rows[2][1:6] == (11.0, 15.5, 10.5, 15.1, 50)
+
+        # 全部重新聚合的结果与增量聚合一致
+        assert xx.resample_kbar_series(SOURCE, "5min", kbar_db, full=True)["source_rows"] == 17
+        assert _bars(kbar_db, "5min") == rows
+
+    def test_database_and_offsets(self, kbar_db):
+        """测试聚合整个库的多个目标周期，以及对齐点平移"""
+        stats = xx.resample_kbar_database(["15min", "1h", "1day"], db_path=kbar_db)
+        assert stats["series"] == 1 and stats["bars"] == 3
+        assert [row[0] for row in _bars(kbar_db, "1h")] == ["2023-08-25T09:00:00"]
+        # 日K线只有日期，与原生日K线一样没有时柱
+        daily = _bars(kbar_db, "1day")
+        assert [row[0] for row in daily] == ["2023-08-25"]
+        assert daily[0][13:] == ("", "")
+        assert daily[0][7:] == calculate_pillar_fields("2023-08-25")
+
+        xx.resample_kbar_series(SOURCE, "1h", kbar_db, offset_minutes=30, full=True)
+        assert [row[0] for row in _bars(kbar_db, "1h")] == ["2023-08-25T09:00:00", "2023-08-25T09:30:00"]
+
+        # 目标K线可以直接通过 KbarSeriesGanZhi 查询
+        session = xx.XuanXueSession(stock_kbar_path=kbar_db)
+        assert session.KbarSeriesGanZhi("2023-08-25", "2023-08-25", ["600000", "SH", "15min"]).get_length() == 1
+
+    def test_sharded(self, tmp_path):
+        """测试启用分片存储时从源序列的分片读取，结果和检查点写入目标序列的分片"""
+        paths = [str(tmp_path / f"kbar_{i}.db") for i in range(2)]
+        xx.set_kbar_shards(paths, strategy="period", period_map={"1min": 0, "5min": 1, "1h": 1})
+        try:
+            ingest_kbar_columns(_columns(datetime.datetime(2023, 8, 25, 9, 30), 12),
+                                symbol="600000", exchange="SH", period="1min")
+            assert xx.resample_kbar_series(SOURCE, "5min")["bars"] == 3
+            assert xx.resample_kbar_series(SOURCE, "5min")["source_rows"] == 2
+            stats = xx.resample_kbar_database(["5min", "1h"], full=True)
+        finally:
+            xx.clear_kbar_shards()
+
+        assert stats["series"] == 1 and stats["bars"] == 4
+        assert _bars(paths[0], "5min") == [] and len(_bars(paths[0], "1min")) == 12
+        assert len(_bars(paths[1], "5min")) == 3 and len(_bars(paths[1], "1h")) == 1
+
+    def test_invalid_periods(self, kbar_db):
+        """测试不支持的周期"""
+        assert period_minutes("15min") == 15 and period_minutes("2h") == 120
+        for period in ("5m", "0min", "2day"):
+            with pytest.raises(ValueError):
+                period_minutes(period)
+        with pytest.raises(ValueError):
+            xx.resample_kbar_series(["600000", "SH", "5min"], "7min", kbar_db)
+
+    def test_cli(self, kbar_db, capsys):
+        """测试命令行"""
+        assert cli_main(["resample", "5min", "30min", "--db", kbar_db]) == 0
+        assert "写入 4 根" in capsys.readouterr().out
+        assert len(_bars(kbar_db, "30min")) == 1
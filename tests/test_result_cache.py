@@ -0,0 +1,139 @@
+"""
+测试KbarSeriesGanZhi结果缓存
+"""
+import datetime
+import os
+import sqlite3
+import pytest
+
+import XuanXue as xx
+from XuanXue import KbarSeries, KbarSeriesKey, Kbar
+from XuanXue.xuanxue.core.ingest import ingest_kbar_columns
+from XuanXue.xuanxue.core.result_cache import ResultCache
+
+KEY = ["600000", "SH", "1h"]
+
+
+def _columns(day=25):
+    ts = [datetime.datetime(2023, 8, day, 9, 30) + datetime.timedelta(hours=i) for i in range(4)]
+    return {"ts": ts, "open": [1.0] * 4, "high": [2.0] * 4, "low": [0.5] * 4,
+            "close": [1.5] * 4, "volume": [100.0] * 4, "amount": [1000.0] * 4}
+
+
+class TestResultCache:
+    """结果缓存测试类"""
+
+    @pytest.fixture
+    def kbar_db(self, kbar_db_factory):
+        """创建K线数据库并启用结果缓存"""
+        yield kbar_db_factory({("600000", "SH", "1h"): _columns(), ("000001", "SZ", "1h"): _columns()},
+                              configure=True)
+        xx.disable_result_cache()
+
+    def test_disabled_by_default(self, kbar_db):
+        """测试默认不缓存"""
+        assert xx.result_cache_stats() == {}
+        xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY)
+        assert xx.result_cache_stats() == {}
+
+    def test_hit_with_normalized_bounds(self, kbar_db):
+        """测试不同写法的相同查询命中同一条缓存，返回副本"""
+        xx.enable_result_cache()
+        first = xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY)
+        second = xx.KbarSeriesGanZhi("2023/08/25", "2023/08/25 23:59:59", {"symbol": "600000", "exchange": "SH",
+                                                                          "period": "1h"})
+        assert second.get_ganzhi_list() == first.get_ganzhi_list()
+        assert second.get_ts_list() == first.get_ts_list()
+        stats = xx.result_cache_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+        assert stats["entries"] == 1 and stats["bytes"] > 0
+
+        second.add_ganzhi("甲子-甲子-甲子-甲子")
+        assert xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY).get_length() == 4
+
+        all_series = xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", None)
+        again = xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", None)
+        assert len(again.get_kbar_series_ganzhi_list()) == len(all_series.get_kbar_series_ganzhi_list()) == 2
+        assert xx.result_cache_stats()["hits"] == 3
+
+    def test_invalidated_by_external_write(self, kbar_db):
+        """测试其他连接写入后 data_version 变化，缓存失效"""
+        db_path = kbar_db
+        xx.enable_result_cache()
+        assert xx.KbarSeriesGanZhi("2023-08-25", "2023-08-26", KEY).get_length() == 4
+
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.execute("DELETE FROM kbar_data WHERE symbol='600000' AND ts LIKE '%09:30:00'")
+        conn.close()
+        assert xx.KbarSeriesGanZhi("2023-08-25", "2023-08-26", KEY).get_length() == 3
+        assert xx.result_cache_stats()["invalidations"] == 1
+
+    def test_invalidated_by_key_write(self, kbar_db):
+        """测试本包写入某个键后，该键和全部序列的缓存失效，其他键不受影响"""
+        db_path = kbar_db
+        cache = xx.enable_result_cache()
+        assert xx.KbarSeriesGanZhi("2023-08-25", "2023-08-26", KEY).get_length() == 4
+
+        kbar_series = KbarSeries(KbarSeriesKey(*KEY), [
+            Kbar(datetime.datetime(2023, 8, 26, 9, 30), 1.0, 2.0, 0.5, 1.5, 100.0, 1000.0)
+        ])
+        xx.KbarSeriesGanZhi("2023-08-26", "2023-08-26", kbar_series, useDB=False)
+        assert xx.KbarSeriesGanZhi("2023-08-25", "2023-08-26", KEY).get_length() == 5
+
+        # 只有写入计数变化时也会失效
+        other = ["000001", "SZ", "1h"]
+        xx.KbarSeriesGanZhi("2023-08-25", "2023-08-26", other)
+        xx.KbarSeriesGanZhi("2023-08-25", "2023-08-26", None)
+        cache.note_write(db_path, [tuple(KEY)])
+        hits = xx.result_cache_stats()["hits"]
+        xx.KbarSeriesGanZhi("2023-08-25", "2023-08-26", other)
+        xx.KbarSeriesGanZhi("2023-08-25", "2023-08-26", None)
+        assert xx.result_cache_stats()["hits"] == hits + 1
+
+    def test_memory_budget(self, kbar_db):
+        """测试超过内存上限时按LRU淘汰"""
+        xx.enable_result_cache()
+        xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY)
+        size = xx.result_cache_stats()["bytes"]
+
+        xx.enable_result_cache(max_bytes=size + size // 2)
+        xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY)
+        xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", ["000001", "SZ", "1h"])
+        stats = xx.result_cache_stats()
+        assert stats["entries"] == 1
+        assert stats["evictions"] == 1
+        assert stats["bytes"] <= stats["max_bytes"]
+
+    def test_disk_tier(self, kbar_db):
+        """测试磁盘缓存可被新的缓存实例（如其他进程）读取，数据库变化后失效"""
+        db_path = kbar_db
+        disk_dir = os.path.join(os.path.dirname(db_path), "cache")
+        xx.enable_result_cache(disk_dir=disk_dir)
+        expected = xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", None)
+        assert xx.result_cache_stats()["disk_writes"] == 1
+
+        xx.enable_result_cache(disk_dir=disk_dir)
+        loaded = xx.KbarSeriesGanZhi("2023-08-25", "2023-08-25", None)
+        assert xx.result_cache_stats()["disk_hits"] == 1
+        for series in expected:
+            assert loaded[series.get_key()].get_ganzhi_list() == series.get_ganzhi_list()
+            assert loaded[series.get_key()].get_ts_list() == series.get_ts_list()
+
+        ingest_kbar_columns(_columns(26), db_path, symbol="600000", exchange="SH", period="1h")
+        cache = ResultCache(disk_dir=disk_dir)
+        try:
+            assert cache.get_or_compute(db_path, None, "2023-08-25", "2023-08-25", lambda: None) is None
+            assert cache.get_stats()["disk_hits"] == 0
+        finally:
+            cache.close()
+
+    def test_bypass_unparseable_bounds(self, kbar_db):
+        """测试无法解析的时间范围不使用缓存"""
+        cache = ResultCache()
+        try:
+            assert cache.get_or_compute(kbar_db, None, "not a date", "2023-08-25", lambda: "computed") == "computed"
+            assert cache.get_stats()["bypassed"] == 1
+        finally:
+            cache.close()
@@ -0,0 +1,72 @@
+"""
+测试XuanXueSession会话
+"""
+import datetime
+import os
+import pytest
+from unittest.mock import patch
+
+import XuanXue as xx
+from XuanXue import XuanXueSession
+from XuanXue.xuanxue.core import database
+
+KEY = ["600000", "SH", "1h"]
+
+
+@pytest.fixture
+def kbar_db(kbar_db_factory):
+    """创建K线数据库"""
+    ts = [datetime.datetime(2023, 8, 25, 9, 30) + datetime.timedelta(hours=i) for i in range(4)]
+    return kbar_db_factory({("600000", "SH", "1h"): {
+        "ts": ts, "open": [1.0] * 4, "high": [2.0] * 4, "low": [0.5] * 4,
+        "close": [1.5] * 4, "volume": [100.0] * 4, "amount": [1000.0] * 4,
+    }})
+
+
+class TestXuanXueSession:
+    """会话测试类"""
+
+    def test_validated_once(self, kbar_db):
+        """测试K线数据库只检查一次"""
+        session = XuanXueSession()
+        with patch('XuanXue.xuanxue.core.kbarseriesganzhi.get_stock_kbar_path', return_value=kbar_db), \
+             patch('XuanXue.xuanxue.core.kbarseriesganzhi.check_stock_kbar_path',
+                   return_value=(True, "ok")) as mock_check:
+            for _ in range(3):
+                assert session.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY).get_length() == 4
+            assert session.KbarSeriesGanZhiMany("2023-08-25", "2023-08-25", [KEY])[0].get_length() == 4
+        assert mock_check.call_count == 1
+
+    def test_invalid_tuple_result_raises(self, kbar_db):
+        """测试检查函数返回 (False, 提示信息) 时抛出异常，且失败结果不缓存"""
+        session = XuanXueSession()
+        with patch('XuanXue.xuanxue.core.kbarseriesganzhi.get_stock_kbar_path', return_value=kbar_db), \
+             patch('XuanXue.xuanxue.core.kbarseriesganzhi.check_stock_kbar_path',
+                   return_value=(False, "数据库文件不存在")) as mock_check:
+            with pytest.raises(FileNotFoundError, match="kbar数据库文件不存在"):
+                session.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY)
+            mock_check.return_value = (True, "ok")
+            assert session.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY).get_length() == 4
+        assert mock_check.call_count == 2
+
+    def test_explicit_paths(self, kbar_db, test_db_path, tmp_path):
+        """测试会话使用指定的数据库路径，不读取配置"""
+        session = XuanXueSession(stock_meta_path=test_db_path, stock_kbar_path=kbar_db)
+        session.validate()
+        assert session.get_stock_kbar_path() == os.path.abspath(kbar_db)
+        assert session.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY).get_length() == 4
+        assert session.OnBoardDateGanZhi("000001.SZ")["name"] == "平安银行"
+        assert session.DateTimeGanZhi("2023/10/10") == xx.DateTimeGanZhi("2023/10/10")
+
+        with pytest.raises(FileNotFoundError):
+            XuanXueSession(stock_kbar_path=str(tmp_path / "missing.db")).validate(stock_meta=False)
+
+    def test_reuse_connections(self, kbar_db):
+        """测试复用连接的会话在关闭时释放当前线程的连接"""
+        with XuanXueSession(stock_kbar_path=kbar_db, reuse_connections=True) as session:
+            session.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY)
+            assert database.thread_connection_cache_enabled()
+            first = database.open_connection(kbar_db)
+            session.KbarSeriesGanZhi("2023-08-25", "2023-08-25", KEY)
+            assert database.open_connection(kbar_db) is first
+        assert not database.thread_connection_cache_enabled()
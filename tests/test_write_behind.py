@@ -0,0 +1,101 @@
+"""
+测试干支后台写入队列
+"""
+import sqlite3
+import pytest
+
+import XuanXue as xx
+from XuanXue.xuanxue.core.write_behind import PillarWriteBehind
+
+
+class TestWriteBehind:
+    """后台写入测试类"""
+
+    @pytest.fixture
+    def kbar_db(self, kbar_db_factory):
+        """创建缺失干支的K线数据库"""
+        ts = [f"2023-08-25T{hour:02d}:30:00" for hour in range(9, 15)]
+        yield kbar_db_factory({("600000", "SH", "1h"): {
+            "ts": ts, "open": [10.0] * 6, "high": [10.5] * 6, "low": [9.8] * 6,
+            "close": [10.2] * 6, "volume": [1000] * 6, "amount": [10000.0] * 6,
+        }}, with_pillars=False, configure=True)
+        xx.disable_write_behind()
+
+    def _missing_count(self, db_path):
+        conn = sqlite3.connect(db_path)
+        count = conn.execute("SELECT COUNT(*) FROM kbar_data WHERE year_gan IS NULL").fetchone()[0]
+        conn.close()
+        return count
+
+    def test_read_returns_before_write(self, kbar_db):
+        """测试读取直接返回计算结果，写回由后台完成"""
+        xx.enable_write_behind()
+
+        result = xx.KbarSeriesGanZhi("2023-08-25 09:00:00", "2023-08-25 15:00:00",
+                                     ["600000", "SH", "1h"], useDB=True)
+        assert result.get_length() == 6
+        assert all(ganzhi.startswith("癸卯-") for ganzhi in result.get_ganzhi_list())
+
+        assert xx.flush_write_behind(timeout=10)
+        assert xx.write_behind_queue_depth() == 0
+        assert self._missing_count(kbar_db) == 0
+
+    def test_coalesce_into_one_transaction(self, kbar_db):
+        """测试积压的更新合并到一个事务中写入"""
+        writer = PillarWriteBehind(autostart=False)
+        fields = ("癸", "卯", "庚", "申", "辛", "巳", "癸", "巳")
+        for row_id in range(1, 7):
+            writer.submit(kbar_db, [fields + (row_id,)])
+        # 同一条记录的重复更新也会被合并
+        writer.submit(kbar_db, [fields + (1,)])
+        assert writer.queue_depth() == 7
+
+        writer.start()
+        assert writer.flush(timeout=10)
+        stats = writer.get_stats()
+        writer.close()
+
+        assert stats["transactions"] == 1
+        assert stats["written_rows"] == 6
+        assert stats["queue_depth"] == 0
+        assert self._missing_count(kbar_db) == 0
+
+    def test_disable_flushes_pending(self, kbar_db):
+        """测试关闭时写完剩余的更新"""
+        writer = xx.enable_write_behind()
+        fields = ("癸", "卯", "庚", "申", "辛", "巳", "癸", "巳")
+        writer.submit(kbar_db, [fields + (row_id,) for row_id in range(1, 7)])
+        xx.disable_write_behind()
+
+        assert self._missing_count(kbar_db) == 0
+        assert xx.write_behind_queue_depth() == 0
+
+    def test_submit_after_close(self, kbar_db):
+        """测试关闭后提交的更新同步写入，队列不再积压"""
+        writer = PillarWriteBehind()
+        writer.close()
+        fields = ("癸", "卯", "庚", "申", "辛", "巳", "癸", "巳")
+        writer.submit(kbar_db, [fields + (row_id,) for row_id in range(1, 7)])
+
+        assert writer.queue_depth() == 0
+        assert writer.flush(timeout=1)
+        assert writer.get_stats()["written_rows"] == 6
+        assert self._missing_count(kbar_db) == 0
+
+    def test_failed_rows_in_stats(self, kbar_db, tmp_path):
+        """测试写入失败的记录数计入统计"""
+        writer = PillarWriteBehind()
+        fields = ("癸", "卯", "庚", "申", "辛", "巳", "癸", "巳")
+        writer.submit(str(tmp_path / "missing" / "kbar.db"), [fields + (row_id,) for row_id in range(1, 4)])
+        assert writer.flush(timeout=10)
+        stats = writer.get_stats()
+        writer.close()
+
+        assert stats["errors"] == 1
+        assert stats["failed_rows"] == 3
+        assert stats["written_rows"] == 0
+
+    def test_invalid_args(self):
+        """测试非法参数"""
+        with pytest.raises(ValueError):
+            PillarWriteBehind(max_queue_size=0, autostart=False)